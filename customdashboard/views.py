@@ -5,12 +5,14 @@ from django.shortcuts import render
 from workflow.models import WorkflowLevel2, WorkflowLevel1, SiteProfile,Country, TolaSites
 from customdashboard.models import JupyterNotebooks
 from formlibrary.models import TrainingAttendance, Distribution, Beneficiary
-from indicators.models import CollectedData, Indicator, TolaTable
+from indicators.models import CollectedData, Indicator, IndicatorActuals, TolaTable
 
 from django.db.models import Sum
 from django.db.models import Q
 
-from tola.util import getCountry, get_table
+from tola.access import get_access_context
+from tola.util import get_table
+from workflow.scorecard import get_scorecards
 
 from django.contrib.auth.decorators import login_required
 import requests
@@ -30,39 +32,24 @@ class ProgramList(ListView):
 
         ## retrieve the coutries the user has data access for
         country = None
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         country_list = Country.objects.all().filter(id__in=countries)
         if int(self.kwargs['pk']) == 0:
             getworkflowlevel1 = WorkflowLevel1.objects.all().filter(country__in=countries)
+            country_ids = get_access_context(request).country_ids
         else:
             getworkflowlevel1 = WorkflowLevel1.objects.all().filter(country__id=self.kwargs['pk'])
             country = Country.objects.get(id=self.kwargs['pk']).country
+            country_ids = [int(self.kwargs['pk'])]
 
-        workflowlevel1_list = []
-        for workflowlevel1 in getworkflowlevel1:
-            # get the percentage of indicators with data
-            getInidcatorDataCount = Indicator.objects.filter(workflowlevel1__id=workflowlevel1.id).exclude(collecteddata__periodic_target=None).count()
-            getInidcatorCount = Indicator.objects.filter(workflowlevel1__id=workflowlevel1.id).count()
-            if getInidcatorCount > 0 and getInidcatorDataCount > 0:
-                getInidcatorDataPercent = 100 * float(getInidcatorDataCount) / float(getInidcatorCount)
-            else:
-                getInidcatorDataPercent = 0
-
-            workflowlevel1.indicator_data_percent = int(getInidcatorDataPercent)
-            workflowlevel1.indicator_percent = int(100 - getInidcatorDataPercent)
-
-            # get the percentage of projects with completes (tracking)
-            getProjectAgreementCount = WorkflowLevel2.objects.filter(workflowlevel1__id=workflowlevel1.id).count()
-            getProjectCompleteCount = WorkflowLevel2.objects.filter(workflowlevel1__id=workflowlevel1.id).count()
-            if getProjectAgreementCount > 0 and getProjectCompleteCount > 0:
-                project_percent = 100 * float(getProjectCompleteCount) / float(getProjectAgreementCount)
-            else:
-                project_percent = 0
-
-            # append the rounded percentages to the workflowlevel1 list
-            workflowlevel1.project_percent = int(project_percent)
-            workflowlevel1.project_agreement_percent = int(100 - project_percent)
-            workflowlevel1_list.append(workflowlevel1)
+        # the percentages of indicators with data and of projects tracking
+        workflowlevel1_list = list(getworkflowlevel1.distinct())
+        scorecards = get_scorecards(
+            [workflowlevel1.id for workflowlevel1 in workflowlevel1_list],
+            country_ids)
+        for workflowlevel1 in workflowlevel1_list:
+            for key, value in scorecards[workflowlevel1.id].items():
+                setattr(workflowlevel1, key, value)
 
         return render(request, self.template_name, {'getworkflowlevel1': workflowlevel1_list, 'getCountry': country_list, 'country': country})
 
@@ -76,12 +63,12 @@ def DefaultCustomDashboard(request,id=0,status=0):
     """
     workflowlevel1_id = id
 
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
 
     #transform to list if a submitted country
     selected_countries_list = Country.objects.all().filter(workflowlevel1__id=workflowlevel1_id)
 
-    getQuantitativeDataSums = CollectedData.objects.filter(indicator__workflowlevel1__id=workflowlevel1_id,achieved__isnull=False, indicator__key_performance_indicator=True).exclude(achieved=None,periodic_target=None).order_by('indicator__number').values('indicator__number','indicator__name','indicator__id').annotate(targets=Sum('periodic_target'), actuals=Sum('achieved')).exclude(achieved=None)
+    getQuantitativeDataSums = IndicatorActuals.objects.filter(indicator__workflowlevel1__id=workflowlevel1_id, indicator__key_performance_indicator=True, has_data=True).order_by('indicator__number').values('indicator__number','indicator__name','indicator__id','targets','actuals')
 
     totalTargets = getQuantitativeDataSums.aggregate(Sum('targets'))
     totalActuals = getQuantitativeDataSums.aggregate(Sum('actuals'))
@@ -143,7 +130,7 @@ def PublicDashboard(request,id=0,public=0):
     """
     workflowlevel1_id = id
     getQuantitativeDataSums_2 = CollectedData.objects.all().filter(indicator__workflowlevel1__id=workflowlevel1_id,achieved__isnull=False).order_by('indicator__source').values('indicator__number','indicator__source','indicator__id')
-    getQuantitativeDataSums = CollectedData.objects.all().filter(indicator__workflowlevel1__id=workflowlevel1_id,achieved__isnull=False).exclude(achieved=None,periodic_target=None).order_by('indicator__number').values('indicator__number','indicator__name','indicator__id').annotate(targets=Sum('periodic_target__target'), actuals=Sum('achieved'))
+    getQuantitativeDataSums = IndicatorActuals.objects.filter(indicator__workflowlevel1__id=workflowlevel1_id, has_data=True).order_by('indicator__number').values('indicator__number','indicator__name','indicator__id','targets','actuals')
     getIndicatorCount = Indicator.objects.all().filter(workflowlevel1__id=workflowlevel1_id).count()
 
     getIndicatorData = CollectedData.objects.all().filter(indicator__workflowlevel1__id=workflowlevel1_id,achieved__isnull=False).order_by('date_collected')
@@ -440,7 +427,7 @@ def RRIMAPublicDashboard(request,id=0):
 
 
     ## retrieve the coutries the user has data access for
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
 
     #retrieve projects for a workflowlevel1
     getProjects = WorkflowLevel2.objects.all()##.filter(workflowlevel1__id=1, workflowlevel1__country__in=1)
@@ -489,7 +476,7 @@ def RRIMAJupyterView1(request,id=0):
     # getworkflowlevel1 = workflowlevel1.objects.all().filter(id=workflowlevel1_id)
 
     ## retrieve the coutries the user has data access for
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
     with open('static/rrima.html') as myfile: data = "\n".join(line for line in myfile)
 
     return HttpResponse(data)
\ No newline at end of file
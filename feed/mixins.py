@@ -0,0 +1,189 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from tola.util import queryset_chunks
+from .renderers import NDJSONRenderer, stream_json_array, stream_ndjson
+
+
+class ListResponseMixin(object):
+    """
+    For viewsets that override list() to scope the queryset by the user.
+    The response goes through the pagination class like ListModelMixin.
+
+    Large lists can be streamed with `?stream=1` (a JSON array) or as
+    NDJSON with `?format=ndjson` / `Accept: application/x-ndjson`. Rows are
+    read with a server-side cursor and serialized in chunks, so memory use
+    does not grow with the number of rows.
+    """
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + \
+        [NDJSONRenderer]
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list_response(self, queryset):
+        if self.is_streaming_requested():
+            return self.streaming_list_response(queryset)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def is_streaming_requested(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if isinstance(renderer, NDJSONRenderer):
+            return True
+        stream = self.request.query_params.get(self.stream_query_param, '')
+        return stream.lower() in ('1', 'true')
+
+    def streaming_list_response(self, queryset):
+        chunks = (self.get_serializer(chunk, many=True).data
+                  for chunk in queryset_chunks(queryset,
+                                               self.stream_chunk_size))
+        if isinstance(self.request.accepted_renderer, NDJSONRenderer):
+            content = stream_ndjson(chunks)
+            content_type = NDJSONRenderer.media_type
+        else:
+            content = stream_json_array(chunks)
+            content_type = 'application/json'
+        return StreamingHttpResponse(content, content_type=content_type)
+
+
+class EagerLoadPlan(object):
+    """
+    select_related/prefetch_related lookups and the columns (None for all)
+    a serializer reads, see plan_eager_loading.
+    """
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(
+                *sorted(self.prefetch_related))
+        if self.only is not None:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _get_relation(model, name):
+    """
+    Return (related model, is many) if `name` is a forward or reverse
+    relation of model, else None.
+    """
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = None
+    if field is not None and field.is_relation and \
+            not field.auto_created and field.related_model:
+        return field.related_model, field.many_to_many
+
+    for related in model._meta.related_objects:
+        if related.get_accessor_name() == name:
+            return related.related_model, not related.one_to_one
+    return None
+
+
+def _plan_serializer(serializer, model, plan, prefix='', in_prefetch=False):
+    """
+    Add the lookups the fields of serializer need to the plan. Returns the
+    concrete columns read from model, or None if a field may read
+    anything else (methods, properties, annotations).
+    """
+    columns = set([model._meta.pk.name])
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, serializers.HyperlinkedIdentityField):
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                nested_columns = _plan_serializer(
+                    field, model, plan, prefix, in_prefetch)
+                columns = None if columns is None or nested_columns is None \
+                    else columns | nested_columns
+            else:
+                columns = None
+            continue
+
+        current_model, path, many = model, prefix, in_prefetch
+        for index, attr in enumerate(field.source_attrs):
+            relation = _get_relation(current_model, attr)
+            if relation is None:
+                if index == 0 and columns is not None and attr in [
+                        f.name for f in model._meta.concrete_fields]:
+                    columns.add(attr)
+                elif index == 0:
+                    columns = None
+                break
+
+            related_model, relation_many = relation
+            lookup = path + attr
+            last = index == len(field.source_attrs) - 1
+            if index == 0 and columns is not None and attr in [
+                    f.name for f in model._meta.concrete_fields]:
+                columns.add(attr)
+            many = many or relation_many
+
+            if last and isinstance(field, serializers.RelatedField) and \
+                    field.use_pk_only_optimization():
+                # hyperlinks and primary keys only need the fk column
+                break
+            if many:
+                plan.prefetch_related.add(lookup)
+            else:
+                plan.select_related.add(lookup)
+
+            if last and isinstance(field, serializers.ListSerializer):
+                _plan_serializer(field.child, related_model, plan,
+                                 lookup + '__', True)
+            elif last and isinstance(field, serializers.BaseSerializer):
+                _plan_serializer(field, related_model, plan, lookup + '__',
+                                 many)
+            current_model, path = related_model, lookup + '__'
+    return columns
+
+
+_plans = {}
+
+
+def plan_eager_loading(serializer_class):
+    """
+    Derive the eager loading of a queryset from the declared and nested
+    fields of a ModelSerializer, so rendering a list takes the same number
+    of queries for any number of rows. Plans are cached per class.
+    """
+    if serializer_class not in _plans:
+        plan = EagerLoadPlan()
+        model = serializer_class.Meta.model
+        columns = _plan_serializer(serializer_class(), model, plan)
+        concrete = set(f.name for f in model._meta.concrete_fields)
+        # only() is pointless when every column is read anyway
+        plan.only = columns if columns and columns != concrete else None
+        _plans[serializer_class] = plan
+    return _plans[serializer_class]
+
+
+class EagerLoadingMixin(object):
+    """
+    Applies plan_eager_loading for the serializer class of the request to
+    the viewset queryset. It is done in filter_queryset so it also covers
+    viewsets overriding get_queryset.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super(EagerLoadingMixin, self).filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, serializers.ModelSerializer):
+            return queryset
+        return plan_eager_loading(serializer_class).apply(queryset)
@@ -0,0 +1,170 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination over a unique ordering.
+
+    Pages are selected with `WHERE (edit_date, id) > (last row)` instead of
+    an OFFSET, so the cost of a page does not grow with its position. The
+    ordering is `id` by default, `?cursor_ordering=edit_date` walks by
+    `(edit_date, id)` to sync the latest changes. The columns are compared
+    as they are so the `(edit_date, id)` indexes are used: rows without
+    an edit date are walked first by id, in a separate phase.
+
+    To keep the existing API responses, lists are only paginated when the
+    client asks for it with `?page_size=` or a `?cursor=` from a previous
+    page. The response is `{"next": <url or null>, "results": [...]}`.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'cursor_ordering'
+    orderings = OrderedDict((
+        ('id', ('id',)),
+        ('edit_date', ('edit_date', 'id')),
+    ))
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering_key, position = self.decode_cursor(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        first = self.ordering[0]
+        nullable = queryset.model._meta.get_field(first).null
+        if position is not None and position[0] is None and not nullable:
+            raise NotFound(self.invalid_cursor_message)
+
+        results = []
+        if nullable and (position is None or position[0] is None):
+            nulls = queryset.filter(**{'{}__isnull'.format(first): True})
+            if position is not None:
+                nulls = nulls.filter(
+                    self.get_position_filter(position[1:], self.ordering[1:]))
+            results = list(nulls[:self.page_size + 1])
+            position = None
+        if len(results) <= self.page_size:
+            if nullable:
+                queryset = queryset.filter(
+                    **{'{}__isnull'.format(first): False})
+            if position is not None:
+                queryset = queryset.filter(
+                    self.get_position_filter(position, self.ordering))
+            results += list(queryset[:self.page_size + 1 - len(results)])
+
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.has_next:
+            last = results[-1]
+            self.next_position = [getattr(last, name)
+                                  for name in self.ordering]
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Return the names of the fields of the ordering. Only the first one
+        may be nullable, its NULL rows are walked first.
+        """
+        ordering = self.orderings[self.ordering_key]
+        for name in ordering:
+            try:
+                queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise NotFound('Cannot order {} by {}'.format(
+                    queryset.model.__name__, name))
+        return ordering
+
+    def get_position_filter(self, position, fields):
+        """
+        Rows after `position` in lexicographical order of `fields`, e.g.
+        for two fields `a > x OR (a = x AND b > y)`.
+        """
+        position_filter = Q()
+        for index, field in enumerate(fields):
+            condition = Q(**{'{}__gt'.format(field): position[index]})
+            for previous in range(index):
+                condition &= Q(**{fields[previous]: position[previous]})
+            position_filter |= condition
+        return position_filter
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.base_url, self.cursor_query_param,
+                                  self.encode_cursor())
+        return remove_query_param(url, self.ordering_query_param)
+
+    def encode_cursor(self):
+        position = [value.isoformat() if isinstance(value, datetime)
+                    else value for value in self.next_position]
+        return base64.urlsafe_b64encode(
+            json.dumps([self.ordering_key, position]))
+
+    def decode_cursor(self, request):
+        """
+        Return the ordering key and the position of the last row of the
+        previous page, or None for the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            ordering_key = request.query_params.get(
+                self.ordering_query_param, 'id')
+            if ordering_key not in self.orderings:
+                raise NotFound(self.invalid_cursor_message)
+            return ordering_key, None
+
+        try:
+            ordering_key, position = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii')))
+            fields = self.orderings[ordering_key]
+            if len(position) != len(fields):
+                raise ValueError
+            # the first value is null in the phase of the NULL rows
+            position = [None if index == 0 and value is None
+                        else int(value) if name == 'id'
+                        else self._parse_datetime(value)
+                        for index, (name, value)
+                        in enumerate(zip(fields, position))]
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return ordering_key, position
+
+    @staticmethod
+    def _parse_datetime(value):
+        value = parse_datetime(value)
+        if value is None:
+            raise ValueError
+        return value
@@ -3,6 +3,7 @@ from rest_framework.relations import ManyRelatedField
 
 from django.http import QueryDict
 
+from tola.access import get_access_context
 from workflow.models import *
 from indicators.models import *
 from formlibrary.models import *
@@ -45,14 +46,14 @@ class IsOrgMember(permissions.BasePermission):
             return True
 
         if view.action == 'create':
-            user_org = request.user.tola_user.organization
+            user_org_id = get_access_context(request).organization_id
 
             if 'organization' in request.data:
                 org_serializer = view.serializer_class().get_fields()[
                     'organization']
                 primitive_value = request.data.get('organization')
                 org = org_serializer.run_validation(primitive_value)
-                return org == user_org
+                return getattr(org, 'id', None) == user_org_id
 
         return True
 
@@ -64,10 +65,8 @@ class IsOrgMember(permissions.BasePermission):
 
         if request.user.is_superuser:
             return True
-        user_groups = request.user.groups.values_list('name', flat=True)
-        org_admin = True if ROLE_ORGANIZATION_ADMIN in user_groups else False
-
-        user_org = request.user.tola_user.organization
+        access = get_access_context(request)
+        user_org_id = access.organization_id
         try:
             if obj.__class__ in [Sector, ProjectType, SiteProfile, Frequency,
                                  FundCode, DisaggregationType, Level,
@@ -75,25 +74,23 @@ class IsOrgMember(permissions.BasePermission):
                                  StakeholderType, ProfileType, Contact,
                                  ApprovalType, Distribution, CustomForm,
                                  CodedField, IssueRegister, Award, Milestone,
-                                 Portfolio, WorkflowLevel1]:
-                return obj.organization == user_org
-            elif obj.__class__ in [Objective, Beneficiary, Documentation,
-                                   CollectedData, WorkflowLevel2,
-                                   WorkflowLevel2Sort]:
-                return obj.workflowlevel1.organization == user_org
-            elif obj.__class__ in [Checklist, Budget, RiskRegister]:
-                return obj.workflowlevel2.workflowlevel1.organization == \
-                       user_org
+                                 Portfolio, WorkflowLevel1, Objective,
+                                 Beneficiary, Documentation, CollectedData,
+                                 WorkflowLevel2, Checklist, Budget,
+                                 RiskRegister]:
+                return obj.organization_id == user_org_id
+            elif obj.__class__ in [WorkflowLevel2Sort]:
+                return obj.workflowlevel1.organization_id == user_org_id
             elif obj.__class__ in [Organization]:
-                return obj == user_org
+                return obj.id == user_org_id
             elif obj.__class__ in [WorkflowTeam]:
-                if org_admin:
-                    return obj.workflow_user.organization == user_org
+                if access.is_org_admin:
+                    return obj.workflow_user.organization_id == user_org_id
                 else:
-                    return obj.workflowlevel1.organization == user_org
+                    return obj.workflowlevel1.organization_id == user_org_id
             elif obj.__class__ in [Indicator]:
                 return obj.workflowlevel1.filter(
-                    organization=user_org).exists()
+                    organization_id=user_org_id).exists()
         except AttributeError:
             pass
         return False
@@ -103,12 +100,12 @@ class AllowTolaRoles(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.user.is_superuser:
             return True
-        user_groups = request.user.groups.values_list('name', flat=True)
+        access = get_access_context(request)
 
         queryset = self._queryset(view)
         model_cls = queryset.model
         if view.action == 'create':
-            user_org = request.user.tola_user.organization
+            user_org_id = access.organization_id
 
             if 'workflowlevel1' in request.data:
                 wflvl1_serializer = view.serializer_class().get_fields()[
@@ -127,25 +124,22 @@ class AllowTolaRoles(permissions.BasePermission):
                 # We use a list to fetch the program teams
                 if not isinstance(wflvl1, list):
                     wflvl1 = [wflvl1]
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1__in=wflvl1).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for(wflvl1)
 
                 if model_cls in [Contact, CustomForm, Documentation, Indicator,
                                  Level, CollectedData, Objective,
                                  WorkflowLevel2]:
                     return ((ROLE_VIEW_ONLY not in team_groups or
-                             ROLE_ORGANIZATION_ADMIN in user_groups) and
-                            all(x.organization == user_org for x in wflvl1))
+                             access.is_org_admin) and
+                            all(x.organization_id == user_org_id for x in wflvl1))
                 elif model_cls is WorkflowTeam:
                     return (((ROLE_VIEW_ONLY not in team_groups and
                             ROLE_PROGRAM_TEAM not in team_groups) or
-                             ROLE_ORGANIZATION_ADMIN in user_groups) and
-                            all(x.organization == user_org for x in wflvl1))
+                             access.is_org_admin) and
+                            all(x.organization_id == user_org_id for x in wflvl1))
 
             elif model_cls is Portfolio:
-                return ROLE_ORGANIZATION_ADMIN in user_groups
+                return access.is_org_admin
 
         return True
 
@@ -178,54 +172,39 @@ class AllowTolaRoles(permissions.BasePermission):
         if request.user and request.user.is_authenticated():
             if request.user.is_superuser:
                 return True
-            user_groups = request.user.groups.values_list('name', flat=True)
-            if ROLE_ORGANIZATION_ADMIN in user_groups:
+            access = get_access_context(request)
+            if access.is_org_admin:
                 return True
 
             queryset = self._queryset(view)
             model_cls = queryset.model
             if model_cls is Portfolio:
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1__portfolio=obj).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for(obj.workflowlevel1_set.all())
                 if ROLE_PROGRAM_ADMIN in team_groups or ROLE_PROGRAM_TEAM in \
                         team_groups:
                     return view.action == 'retrieve'
             elif model_cls is WorkflowTeam:
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1=obj.workflowlevel1).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for([obj.workflowlevel1_id])
                 if ROLE_PROGRAM_ADMIN in team_groups:
                     return True
                 else:
                     return view.action == 'retrieve'
             elif model_cls is WorkflowLevel1:
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1=obj).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for([obj.id])
                 if ROLE_PROGRAM_ADMIN in team_groups:
                     return True
                 elif ROLE_PROGRAM_TEAM in team_groups:
                     return view.action != 'destroy'
             elif model_cls is Indicator:
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1__indicator=obj).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for(obj.workflowlevel1.all())
                 if ROLE_PROGRAM_ADMIN in team_groups:
                     return True
                 elif ROLE_PROGRAM_TEAM in team_groups:
                     return view.action != 'destroy'
                 elif ROLE_VIEW_ONLY in team_groups:
-                    return view.action == 'retrieve'
+                    return view.action in ('retrieve', 'progress')
             elif model_cls in [CollectedData, Level, WorkflowLevel2]:
-                team_groups = WorkflowTeam.objects.filter(
-                    workflow_user=request.user.tola_user,
-                    workflowlevel1=obj.workflowlevel1).values_list(
-                    'role__name', flat=True)
+                team_groups = access.roles_for([obj.workflowlevel1_id])
                 if ROLE_PROGRAM_ADMIN in team_groups:
                     return True
                 elif ROLE_PROGRAM_TEAM in team_groups:
@@ -239,10 +218,7 @@ class AllowTolaRoles(permissions.BasePermission):
                             'workflowlevel1']
                         wflvl1 = serializer.run_validation(request.data.get(
                                 'workflowlevel1'))
-                        team_groups = WorkflowTeam.objects.filter(
-                            workflow_user=request.user.tola_user,
-                            workflowlevel1=wflvl1).values_list(
-                            'role__name', flat=True)
+                        team_groups = access.roles_for([wflvl1])
                         return ROLE_VIEW_ONLY not in team_groups
                     return True
                 else:
@@ -0,0 +1,42 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def json_line(item):
+    return json.dumps(item, cls=JSONEncoder).encode('utf-8') + b'\n'
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Newline delimited JSON, one object per line. List endpoints stream it,
+    see ListResponseMixin.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(json_line(item) for item in items)
+
+
+def stream_json_array(chunks):
+    """
+    Render serialized chunks as one JSON array, chunk by chunk.
+    """
+    yield b'['
+    separator = b''
+    for data in chunks:
+        for item in data:
+            yield separator + json.dumps(item, cls=JSONEncoder).encode('utf-8')
+            separator = b','
+    yield b']'
+
+
+def stream_ndjson(chunks):
+    for data in chunks:
+        yield b''.join(json_line(item) for item in data)
@@ -1,8 +1,11 @@
+import json
+
 from rest_framework import serializers
 
 from workflow.models import *
 from indicators.models import *
 from formlibrary.models import *
+from reports.models import ExportJob
 from django.contrib.auth.models import User, Group
 from rest_framework.reverse import reverse
 
@@ -30,39 +33,36 @@ class WorkflowLevel1Serializer(serializers.HyperlinkedModelSerializer):
     workflow_key = serializers.UUIDField(read_only=True)
     id = serializers.ReadOnlyField()
     status = serializers.SerializerMethodField()
-    budget = serializers.ReadOnlyField()
-    actuals = serializers.ReadOnlyField()
+    budget = serializers.SerializerMethodField()
+    actuals = serializers.SerializerMethodField()
     difference = serializers.SerializerMethodField()
+    project_counts = serializers.SerializerMethodField()
+
+    def _get_rollup(self, obj):
+        try:
+            return obj.rollup
+        except WorkflowLevel1Rollup.DoesNotExist:
+            return None
 
     def get_status(self, obj):
-        get_projects = WorkflowLevel2.objects.all().filter(workflowlevel1=obj)
-        score = []
-        red = ""
-        yellow = ""
-        green = ""
-
-        for project_status in get_projects:
-            if project_status.status == "red":
-                score.append(red)
-            if project_status.status == "yellow":
-                score.append(yellow)
-            if project_status.status == "green":
-                score.append(green)
-        if score:
-            calculated_status = max(score)
-        else:
-            calculated_status = "green"
-
-        return calculated_status
+        rollup = self._get_rollup(obj)
+        return rollup.status if rollup else WorkflowLevel2.STATUS_GREEN
+
+    def get_budget(self, obj):
+        rollup = self._get_rollup(obj)
+        return rollup.budget if rollup else None
+
+    def get_actuals(self, obj):
+        rollup = self._get_rollup(obj)
+        return rollup.actuals if rollup else None
 
     def get_difference(self, obj):
-        try:
-            if obj.budget:
-                return obj.budget - obj.actuals
-            else:
-                return 0
-        except AttributeError:
-            return None
+        rollup = self._get_rollup(obj)
+        return rollup.difference if rollup and rollup.budget else 0
+
+    def get_project_counts(self, obj):
+        rollup = self._get_rollup(obj) or WorkflowLevel1Rollup()
+        return rollup.progress_counts
 
     class Meta:
         model = WorkflowLevel1
@@ -633,3 +633,31 @@ class WorkflowLevel1SectorSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkflowLevel1Sector
         fields = '__all__'
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """
+    An export started through the API, see reports.exports. The filters are
+    an object of the filter fields of the resource.
+    """
+    filters = serializers.JSONField(required=False)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'resource', 'format', 'filters', 'status',
+                  'rows_done', 'rows_total', 'error', 'download_url',
+                  'create_date', 'edit_date')
+        read_only_fields = ('status', 'rows_done', 'rows_total', 'error',
+                            'create_date', 'edit_date')
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_DONE:
+            return None
+        return reverse('exportjob-download', kwargs={'pk': obj.pk},
+                       request=self.context.get('request'))
+
+    def to_representation(self, obj):
+        data = super(ExportJobSerializer, self).to_representation(obj)
+        data['filters'] = json.loads(obj.filters or '{}')
+        return data
@@ -0,0 +1,105 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+import factories
+from feed.mixins import plan_eager_loading
+from feed.serializers import (
+    CollectedDataSerializer, IndicatorLightSerializer,
+    StakeholderFullSerializer, TolaUserSerializer,
+    WorkflowLevel2FullSerializer)
+from feed.views import CollectedDataViewSet, StakeholderViewSet
+from tola.access import get_program_roles
+from workflow.models import WorkflowTeam, ROLE_PROGRAM_ADMIN
+
+
+class EagerLoadingPlanTest(TestCase):
+    def test_plan_hyperlinks(self):
+        plan = plan_eager_loading(CollectedDataSerializer)
+        # hyperlinks to foreign keys only need the id column
+        self.assertEqual(plan.select_related, set())
+        self.assertEqual(plan.prefetch_related,
+                         {'site', 'disaggregation_value'})
+        self.assertIsNone(plan.only)
+
+    def test_plan_nested(self):
+        plan = plan_eager_loading(WorkflowLevel2FullSerializer)
+        self.assertEqual(plan.select_related,
+                         {'workflowlevel1', 'office', 'sector'})
+        self.assertIn('workflowlevel1__country', plan.prefetch_related)
+        self.assertIn('stakeholder', plan.prefetch_related)
+
+    def test_plan_nested_many(self):
+        plan = plan_eager_loading(StakeholderFullSerializer)
+        self.assertEqual(plan.select_related, {'country'})
+        self.assertTrue({'contact', 'sectors', 'approval',
+                         'sectors__sector_nearest'}.issubset(
+            plan.prefetch_related))
+
+    def test_plan_depth(self):
+        plan = plan_eager_loading(TolaUserSerializer)
+        self.assertTrue({'user', 'organization', 'country'}.issubset(
+            plan.select_related))
+        self.assertIn('countries', plan.prefetch_related)
+
+    def test_plan_only(self):
+        plan = plan_eager_loading(IndicatorLightSerializer)
+        self.assertIsNone(plan.only)
+
+        class IndicatorNameSerializer(IndicatorLightSerializer):
+            class Meta(IndicatorLightSerializer.Meta):
+                fields = ('name', 'number', 'indicator_type')
+
+        plan = plan_eager_loading(IndicatorNameSerializer)
+        self.assertEqual(plan.only, {'id', 'name', 'number'})
+        self.assertEqual(plan.prefetch_related, {'indicator_type'})
+
+
+class EagerLoadingViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.tola_user = factories.TolaUser()
+        self.wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user, workflowlevel1=self.wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_ADMIN))
+        # keep the cached team roles out of the counts
+        get_program_roles(self.tola_user.id)
+
+    def _count_queries(self, view, url):
+        request = self.factory.get(url)
+        request.user = self.tola_user.user
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+            self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_collecteddata_queries(self):
+        view = CollectedDataViewSet.as_view({'get': 'list'})
+        indicator = factories.Indicator(workflowlevel1=[self.wflvl1])
+        factories.CollectedData(indicator=indicator,
+                                workflowlevel1=self.wflvl1)
+        count, response = self._count_queries(view, '/api/collecteddata/')
+        self.assertEqual(len(response.data), 1)
+
+        factories.CollectedData.create_batch(
+            4, indicator=indicator, workflowlevel1=self.wflvl1)
+        count_more, response = self._count_queries(
+            view, '/api/collecteddata/')
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(count, count_more)
+
+    def test_list_stakeholder_nested_queries(self):
+        view = StakeholderViewSet.as_view({'get': 'list'})
+        factories.Stakeholder(workflowlevel1=[self.wflvl1])
+        url = '/api/stakeholder/?nested_models=true'
+        count, response = self._count_queries(view, url)
+        self.assertEqual(len(response.data), 1)
+        self.assertIn('country', response.data[0])
+
+        factories.Stakeholder.create_batch(3, workflowlevel1=[self.wflvl1])
+        count_more, response = self._count_queries(view, url)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(count, count_more)
@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings, tag
+from rest_framework.test import APIRequestFactory
+
+import factories
+from feed.views import ExportJobViewSet
+from reports import exports
+from reports.models import ExportJob
+from workflow.models import ROLE_ORGANIZATION_ADMIN, ROLE_PROGRAM_ADMIN
+
+
+@tag('pkg')
+class ExportJobViewTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+        self.tola_user = factories.TolaUser()
+        self.organization = self.tola_user.organization
+        self.wflvl1 = factories.WorkflowLevel1(organization=self.organization)
+        factories.WorkflowTeam(workflow_user=self.tola_user,
+                               workflowlevel1=self.wflvl1,
+                               role=factories.Group(name=ROLE_PROGRAM_ADMIN))
+        factories.Stakeholder(organization=self.organization,
+                              workflowlevel1=[self.wflvl1])
+        self.factory = APIRequestFactory()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def _create(self, data, user=None):
+        request = self.factory.post('/api/exportjob/', data, format='json')
+        request.user = user or self.tola_user.user
+        return ExportJobViewSet.as_view({'post': 'create'})(request)
+
+    def _get(self, action, pk, user=None):
+        request = self.factory.get('/api/exportjob/%s/' % pk)
+        request.user = user or self.tola_user.user
+        return ExportJobViewSet.as_view({'get': action})(request, pk=pk)
+
+    def test_export(self):
+        response = self._create({
+            'resource': 'stakeholder', 'format': 'csv',
+            'filters': {'workflowlevel1': self.wflvl1.id}})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], ExportJob.STATUS_PENDING)
+        self.assertEqual(response.data['filters'],
+                         {'workflowlevel1': unicode(self.wflvl1.id)})
+        pk = response.data['id']
+        self.assertEqual(self._get('download', pk).status_code, 409)
+
+        exports.run_pending()
+        response = self._get('retrieve', pk)
+        self.assertEqual((response.data['rows_done'],
+                          response.data['rows_total']), (1, 1))
+        self.assertTrue(response.data['download_url'].endswith(
+            '/api/exportjob/%s/download/' % pk))
+        response = self._get('download', pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename=stakeholder.csv')
+
+        # same export, same job
+        self.assertEqual(self._create({'resource': 'stakeholder',
+                                       'filters': {'workflowlevel1':
+                                                   self.wflvl1.id}})
+                         .data['id'], pk)
+
+    def test_other_organization(self):
+        pk = self._create({'resource': 'stakeholder'}).data['id']
+        other_user = factories.TolaUser(
+            user=factories.User(username='other'),
+            organization=factories.Organization(name='Other Org'))
+        self.assertEqual(self._get('retrieve', pk, other_user.user)
+                         .status_code, 404)
+
+    def test_programs(self):
+        other_wflvl1 = factories.WorkflowLevel1(
+            name='Other Program', organization=self.organization)
+        factories.Stakeholder(organization=self.organization,
+                              workflowlevel1=[other_wflvl1])
+        org_admin = factories.TolaUser(
+            user=factories.User(username='orgadmin'),
+            organization=self.organization)
+        org_admin.user.groups.add(
+            factories.Group(name=ROLE_ORGANIZATION_ADMIN))
+
+        admin_pk = self._create({'resource': 'stakeholder'},
+                                org_admin.user).data['id']
+        response = self._create({'resource': 'stakeholder'})
+        pk = response.data['id']
+        self.assertNotEqual(pk, admin_pk)
+        exports.run_pending()
+        self.assertEqual(self._get('retrieve', pk).data['rows_total'], 1)
+        self.assertEqual(self._get('retrieve', admin_pk, org_admin.user)
+                         .data['rows_total'], 2)
+
+        # the export of the org admin has programs the user can't see
+        self.assertEqual(self._get('retrieve', admin_pk).status_code, 404)
+        self.assertEqual(self._get('download', admin_pk).status_code, 404)
+
+    def test_invalid(self):
+        self.assertEqual(self._create({'resource': 'user'}).status_code, 400)
+        self.assertEqual(self._create({'resource': 'stakeholder',
+                                       'format': 'pdf'}).status_code, 400)
+        self.assertEqual(self._create({
+            'resource': 'stakeholder',
+            'filters': {'name': 'Stakeholder'}}).status_code, 400)
+        self.assertEqual(self._create({
+            'resource': 'stakeholder',
+            'filters': {'workflowlevel1': 'abc'}}).status_code, 400)
@@ -119,6 +119,24 @@ class IndicatorListViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
 
+    def test_list_indicator_actuals(self):
+        wflvl1 = factories.WorkflowLevel1()
+        indicator = factories.Indicator(workflowlevel1=[wflvl1])
+        factories.CollectedData(indicator=indicator, workflowlevel1=wflvl1,
+                                achieved=5)
+        factories.CollectedData(indicator=indicator, workflowlevel1=wflvl1,
+                                achieved=7)
+
+        request = self.factory.get('/api/indicator/')
+        request.user = factories.User.build(is_superuser=True,
+                                            is_staff=True)
+        view = IndicatorViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        actuals = {i['id']: i['actuals'] for i in response.data}
+        self.assertEqual(actuals[indicator.id], 12)
+        self.assertEqual(actuals[Indicator.objects.first().id], None)
+
 
 class IndicatorCreateViewsTest(TestCase):
     def setUp(self):
@@ -606,3 +624,41 @@ class IndicatorFilterViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], indicator1_1.name)
+
+
+class IndicatorProgressViewTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.tola_user = factories.TolaUser()
+        self.wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        self.indicator = factories.Indicator(workflowlevel1=[self.wflvl1])
+        factories.PeriodicTarget(indicator=self.indicator, period='Year 1',
+                                 target=10)
+
+    def _progress(self):
+        request = self.factory.get('/api/indicator/%s/progress/' %
+                                   self.indicator.pk)
+        request.user = self.tola_user.user
+        view = IndicatorViewSet.as_view({'get': 'progress'})
+        return view(request, pk=self.indicator.pk)
+
+    def test_progress_view_only(self):
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user,
+            workflowlevel1=self.wflvl1,
+            role=factories.Group(name=ROLE_VIEW_ONLY))
+        response = self._progress()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.indicator.pk)
+        self.assertEqual(len(response.data['periods']), 1)
+        self.assertEqual(response.data['periods'][0]['periodic_targets'],
+                         ['Year 1'])
+
+    def test_progress_other_program(self):
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user,
+            workflowlevel1=factories.WorkflowLevel1(
+                organization=self.tola_user.organization),
+            role=factories.Group(name=ROLE_VIEW_ONLY))
+        self.assertEqual(self._progress().status_code, 403)
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from django.test import TestCase
+from django.utils.timezone import utc
+from rest_framework.test import APIRequestFactory
+
+import factories
+from feed.views import CollectedDataViewSet
+from indicators.models import CollectedData
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        factories.CollectedData.create_batch(5)
+        self.factory = APIRequestFactory()
+        self.user = factories.User.build(is_superuser=True, is_staff=True)
+        self.view = CollectedDataViewSet.as_view({'get': 'list'})
+
+    def _walk(self, url):
+        ids = []
+        while url:
+            request = self.factory.get(url)
+            request.user = self.user
+            response = self.view(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [data['id'] for data in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_list_unpaginated_by_default(self):
+        request = self.factory.get('/api/collecteddata/')
+        request.user = self.user
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+
+    def test_list_by_id(self):
+        ids = self._walk('/api/collecteddata/?page_size=2')
+        self.assertEqual(ids, sorted(CollectedData.objects.values_list(
+            'id', flat=True)))
+
+    def test_list_by_edit_date(self):
+        first, second, third, fourth, fifth = CollectedData.objects.order_by(
+            'id').values_list('id', flat=True)
+        edit_date = datetime(2017, 1, 1, tzinfo=utc)
+        CollectedData.objects.filter(id__in=[first, fourth]).update(
+            edit_date=edit_date.replace(month=2))
+        CollectedData.objects.filter(id=second).update(edit_date=None)
+        CollectedData.objects.filter(id__in=[third, fifth]).update(
+            edit_date=edit_date)
+
+        ids = self._walk('/api/collecteddata/?page_size=2'
+                         '&cursor_ordering=edit_date')
+        self.assertEqual(ids, [second, third, fifth, first, fourth])
+
+    def test_list_by_edit_date_nulls_over_pages(self):
+        first, second, third, fourth, fifth = CollectedData.objects.order_by(
+            'id').values_list('id', flat=True)
+        CollectedData.objects.filter(id__in=[second, third, fifth]).update(
+            edit_date=None)
+        CollectedData.objects.filter(id=first).update(
+            edit_date=datetime(2017, 2, 1, tzinfo=utc))
+        CollectedData.objects.filter(id=fourth).update(
+            edit_date=datetime(2017, 1, 1, tzinfo=utc))
+
+        ids = self._walk('/api/collecteddata/?page_size=2'
+                         '&cursor_ordering=edit_date')
+        self.assertEqual(ids, [second, third, fifth, fourth, first])
+
+    def test_list_invalid_cursor(self):
+        request = self.factory.get('/api/collecteddata/?cursor=invalid')
+        request.user = self.user
+        response = self.view(request)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,72 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+import factories
+from feed.views import IndicatorViewSet
+
+
+class StreamingListTest(TestCase):
+    def setUp(self):
+        self.wflvl1 = factories.WorkflowLevel1()
+        factories.Indicator.create_batch(3, workflowlevel1=[self.wflvl1])
+        self.factory = APIRequestFactory()
+        self.user = factories.User.build(is_superuser=True, is_staff=True)
+        self.view = IndicatorViewSet.as_view({'get': 'list'})
+
+    def _get(self, url, **kwargs):
+        request = self.factory.get(url, **kwargs)
+        request.user = self.user
+        return self.view(request)
+
+    def test_stream_json_array(self):
+        expected = self._get('/api/indicator/').data
+
+        response = self._get('/api/indicator/?stream=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), 3)
+        self.assertEqual([indicator['id'] for indicator in data],
+                         [indicator['id'] for indicator in expected])
+        self.assertEqual(data[0]['workflowlevel1'],
+                         expected[0]['workflowlevel1'])
+
+    def test_stream_ndjson(self):
+        response = self._get('/api/indicator/?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('name', json.loads(lines[0]))
+
+        response = self._get('/api/indicator/',
+                             HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(b''.join(response.streaming_content).splitlines()), 3)
+
+    def test_stream_in_chunks(self):
+        self.view = type('ChunkedIndicatorViewSet', (IndicatorViewSet,),
+                         {'stream_chunk_size': 2}).as_view({'get': 'list'})
+        response = self._get('/api/indicator/?stream=1')
+        with CaptureQueriesContext(connection) as queries:
+            data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), 3)
+        # the manager's prefetch_related runs once per chunk
+        prefetches = [query for query in queries.captured_queries
+                      if '"indicators_indicator_workflowlevel1"' in
+                      query['sql']]
+        self.assertEqual(len(prefetches), 2)
+
+    def test_empty_stream(self):
+        self.view = type('EmptyViewSet', (IndicatorViewSet,), {
+            'get_queryset': lambda self: IndicatorViewSet.get_queryset(
+                self).none()}).as_view({'get': 'list'})
+        response = self._get('/api/indicator/?stream=1')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)),
+                         [])
@@ -5,7 +5,7 @@ from rest_framework.test import APIRequestFactory
 import json
 import factories
 from feed.views import WorkflowLevel1ViewSet
-from workflow.models import (WorkflowTeam, WorkflowLevel1,
+from workflow.models import (WorkflowTeam, WorkflowLevel1, WorkflowLevel2,
                              ROLE_ORGANIZATION_ADMIN, ROLE_PROGRAM_TEAM,
                              ROLE_PROGRAM_ADMIN, ROLE_VIEW_ONLY)
 
@@ -35,6 +35,30 @@ class WorkflowLevel1ListViewsTest(TestCase):
                          wflvl2.total_estimated_budget)
         self.assertEqual(response.data[0]['actuals'], wflvl2.actual_cost)
 
+    def test_list_workflowlevel1_rollup(self):
+        wflvl1 = factories.WorkflowLevel1()
+        factories.WorkflowLevel2(workflowlevel1=wflvl1,
+                                 status=WorkflowLevel2.STATUS_ORANGE)
+        factories.WorkflowLevel2(workflowlevel1=wflvl1,
+                                 progress=WorkflowLevel2.PROGRESS_TRACKING)
+        factories.WorkflowLevel1(name='No projects')
+
+        self.tola_user.user.is_superuser = True
+        request = self.factory.get('/api/workflowlevel1/')
+        request.user = self.tola_user.user
+        view = WorkflowLevel1ViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        data = {item['id']: item for item in response.data}
+        self.assertEqual(data[wflvl1.id]['status'],
+                         WorkflowLevel2.STATUS_ORANGE)
+        self.assertEqual(data[wflvl1.id]['project_counts'], {
+            'open': 1, 'awaitingapproval': 0, 'tracking': 1, 'closed': 0})
+        empty = [item for item in response.data if item['id'] != wflvl1.id]
+        self.assertEqual(empty[0]['status'], WorkflowLevel2.STATUS_GREEN)
+        self.assertIsNone(empty[0]['budget'])
+        self.assertEqual(empty[0]['difference'], 0)
+
     def test_list_workflowlevel1_superuser_and_org_admin(self):
         wflvl1 = factories.WorkflowLevel1()
         wflvl2 = factories.WorkflowLevel2(workflowlevel1=wflvl1)
@@ -607,3 +631,52 @@ class WorkflowLevel1FilterViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], wflvl1.name)
+
+
+class WorkflowLevel1ProgressViewTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.tola_user = factories.TolaUser()
+        factories.Group()
+
+    def test_progress(self):
+        wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user, workflowlevel1=wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_TEAM))
+        indicator = factories.Indicator(workflowlevel1=[wflvl1])
+
+        request = self.factory.get('/api/workflowlevel1/%s/progress/' %
+                                   wflvl1.pk)
+        request.user = self.tola_user.user
+        view = WorkflowLevel1ViewSet.as_view({'get': 'progress'})
+        response = view(request, pk=wflvl1.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([series['id'] for series in response.data],
+                         [indicator.pk])
+
+
+class WorkflowLevel1ScorecardsViewTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.tola_user = factories.TolaUser()
+        factories.Group()
+
+    def test_scorecards(self):
+        wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user, workflowlevel1=wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_TEAM))
+        factories.WorkflowLevel1(organization=self.tola_user.organization)
+        factories.WorkflowLevel2(workflowlevel1=wflvl1)
+
+        request = self.factory.get('/api/workflowlevel1/scorecards/')
+        request.user = self.tola_user.user
+        view = WorkflowLevel1ViewSet.as_view({'get': 'scorecards'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(scorecard['workflowlevel1'],
+                           scorecard['project_count'])
+                          for scorecard in response.data], [(wflvl1.id, 1)])
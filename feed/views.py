@@ -1,10 +1,11 @@
-from django.db.models import Sum
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 
-from rest_framework import viewsets
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import status
@@ -18,9 +19,14 @@ from urlparse import urljoin
 from .serializers import *
 from workflow.models import *
 from indicators.models import *
+from indicators import progress
 from formlibrary.models import *
+from reports import exports
+from reports.models import ExportJob
+from .mixins import EagerLoadingMixin, ListResponseMixin
 from .permissions import IsOrgMember, AllowTolaRoles
-from tola.util import getCountry, get_programs_user
+from tola.access import get_access_context
+from workflow.scorecard import get_scorecards
 
 
 class LargeResultsSetPagination(PageNumberPagination):
@@ -41,7 +47,8 @@ class SmallResultsSetPagination(PageNumberPagination):
     max_page_size = 50
 
 
-class ProgramIndicatorReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+class ProgramIndicatorReadOnlyViewSet(EagerLoadingMixin,
+                                      viewsets.ReadOnlyModelViewSet):
     serializer_class = ProgramIndicatorSerializer
     pagination_class = StandardResultsSetPagination
 
@@ -54,7 +61,7 @@ class ProgramIndicatorReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     A ViewSet for listing or retrieving users.
     """
@@ -62,7 +69,7 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     A ViewSet for listing or retrieving users.
     """
@@ -70,7 +77,8 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = GroupSerializer
 
 
-class WorkflowLevel1ViewSet(viewsets.ModelViewSet):
+class WorkflowLevel1ViewSet(EagerLoadingMixin, ListResponseMixin,
+                            viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -82,23 +90,35 @@ class WorkflowLevel1ViewSet(viewsets.ModelViewSet):
     def dispatch(self, *args, **kwargs):
         return super(WorkflowLevel1ViewSet, self).dispatch(*args, **kwargs)
 
-    def list(self, request):
+    def _visible_queryset(self, request):
         # Use this queryset or the django-filters lib will not work
-        queryset = self.filter_queryset(self.get_queryset()).annotate(
-            budget=Sum('workflowlevel2__total_estimated_budget'),
-            actuals=Sum('workflowlevel2__actual_cost'))
+        queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            if ROLE_ORGANIZATION_ADMIN in request.user.groups.values_list(
-                    'name', flat=True):
-                organization_id = TolaUser.objects. \
-                    values_list('organization_id', flat=True). \
-                    get(user=request.user)
+            access = get_access_context(request)
+            if access.is_org_admin:
+                organization_id = access.organization_id
                 queryset = queryset.filter(organization_id=organization_id)
             else:
-                wflvl1_ids = get_programs_user(request.user)
+                wflvl1_ids = access.program_ids
                 queryset = queryset.filter(id__in=wflvl1_ids)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return queryset
+
+    def list(self, request):
+        return self.list_response(self._visible_queryset(request))
+
+    @list_route(methods=['get'])
+    def scorecards(self, request):
+        """
+        The scorecards of the listed programs: indicators with data and
+        projects past initiation, see workflow.scorecard.
+        """
+        wflvl1_ids = self._visible_queryset(request)\
+            .values_list('id', flat=True)
+        scorecards = get_scorecards(
+            wflvl1_ids, get_access_context(request).country_ids)
+        return Response([dict(scorecard, workflowlevel1=wflvl1_id)
+                         for wflvl1_id, scorecard
+                         in sorted(scorecards.items())])
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -118,9 +138,7 @@ class WorkflowLevel1ViewSet(viewsets.ModelViewSet):
                         headers=headers)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         obj = serializer.save(organization_id=organization_id)
         obj.user_access.add(self.request.user.tola_user)
 
@@ -129,18 +147,25 @@ class WorkflowLevel1ViewSet(viewsets.ModelViewSet):
         workflowlevel1.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @detail_route(methods=['get'])
+    def progress(self, request, pk=None):
+        """
+        Targets and actuals of the program indicators per reporting period.
+        """
+        workflowlevel1 = self.get_object()
+        return Response(progress.program_series(workflowlevel1.pk))
+
     ordering_fields = ('country__country', 'name')
     filter_fields = ('country__country', 'name', 'level1_uuid')
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
 
-    queryset = WorkflowLevel1.objects.all().annotate(
-        budget=Sum('workflowlevel2__total_estimated_budget'),
-        actuals=Sum('workflowlevel2__actual_cost'))
+    queryset = WorkflowLevel1.objects.select_related('rollup')
     permission_classes = (AllowTolaRoles, IsOrgMember)
     serializer_class = WorkflowLevel1Serializer
 
 
-class SectorViewSet(viewsets.ModelViewSet):
+class SectorViewSet(EagerLoadingMixin, ListResponseMixin,
+                    viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -150,12 +175,9 @@ class SectorViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not self.request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=self.request.user)
+            organization_id = get_access_context(self.request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -167,7 +189,8 @@ class SectorViewSet(viewsets.ModelViewSet):
     serializer_class = SectorSerializer
 
 
-class ProjectTypeViewSet(viewsets.ModelViewSet):
+class ProjectTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                         viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -177,12 +200,9 @@ class ProjectTypeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -191,7 +211,7 @@ class ProjectTypeViewSet(viewsets.ModelViewSet):
     serializer_class = ProjectTypeSerializer
 
 
-class OfficeViewSet(viewsets.ModelViewSet):
+class OfficeViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -203,7 +223,8 @@ class OfficeViewSet(viewsets.ModelViewSet):
     serializer_class = OfficeSerializer
 
 
-class SiteProfileViewSet(viewsets.ModelViewSet):
+class SiteProfileViewSet(EagerLoadingMixin, ListResponseMixin,
+                         viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -214,17 +235,12 @@ class SiteProfileViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id,
                         created_by=self.request.user)
 
@@ -235,7 +251,7 @@ class SiteProfileViewSet(viewsets.ModelViewSet):
     serializer_class = SiteProfileSerializer
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CountryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -246,7 +262,8 @@ class CountryViewSet(viewsets.ModelViewSet):
     serializer_class = CountrySerializer
 
 
-class IndicatorViewSet(viewsets.ModelViewSet):
+class IndicatorViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -257,29 +274,32 @@ class IndicatorViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            if ROLE_ORGANIZATION_ADMIN in request.user.groups.values_list(
-                    'name', flat=True):
-                organization_id = TolaUser.objects. \
-                    values_list('organization_id', flat=True). \
-                    get(user=request.user)
+            access = get_access_context(request)
+            if access.is_org_admin:
+                organization_id = access.organization_id
                 queryset = queryset.filter(
-                    workflowlevel1__organization_id=organization_id)
+                    workflowlevel1__organization_id=organization_id).distinct()
             else:
-                wflvl1_ids = get_programs_user(request.user)
+                wflvl1_ids = access.program_ids
                 queryset = queryset.filter(
-                    workflowlevel1__in=wflvl1_ids).annotate(
-                    actuals=Sum('collecteddata__achieved'))
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+                    workflowlevel1__in=wflvl1_ids).distinct()
+        return self.list_response(queryset)
 
     def destroy(self, request, pk):
         indicator = self.get_object()
         indicator.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @detail_route(methods=['get'])
+    def progress(self, request, pk=None):
+        """
+        Targets and actuals of the indicator per reporting period.
+        """
+        indicator = self.get_object()
+        return Response(progress.indicator_series(indicator.pk))
+
     def get_queryset(self):
-        return Indicator.objects.annotate(
-            actuals=Sum('collecteddata__achieved'))
+        return Indicator.objects.with_actuals()
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -292,7 +312,8 @@ class IndicatorViewSet(viewsets.ModelViewSet):
     serializer_class = IndicatorSerializer
 
 
-class FrequencyViewSet(viewsets.ModelViewSet):
+class FrequencyViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -301,21 +322,17 @@ class FrequencyViewSet(viewsets.ModelViewSet):
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
-        organization_id = TolaUser.objects.\
-                values_list('organization_id', flat=True).\
-                get(user=request.user)
+        organization_id = get_access_context(request).organization_id
         queryset = queryset.filter(organization_id=organization_id)
-        serializer = FrequencySerializer(instance=queryset,
-                                         context={'request': request},
-                                         many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     permission_classes = (IsOrgMember,)
     queryset = Frequency.objects.all()
     serializer_class = FrequencySerializer
 
 
-class TolaUserViewSet(viewsets.ModelViewSet):
+class TolaUserViewSet(EagerLoadingMixin, ListResponseMixin,
+                      viewsets.ModelViewSet):
     """
     A ViewSet for listing or retrieving TolaUsers.
 
@@ -324,13 +341,9 @@ class TolaUserViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects.\
-                values_list('organization_id', flat=True).\
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = TolaUserSerializer(
-            instance=queryset, context={'request': request}, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def retrieve(self, request, pk=None):
         queryset = self.queryset
@@ -345,7 +358,8 @@ class TolaUserViewSet(viewsets.ModelViewSet):
     serializer_class = TolaUserSerializer
 
 
-class IndicatorTypeViewSet(viewsets.ModelViewSet):
+class IndicatorTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                           viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -355,12 +369,9 @@ class IndicatorTypeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects.\
-                values_list('organization_id', flat=True).\
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -369,7 +380,8 @@ class IndicatorTypeViewSet(viewsets.ModelViewSet):
     serializer_class = IndicatorTypeSerializer
 
 
-class ObjectiveViewSet(viewsets.ModelViewSet):
+class ObjectiveViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -379,13 +391,9 @@ class ObjectiveViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel1__organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            organization_id = get_access_context(request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -397,7 +405,8 @@ class ObjectiveViewSet(viewsets.ModelViewSet):
     serializer_class = ObjectiveSerializer
 
 
-class FundCodeViewSet(viewsets.ModelViewSet):
+class FundCodeViewSet(EagerLoadingMixin, ListResponseMixin,
+                      viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -407,12 +416,9 @@ class FundCodeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -421,7 +427,8 @@ class FundCodeViewSet(viewsets.ModelViewSet):
     serializer_class = FundCodeSerializer
 
 
-class DisaggregationTypeViewSet(viewsets.ModelViewSet):
+class DisaggregationTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                                viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -431,18 +438,13 @@ class DisaggregationTypeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(
                 organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id)
 
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -451,7 +453,8 @@ class DisaggregationTypeViewSet(viewsets.ModelViewSet):
     serializer_class = DisaggregationTypeSerializer
 
 
-class LevelViewSet(viewsets.ModelViewSet):
+class LevelViewSet(EagerLoadingMixin, ListResponseMixin,
+                   viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -461,12 +464,9 @@ class LevelViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -479,7 +479,8 @@ class LevelViewSet(viewsets.ModelViewSet):
     serializer_class = LevelSerializer
 
 
-class StakeholderViewSet(viewsets.ModelViewSet):
+class StakeholderViewSet(EagerLoadingMixin, ListResponseMixin,
+                         viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -487,30 +488,20 @@ class StakeholderViewSet(viewsets.ModelViewSet):
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
-        wflvl1_ids = get_programs_user(request.user)
+        wflvl1_ids = get_access_context(request).program_ids
         queryset = queryset.filter(workflowlevel1__in=wflvl1_ids).distinct()
 
-        nested = request.GET.get('nested_models')
-        if nested is not None and (nested.lower() == 'true' or nested == '1'):
-            self.serializer_class = StakeholderFullSerializer
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        return self.list_response(queryset)
 
-        nested = request.GET.get('nested_models')
-        if nested is not None and (nested.lower() == 'true' or nested == '1'):
-            self.serializer_class = StakeholderFullSerializer
-
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get_serializer_class(self):
+        nested = self.request.GET.get('nested_models')
+        if self.action in ('list', 'retrieve') and nested is not None and \
+                (nested.lower() == 'true' or nested == '1'):
+            return StakeholderFullSerializer
+        return self.serializer_class
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id,
                         created_by=self.request.user)
 
@@ -520,7 +511,8 @@ class StakeholderViewSet(viewsets.ModelViewSet):
     serializer_class = StakeholderSerializer
 
 
-class ExternalServiceViewSet(viewsets.ModelViewSet):
+class ExternalServiceViewSet(EagerLoadingMixin, ListResponseMixin,
+                             viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -530,13 +522,10 @@ class ExternalServiceViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(
                 organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -545,7 +534,7 @@ class ExternalServiceViewSet(viewsets.ModelViewSet):
     serializer_class = ExternalServiceSerializer
 
 
-class ExternalServiceRecordViewSet(viewsets.ModelViewSet):
+class ExternalServiceRecordViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -556,7 +545,8 @@ class ExternalServiceRecordViewSet(viewsets.ModelViewSet):
     serializer_class = ExternalServiceRecordSerializer
 
 
-class StrategicObjectiveViewSet(viewsets.ModelViewSet):
+class StrategicObjectiveViewSet(EagerLoadingMixin, ListResponseMixin,
+                                viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -566,17 +556,12 @@ class StrategicObjectiveViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id)
 
     filter_fields = ('organization__id', 'country__country')
@@ -586,7 +571,8 @@ class StrategicObjectiveViewSet(viewsets.ModelViewSet):
     serializer_class = StrategicObjectiveSerializer
 
 
-class StakeholderTypeViewSet(viewsets.ModelViewSet):
+class StakeholderTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                             viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -596,12 +582,9 @@ class StakeholderTypeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -610,7 +593,8 @@ class StakeholderTypeViewSet(viewsets.ModelViewSet):
     serializer_class = StakeholderTypeSerializer
 
 
-class ProfileTypeViewSet(viewsets.ModelViewSet):
+class ProfileTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                         viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -620,12 +604,9 @@ class ProfileTypeViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -634,7 +615,7 @@ class ProfileTypeViewSet(viewsets.ModelViewSet):
     serializer_class = ProfileTypeSerializer
 
 
-class ProvinceViewSet(viewsets.ModelViewSet):
+class ProvinceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -643,7 +624,7 @@ class ProvinceViewSet(viewsets.ModelViewSet):
     serializer_class = ProvinceSerializer
 
 
-class DistrictViewSet(viewsets.ModelViewSet):
+class DistrictViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -652,7 +633,7 @@ class DistrictViewSet(viewsets.ModelViewSet):
     serializer_class = DistrictSerializer
 
 
-class AdminLevelThreeViewSet(viewsets.ModelViewSet):
+class AdminLevelThreeViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -661,7 +642,7 @@ class AdminLevelThreeViewSet(viewsets.ModelViewSet):
     serializer_class = AdminLevelThreeSerializer
 
 
-class VillageViewSet(viewsets.ModelViewSet):
+class VillageViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -670,7 +651,8 @@ class VillageViewSet(viewsets.ModelViewSet):
     serializer_class = VillageSerializer
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(EagerLoadingMixin, ListResponseMixin,
+                     viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -680,14 +662,12 @@ class ContactViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            wflvl1_ids = get_programs_user(request.user)
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            access = get_access_context(request)
+            wflvl1_ids = access.program_ids
+            organization_id = access.organization_id
             queryset = queryset.filter(organization_id=organization_id,
                                        workflowlevel1__in=wflvl1_ids)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('name',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -696,7 +676,8 @@ class ContactViewSet(viewsets.ModelViewSet):
     serializer_class = ContactSerializer
 
 
-class DocumentationViewSet(viewsets.ModelViewSet):
+class DocumentationViewSet(EagerLoadingMixin, ListResponseMixin,
+                           viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -706,16 +687,12 @@ class DocumentationViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            wflvl1_ids = get_programs_user(request.user)
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel1__organization_id=organization_id
-            ).filter(
-                workflowlevel1__in=wflvl1_ids)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            access = get_access_context(request)
+            wflvl1_ids = access.program_ids
+            organization_id = access.organization_id
+            queryset = queryset.filter(organization_id=organization_id,
+                                       workflowlevel1__in=wflvl1_ids)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
 
@@ -729,7 +706,7 @@ class DocumentationViewSet(viewsets.ModelViewSet):
     serializer_class = DocumentationSerializer
 
 
-class PeriodicTargetViewSet(viewsets.ModelViewSet):
+class PeriodicTargetViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -739,7 +716,8 @@ class PeriodicTargetViewSet(viewsets.ModelViewSet):
     serializer_class = PeriodicTargetSerializer
 
 
-class CollectedDataViewSet(viewsets.ModelViewSet):
+class CollectedDataViewSet(EagerLoadingMixin, ListResponseMixin,
+                           viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -749,10 +727,9 @@ class CollectedDataViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            wflvl1_ids = get_programs_user(request.user)
+            wflvl1_ids = get_access_context(request).program_ids
             queryset = queryset.filter(indicator__workflowlevel1__in=wflvl1_ids)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -764,17 +741,16 @@ class CollectedDataViewSet(viewsets.ModelViewSet):
     queryset = CollectedData.objects.all()
     permission_classes = (AllowTolaRoles, IsOrgMember)
     serializer_class = CollectedDataSerializer
-    pagination_class = SmallResultsSetPagination
 
 
-class TolaTableViewSet(viewsets.ModelViewSet):
+class TolaTableViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
     """
 
     def get_queryset(self):
-        wflvl1_ids = get_programs_user(self.request.user)
+        wflvl1_ids = get_access_context(self.request).program_ids
         queryset = TolaTable.objects.filter(workflowlevel1__in=wflvl1_ids)
         table_id = self.request.query_params.get('table_id', None)
         if table_id is not None:
@@ -791,7 +767,7 @@ class TolaTableViewSet(viewsets.ModelViewSet):
     queryset = TolaTable.objects.all()
 
 
-class DisaggregationValueViewSet(viewsets.ModelViewSet):
+class DisaggregationValueViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -803,7 +779,7 @@ class DisaggregationValueViewSet(viewsets.ModelViewSet):
     serializer_class = DisaggregationValueSerializer
 
 
-class DisaggregationLabelViewSet(viewsets.ModelViewSet):
+class DisaggregationLabelViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -813,19 +789,16 @@ class DisaggregationLabelViewSet(viewsets.ModelViewSet):
     serializer_class = DisaggregationLabelSerializer
 
 
-class ChecklistViewSet(viewsets.ModelViewSet):
+class ChecklistViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel2__workflowlevel1__organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            organization_id = get_access_context(request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -840,18 +813,16 @@ class ChecklistViewSet(viewsets.ModelViewSet):
     serializer_class = ChecklistSerializer
 
 
-class OrganizationViewSet(viewsets.ModelViewSet):
+class OrganizationViewSet(EagerLoadingMixin, ListResponseMixin,
+                          viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     permission_classes = (IsOrgMember,)
@@ -859,7 +830,8 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     serializer_class = OrganizationSerializer
 
 
-class WorkflowLevel2ViewSet(viewsets.ModelViewSet):
+class WorkflowLevel2ViewSet(EagerLoadingMixin, ListResponseMixin,
+                            viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
@@ -875,35 +847,23 @@ class WorkflowLevel2ViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            if ROLE_ORGANIZATION_ADMIN in request.user.groups.values_list(
-                    'name', flat=True):
-                queryset = queryset.filter(
-                    workflowlevel1__organization_id=organization_id)
+            access = get_access_context(request)
+            organization_id = access.organization_id
+            if access.is_org_admin:
+                queryset = queryset.filter(organization_id=organization_id)
             else:
-                wflvl1_ids = get_programs_user(request.user)
-                queryset = queryset.filter(
-                    workflowlevel1__organization_id=organization_id,
-                    workflowlevel1__in=wflvl1_ids)
-
-        nested = request.GET.get('nested_models')
-        if nested is not None and (nested.lower() == 'true' or nested == '1'):
-            self.serializer_class = WorkflowLevel2FullSerializer
+                wflvl1_ids = access.program_ids
+                queryset = queryset.filter(organization_id=organization_id,
+                                           workflowlevel1__in=wflvl1_ids)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        return self.list_response(queryset)
 
-        nested = request.GET.get('nested_models')
-        if nested is not None and (nested.lower() == 'true' or nested == '1'):
-            self.serializer_class = WorkflowLevel2FullSerializer
-
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get_serializer_class(self):
+        nested = self.request.GET.get('nested_models')
+        if self.action in ('list', 'retrieve') and nested is not None and \
+                (nested.lower() == 'true' or nested == '1'):
+            return WorkflowLevel2FullSerializer
+        return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -914,33 +874,32 @@ class WorkflowLevel2ViewSet(viewsets.ModelViewSet):
     queryset = WorkflowLevel2.objects.all()
     permission_classes = (AllowTolaRoles, IsOrgMember)
     serializer_class = WorkflowLevel2Serializer
-    pagination_class = SmallResultsSetPagination
 
 
-class WorkflowModulesViewSet(viewsets.ModelViewSet):
+class WorkflowModulesViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     filter_fields = ('workflowlevel2__workflowlevel1__organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     queryset = WorkflowModules.objects.all()
     serializer_class = WorkflowModulesSerializer
 
 
-class WorkflowLevel2SortViewSet(viewsets.ModelViewSet):
+class WorkflowLevel2SortViewSet(EagerLoadingMixin, ListResponseMixin,
+                                viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            wflvl1_ids = get_programs_user(request.user)
+            wflvl1_ids = get_access_context(request).program_ids
             queryset = queryset.filter(workflowlevel1__in=wflvl1_ids)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     queryset = WorkflowLevel2Sort.objects.all()
     permission_classes = (IsOrgMember,)
     serializer_class = WorkflowLevel2SortSerializer
 
 
-class CurrencyViewSet(viewsets.ModelViewSet):
+class CurrencyViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Global Field so do not filter by Org
     """
@@ -948,18 +907,16 @@ class CurrencyViewSet(viewsets.ModelViewSet):
     serializer_class = CurrencySerializer
 
 
-class ApprovalTypeViewSet(viewsets.ModelViewSet):
+class ApprovalTypeViewSet(EagerLoadingMixin, ListResponseMixin,
+                          viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -968,7 +925,7 @@ class ApprovalTypeViewSet(viewsets.ModelViewSet):
     serializer_class = ApprovalTypeSerializer
 
 
-class ApprovalWorkflowViewSet(viewsets.ModelViewSet):
+class ApprovalWorkflowViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ApprovalWorkflow.objects.all()
     serializer_class = ApprovalWorkflowSerializer
 
@@ -976,19 +933,16 @@ class ApprovalWorkflowViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=self.request.user)
 
 
-class BeneficiaryViewSet(viewsets.ModelViewSet):
+class BeneficiaryViewSet(EagerLoadingMixin, ListResponseMixin,
+                         viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel1__organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            organization_id = get_access_context(request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+        return self.list_response(queryset)
 
     filter_fields = ('workflowlevel1__organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -997,17 +951,15 @@ class BeneficiaryViewSet(viewsets.ModelViewSet):
     serializer_class = BeneficiarySerializer
 
 
-class DistributionViewSet(viewsets.ModelViewSet):
+class DistributionViewSet(EagerLoadingMixin, ListResponseMixin,
+                          viewsets.ModelViewSet):
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1016,18 +968,16 @@ class DistributionViewSet(viewsets.ModelViewSet):
     serializer_class = DistributionSerializer
 
 
-class CustomFormViewSet(viewsets.ModelViewSet):
+class CustomFormViewSet(EagerLoadingMixin, ListResponseMixin,
+                        viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -1098,9 +1048,7 @@ class CustomFormViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id,
                         created_by=self.request.user)
 
@@ -1111,29 +1059,26 @@ class CustomFormViewSet(viewsets.ModelViewSet):
     serializer_class = CustomFormSerializer
 
 
-class CustomFormFieldViewSet(viewsets.ModelViewSet):
+class CustomFormFieldViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = CustomFormField.objects.all()
     serializer_class = CustomFormFieldSerializer
 
 
-class FieldTypeViewSet(viewsets.ModelViewSet):
+class FieldTypeViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = FieldType.objects.all()
     serializer_class = FieldTypeSerializer
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(EagerLoadingMixin, ListResponseMixin,
+                    viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel2__workflowlevel1__organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            organization_id = get_access_context(request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -1145,37 +1090,32 @@ class BudgetViewSet(viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
 
 
-class RiskRegisterViewSet(viewsets.ModelViewSet):
+class RiskRegisterViewSet(EagerLoadingMixin, ListResponseMixin,
+                          viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
-            queryset = queryset.filter(
-                workflowlevel2__workflowlevel1__organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            organization_id = get_access_context(request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+        return self.list_response(queryset)
 
     queryset = RiskRegister.objects.all()
     permission_classes = (IsOrgMember,)
     serializer_class = RiskRegisterSerializer
 
 
-class CodedFieldViewSet(viewsets.ModelViewSet):
+class CodedFieldViewSet(EagerLoadingMixin, ListResponseMixin,
+                        viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('workflowlevel2__workflowlevel1__organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1184,28 +1124,24 @@ class CodedFieldViewSet(viewsets.ModelViewSet):
     serializer_class = CodedFieldSerializer
 
 
-class CodedFieldValuesViewSet(viewsets.ModelViewSet):
+class CodedFieldValuesViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = CodedFieldValues.objects.all()
     serializer_class = CodedFieldValuesSerializer
 
 
-class IssueRegisterViewSet(viewsets.ModelViewSet):
+class IssueRegisterViewSet(EagerLoadingMixin, ListResponseMixin,
+                           viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
-        organization_id = TolaUser.objects. \
-            values_list('organization_id', flat=True). \
-            get(user=self.request.user)
+        organization_id = get_access_context(self.request).organization_id
         serializer.save(organization_id=organization_id)
 
     filter_fields = ('workflowlevel2__workflowlevel1__organization__id',)
@@ -1215,7 +1151,7 @@ class IssueRegisterViewSet(viewsets.ModelViewSet):
     serializer_class = IssueRegisterSerializer
 
 
-class LandTypeViewSet(viewsets.ModelViewSet):
+class LandTypeViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Global Field so do not filter by Org
     """
@@ -1224,7 +1160,7 @@ class LandTypeViewSet(viewsets.ModelViewSet):
     serializer_class = LandTypeSerializer
 
 
-class InternationalizationViewSet(viewsets.ModelViewSet):
+class InternationalizationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Global Field so do not filter by Org
     """
@@ -1233,23 +1169,21 @@ class InternationalizationViewSet(viewsets.ModelViewSet):
     serializer_class = InternationalizationSerializer
 
 
-class TolaUserFilterViewSet(viewsets.ModelViewSet):
+class TolaUserFilterViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = TolaUserFilter.objects.all()
     serializer_class = TolaUserFilterSerializer
 
 
-class AwardViewSet(viewsets.ModelViewSet):
+class AwardViewSet(EagerLoadingMixin, ListResponseMixin,
+                   viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1258,7 +1192,8 @@ class AwardViewSet(viewsets.ModelViewSet):
     serializer_class = AwardSerializer
 
 
-class WorkflowTeamViewSet(viewsets.ModelViewSet):
+class WorkflowTeamViewSet(EagerLoadingMixin, ListResponseMixin,
+                          viewsets.ModelViewSet):
     """
     This viewset provides `list`, `create`, `retrieve`, `update` and
     `destroy` actions.
@@ -1267,19 +1202,16 @@ class WorkflowTeamViewSet(viewsets.ModelViewSet):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            if ROLE_ORGANIZATION_ADMIN in request.user.groups.values_list(
-                    'name', flat=True):
-                organization_id = TolaUser.objects. \
-                    values_list('organization_id', flat=True). \
-                    get(user=request.user)
+            access = get_access_context(request)
+            if access.is_org_admin:
+                organization_id = access.organization_id
                 queryset = queryset.filter(
                     workflow_user__organization_id=organization_id)
             else:
-                wflvl1_ids = get_programs_user(request.user)
+                wflvl1_ids = access.program_ids
                 queryset = queryset.filter(workflowlevel1__in=wflvl1_ids)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('workflowlevel1__organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1288,18 +1220,16 @@ class WorkflowTeamViewSet(viewsets.ModelViewSet):
     serializer_class = WorkflowTeamSerializer
 
 
-class MilestoneViewSet(viewsets.ModelViewSet):
+class MilestoneViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -1309,18 +1239,16 @@ class MilestoneViewSet(viewsets.ModelViewSet):
     serializer_class = MilestoneSerializer
 
 
-class PortfolioViewSet(viewsets.ModelViewSet):
+class PortfolioViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -1340,53 +1268,51 @@ class PortfolioViewSet(viewsets.ModelViewSet):
     serializer_class = PortfolioSerializer
 
 
-class PublicDashboardViewSet(viewsets.ModelViewSet):
+class PublicDashboardViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
 
     queryset = Dashboard.objects.all().filter(public_all=True)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     serializer_class = PublicDashboardSerializer
 
 
-class PublicOrgDashboardViewSet(viewsets.ModelViewSet):
+class PublicOrgDashboardViewSet(EagerLoadingMixin, ListResponseMixin,
+                                viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            organization_id = TolaUser.objects. \
-                values_list('organization_id', flat=True). \
-                get(user=request.user)
+            organization_id = get_access_context(request).organization_id
             queryset = queryset.filter(organization_id=organization_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     queryset = Dashboard.objects.all().filter(public_in_org=True)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     serializer_class = PublicOrgDashboardSerializer
 
 
-class DashboardViewSet(viewsets.ModelViewSet):
+class DashboardViewSet(EagerLoadingMixin, ListResponseMixin,
+                       viewsets.ModelViewSet):
 
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
         if not request.user.is_superuser:
-            get_user = TolaUser.objects.get(user=request.user)
+            get_user = get_access_context(request).tola_user
             queryset = queryset.filter(Q(user=get_user) | Q(share=get_user))
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     filter_fields = ('user', 'share',)
     queryset = Dashboard.objects.all()
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     serializer_class = DashboardSerializer
 
 
-class WidgetViewSet(viewsets.ModelViewSet):
+class WidgetViewSet(EagerLoadingMixin, ListResponseMixin,
+                    viewsets.ModelViewSet):
     def list(self, request):
         # Use this queryset or the django-filters lib will not work
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     filter_fields = ('dashboard',)
     queryset = Widget.objects.all()
@@ -1394,7 +1320,7 @@ class WidgetViewSet(viewsets.ModelViewSet):
     serializer_class = WidgetSerializer
 
 
-class SectorRelatedViewSet(viewsets.ModelViewSet):
+class SectorRelatedViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
 
     filter_fields = ('sector', 'organization__id',)
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
@@ -1402,7 +1328,7 @@ class SectorRelatedViewSet(viewsets.ModelViewSet):
     serializer_class = SectorRelatedSerializer
 
 
-class WorkflowLevel1SectorViewSet(viewsets.ModelViewSet):
+class WorkflowLevel1SectorViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
 
     queryset = WorkflowLevel1Sector.objects.all()
     filter_fields = ('sector', 'workflowlevel1',)
@@ -1410,3 +1336,66 @@ class WorkflowLevel1SectorViewSet(viewsets.ModelViewSet):
     serializer_class = WorkflowLevel1SectorSerializer
 
 
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Exports of large resources run in the background, see reports.exports.
+    POST {"resource": ..., "format": "csv"|"xlsx", "filters": {...}}
+    returns the job, which is polled for its status and rows_done until it
+    can be downloaded from its download_url. The exports of users who are
+    not organization admins only have the rows of the programs of their
+    teams.
+    """
+    def _program_ids(self):
+        access = get_access_context(self.request)
+        if self.request.user.is_superuser or access.is_org_admin:
+            return None
+        return access.program_ids
+
+    def get_queryset(self):
+        queryset = ExportJob.objects.all()
+        if not self.request.user.is_superuser:
+            organization_id = get_access_context(self.request).organization_id
+            queryset = queryset.filter(organization_id=organization_id)
+            program_ids = self._program_ids()
+            if program_ids is not None:
+                queryset = queryset.filter(
+                    workflowlevel1_ids=json.dumps(program_ids))
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            job = exports.start_export(
+                get_access_context(request).organization_id,
+                serializer.validated_data['resource'],
+                serializer.validated_data.get('format',
+                                              ExportJob.FORMAT_CSV),
+                serializer.validated_data.get('filters'), request.user,
+                self._program_ids())
+        except exports.ExportError as e:
+            return Response({'detail': unicode(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(job).data,
+                        status=status.HTTP_201_CREATED)
+
+    @detail_route(methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_DONE:
+            return Response({'detail': 'The export is %s' % job.status},
+                            status=status.HTTP_409_CONFLICT)
+        response = FileResponse(
+            job.file.storage.open(job.file.name, 'rb'),
+            content_type='text/csv' if job.format == ExportJob.FORMAT_CSV
+            else 'application/vnd.openxmlformats-officedocument'
+                 '.spreadsheetml.sheet')
+        response['Content-Disposition'] = 'attachment; filename=%s' % \
+            job.file_name
+        return response
+
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
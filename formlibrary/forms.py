@@ -6,7 +6,7 @@ from crispy_forms.bootstrap import *
 
 from workflow.models import WorkflowLevel1, WorkflowLevel2, Office, AdminLevelOne, SiteProfile
 from functools import partial
-from tola.util import getCountry
+from tola.access import get_access_context
 
 
 class DatePicker(forms.DateInput):
@@ -183,7 +183,7 @@ class TrainingAttendanceForm(forms.ModelForm):
 
         super(TrainingAttendanceForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['workflowlevel2'].queryset = WorkflowLevel2.objects.filter(workflowlevel1__country__in=countries)
         self.fields['workflowlevel1'].queryset = WorkflowLevel1.objects.filter(country__in=countries)
 
@@ -361,7 +361,7 @@ class DistributionForm(forms.ModelForm):
 
         super(DistributionForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['workflowlevel2'].queryset = WorkflowLevel2.objects.filter(workflowlevel1__country__in=countries)
         self.fields['workflowlevel1'].queryset = WorkflowLevel1.objects.filter(country__in=countries)
         self.fields['office_code'].queryset = Office.objects.filter(country__in=countries)
@@ -415,7 +415,7 @@ class BeneficiaryForm(forms.ModelForm):
 
         super(BeneficiaryForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['training'].queryset = TrainingAttendance.objects.filter(workflowlevel1__country__in=countries)
         self.fields['distribution'].queryset = Distribution.objects.filter(workflowlevel1__country__in=countries)
         self.fields['site'].queryset = SiteProfile.objects.filter(country__in=countries)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 08:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from workflow.organization import ORGANIZATION_PATHS, fill_organization
+
+
+def fill_formlibrary_organization(apps, schema_editor):
+    for label, organization_path in ORGANIZATION_PATHS.items():
+        app_label, model_name = label.split('.')
+        if app_label == 'formlibrary':
+            fill_organization(apps.get_model(app_label, model_name),
+                              organization_path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0013_organization_scope'),
+        ('formlibrary', '0006_auto_20171206_0942'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beneficiary',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.RunPython(fill_formlibrary_organization,
+                             migrations.RunPython.noop),
+    ]
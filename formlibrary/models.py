@@ -113,6 +113,8 @@ class Beneficiary(models.Model):
     workflowlevel1 = models.ManyToManyField(WorkflowLevel1, blank=True)
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
+    # copied from the programs when they are set, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
 
     class Meta:
         ordering = ('beneficiary_name',)
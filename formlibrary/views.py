@@ -6,7 +6,8 @@ from django.core.urlresolvers import reverse_lazy
 from .forms import TrainingAttendanceForm, BeneficiaryForm, DistributionForm
 from workflow.models import FormGuidance, WorkflowLevel1, WorkflowLevel2
 from django.utils.decorators import method_decorator
-from tola.util import getCountry, group_excluded
+from tola.access import get_access_context
+from tola.util import group_excluded
 
 from django.shortcuts import render
 from django.contrib import messages
@@ -29,7 +30,7 @@ class TrainingList(ListView):
     def get(self, request, *args, **kwargs):
 
         project_agreement_id = self.kwargs['pk']
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
         if int(self.kwargs['pk']) == 0:
             getTraining = TrainingAttendance.objects.all().filter(workflowlevel1__country__in=countries)
@@ -152,7 +153,7 @@ class BeneficiaryList(ListView):
     def get(self, request, *args, **kwargs):
 
         project_agreement_id = self.kwargs['pk']
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
 
@@ -281,7 +282,7 @@ class DistributionList(ListView):
     def get(self, request, *args, **kwargs):
 
         workflowlevel1_id = self.kwargs['pk']
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
         if int(self.kwargs['pk']) == 0:
@@ -402,7 +403,7 @@ class TrainingListObjects(View, AjaxableResponseMixin):
         workflowlevel1_id = int(self.kwargs['workflowlevel1'])
         project_id = int(self.kwargs['workflowlevel2'])
         print project_id
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         if int(self.kwargs['workflowlevel1']) == 0:
             getTraining = TrainingAttendance.objects.all()\
                 .filter(workflowlevel1__country__in=countries)\
@@ -429,7 +430,7 @@ class BeneficiaryListObjects(View, AjaxableResponseMixin):
 
         workflowlevel1_id = int(self.kwargs['workflowlevel1'])
         project_id = int(self.kwargs['workflowlevel2'])
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         if workflowlevel1_id == 0:
             getBeneficiaries = Beneficiary.objects.all().filter(
@@ -457,7 +458,7 @@ class DistributionListObjects(View, AjaxableResponseMixin):
 
         workflowlevel1_id = int(self.kwargs['workflowlevel1'])
         project_id = int(self.kwargs['workflowlevel2'])
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         if workflowlevel1_id == 0:
             getDistribution = Distribution.objects.all()\
                 .filter(workflowlevel1__country__in=countries)\
@@ -485,7 +486,7 @@ class GetAgreements(View, AjaxableResponseMixin):
     def get(self, request, *args, **kwargs):
 
         workflowlevel1_id = self.kwargs['workflowlevel1']
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         if workflowlevel1_id != 0:
             getAgreements = WorkflowLevel2.objects.all().filter(workflowlevel1=workflowlevel1_id).values('id', 'name')
         else:
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class GladmapConfig(AppConfig):
     name = 'gladmap'
+
+    def ready(self):
+        import gladmap.signals  # noqa
@@ -1,15 +1,21 @@
 
 
+from gladmap.spatial import SpatialIndex
+
+
 class Geo():
     """
     
     """
     def find_district(self, point, geo_boundary):
-        for feature in geo_boundary["features"]:
-            for coords in feature["geometry"]["coordinates"]:
-                if self.in_coords(point, coords):
-                    return feature["properties"]
-        return False
+        """
+        Builds the index of geo_boundary for a single lookup, use
+        gladmap.spatial.get_country_index for repeated lookups.
+        """
+        properties = SpatialIndex(geo_boundary).find(point)
+        if properties is None:
+            return False
+        return properties
 
 
     def in_boundary(self, point, geo_boundary):
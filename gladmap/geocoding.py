@@ -0,0 +1,238 @@
+"""
+Batch reverse geocoding of points to the gladmap State and District
+containing them, for the reverse geocode API and the geocode-sites command.
+
+A point is first looked up in the districts of the country, which give its
+state too, and only when no district contains it in the states. With NumPy
+installed, the points in the bounding box of a polygon are tested against
+all of its edges at once, else each point goes through the grid of the
+SpatialIndex.
+
+The province and district of SiteProfiles are matched to the State and
+District by name, see update_site_admin_levels.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from gladmap.models import District, State
+from gladmap.spatial import SpatialIndex, cached_index, coordinates_geometry
+from workflow.models import AdminLevelOne, AdminLevelTwo, SiteProfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# point x edge comparisons done at a time by the vectorized lookup
+MAX_CELLS = 1000000
+# sites updated per query, below the SQLite limit of query parameters
+UPDATE_BATCH_SIZE = 900
+
+
+def _contains(polygon, xs, ys):
+    """
+    Returns the mask of the points xs, ys inside polygon (even-odd rule).
+    """
+    x1 = numpy.frombuffer(polygon.x1)
+    y1 = numpy.frombuffer(polygon.y1)
+    x2 = numpy.frombuffer(polygon.x2)
+    y2 = numpy.frombuffer(polygon.y2)
+    inside = numpy.zeros(len(xs), dtype=bool)
+    step = max(1, MAX_CELLS // len(x1))
+    for start in range(0, len(xs), step):
+        x = xs[start:start + step, None]
+        y = ys[start:start + step, None]
+        crossings = ((y1 > y) != (y2 > y)) & \
+            (x < (x2 - x1) * (y - y1) / (y2 - y1) + x1)
+        inside[start:start + step] = crossings.sum(axis=1) % 2 == 1
+    return inside
+
+
+class BoundaryIndex(SpatialIndex):
+    """
+    SpatialIndex of the (pk, boundary coordinates) rows of State or
+    District, finding the pk of the row containing a point.
+    """
+    def __init__(self, rows):
+        features = []
+        for pk, coordinates in rows:
+            geometry = coordinates_geometry(coordinates)
+            if geometry is not None:
+                features.append({'geometry': geometry, 'properties': pk})
+        super(BoundaryIndex, self).__init__({'features': features})
+
+    def find_all(self, xs, ys):
+        """
+        Returns the pk of the row containing each point xs[i], ys[i], None
+        for the points outside of every row.
+        """
+        if numpy is None or not self.features:
+            return [self.find(point) for point in zip(xs, ys)]
+
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.asarray(ys, dtype=float)
+        found = numpy.full(len(xs), -1, dtype=int)
+        for i, (_, polygons, _) in enumerate(self.features):
+            for polygon in polygons:
+                min_x, min_y, max_x, max_y = polygon.bbox
+                candidates = numpy.flatnonzero(
+                    (found < 0) & (xs >= min_x) & (xs <= max_x) &
+                    (ys >= min_y) & (ys <= max_y))
+                if candidates.size:
+                    inside = _contains(polygon, xs[candidates],
+                                       ys[candidates])
+                    found[candidates[inside]] = i
+        return [self.features[i][2] if i >= 0 else None for i in found]
+
+
+class ReverseGeocoder(object):
+    """
+    Finds the gladmap State and District of points of a country.
+
+    :param code: code of the gladmap Country (AFG, DEU, ...)
+    """
+    def __init__(self, code):
+        states = State.objects.filter(country__code=code)
+        districts = District.objects.filter(country__code=code)
+        self.states = states.defer('boundary').in_bulk()
+        self.districts = districts.defer('boundary').in_bulk()
+        self.state_index = BoundaryIndex(
+            states.values_list('pk', 'boundary').iterator())
+        self.district_index = BoundaryIndex(
+            districts.values_list('pk', 'boundary').iterator())
+
+    def locate(self, points):
+        """
+        Returns (state, district) for each (lon, lat) of points, None for
+        what was not found.
+        """
+        xs = [float(point[0]) for point in points]
+        ys = [float(point[1]) for point in points]
+        district_ids = self.district_index.find_all(xs, ys)
+        state_ids = [self.districts[pk].state_id if pk is not None else None
+                     for pk in district_ids]
+
+        missing = [i for i, pk in enumerate(state_ids) if pk is None]
+        if missing:
+            found = self.state_index.find_all([xs[i] for i in missing],
+                                              [ys[i] for i in missing])
+            for i, pk in zip(missing, found):
+                state_ids[i] = pk
+
+        return [(self.states.get(state_id), self.districts.get(district_id))
+                for state_id, district_id in zip(state_ids, district_ids)]
+
+
+def _build_geocoder(code):
+    if not State.objects.filter(country__code=code).exists():
+        return None
+    return ReverseGeocoder(code)
+
+
+def get_geocoder(code):
+    """
+    Returns the ReverseGeocoder of a gladmap Country, cached by the
+    process, None if the country has no states.
+    """
+    return cached_index(('geocoder', code), lambda: _build_geocoder(code))
+
+
+def _admin_levels(country, states, districts):
+    """
+    Returns the AdminLevelOne by name and the AdminLevelTwo by (admin level
+    one, name) of country, creating those of states and districts missing.
+    """
+    now = timezone.now()
+    provinces = {}
+    for province in AdminLevelOne.objects.filter(country=country):
+        provinces.setdefault(province.name, province)
+    missing = set(state.name for state in states) - set(provinces)
+    if missing:
+        AdminLevelOne.objects.bulk_create(
+            AdminLevelOne(name=name, country=country, create_date=now,
+                          edit_date=now) for name in missing)
+        for province in AdminLevelOne.objects.filter(country=country,
+                                                     name__in=missing):
+            provinces.setdefault(province.name, province)
+
+    levels_two = {}
+    for level_two in AdminLevelTwo.objects.filter(
+            adminlevelone__country=country):
+        levels_two.setdefault((level_two.adminlevelone_id, level_two.name),
+                              level_two)
+    missing = set((provinces[state.name].pk, district.name)
+                  for state, district in districts) - set(levels_two)
+    if missing:
+        AdminLevelTwo.objects.bulk_create(
+            AdminLevelTwo(adminlevelone_id=province_id, name=name,
+                          create_date=now, edit_date=now)
+            for province_id, name in missing)
+        for level_two in AdminLevelTwo.objects.filter(
+                adminlevelone_id__in=set(key[0] for key in missing),
+                name__in=set(key[1] for key in missing)):
+            levels_two.setdefault(
+                (level_two.adminlevelone_id, level_two.name), level_two)
+    return provinces, levels_two
+
+
+def update_site_admin_levels(country, geocoder, sites=None, dry_run=False):
+    """
+    Set the province and district of the SiteProfiles of country (a
+    workflow Country) to the AdminLevelOne and AdminLevelTwo named as the
+    State and District containing them, creating the ones missing. Sites
+    outside of every State and sites at 0, 0 are left as they are. When
+    the district changes, admin_level_three is cleared.
+
+    All sites are located at once and the changes are written with one
+    update per (province, district). Returns the number of sites located
+    and the number of sites changed.
+    """
+    if sites is None:
+        sites = SiteProfile.objects.filter(country=country)
+    rows = list(sites.exclude(latitude=0, longitude=0).order_by('pk')
+                .values_list('pk', 'longitude', 'latitude', 'province_id',
+                             'district_id'))
+    locations = geocoder.locate([(row[1], row[2]) for row in rows])
+    located = [(row, state, district)
+               for row, (state, district) in zip(rows, locations)
+               if state is not None]
+    if dry_run or not located:
+        return len(located), 0
+
+    with transaction.atomic():
+        provinces, levels_two = _admin_levels(
+            country, [state for _, state, _ in located],
+            [(state, district) for _, state, district in located
+             if district is not None])
+
+        changes = defaultdict(list)
+        for (pk, _, _, province_id, district_id), state, district \
+                in located:
+            new_province_id = provinces[state.name].pk
+            if district is not None:
+                new_district_id = levels_two[
+                    (new_province_id, district.name)].pk
+            elif new_province_id == province_id:
+                new_district_id = district_id
+            else:
+                new_district_id = None
+            if (new_province_id, new_district_id) != \
+                    (province_id, district_id):
+                changes[(new_province_id, new_district_id,
+                         new_district_id != district_id)].append(pk)
+
+        now = timezone.now()
+        for (province_id, district_id, clear_level_three), pks in \
+                changes.items():
+            values = {'province_id': province_id,
+                      'district_id': district_id, 'edit_date': now}
+            if clear_level_three:
+                values['admin_level_three'] = None
+            for start in range(0, len(pks), UPDATE_BATCH_SIZE):
+                SiteProfile.objects.filter(
+                    pk__in=pks[start:start + UPDATE_BATCH_SIZE]) \
+                    .update(**values)
+
+    return len(located), sum(len(pks) for pks in changes.values())
@@ -0,0 +1,267 @@
+"""
+Loading of GADM boundaries (GeoJSON converted from the shapefiles with
+ogr2ogr) into the Country, State, District and Boundary tables.
+
+Files are read a chunk at a time and their features decoded one by one
+(see iter_features), so the size of a file does not matter. Rows are
+written with bulk_create in batches, with the countries and states looked
+up once per file, and the simplified boundaries of the map tiles are built
+for each batch. The features of the Boundary collection of a country are
+written serialized to a temporary file as they are read, and the collection
+is stored when the file moves on to the next country, so files hold one
+country, as GADM ships them, or are sorted by country.
+"""
+import json
+import os
+import re
+import tempfile
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import TextField, Value
+
+from gladmap.models import Boundary, Country, District, State
+from gladmap.spatial import clear_indexes
+from gladmap.tiles import build_simplified_boundaries
+
+CHUNK_SIZE = 1 << 20
+# XXX_adm1.json, as named by the GADM downloads
+FILE_NAME = re.compile(
+    r'^(?P<country>[A-Z]{3})_adm(?P<level>\d)\.(json|geojson|shp)$')
+
+LEVEL_NAMES = {0: 'country', 1: 'state', 2: 'district'}
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[\s,]*')
+
+
+def iter_features(fileobj, chunk_size=CHUNK_SIZE):
+    """
+    Yields the features of a GeoJSON FeatureCollection file, reading
+    chunk_size characters at a time.
+    """
+    buffer = ''
+    start = None
+    # find the opening bracket of the features array
+    while start is None:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        match = re.search(r'"features"\s*:\s*\[', buffer)
+        if match is not None:
+            start = match.end()
+    buffer = buffer[start:]
+    position = 0
+
+    eof = False
+    while True:
+        position = _whitespace.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            feature, position = _decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise ValueError('Truncated GeoJSON feature collection')
+            # read at least as much as is buffered, so a feature larger
+            # than a chunk is decoded again only a few times
+            chunk = fileobj.read(max(chunk_size, len(buffer) - position))
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield feature
+
+
+class CollectionFile(object):
+    """
+    The features of a FeatureCollection, written as JSON to a temporary
+    file one at a time so they are not kept decoded in memory.
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def add(self, feature):
+        if self.count:
+            self.file.write(',')
+        self.file.write(json.dumps(feature))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def read(self):
+        """
+        Returns the JSON of the FeatureCollection and closes the file.
+        """
+        self.file.seek(0)
+        features = self.file.read()
+        self.close()
+        return '{"type": "FeatureCollection", "features": [%s]}' % features
+
+
+def parse_file_name(path):
+    """
+    Returns (country code, level) of a GADM file name, None if it does not
+    follow the XXX_admN naming.
+    """
+    match = FILE_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    return match.group('country'), int(match.group('level'))
+
+
+class BoundaryLoader(object):
+    """
+    Loads the features of GADM files of level 0 (countries), 1 (states)
+    and 2 (districts).
+
+    :param batch_size: rows written per bulk_create
+    :param tiles: build the simplified boundaries of the map tiles
+    :param collections: store the Boundary collection of each country
+    """
+    def __init__(self, batch_size=500, tiles=True, collections=True):
+        self.batch_size = batch_size
+        self.tiles = tiles
+        self.collections = collections
+        self.countries = {}
+        self.states = {}
+        self.skipped = 0
+
+    def _country(self, code, geometry=None):
+        if code not in self.countries:
+            country, _ = Country.objects.get_or_create(
+                code=code, defaults={'boundary': geometry['coordinates']
+                                     if geometry else []})
+            self.countries[code] = country
+        return self.countries[code]
+
+    def _state_ids(self, country):
+        """
+        {code: pk} of the states of a country, read once.
+        """
+        if country.pk not in self.states:
+            self.states[country.pk] = dict(
+                State.objects.filter(country=country)
+                .values_list('code', 'pk'))
+        return self.states[country.pk]
+
+    def _row(self, level, feature):
+        properties = feature.get('properties') or {}
+        geometry = feature.get('geometry')
+        code = properties.get('ISO')
+        if not code or not geometry:
+            return None
+        country = self._country(code, geometry)
+        if level == 0:
+            country.boundary = geometry['coordinates']
+            return country
+        if level == 1:
+            if not properties.get('HASC_1'):
+                return None
+            return State(country=country, code=properties['HASC_1'],
+                         name=properties.get('NAME_1') or '',
+                         boundary=geometry['coordinates'])
+
+        hasc = properties.get('HASC_2')
+        if not hasc:
+            return None
+        state_id = self._state_ids(country).get(
+            '.'.join(hasc.split('.')[:2]))
+        if state_id is None:
+            return None
+        return District(country=country, state_id=state_id, code=hasc,
+                        name=properties.get('NAME_2') or '',
+                        boundary=geometry['coordinates'])
+
+    def _write(self, level, rows):
+        """
+        Insert the new rows, update the boundary of the existing ones (same
+        code) and build their simplified boundaries.
+        """
+        if not rows:
+            return
+        if level == 0:
+            for country in rows:
+                Country.objects.filter(pk=country.pk).update(
+                    boundary=country.boundary)
+        else:
+            model = State if level == 1 else District
+            # the codes are unique, the last feature of a code wins
+            rows = OrderedDict((row.code, row) for row in rows).values()
+            codes = [row.code for row in rows]
+            existing = dict(model.objects.filter(code__in=codes)
+                            .values_list('code', 'pk'))
+            for row in rows:
+                if row.code in existing:
+                    row.pk = existing[row.code]
+                    model.objects.filter(pk=row.pk).update(
+                        name=row.name, boundary=row.boundary)
+            model.objects.bulk_create(
+                [row for row in rows if row.code not in existing])
+            # only PostgreSQL returns the primary keys of bulk_create
+            missing = [row for row in rows if row.pk is None]
+            if missing:
+                ids = dict(model.objects.filter(
+                    code__in=[row.code for row in missing])
+                    .values_list('code', 'pk'))
+                for row in missing:
+                    row.pk = ids[row.code]
+            if level == 1:
+                for row in rows:
+                    self._state_ids(row.country)[row.code] = row.pk
+
+        if self.tiles:
+            build_simplified_boundaries(LEVEL_NAMES[level], rows,
+                                        batch_size=self.batch_size)
+
+    def _write_collection(self, code, level, collection):
+        if collection is None:
+            return
+        if code is None:
+            collection.close()
+            return
+        Boundary.objects.filter(country=code, level=level).delete()
+        boundary = Boundary.objects.create(country=code, level=level,
+                                           geo_json={})
+        # the JSON is stored as it is, without decoding it
+        Boundary.objects.filter(pk=boundary.pk).update(
+            geo_json=Value(collection.read(), output_field=TextField()))
+
+    def load(self, fileobj, level):
+        """
+        Load the features of a GeoJSON file of level. Returns the number of
+        rows written.
+        """
+        count = 0
+        rows = []
+        collection_code, collection = None, None
+        with transaction.atomic():
+            for feature in iter_features(fileobj):
+                code = (feature.get('properties') or {}).get('ISO')
+                if self.collections and (collection is None or
+                                         code != collection_code):
+                    self._write_collection(collection_code, level,
+                                           collection)
+                    collection_code, collection = code, CollectionFile()
+                if collection is not None:
+                    collection.add(feature)
+
+                row = self._row(level, feature)
+                if row is None:
+                    self.skipped += 1
+                    continue
+                rows.append(row)
+                if len(rows) >= self.batch_size:
+                    self._write(level, rows)
+                    count += len(rows)
+                    rows = []
+            self._write(level, rows)
+            count += len(rows)
+            self._write_collection(collection_code, level, collection)
+
+        # bulk_create sends no signals, the cached indexes are outdated
+        clear_indexes()
+        return count
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from gladmap.tiles import LEVELS, ZOOM_LEVELS, build_simplified_boundaries
+
+
+class Command(BaseCommand):
+    help = """
+    Build the simplified boundaries of the map tiles.
+
+    The boundaries of the gladmap countries, states and districts (or of
+    --level only, of the --country only) are simplified for each zoom of
+    the tiles and replace the ones built before.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', choices=sorted(LEVELS),
+                            help='Only build this level')
+        parser.add_argument('--country',
+                            help='Only build the boundaries of this code')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        levels = [options['level']] if options['level'] else \
+            ['country', 'state', 'district']
+        for level in levels:
+            model = LEVELS[level][0]
+            objects = model.objects.order_by('pk')
+            if options['country']:
+                if level == 'country':
+                    objects = objects.filter(code=options['country'])
+                else:
+                    objects = objects.filter(
+                        country__code=options['country'])
+            count = build_simplified_boundaries(
+                level, objects.iterator(), zooms=ZOOM_LEVELS,
+                batch_size=options['batch_size'])
+            self.stdout.write('{}: {} simplified boundaries'.format(
+                level, count))
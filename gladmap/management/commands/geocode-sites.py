@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from gladmap.geocoding import ReverseGeocoder, update_site_admin_levels
+from gladmap.models import State
+from workflow.models import Country
+
+
+class Command(BaseCommand):
+    help = """
+    Set the Administrative Level 1 and 2 of the site profiles of a country
+    from their latitude and longitude.
+
+    The sites are located in the gladmap states and districts of boundary
+    (AFG, DEU, ...) in one pass and their province and district are set to
+    the admin boundaries of the same name, created if missing. With
+    --blank only the sites without province or district are updated.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('country',
+                            help='Code of the country of the sites')
+        parser.add_argument('boundary',
+                            help='Code of the gladmap country')
+        parser.add_argument('--blank', action='store_true',
+                            help='Only the sites without admin levels')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Locate the sites without saving')
+
+    def handle(self, *args, **options):
+        country = Country.objects.filter(code=options['country']).first()
+        if country is None:
+            raise CommandError('Unknown country {}'.format(
+                options['country']))
+        if not State.objects.filter(country__code=options['boundary']) \
+                .exists():
+            raise CommandError('No states for {}'.format(
+                options['boundary']))
+
+        sites = None
+        if options['blank']:
+            sites = country.siteprofile_set.filter(
+                Q(province__isnull=True) | Q(district__isnull=True))
+
+        geocoder = ReverseGeocoder(options['boundary'])
+        located, changed = update_site_admin_levels(
+            country, geocoder, sites=sites, dry_run=options['dry_run'])
+        self.stdout.write('{} sites located, {} updated'.format(
+            located, changed))
@@ -0,0 +1,88 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gladmap.ingest import BoundaryLoader, parse_file_name
+
+
+class Command(BaseCommand):
+    help = """
+    Load GADM boundaries into the gladmap countries, states and districts.
+
+    Takes GeoJSON files named XXX_admN.json, shapefiles XXX_admN.shp
+    (converted with ogr2ogr) or directories of them. Countries are loaded
+    first, then states, then districts. Files are read as a stream and the
+    rows written in batches, along with the simplified boundaries of the
+    map tiles.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help='GADM files or directories')
+        parser.add_argument('--level', type=int, choices=(0, 1, 2),
+                            help='Level of files not named XXX_admN')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--no-tiles', action='store_true',
+                            help='Do not build the tile boundaries')
+        parser.add_argument('--no-collections', action='store_true',
+                            help='Do not store the Boundary collections')
+
+    def handle(self, *args, **options):
+        files = []
+        for path in options['paths']:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name)
+                             for name in sorted(os.listdir(path))
+                             if parse_file_name(name) is not None)
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError('{} does not exist'.format(path))
+
+        levels = []
+        for path in files:
+            parsed = parse_file_name(path)
+            level = parsed[1] if parsed is not None else options['level']
+            if level is None:
+                raise CommandError(
+                    'The level of {} is unknown, use --level'.format(path))
+            if level > 2:
+                self.stdout.write('Skipping {}, only levels 0 to 2 are '
+                                  'loaded'.format(path))
+                continue
+            levels.append((level, path))
+
+        loader = BoundaryLoader(
+            batch_size=options['batch_size'],
+            tiles=not options['no_tiles'],
+            collections=not options['no_collections'])
+        for level, path in sorted(levels):
+            count = self.load(loader, path, level)
+            self.stdout.write('{}: {} rows'.format(path, count))
+        if loader.skipped:
+            self.stdout.write('{} features without code or parent state '
+                              'skipped'.format(loader.skipped))
+
+    def load(self, loader, path, level):
+        if not path.endswith('.shp'):
+            with open(path) as geojson:
+                return loader.load(geojson, level)
+
+        directory = tempfile.mkdtemp()
+        try:
+            converted = os.path.join(directory, 'boundaries.json')
+            try:
+                subprocess.check_call(
+                    ['ogr2ogr', '-f', 'GeoJSON', converted, path])
+            except OSError:
+                raise CommandError('ogr2ogr is needed to load shapefiles')
+            except subprocess.CalledProcessError:
+                raise CommandError('ogr2ogr could not convert {}'
+                                   .format(path))
+            with open(converted) as geojson:
+                return loader.load(geojson, level)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 09:47
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gladmap', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimplifiedBoundary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(choices=[(0, 'Country'), (1, 'State'), (2, 'District')])),
+                ('object_id', models.IntegerField()),
+                ('zoom', models.IntegerField()),
+                ('code', models.CharField(max_length=100)),
+                ('name', models.CharField(blank=True, max_length=150)),
+                ('min_x', models.FloatField()),
+                ('min_y', models.FloatField()),
+                ('max_x', models.FloatField()),
+                ('max_y', models.FloatField()),
+                ('geometry', django.contrib.postgres.fields.jsonb.JSONField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='simplifiedboundary',
+            unique_together=set([('level', 'object_id', 'zoom')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='simplifiedboundary',
+            index_together=set([('level', 'zoom', 'min_x', 'max_x')]),
+        ),
+    ]
@@ -52,4 +52,49 @@ Level 2 - Districts
 
 
 
-"""
\ No newline at end of file
+"""
+
+class SimplifiedBoundary(models.Model):
+    """
+    Boundary of a Country, State or District simplified for the map tiles
+    of a zoom level, see gladmap.tiles.
+    """
+    COUNTRY = 0
+    STATE = 1
+    DISTRICT = 2
+    LEVEL_CHOICES = (
+        (COUNTRY, 'Country'),
+        (STATE, 'State'),
+        (DISTRICT, 'District'),
+    )
+
+    level = models.IntegerField(choices=LEVEL_CHOICES)
+    object_id = models.IntegerField()
+    zoom = models.IntegerField()
+    code = models.CharField(max_length=100)
+    name = models.CharField(max_length=150, blank=True)
+    # bounding box of the simplified geometry
+    min_x = models.FloatField()
+    min_y = models.FloatField()
+    max_x = models.FloatField()
+    max_y = models.FloatField()
+    geometry = JSONField()
+
+    class Meta:
+        unique_together = ('level', 'object_id', 'zoom')
+        index_together = (('level', 'zoom', 'min_x', 'max_x'),)
+
+    def __str__(self):
+        return self.code + " " + str(self.zoom)
+
+
+class IndexVersion(models.Model):
+    """
+    Version of the spatial indexes cached by the processes under a key, or
+    of all of them for the empty key, see gladmap.spatial.cached_index.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return self.key + " " + self.version
@@ -0,0 +1,26 @@
+from django.db.models import signals
+from django.dispatch import receiver
+
+from gladmap.models import Boundary, District, State
+from gladmap.spatial import clear_indexes
+
+
+@receiver(signals.post_save, sender=Boundary)
+@receiver(signals.post_delete, sender=Boundary)
+def clear_boundary_index(sender, instance, **kwargs):
+    """
+    The cached index of the country is built again on its next lookup.
+    """
+    clear_indexes(('boundary', instance.country))
+
+
+@receiver(signals.post_save, sender=State)
+@receiver(signals.post_delete, sender=State)
+@receiver(signals.post_save, sender=District)
+@receiver(signals.post_delete, sender=District)
+def clear_geocoder_indexes(sender, instance, **kwargs):
+    """
+    The country of a deleted State or District may be deleted as well, so
+    the geocoders of every country are built again.
+    """
+    clear_indexes()
@@ -0,0 +1,280 @@
+"""
+Spatial index of the features of a boundary GeoJSON, for point in polygon
+lookups.
+
+The edges of the rings of each polygon are kept in arrays of doubles and
+bucketed in horizontal bands, so the ray cast of a point only tests the
+edges of its band. The features are bucketed in a grid by their bounding
+box, so a lookup only tests the features of the cell of the point. Rings
+are combined with the even-odd rule, which handles holes, and every polygon
+of a MultiPolygon is tested.
+
+The index of a country is built once per process and kept in a bounded
+cache, see get_country_index. It is built again when its Boundary changes:
+clear_indexes stores a new IndexVersion, which the cached indexes of every
+process are checked against, at most once every
+GLADMAP_INDEX_VERSION_INTERVAL seconds each so lookups don't query it.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+
+from gladmap.models import Boundary, IndexVersion
+
+# edges per band of a polygon, features per grid cell, on average
+EDGES_PER_BAND = 8
+FEATURES_PER_CELL = 1
+
+
+def _rings(geometry):
+    """
+    Returns the list of polygons of a Polygon or MultiPolygon geometry, each
+    as its list of rings (the exterior and the holes).
+    """
+    if not geometry:
+        return []
+    if geometry.get('type') == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry.get('type') == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def coordinates_geometry(coordinates):
+    """
+    Returns the geometry of the coordinates of a Polygon or a MultiPolygon,
+    as stored without their type by the gladmap Country, State and District.
+    """
+    geometry_type = 'Polygon'
+    try:
+        if isinstance(coordinates[0][0][0], list):
+            geometry_type = 'MultiPolygon'
+    except (IndexError, TypeError):
+        return None
+    return {'type': geometry_type, 'coordinates': coordinates}
+
+
+class Polygon(object):
+    """
+    A polygon with holes, stored as arrays of the coordinates of its edges.
+    """
+    def __init__(self, rings):
+        self.x1, self.y1 = array('d'), array('d')
+        self.x2, self.y2 = array('d'), array('d')
+        for ring in rings:
+            points = [(float(point[0]), float(point[1])) for point in ring
+                      if len(point) >= 2 and point[0] is not None and
+                      point[1] is not None]
+            if len(points) < 3:
+                continue
+            # rings may or may not repeat their first point at the end
+            for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+                if y1 == y2:
+                    # horizontal edges are never crossed by the ray
+                    continue
+                self.x1.append(x1)
+                self.y1.append(y1)
+                self.x2.append(x2)
+                self.y2.append(y2)
+
+        if not self.x1:
+            self.bbox = None
+            return
+        xs = self.x1 + self.x2
+        ys = self.y1 + self.y2
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self._build_bands()
+
+    def _build_bands(self):
+        min_y, max_y = self.bbox[1], self.bbox[3]
+        count = max(1, len(self.x1) // EDGES_PER_BAND)
+        self.band_height = (max_y - min_y) / count or 1.0
+        self.bands = [array('l') for _ in range(count)]
+        for i in range(len(self.x1)):
+            low = min(self.y1[i], self.y2[i])
+            high = max(self.y1[i], self.y2[i])
+            for band in range(self._band(low), self._band(high) + 1):
+                self.bands[band].append(i)
+
+    def _band(self, y):
+        band = int((y - self.bbox[1]) / self.band_height)
+        return min(max(band, 0), len(self.bands) - 1)
+
+    def contains(self, x, y):
+        if self.bbox is None:
+            return False
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        inside = False
+        for i in self.bands[self._band(y)]:
+            if (y1[i] > y) != (y2[i] > y) and \
+                    x < (x2[i] - x1[i]) * (y - y1[i]) / (y2[i] - y1[i]) + \
+                    x1[i]:
+                inside = not inside
+        return inside
+
+
+class SpatialIndex(object):
+    """
+    Finds the feature of a FeatureCollection containing a point.
+    """
+    def __init__(self, geo_json):
+        if isinstance(geo_json, basestring):
+            geo_json = json.loads(geo_json)
+        self.features = []
+        for feature in geo_json.get('features', []):
+            polygons = [polygon for polygon in
+                        (Polygon(rings) for rings in
+                         _rings(feature.get('geometry')))
+                        if polygon.bbox is not None]
+            if polygons:
+                self.features.append(
+                    (_union_bbox(polygon.bbox for polygon in polygons),
+                     polygons, feature.get('properties')))
+        self._build_grid()
+
+    def _build_grid(self):
+        if not self.features:
+            self.bbox = None
+            return
+        self.bbox = _union_bbox(bbox for bbox, _, _ in self.features)
+        self.size = max(1, int(math.ceil(math.sqrt(
+            len(self.features) / float(FEATURES_PER_CELL)))))
+        self.cell_width = (self.bbox[2] - self.bbox[0]) / self.size or 1.0
+        self.cell_height = (self.bbox[3] - self.bbox[1]) / self.size or 1.0
+        self.cells = [array('l') for _ in range(self.size * self.size)]
+        for i, (bbox, _, _) in enumerate(self.features):
+            first_col, first_row = self._cell(bbox[0], bbox[1])
+            last_col, last_row = self._cell(bbox[2], bbox[3])
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    self.cells[row * self.size + col].append(i)
+
+    def _cell(self, x, y):
+        col = int((x - self.bbox[0]) / self.cell_width)
+        row = int((y - self.bbox[1]) / self.cell_height)
+        return (min(max(col, 0), self.size - 1),
+                min(max(row, 0), self.size - 1))
+
+    def find(self, point):
+        """
+        Returns the properties of the feature containing point (lon, lat),
+        None when no feature does.
+        """
+        x, y = float(point[0]), float(point[1])
+        if self.bbox is None or not (self.bbox[0] <= x <= self.bbox[2] and
+                                     self.bbox[1] <= y <= self.bbox[3]):
+            return None
+        col, row = self._cell(x, y)
+        for i in self.cells[row * self.size + col]:
+            bbox, polygons, properties = self.features[i]
+            if not (bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]):
+                continue
+            for polygon in polygons:
+                if polygon.contains(x, y):
+                    return properties
+        return None
+
+
+def _union_bbox(bboxes):
+    min_xs, min_ys, max_xs, max_ys = zip(*bboxes)
+    return min(min_xs), min(min_ys), max(max_xs), max(max_ys)
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+# IndexVersion of all the indexes
+ALL_INDEXES = ''
+
+
+def _version_key(key):
+    return ':'.join('%s' % part for part in key)
+
+
+def index_version(key):
+    """
+    Returns the version of the index cached under key, it changes when
+    clear_indexes is called for it (or all indexes) in any process.
+    """
+    version_key = _version_key(key)
+    versions = dict(IndexVersion.objects.filter(
+        key__in=[ALL_INDEXES, version_key]).values_list('key', 'version'))
+    return versions.get(ALL_INDEXES), versions.get(version_key)
+
+
+def cached_index(key, build):
+    """
+    Returns the index cached under key, built by build() the first time or
+    when its version changed. Nothing is cached when build returns None.
+    The GLADMAP_INDEX_CACHE_SIZE indexes used last are kept, and their
+    version is checked every GLADMAP_INDEX_VERSION_INTERVAL seconds.
+    """
+    now = time.time()
+    with _lock:
+        if key in _indexes:
+            cached_version, checked, index = _indexes.pop(key)
+            _indexes[key] = cached_version, checked, index
+            if now - checked < getattr(
+                    settings, 'GLADMAP_INDEX_VERSION_INTERVAL', 5):
+                return index
+
+    version = index_version(key)
+    with _lock:
+        if key in _indexes:
+            cached_version, checked, index = _indexes.pop(key)
+            if cached_version == version:
+                _indexes[key] = cached_version, now, index
+                return index
+
+    index = build()
+    if index is None:
+        return None
+
+    with _lock:
+        _indexes[key] = version, now, index
+        while len(_indexes) > getattr(settings, 'GLADMAP_INDEX_CACHE_SIZE',
+                                      20):
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_indexes(key=None):
+    """
+    Drop the cached index of key, or every index when no key is given, in
+    all the processes.
+    """
+    with _lock:
+        if key is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(key, None)
+    IndexVersion.objects.update_or_create(
+        key=ALL_INDEXES if key is None else _version_key(key),
+        defaults={'version': uuid.uuid4().hex})
+
+
+def _build_country_index(country):
+    boundary = Boundary.objects.filter(country=country).order_by('pk') \
+        .values_list('geo_json', flat=True).first()
+    if boundary is None:
+        return None
+    return SpatialIndex(boundary)
+
+
+def get_country_index(country):
+    """
+    Returns the SpatialIndex of the Boundary of a country, None if it has
+    none.
+    """
+    return cached_index(('boundary', country),
+                        lambda: _build_country_index(country))
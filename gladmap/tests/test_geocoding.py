@@ -0,0 +1,96 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase, tag
+from mock import Mock, patch
+
+import factories
+from gladmap import geocoding
+from gladmap.geocoding import BoundaryIndex, update_site_admin_levels
+from gladmap.models import District, State
+from workflow.models import AdminLevelOne, AdminLevelTwo, SiteProfile
+
+
+def _square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size],
+            [x, y]]
+
+
+@tag('pkg')
+class BoundaryIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = BoundaryIndex([
+            # Polygon with a hole, MultiPolygon
+            (1, [_square(0, 0, 10), _square(4, 4, 2)]),
+            (2, [[_square(4.5, 4.5, 1)], [_square(20, 0, 5)]]),
+        ])
+        self.xs = [1, 4.2, 5, 22, 15, 9.9]
+        self.ys = [1, 4.2, 5, 2, 5, 9.9]
+        self.expected = [1, None, 2, 2, None, 1]
+
+    def test_find_all(self):
+        self.assertEqual(self.index.find_all(self.xs, self.ys),
+                         self.expected)
+
+    def test_find_all_without_numpy(self):
+        with patch.object(geocoding, 'numpy', None):
+            self.assertEqual(self.index.find_all(self.xs, self.ys),
+                             self.expected)
+
+    def test_find_all_chunks(self):
+        with patch.object(geocoding, 'MAX_CELLS', 1):
+            self.assertEqual(self.index.find_all(self.xs, self.ys),
+                             self.expected)
+
+
+@tag('pkg')
+class UpdateSiteAdminLevelsTest(TestCase):
+    def setUp(self):
+        self.country = factories.Country()
+        self.kabul = AdminLevelOne.objects.create(name='Kabul',
+                                                  country=self.country)
+        self.kunduz = State(id=1, name='Kunduz', code='AF.KD')
+        self.nirkh = District(id=1, name='Nirkh', code='AF.KD.NI')
+        self.geocoder = Mock()
+
+    def _site(self, name, **kwargs):
+        kwargs.setdefault('latitude', Decimal('36.7'))
+        kwargs.setdefault('longitude', Decimal('68.8'))
+        return factories.SiteProfile(name=name, country=self.country,
+                                     **kwargs)
+
+    def test_update(self):
+        wrong = self._site('Wrong', province=self.kabul)
+        blank = self._site('Blank')
+        self._site('Outside')
+        self._site('Unset', latitude=0, longitude=0)
+        self.geocoder.locate.return_value = [
+            (self.kunduz, self.nirkh), (self.kunduz, None), (None, None)]
+
+        located, changed = update_site_admin_levels(self.country,
+                                                    self.geocoder)
+        self.assertEqual((located, changed), (2, 2))
+        self.assertEqual(len(self.geocoder.locate.call_args[0][0]), 3)
+
+        kunduz = AdminLevelOne.objects.get(name='Kunduz')
+        nirkh = AdminLevelTwo.objects.get(name='Nirkh')
+        self.assertEqual(nirkh.adminlevelone, kunduz)
+        wrong = SiteProfile.objects.get(pk=wrong.pk)
+        self.assertEqual((wrong.province, wrong.district), (kunduz, nirkh))
+        blank = SiteProfile.objects.get(pk=blank.pk)
+        self.assertEqual((blank.province, blank.district), (kunduz, None))
+        self.assertIsNone(
+            SiteProfile.objects.get(name='Outside').province)
+
+        # nothing changes the second time, no admin levels are added
+        located, changed = update_site_admin_levels(self.country,
+                                                    self.geocoder)
+        self.assertEqual((located, changed), (2, 0))
+        self.assertEqual(AdminLevelOne.objects.count(), 2)
+
+    def test_dry_run(self):
+        self._site('Blank')
+        self.geocoder.locate.return_value = [(self.kunduz, self.nirkh)]
+        self.assertEqual(update_site_admin_levels(
+            self.country, self.geocoder, dry_run=True), (1, 0))
+        self.assertFalse(AdminLevelOne.objects.filter(name='Kunduz')
+                         .exists())
@@ -0,0 +1,55 @@
+import json
+from StringIO import StringIO
+
+from django.test import SimpleTestCase, tag
+
+from gladmap.ingest import CollectionFile, iter_features, parse_file_name
+
+
+def _collection(count):
+    return json.dumps({
+        'type': 'FeatureCollection',
+        'crs': {'type': 'name', 'properties': {'name': 'EPSG:4326'}},
+        'features': [
+            {'type': 'Feature', 'properties': {'ISO': 'AFG', 'ID': i,
+                                               'NAME_1': u'B\xe2mi\xe2n'},
+             'geometry': {'type': 'Polygon', 'coordinates': [
+                 [[i, 0], [i + 1, 0], [i + 1, 1], [i, 0]]]}}
+            for i in range(count)]}, indent=2)
+
+
+@tag('pkg')
+class IterFeaturesTest(SimpleTestCase):
+    def test_iter_features(self):
+        content = _collection(20)
+        expected = json.loads(content)['features']
+        for chunk_size in (1, 7, 100, len(content)):
+            features = list(iter_features(StringIO(content), chunk_size))
+            self.assertEqual(features, expected)
+
+    def test_empty(self):
+        self.assertEqual(list(iter_features(StringIO(_collection(0)))), [])
+        self.assertEqual(list(iter_features(StringIO(''))), [])
+
+    def test_truncated(self):
+        content = _collection(3)
+        with self.assertRaises(ValueError):
+            list(iter_features(StringIO(content[:len(content) // 2]), 10))
+
+    def test_parse_file_name(self):
+        self.assertEqual(parse_file_name('/tmp/gadm/AFG_adm2.json'),
+                         ('AFG', 2))
+        self.assertEqual(parse_file_name('DEU_adm1.shp'), ('DEU', 1))
+        self.assertIsNone(parse_file_name('boundaries.json'))
+
+
+@tag('pkg')
+class CollectionFileTest(SimpleTestCase):
+    def test_read(self):
+        features = json.loads(_collection(3))['features']
+        collection = CollectionFile()
+        for feature in features:
+            collection.add(feature)
+        self.assertEqual(json.loads(collection.read()),
+                         {'type': 'FeatureCollection', 'features': features})
+        self.assertEqual(json.loads(CollectionFile().read())['features'], [])
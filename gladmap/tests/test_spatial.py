@@ -0,0 +1,109 @@
+import json
+import os
+
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from mock import Mock
+
+from gladmap.geo import Geo
+from gladmap.models import IndexVersion
+from gladmap.spatial import SpatialIndex, cached_index, clear_indexes
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'fixtures', 'single-boundary.json')
+
+
+def _square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size],
+            [x, y]]
+
+
+def _feature(geometry_type, coordinates, name):
+    return {'type': 'Feature', 'properties': {'name': name},
+            'geometry': {'type': geometry_type, 'coordinates': coordinates}}
+
+
+@tag('pkg')
+class SpatialIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = SpatialIndex({'type': 'FeatureCollection', 'features': [
+            # a square with a square hole
+            _feature('Polygon', [_square(0, 0, 10), _square(4, 4, 2)],
+                     'ring'),
+            # the island in the hole and a square apart
+            _feature('MultiPolygon', [[_square(4.5, 4.5, 1)],
+                                      [[[20, 0], [30, 0], [30, 10]]]],
+                     'islands'),
+        ]})
+
+    def test_find(self):
+        self.assertEqual(self.index.find((1, 1))['name'], 'ring')
+        self.assertEqual(self.index.find((9.5, 5))['name'], 'ring')
+
+    def test_find_hole(self):
+        self.assertIsNone(self.index.find((4.2, 4.2)))
+        self.assertEqual(self.index.find((5, 5))['name'], 'islands')
+
+    def test_find_multipolygon(self):
+        self.assertEqual(self.index.find((29, 5))['name'], 'islands')
+        # in the bounding box of the triangle only
+        self.assertIsNone(self.index.find((21, 9)))
+
+    def test_find_outside(self):
+        self.assertIsNone(self.index.find((15, 5)))
+        self.assertIsNone(self.index.find((-1, -1)))
+
+    def test_find_fixture(self):
+        with open(FIXTURE) as fixture:
+            geo_json = json.load(fixture)[0]['fields']['geo_json']
+        geo = Geo()
+        dist = geo.find_district((25.4, 7.0), geo_json)
+        self.assertEqual(dist['NAME_2'], 'Djemah')
+        dist = geo.find_district((22.22046279807357, 8.74786376953125),
+                                 geo_json)
+        self.assertEqual(dist['NAME_2'], u'Ouanda Djall\xe9')
+        dist = geo.find_district((33.1373748779298, 44.22711944580078),
+                                 geo_json)
+        self.assertEqual(dist, False)
+
+
+@tag('pkg')
+class CachedIndexTest(TestCase):
+    def setUp(self):
+        clear_indexes()
+        self.build = Mock(side_effect=lambda: object())
+
+    def test_cached(self):
+        index = cached_index(('boundary', 'AFG'), self.build)
+        self.assertIs(cached_index(('boundary', 'AFG'), self.build), index)
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_version_checked_every_interval(self):
+        index = cached_index(('boundary', 'AFG'), self.build)
+        IndexVersion.objects.update_or_create(
+            key='boundary:AFG', defaults={'version': 'changed'})
+        with self.assertNumQueries(0):
+            self.assertIs(cached_index(('boundary', 'AFG'), self.build),
+                          index)
+
+    @override_settings(GLADMAP_INDEX_VERSION_INTERVAL=0)
+    def test_cleared_by_other_process(self):
+        index = cached_index(('boundary', 'AFG'), self.build)
+        # the version another process stores when clearing the index
+        IndexVersion.objects.update_or_create(
+            key='boundary:AFG', defaults={'version': 'changed'})
+        self.assertIsNot(cached_index(('boundary', 'AFG'), self.build),
+                         index)
+
+        index = cached_index(('boundary', 'AFG'), self.build)
+        IndexVersion.objects.filter(key='').update(version='changed')
+        self.assertIsNot(cached_index(('boundary', 'AFG'), self.build),
+                         index)
+        self.assertEqual(self.build.call_count, 3)
+
+    def test_clear_indexes(self):
+        index = cached_index(('boundary', 'AFG'), self.build)
+        other = cached_index(('boundary', 'IRQ'), self.build)
+        clear_indexes(('boundary', 'AFG'))
+        self.assertIsNot(cached_index(('boundary', 'AFG'), self.build),
+                         index)
+        self.assertIs(cached_index(('boundary', 'IRQ'), self.build), other)
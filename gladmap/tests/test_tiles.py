@@ -0,0 +1,71 @@
+import json
+import os
+
+from django.test import SimpleTestCase, tag
+
+from gladmap import tiles
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'fixtures', 'single-boundary.json')
+
+
+def _square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size],
+            [x, y]]
+
+
+@tag('pkg')
+class TilesTest(SimpleTestCase):
+    def test_simplify_line(self):
+        points = [(0, 0), (1, 0.01), (2, 0), (3, 1), (4, 0)]
+        self.assertEqual(tiles.simplify_line(points, 0.1),
+                         [(0, 0), (2, 0), (3, 1), (4, 0)])
+
+    def test_simplify_geometry(self):
+        geometry = {'type': 'MultiPolygon', 'coordinates': [
+            [_square(0, 0, 10), _square(4, 4, 0.01)],
+            [_square(20, 20, 0.01)]]}
+        simplified = tiles.simplify_geometry(geometry, 0.1)
+        # the hole and the small polygon are dropped
+        self.assertEqual(simplified, {'type': 'MultiPolygon',
+                                      'coordinates': [[_square(0, 0, 10)]]})
+        self.assertIsNone(tiles.simplify_geometry(
+            {'type': 'Polygon', 'coordinates': [_square(0, 0, 0.01)]}, 0.1))
+
+    def test_simplify_fixture(self):
+        with open(FIXTURE) as fixture:
+            geo_json = json.load(fixture)[0]['fields']['geo_json']
+        geometry = geo_json['features'][0]['geometry']
+        previous = 0
+        for zoom in tiles.ZOOM_LEVELS:
+            simplified = tiles.simplify_geometry(geometry,
+                                                 tiles.tolerance(zoom))
+            size = len(simplified['coordinates'][0])
+            self.assertGreater(size, previous)
+            previous = size
+        self.assertLess(previous, len(geometry['coordinates'][0]))
+
+    def test_tile_bbox(self):
+        min_x, min_y, max_x, max_y = tiles.tile_bbox(0, 0, 0)
+        self.assertEqual((min_x, max_x), (-180, 180))
+        self.assertAlmostEqual(max_y, 85.0511287798)
+        self.assertEqual(tiles.tile_bbox(1, 1, 0)[:1], (0,))
+        self.assertEqual(tiles.stored_zoom(0), 2)
+        self.assertEqual(tiles.stored_zoom(9), 8)
+
+    def test_clip_geometry(self):
+        geometry = {'type': 'Polygon',
+                    'coordinates': [_square(-5, -5, 10),
+                                    _square(2.5, 2.5, 1.25)]}
+        bbox = (0, 0, 10, 10)
+        clipped = tiles.clip_geometry(geometry, bbox, bbox)
+        self.assertEqual(clipped, {'type': 'Polygon', 'coordinates': [
+            _square(0, 0, 5), _square(2.5, 2.5, 1.25)]})
+        self.assertIsNone(tiles.clip_geometry(geometry, (20, 20, 30, 30),
+                                              bbox))
+
+    def test_quantize_ring(self):
+        ring = [[0.0001, 0], [10, 0.0001], [10, 10], [0, 10], [0, 0.0002],
+                [0.0001, 0]]
+        self.assertEqual(tiles.quantize_ring(ring, (0, 0, 10, 10)),
+                         _square(0, 0, 10))
@@ -0,0 +1,325 @@
+"""
+Simplified boundaries and map tiles.
+
+The boundaries of the Country, State and District rows are simplified with
+Douglas-Peucker for each zoom of ZOOM_LEVELS, to a tolerance of a pixel at
+that zoom, and stored as SimplifiedBoundary rows with their bounding box
+(see build_simplified_boundaries and the build-boundary-tiles command).
+
+A tile z/x/y (the scheme of OpenStreetMap) is built from the geometries of
+the nearest simplified zoom intersecting it, clipped to the tile with a
+small buffer and with coordinates snapped to a grid of TILE_EXTENT units
+per tile side, see get_tile. Coordinates stay longitudes and latitudes, so
+the tiles are plain GeoJSON.
+"""
+import math
+
+from django.db import transaction
+
+from gladmap.models import Country, District, SimplifiedBoundary, State
+from gladmap.spatial import coordinates_geometry
+
+ZOOM_LEVELS = (2, 5, 8, 11)
+TILE_SIZE = 256
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# name of the level: (model, SimplifiedBoundary.level)
+LEVELS = {
+    'country': (Country, SimplifiedBoundary.COUNTRY),
+    'state': (State, SimplifiedBoundary.STATE),
+    'district': (District, SimplifiedBoundary.DISTRICT),
+}
+
+
+def tolerance(zoom):
+    """
+    Returns the size of a pixel at zoom in degrees (at the equator).
+    """
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def stored_zoom(zoom):
+    """
+    Returns the zoom of ZOOM_LEVELS whose geometries are used at zoom.
+    """
+    stored = ZOOM_LEVELS[0]
+    for level in ZOOM_LEVELS:
+        if level <= zoom:
+            stored = level
+    return stored
+
+
+def _segment_distance(point, start, end):
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+    t = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / \
+        (dx * dx + dy * dy)
+    t = min(max(t, 0.0), 1.0)
+    return math.hypot(point[0] - start[0] - t * dx,
+                      point[1] - start[1] - t * dy)
+
+
+def simplify_line(points, epsilon):
+    """
+    Douglas-Peucker simplification of a list of points, keeping its first
+    and last points.
+    """
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        index, distance = None, epsilon
+        for i in range(first + 1, last):
+            d = _segment_distance(points[i], points[first], points[last])
+            if d > distance:
+                index, distance = i, d
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_ring(ring, epsilon):
+    """
+    Returns the simplified closed ring, None when it collapses below a
+    triangle. The ring is split at its farthest point from the first, so
+    both halves keep their extent.
+    """
+    points = [(float(point[0]), float(point[1])) for point in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    if len(points) < 3:
+        return None
+    far = max(range(len(points)),
+              key=lambda i: math.hypot(points[i][0] - points[0][0],
+                                       points[i][1] - points[0][1]))
+    simplified = simplify_line(points[:far + 1], epsilon)[:-1] + \
+        simplify_line(points[far:] + points[:1], epsilon)
+    if len(simplified) < 4:
+        return None
+    return [list(point) for point in simplified]
+
+
+def _map_polygons(geometry, function):
+    """
+    Applies function to the list of rings of each polygon of geometry.
+    Polygons for which it returns None are dropped, as are geometries left
+    without polygons.
+    """
+    if geometry['type'] == 'Polygon':
+        rings = function(geometry['coordinates'])
+        if rings is None:
+            return None
+        return {'type': 'Polygon', 'coordinates': rings}
+    polygons = [rings for rings in
+                (function(polygon) for polygon in geometry['coordinates'])
+                if rings is not None]
+    if not polygons:
+        return None
+    return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+
+def _polygon_rings(function):
+    """
+    Returns a function applying function to each ring of a polygon,
+    dropping the holes it returns None for and the polygon when its
+    exterior is None.
+    """
+    def rings(polygon):
+        exterior = function(polygon[0]) if polygon else None
+        if exterior is None:
+            return None
+        return [exterior] + [ring for ring in
+                             (function(hole) for hole in polygon[1:])
+                             if ring is not None]
+    return rings
+
+
+def simplify_geometry(geometry, epsilon):
+    """
+    Returns the Polygon or MultiPolygon simplified to epsilon, None when
+    nothing is left of it.
+    """
+    return _map_polygons(geometry, _polygon_rings(
+        lambda ring: simplify_ring(ring, epsilon)))
+
+
+def geometry_bbox(geometry):
+    xs, ys = [], []
+    polygons = [geometry['coordinates']] \
+        if geometry['type'] == 'Polygon' else geometry['coordinates']
+    for polygon in polygons:
+        for ring in polygon:
+            xs.extend(point[0] for point in ring)
+            ys.extend(point[1] for point in ring)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _latitude(y, zoom):
+    n = math.pi - 2.0 * math.pi * y / 2 ** zoom
+    return math.degrees(math.atan(math.sinh(n)))
+
+
+def tile_bbox(zoom, x, y, buffer=0):
+    """
+    Returns (min lon, min lat, max lon, max lat) of the tile, grown by
+    buffer units of TILE_EXTENT on each side.
+    """
+    margin = float(buffer) / TILE_EXTENT
+    count = 2 ** zoom
+    return (-180.0 + 360.0 * (x - margin) / count,
+            _latitude(y + 1 + margin, zoom),
+            -180.0 + 360.0 * (x + 1 + margin) / count,
+            _latitude(y - margin, zoom))
+
+
+def _clip_edge(points, inside, intersect):
+    clipped = []
+    for i, current in enumerate(points):
+        previous = points[i - 1]
+        if inside(current):
+            if not inside(previous):
+                clipped.append(intersect(previous, current))
+            clipped.append(current)
+        elif inside(previous):
+            clipped.append(intersect(previous, current))
+    return clipped
+
+
+def _x_intersect(x):
+    def intersect(p, q):
+        return (x, p[1] + (q[1] - p[1]) * (x - p[0]) / (q[0] - p[0]))
+    return intersect
+
+
+def _y_intersect(y):
+    def intersect(p, q):
+        return (p[0] + (q[0] - p[0]) * (y - p[1]) / (q[1] - p[1]), y)
+    return intersect
+
+
+def clip_ring(ring, bbox):
+    """
+    Sutherland-Hodgman clipping of a ring to bbox. Returns the closed ring,
+    None when nothing is left.
+    """
+    min_x, min_y, max_x, max_y = bbox
+    points = [(float(point[0]), float(point[1])) for point in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    for inside, intersect in (
+            (lambda p: p[0] >= min_x, _x_intersect(min_x)),
+            (lambda p: p[0] <= max_x, _x_intersect(max_x)),
+            (lambda p: p[1] >= min_y, _y_intersect(min_y)),
+            (lambda p: p[1] <= max_y, _y_intersect(max_y))):
+        if not points:
+            return None
+        points = _clip_edge(points, inside, intersect)
+    if len(points) < 3:
+        return None
+    return points + points[:1]
+
+
+def quantize_ring(ring, bbox):
+    """
+    Snaps the points of a ring to a grid of TILE_EXTENT units per side of
+    bbox, dropping the repeated points. None when it collapses.
+    """
+    min_x, min_y, max_x, max_y = bbox
+    unit_x = float(max_x - min_x) / TILE_EXTENT
+    unit_y = float(max_y - min_y) / TILE_EXTENT
+    points = []
+    for x, y in ring:
+        point = [round(min_x + round((x - min_x) / unit_x) * unit_x, 7),
+                 round(min_y + round((y - min_y) / unit_y) * unit_y, 7)]
+        if not points or points[-1] != point:
+            points.append(point)
+    if len(points) < 4:
+        return None
+    return points
+
+
+def clip_geometry(geometry, bbox, grid_bbox):
+    """
+    Returns geometry clipped to bbox and quantized on the grid of
+    grid_bbox, None when nothing is left in bbox.
+    """
+    def ring(points):
+        clipped = clip_ring(points, bbox)
+        if clipped is None:
+            return None
+        return quantize_ring(clipped, grid_bbox)
+    return _map_polygons(geometry, _polygon_rings(ring))
+
+
+def build_simplified_boundaries(level, objects, zooms=ZOOM_LEVELS,
+                                batch_size=500):
+    """
+    Replace the SimplifiedBoundary rows of objects, (Country, State or
+    District rows of the level named level) by their geometries simplified
+    for each of zooms. Returns the number of rows created.
+    """
+    level_id = LEVELS[level][1]
+    count = 0
+    batch = []
+    with transaction.atomic():
+        ids = []
+        for obj in objects:
+            ids.append(obj.pk)
+            geometry = coordinates_geometry(obj.boundary)
+            if geometry is None:
+                continue
+            for zoom in zooms:
+                simplified = simplify_geometry(geometry, tolerance(zoom))
+                if simplified is None:
+                    continue
+                min_x, min_y, max_x, max_y = geometry_bbox(simplified)
+                batch.append(SimplifiedBoundary(
+                    level=level_id, object_id=obj.pk, zoom=zoom,
+                    code=obj.code, name=getattr(obj, 'name', ''),
+                    min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y,
+                    geometry=simplified))
+            if len(batch) >= batch_size:
+                _replace(level_id, ids, batch)
+                count += len(batch)
+                ids, batch = [], []
+        _replace(level_id, ids, batch)
+        count += len(batch)
+    return count
+
+
+def _replace(level_id, ids, batch):
+    SimplifiedBoundary.objects.filter(level=level_id,
+                                      object_id__in=ids).delete()
+    SimplifiedBoundary.objects.bulk_create(batch)
+
+
+def get_tile(level, zoom, x, y):
+    """
+    Returns the GeoJSON FeatureCollection of the tile zoom/x/y of the
+    boundaries of the level named level.
+    """
+    grid_bbox = tile_bbox(zoom, x, y)
+    bbox = tile_bbox(zoom, x, y, TILE_BUFFER)
+    min_x, min_y, max_x, max_y = bbox
+    rows = SimplifiedBoundary.objects.filter(
+        level=LEVELS[level][1], zoom=stored_zoom(zoom),
+        min_x__lte=max_x, max_x__gte=min_x,
+        min_y__lte=max_y, max_y__gte=min_y).order_by('object_id') \
+        .values_list('object_id', 'code', 'name', 'geometry')
+
+    features = []
+    for object_id, code, name, geometry in rows.iterator():
+        clipped = clip_geometry(geometry, bbox, grid_bbox)
+        if clipped is not None:
+            features.append({
+                'type': 'Feature', 'id': object_id, 'geometry': clipped,
+                'properties': {'code': code, 'name': name}})
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from .views import boundary_tile, fetch_country_boundaries, reverse_geocode
+
+urlpatterns = [
+    url(r'^fetchcountry/(?P<country>\w+)/?$', fetch_country_boundaries, name='fetch_country_boundaries'),
+    url(r'^reverse-geocode/(?P<country>\w+)/$', reverse_geocode, name='reverse_geocode'),
+    url(r'^tiles/(?P<level>\w+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)/$', boundary_tile, name='boundary_tile'),
+]
@@ -96,3 +96,5 @@ admin.site.register(ExternalService, ExternalServiceAdmin)
 admin.site.register(ExternalServiceRecord, ExternalServiceRecordAdmin)
 admin.site.register(TolaTable, TolaTableAdmin)
 admin.site.register(PeriodicTarget, PeriodicTargetAdmin)
+admin.site.register(IndicatorActuals, IndicatorActualsAdmin)
+admin.site.register(PDFReport, PDFReportAdmin)
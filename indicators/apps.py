@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class IndicatorsAppConfig(AppConfig):
+    name = 'indicators'
+    verbose_name = 'indicators'
+
+    def ready(self):
+        import indicators.signals  # noqa
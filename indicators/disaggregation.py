@@ -0,0 +1,86 @@
+"""
+Data of the disaggregation report of a program.
+
+The report is built from two grouped queries, the actuals of the
+indicators of the program and the actuals of their disaggregation labels,
+joined in Python by indicator id. The values of disaggregations are kept
+as text, the ones which are not numbers count as 0.
+
+The report of a program is cached under the version of its data (see
+indicators.versions), it is built again after any change of the program
+indicators, collected data or disaggregations.
+"""
+from django.db.models import Case, DecimalField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from indicators.models import CollectedData, Indicator
+from indicators.versions import cached_report, data_version
+
+DISAGGREGATION_REPORT_KEY = 'disaggregation-report:{}:{}'
+
+NUMBER = r'^-?[0-9]+(\.[0-9]+)?$'
+
+_VALUE = 'disaggregationvalue__value'
+_LABEL = 'disaggregationvalue__disaggregation_label__label'
+_CUSTOMSORT = 'disaggregationvalue__disaggregation_label__customsort'
+_TYPE = 'disaggregationvalue__disaggregation_label__disaggregation_type'\
+    '__disaggregation_type'
+
+
+def _label_actuals(program_id):
+    decimal = DecimalField(max_digits=20, decimal_places=2)
+    value = Case(When(**{_VALUE + '__regex': NUMBER,
+                         'then': Cast(_VALUE, decimal)}),
+                 default=Value(0), output_field=decimal)
+    return CollectedData.disaggregation_value.through.objects\
+        .filter(collecteddata__indicator__workflowlevel1=program_id)\
+        .values('collecteddata__indicator_id', _TYPE, _CUSTOMSORT, _LABEL)\
+        .annotate(actuals=Sum(value))\
+        .order_by('collecteddata__indicator_id', _TYPE, _CUSTOMSORT, _LABEL)
+
+
+def build_disaggregation_report(program_id):
+    """
+    Returns the indicators of a program, ordered by name, with their
+    overall actuals and their actuals per disaggregation type and label::
+
+        [{'id': 1, 'number': '1.1', 'name': 'Indicator', 'lop_target': 10,
+          'actuals': Decimal('8.00'),
+          'disaggregations': [
+              {'type': 'Gender', 'labels': [
+                  {'label': 'Female', 'actuals': Decimal('5.00')},
+                  {'label': 'Male', 'actuals': Decimal('3.00')}]}]}]
+    """
+    disaggregations = {}
+    types = {}
+    for row in _label_actuals(program_id):
+        indicator_id = row['collecteddata__indicator_id']
+        key = (indicator_id, row[_TYPE])
+        disaggregation = types.get(key)
+        if disaggregation is None:
+            disaggregation = types[key] = {'type': row[_TYPE], 'labels': []}
+            disaggregations.setdefault(indicator_id, []).append(disaggregation)
+        disaggregation['labels'].append({'label': row[_LABEL],
+                                         'actuals': row['actuals']})
+
+    indicators = Indicator.objects.filter(workflowlevel1=program_id)\
+        .values('id', 'number', 'name', 'lop_target')\
+        .annotate(actuals=Sum('collecteddata__achieved'))\
+        .order_by('name', 'id')
+    report = []
+    for indicator in indicators:
+        indicator['disaggregations'] = disaggregations.get(indicator['id'],
+                                                           [])
+        report.append(indicator)
+    return report
+
+
+def disaggregation_report(program_id):
+    """
+    Returns the disaggregation report of a program (see
+    build_disaggregation_report) from the cache, building it when the
+    data of the program changed.
+    """
+    key = DISAGGREGATION_REPORT_KEY.format(program_id,
+                                           data_version(program_id))
+    return cached_report(key, lambda: build_disaggregation_report(program_id))
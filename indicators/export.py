@@ -20,6 +20,10 @@ class IndicatorResource(resources.ModelResource):
     approval_submitted_by = fields.Field(column_name='approval submitted by', attribute='approval_submitted_by', widget=ForeignKeyWidget(TolaUser, 'name'))
     approved_by = fields.Field(column_name='approved by', attribute='approved_by', widget=ForeignKeyWidget(TolaUser, 'name'))
 
+    # read by the properties of the columns, see tola.export
+    export_select_related = ('level',)
+    export_prefetch_related = ('indicator_type', 'objectives', 'strategic_objectives', 'disaggregation')
+
     class Meta:
         model = Indicator
         exclude = ('create_date','edit_date','owner','id','strategic_objective','objective')
@@ -39,6 +43,10 @@ class CollectedDataResource(resources.ModelResource):
     workflowlevel1 = fields.Field(column_name='workflowlevel1', attribute='workflowlevel1', widget=ForeignKeyWidget(WorkflowLevel1, 'name'))
     disaggregations = fields.Field(column_name='dissaggregations', attribute='disaggregations')
 
+    # read by the properties of the columns, see tola.export
+    export_select_related = ('indicator__level',)
+    export_prefetch_related = ('disaggregation_value__disaggregation_label',)
+
     class Meta:
         model = CollectedData
         exclude = ('create_date','edit_date')
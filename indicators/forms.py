@@ -7,7 +7,7 @@ from crispy_forms.bootstrap import *
 from crispy_forms.layout import Layout, Submit, Reset
 from functools import partial
 from django import forms
-from tola.util import getCountry
+from tola.access import get_access_context
 from django.db.models import Q
 
 
@@ -151,7 +151,7 @@ class IndicatorForm(forms.ModelForm):
         super(IndicatorForm, self).__init__(*args, **kwargs)
 
         #override the country queryset to use request.user for country
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         organization_id = TolaUser.objects.values_list(
             'organization_id', flat=True).get(user=self.request.user)
         self.fields['workflowlevel1'].queryset = WorkflowLevel1.objects.filter(country__in=countries)
@@ -322,7 +322,7 @@ class CollectedDataForm(forms.ModelForm):
         self.fields['workflowlevel2'].queryset = WorkflowLevel2.objects.filter(workflowlevel1=self.workflowlevel1)
 
         #override the country queryset to use request.user for country
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         try:
             int(self.workflowlevel1)
             self.workflowlevel1 = WorkflowLevel1.objects.get(id=self.workflowlevel1)
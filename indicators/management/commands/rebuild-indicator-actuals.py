@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from indicators.models import IndicatorActuals, IndicatorProgramActuals
+
+
+class Command(BaseCommand):
+    help = """
+    Recompute the materialized indicator actuals from the CollectedData table.
+
+    The totals are maintained on every CollectedData write, run this after
+    bulk imports or raw SQL changes. Pass indicator ids to limit the rebuild.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('indicator_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        indicator_ids = options['indicator_ids'] or None
+        count = IndicatorActuals.objects.rebuild(indicator_ids)
+        program_count = IndicatorProgramActuals.objects.rebuild(indicator_ids)
+
+        self.stdout.write('Rebuilt actuals of {} indicators and {} indicator '
+                          'programs'.format(count, program_count))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from indicators.pdf import render_pending
+
+
+class Command(BaseCommand):
+    help = """
+    Render the pending PDF reports of the TvA and disaggregation reports.
+
+    The web processes render them in a background thread unless
+    PDF_REPORT_WORKER is off. Run this to render the reports left pending
+    by a process that was stopped, e.g. by a deployment.
+    """
+
+    def handle(self, *args, **options):
+        count = render_pending()
+        self.stdout.write('Rendered {} PDF reports'.format(count))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 08:17
+from __future__ import unicode_literals
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+
+def fill_indicator_actuals(apps, schema_editor):
+    CollectedData = apps.get_model('indicators', 'CollectedData')
+    for model_name, scope in (('IndicatorActuals', ('indicator',)),
+                              ('IndicatorProgramActuals',
+                               ('indicator', 'workflowlevel1'))):
+        model = apps.get_model('indicators', model_name)
+        data = CollectedData.objects.order_by()
+        for field in scope:
+            data = data.filter(**{'{}__isnull'.format(field): False})
+        totals = data.values(*scope).annotate(
+            sum_actuals=Sum('achieved'),
+            sum_targets=Sum('periodic_target__target'),
+            count=Count('id'),
+            first=Min('date_collected'),
+            last=Max('date_collected'))
+        model.objects.bulk_create([
+            model(actuals=total['sum_actuals'] or Decimal('0.00'),
+                  targets=total['sum_targets'] or Decimal('0.00'),
+                  data_count=total['count'],
+                  has_data=total['count'] > 0,
+                  first_date_collected=total['first'],
+                  last_date_collected=total['last'],
+                  **{'{}_id'.format(field): total[field] for field in scope})
+            for total in totals
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0012_widget_changed'),
+        ('indicators', '0003_auto_20171101_0151'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorActuals',
+            fields=[
+                ('actuals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('targets', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('data_count', models.PositiveIntegerField(default=0)),
+                ('has_data', models.BooleanField(default=False)),
+                ('first_date_collected', models.DateTimeField(blank=True, null=True)),
+                ('last_date_collected', models.DateTimeField(blank=True, null=True)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+                ('indicator', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='actuals_summary', serialize=False, to='indicators.Indicator')),
+            ],
+            options={
+                'verbose_name_plural': 'Indicator Actuals',
+            },
+        ),
+        migrations.CreateModel(
+            name='IndicatorProgramActuals',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actuals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('targets', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('data_count', models.PositiveIntegerField(default=0)),
+                ('has_data', models.BooleanField(default=False)),
+                ('first_date_collected', models.DateTimeField(blank=True, null=True)),
+                ('last_date_collected', models.DateTimeField(blank=True, null=True)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+                ('indicator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='program_actuals', to='indicators.Indicator')),
+                ('workflowlevel1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_actuals', to='workflow.WorkflowLevel1')),
+            ],
+            options={
+                'verbose_name_plural': 'Indicator Program Actuals',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='indicatorprogramactuals',
+            unique_together=set([('indicator', 'workflowlevel1')]),
+        ),
+        migrations.RunPython(fill_indicator_actuals,
+                             migrations.RunPython.noop),
+    ]
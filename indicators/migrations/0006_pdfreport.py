@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 10:04
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0015_siteprofile_map_index'),
+        ('indicators', '0005_organization_scope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDFReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(choices=[(b'tva', b'Targets vs Actuals'), (b'disaggregation', b'Disaggregation')], max_length=20)),
+                ('data_version', models.CharField(max_length=32)),
+                ('status', models.CharField(choices=[(b'pending', b'Pending'), (b'running', b'Running'), (b'done', b'Done'), (b'failed', b'Failed')], default=b'pending', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to=b'reports/pdf')),
+                ('base_url', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('create_date', models.DateTimeField(blank=True, null=True)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+                ('workflowlevel1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_reports', to='workflow.WorkflowLevel1')),
+            ],
+            options={
+                'verbose_name_plural': 'PDF Reports',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='pdfreport',
+            unique_together=set([('report', 'workflowlevel1', 'data_version')]),
+        ),
+    ]
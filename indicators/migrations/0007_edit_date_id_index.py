@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 11:11
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indicators', '0006_pdfreport'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='collecteddata',
+            index_together=set([('edit_date', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='indicator',
+            index_together=set([('edit_date', 'id')]),
+        ),
+    ]
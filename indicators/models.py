@@ -2,12 +2,13 @@ from datetime import timedelta
 from decimal import Decimal
 import uuid
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Sum, When
 from django.contrib import admin
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 
-from search.exceptions import ValueNotFoundError
+from search.models import SearchOutbox
 from workflow.models import WorkflowLevel1, Sector, SiteProfile, WorkflowLevel2, Country, Office, Documentation, TolaUser,\
     Organization
 
@@ -108,6 +109,8 @@ class Objective(models.Model):
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey('auth.User', related_name='objectives', null=True, blank=True, on_delete=models.SET_NULL)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
 
     class Meta:
         ordering = ('workflowlevel1','name')
@@ -120,6 +123,8 @@ class Objective(models.Model):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
+        self.organization_id = self.workflowlevel1.organization_id \
+            if self.workflowlevel1 else None
         super(Objective, self).save(*args, **kwargs)
 
 
@@ -313,11 +318,23 @@ class ExternalServiceRecordAdmin(admin.ModelAdmin):
     display = 'Exeternal Indicator Data Service'
 
 
-class IndicatorManager(models.Manager):
+class IndicatorQuerySet(models.QuerySet):
+    def with_actuals(self):
+        """
+        Annotate ``actuals`` from the materialized IndicatorActuals table
+        instead of summing all CollectedData rows of every indicator.
+        Indicators without data get None, like Sum() on an empty join.
+        """
+        return self.annotate(actuals=Case(
+            When(actuals_summary__has_data=True,
+                 then=F('actuals_summary__actuals')),
+            output_field=DecimalField()))
+
+
+class IndicatorManager(models.Manager.from_queryset(IndicatorQuerySet)):
     def get_queryset(self):
         return super(IndicatorManager, self).get_queryset().prefetch_related('workflowlevel1').select_related('sector')
 
-from search.utils import ElasticsearchIndexer
 
 class Indicator(models.Model):
     indicator_uuid = models.CharField(max_length=255,verbose_name='Indicator UUID', default=uuid.uuid4, unique=True, blank=True)
@@ -367,6 +384,8 @@ class Indicator(models.Model):
         permissions = (
             ('view_indicator', 'View Indicator Model'),
         )
+        # keyset pagination of the API, see feed.pagination
+        index_together = (('edit_date', 'id'),)
 
     def save(self, *args, **kwargs):
         #onsave add create date or update edit date
@@ -374,18 +393,9 @@ class Indicator(models.Model):
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
 
-        super(Indicator, self).save(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.index_indicator(self)
-
-    def delete(self, *args, **kwargs):
-        ei = ElasticsearchIndexer()
-        try:
-            ei.delete_indicator(self)
-        except ValueNotFoundError:
-            pass
-        super(Indicator, self).delete(*args, **kwargs)
+        with transaction.atomic():
+            super(Indicator, self).save(*args, **kwargs)
+            SearchOutbox.objects.add_index(self)
 
     @property
     def just_created(self):
@@ -472,28 +482,29 @@ class CollectedData(models.Model):
     edit_date = models.DateTimeField(null=True, blank=True)
     site = models.ManyToManyField(SiteProfile, blank=True)
     created_by = models.ForeignKey('auth.User', related_name='collecteddata', null=True, blank=True, on_delete=models.SET_NULL)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
     history = HistoricalRecords()
     objects = CollectedDataManager()
 
     class Meta:
         ordering = ('workflowlevel2','indicator','date_collected','create_date')
         verbose_name_plural = "Indicator Output/Outcome Collected Data"
+        # keyset pagination of the API, see feed.pagination
+        index_together = (('edit_date', 'id'),)
 
     #onsave add create date or update edit date
     def save(self, *args, **kwargs):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
-        super(CollectedData, self).save(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.index_collecteddata(self)
-
-    def delete(self, *args, **kwargs):
-        super(CollectedData, self).delete(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.delete_collecteddata(self)
+        self.organization_id = self.workflowlevel1.organization_id \
+            if self.workflowlevel1 else None
+        with transaction.atomic():
+            old_values = self.actuals_values()
+            super(CollectedData, self).save(*args, **kwargs)
+            IndicatorActuals.update_values(old_values, self.actuals_values())
+            SearchOutbox.objects.add_index(self)
 
     #displayed in admin templates
     def __unicode__(self):
@@ -503,9 +514,243 @@ class CollectedData(models.Model):
         achieved=CollectedData.targeted.filter(indicator__id=self).sum('achieved')
         return achieved
 
+    def actuals_values(self):
+        """
+        The stored values this row contributes to the IndicatorActuals
+        tables, or None if it was not saved yet.
+        """
+        if not self.pk:
+            return None
+        return CollectedData.objects.prefetch_related(None)\
+            .filter(pk=self.pk)\
+            .values('indicator', 'workflowlevel1', 'achieved',
+                    'date_collected', target=F('periodic_target__target'))\
+            .first()
+
     @property
     def disaggregations(self):
         return ', '.join([y.disaggregation_label.label + ': ' + y.value for y in self.disaggregation_value.all()])
 
 
+class ActualsManager(models.Manager):
+    """
+    Keeps the materialized CollectedData totals up to date. The model's
+    ``scope_fields`` are the CollectedData fields its rows are grouped by.
+    """
+    def _scope(self, values):
+        scope = {}
+        for field in self.model.scope_fields:
+            if values[field] is None:
+                return None
+            scope['{}_id'.format(field)] = values[field]
+        return scope
+
+    def add_values(self, values, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) the values of a CollectedData row,
+        as returned by CollectedData.actuals_values, to its totals row.
+        """
+        scope = self._scope(values)
+        if scope is None:
+            return
+
+        if sign > 0:
+            row, created = self.select_for_update().get_or_create(**scope)
+        else:
+            # Removing never creates rows, the parent may be in the middle of
+            # a cascading delete.
+            row = self.select_for_update().filter(**scope).first()
+            if row is None:
+                return
+
+        achieved = values['achieved'] or Decimal('0.00')
+        target = values['target'] or Decimal('0.00')
+        date = values['date_collected']
+
+        row.data_count = max(row.data_count + sign, 0)
+        row.has_data = row.data_count > 0
+        if not row.has_data:
+            row.actuals = row.targets = Decimal('0.00')
+            row.first_date_collected = row.last_date_collected = None
+        else:
+            row.actuals += sign * achieved
+            row.targets += sign * target
+            if date is not None and sign > 0:
+                if row.first_date_collected is None or \
+                        date < row.first_date_collected:
+                    row.first_date_collected = date
+                if row.last_date_collected is None or \
+                        date > row.last_date_collected:
+                    row.last_date_collected = date
+            elif date is not None and date in (row.first_date_collected,
+                                               row.last_date_collected):
+                # the removed row was a boundary, look up the new ones
+                dates = CollectedData.objects.prefetch_related(None)\
+                    .filter(**scope).aggregate(first=Min('date_collected'),
+                                               last=Max('date_collected'))
+                row.first_date_collected = dates['first']
+                row.last_date_collected = dates['last']
+        row.save()
+
+    def rebuild(self, indicator_ids=None):
+        """
+        Recompute the totals from scratch with one grouped query, for the
+        given indicators or all of them. Use it after bulk_create/update
+        of CollectedData, which do not go through save().
+        """
+        data = CollectedData.objects.prefetch_related(None).order_by()
+        rows = self.all()
+        if indicator_ids is not None:
+            data = data.filter(indicator_id__in=indicator_ids)
+            rows = rows.filter(indicator_id__in=indicator_ids)
+        for field in self.model.scope_fields:
+            data = data.filter(**{'{}__isnull'.format(field): False})
+
+        totals = data.values(*self.model.scope_fields).annotate(
+            sum_actuals=Sum('achieved'),
+            sum_targets=Sum('periodic_target__target'),
+            count=Count('id'),
+            first=Min('date_collected'),
+            last=Max('date_collected'))
+
+        new_rows = []
+        now = timezone.now()
+        for total in totals:
+            row = self.model(
+                actuals=total['sum_actuals'] or Decimal('0.00'),
+                targets=total['sum_targets'] or Decimal('0.00'),
+                data_count=total['count'],
+                has_data=total['count'] > 0,
+                first_date_collected=total['first'],
+                last_date_collected=total['last'],
+                edit_date=now,
+                **self._scope(total))
+            new_rows.append(row)
+
+        with transaction.atomic():
+            rows.delete()
+            self.bulk_create(new_rows, batch_size=1000)
+        return len(new_rows)
+
+
+class IndicatorActualsBase(models.Model):
+    actuals = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    targets = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    data_count = models.PositiveIntegerField(default=0)
+    has_data = models.BooleanField(default=False)
+    first_date_collected = models.DateTimeField(null=True, blank=True)
+    last_date_collected = models.DateTimeField(null=True, blank=True)
+    edit_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.edit_date = timezone.now()
+        super(IndicatorActualsBase, self).save(*args, **kwargs)
+
+
+class IndicatorActuals(IndicatorActualsBase):
+    """
+    CollectedData totals per Indicator, maintained on every CollectedData
+    write so reports don't have to sum all data points per request.
+    """
+    indicator = models.OneToOneField(Indicator, primary_key=True, related_name='actuals_summary')
+    objects = ActualsManager()
+    scope_fields = ('indicator',)
+
+    class Meta:
+        verbose_name_plural = "Indicator Actuals"
+
+    @classmethod
+    def update_values(cls, old_values, new_values):
+        """
+        Move a CollectedData row from its old to its new totals in both the
+        per indicator and the per indicator and program table.
+        """
+        if old_values == new_values:
+            return
+        for manager in (cls.objects, IndicatorProgramActuals.objects):
+            if old_values:
+                manager.add_values(old_values, sign=-1)
+            if new_values:
+                manager.add_values(new_values)
+
+    def __unicode__(self):
+        return u'%s' % self.indicator_id
+
+
+class IndicatorProgramActuals(IndicatorActualsBase):
+    """
+    CollectedData totals per Indicator and the WorkflowLevel1 the data was
+    collected for.
+    """
+    indicator = models.ForeignKey(Indicator, related_name='program_actuals')
+    workflowlevel1 = models.ForeignKey(WorkflowLevel1, related_name='indicator_actuals')
+    objects = ActualsManager()
+    scope_fields = ('indicator', 'workflowlevel1')
+
+    class Meta:
+        unique_together = ('indicator', 'workflowlevel1')
+        verbose_name_plural = "Indicator Program Actuals"
+
+    def __unicode__(self):
+        return u'%s %s' % (self.indicator_id, self.workflowlevel1_id)
+
+
+class IndicatorActualsAdmin(admin.ModelAdmin):
+    list_display = ('indicator', 'actuals', 'targets', 'data_count', 'first_date_collected', 'last_date_collected')
+    display = 'Indicator Actuals'
+
+
+class PDFReport(models.Model):
+    """
+    The PDF of a program report for a version of its data, rendered in the
+    background by indicators.pdf and kept until the data changes.
+    """
+    REPORT_TVA = 'tva'
+    REPORT_DISAGGREGATION = 'disaggregation'
+    REPORT_CHOICES = (
+        (REPORT_TVA, 'Targets vs Actuals'),
+        (REPORT_DISAGGREGATION, 'Disaggregation'),
+    )
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    report = models.CharField(max_length=20, choices=REPORT_CHOICES)
+    workflowlevel1 = models.ForeignKey(WorkflowLevel1, related_name='pdf_reports', on_delete=models.CASCADE)
+    data_version = models.CharField(max_length=32)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(upload_to='reports/pdf', blank=True)
+    # resolves the relative URLs of the report, e.g. the logo
+    base_url = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    create_date = models.DateTimeField(null=True, blank=True)
+    edit_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('report', 'workflowlevel1', 'data_version')
+        verbose_name_plural = "PDF Reports"
+
+    def save(self, *args, **kwargs):
+        if self.create_date is None:
+            self.create_date = timezone.now()
+        self.edit_date = timezone.now()
+        super(PDFReport, self).save(*args, **kwargs)
+
+    def __unicode__(self):
+        return u'%s %s %s' % (self.report, self.workflowlevel1_id, self.status)
+
 
+class PDFReportAdmin(admin.ModelAdmin):
+    list_display = ('report', 'workflowlevel1', 'data_version', 'status', 'create_date', 'edit_date')
+    list_filter = ('report', 'status')
+    display = 'PDF Reports'
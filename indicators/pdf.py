@@ -0,0 +1,190 @@
+"""
+PDF of the program reports (Targets vs Actuals and disaggregation).
+
+WeasyPrint takes long to render the report of a big program, so the PDFs
+are rendered by a background thread of the process instead of the request:
+the print views enqueue a PDFReport for the program and the current version
+of its data (see indicators.versions), and serve the file once it is done.
+A PDF stays valid until the indicator data of the program changes, repeated
+downloads are served from the storage.
+
+Reports left pending, e.g. by a restarted process, are rendered with the
+render-pdf-reports command. With PDF_REPORT_WORKER off, the reports are
+rendered in the request as before.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from indicators.disaggregation import disaggregation_report
+from indicators.models import Indicator, PDFReport
+from indicators.versions import data_version
+from tola.worker import wake
+
+try:
+    from weasyprint import CSS, HTML
+except ImportError:
+    CSS = HTML = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_CSS = '@page {\
+    size: letter; margin: 1cm;\
+    @bottom-right{\
+        content: "Page " counter(page) " of " counter(pages);\
+    };\
+}'
+
+# report: (template, file name of the download)
+REPORTS = {
+    PDFReport.REPORT_TVA: ('indicators/tva_print.html', 'tva.pdf'),
+    PDFReport.REPORT_DISAGGREGATION: (
+        'indicators/disaggregation_print.html',
+        'indicators_disaggregation_report.pdf'),
+}
+
+
+def report_context(report, program):
+    if report == PDFReport.REPORT_TVA:
+        indicators = Indicator.objects\
+            .select_related('sector')\
+            .prefetch_related('indicator_type', 'level', 'workflowlevel1')\
+            .filter(workflowlevel1=program)\
+            .with_actuals()
+        context = {'data': indicators, 'program': program}
+    else:
+        context = {'data': disaggregation_report(program.id),
+                   'program_selected': program}
+    context['STATIC_URL'] = settings.STATIC_URL
+    return context
+
+
+def render_pdf(job):
+    """
+    Returns the PDF of a PDFReport as a string.
+    """
+    if HTML is None:
+        raise ImproperlyConfigured('WeasyPrint is not installed')
+    template = REPORTS[job.report][0]
+    html = render_to_string(template,
+                            report_context(job.report, job.workflowlevel1))
+    return HTML(string=html, base_url=job.base_url or None)\
+        .write_pdf(stylesheets=[CSS(string=PAGE_CSS)])
+
+
+def _delete(jobs):
+    for job in jobs:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+
+
+def enqueue(report, program, base_url='', retry=False):
+    """
+    Returns the PDFReport of the current data of program, adding it when
+    there is none. The reports of older versions are deleted. A failed
+    report is queued again with retry.
+    """
+    version = data_version(program.pk)
+    job, created = PDFReport.objects.get_or_create(
+        report=report, workflowlevel1=program, data_version=version,
+        defaults={'base_url': base_url})
+    if created:
+        _delete(PDFReport.objects.filter(report=report, workflowlevel1=program)
+                .exclude(pk=job.pk).exclude(status=PDFReport.STATUS_RUNNING))
+    elif (job.status == PDFReport.STATUS_FAILED and retry) or \
+            (job.status == PDFReport.STATUS_DONE and
+             not job.file.storage.exists(job.file.name)):
+        # the file may have been removed from the storage
+        job.status = PDFReport.STATUS_PENDING
+        job.error = ''
+        job.save()
+        created = True
+
+    if created:
+        if getattr(settings, 'PDF_REPORT_WORKER', True):
+            transaction.on_commit(schedule_render)
+        else:
+            render(job)
+            job.refresh_from_db()
+    return job
+
+
+def _claim(job):
+    return PDFReport.objects.filter(
+        pk=job.pk, status=PDFReport.STATUS_PENDING).update(
+        status=PDFReport.STATUS_RUNNING, edit_date=timezone.now()) == 1
+
+
+def render(job):
+    """
+    Render a pending PDFReport. Returns False when another process has
+    already claimed it, the rendering failed or a newer version of the
+    report was added meanwhile (the report is then deleted, enqueue leaves
+    running reports alone).
+    """
+    if not _claim(job):
+        return False
+    try:
+        pdf = render_pdf(job)
+    except Exception as e:
+        logger.error('Error rendering the %s report of program %s',
+                     job.report, job.workflowlevel1_id, exc_info=True)
+        PDFReport.objects.filter(pk=job.pk).update(
+            status=PDFReport.STATUS_FAILED, error=unicode(e),
+            edit_date=timezone.now())
+        return False
+
+    name = '%s-%s-%s.pdf' % (job.report, job.workflowlevel1_id,
+                             job.data_version)
+    job.file.save(name, ContentFile(pdf), save=False)
+    superseded = PDFReport.objects.filter(
+        report=job.report, workflowlevel1_id=job.workflowlevel1_id,
+        pk__gt=job.pk).exists()
+    if superseded or not PDFReport.objects.filter(pk=job.pk).update(
+            status=PDFReport.STATUS_DONE, file=job.file.name,
+            edit_date=timezone.now()):
+        # replaced by a newer version while rendering
+        job.file.delete(save=False)
+        PDFReport.objects.filter(pk=job.pk).delete()
+        return False
+    return True
+
+
+def render_pending():
+    """
+    Render the pending reports, as well as the running ones which did not
+    finish in PDF_REPORT_TIMEOUT seconds (their process died). Returns the
+    number of reports rendered.
+    """
+    timeout = getattr(settings, 'PDF_REPORT_TIMEOUT', 600)
+    PDFReport.objects.filter(
+        status=PDFReport.STATUS_RUNNING,
+        edit_date__lt=timezone.now() - timedelta(seconds=timeout))\
+        .update(status=PDFReport.STATUS_PENDING)
+
+    count = 0
+    while True:
+        jobs = list(PDFReport.objects.filter(status=PDFReport.STATUS_PENDING)
+                    .select_related('workflowlevel1').order_by('id')[:10])
+        if not jobs:
+            break
+        for job in jobs:
+            # claimed or failed jobs are not pending anymore, the next
+            # query leaves them out
+            if render(job):
+                count += 1
+    return count
+
+
+def schedule_render():
+    """
+    Wake up the render worker of the process, used as on_commit callback.
+    """
+    wake('pdf-reports', render_pending)
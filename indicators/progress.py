@@ -0,0 +1,237 @@
+"""
+Progress of indicators per reporting period: the actuals of the collected
+data against the periodic targets, period by period and cumulated.
+
+The database sums the collected data of each indicator per month of
+date_collected, the months are then folded into the periods of the
+reporting frequency of the indicator (monthly, quarterly, semi annual or
+annual, starting in January), so the work done in Python depends on the
+number of months and targets, not on the number of collected data.
+
+A PeriodicTarget has a period name but no dates: it belongs to the period
+of the first data collected against it. The targets without data follow
+in their order, one per period, after the last period with a target (or
+from the first period with data, or the current period).
+
+The series of a program or an indicator are cached under the version of
+their data, see indicators.versions.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from indicators.models import CollectedData, Indicator, PeriodicTarget
+from indicators.versions import cached_report, data_version, indicator_version
+
+PROGRAM_SERIES_KEY = 'progress-series:program:{}:{}'
+INDICATOR_SERIES_KEY = 'progress-series:indicator:{}:{}'
+
+# word of a Frequency name: months of its periods
+FREQUENCIES = (
+    ('week', 1),
+    ('month', 1),
+    ('quarter', 3),
+    ('semi', 6),
+    ('annual', 12),
+    ('year', 12),
+)
+DEFAULT_PERIOD_MONTHS = 12
+
+ZERO = Decimal('0.00')
+
+
+def period_months(frequency):
+    """
+    Returns the number of months of the periods of a reporting frequency
+    name. The first known word of the name wins, "Semi Annual" is 6 and
+    "Monthly, Quarterly, Annually" is 1. Unknown frequencies are annual.
+    """
+    name = (frequency or '').lower()
+    found = [(name.find(word), months) for word, months in FREQUENCIES
+             if word in name]
+    return min(found)[1] if found else DEFAULT_PERIOD_MONTHS
+
+
+def period_index(year, month, months):
+    """
+    Returns the number of the period of months months containing month of
+    year, counted from year 0.
+    """
+    return (year * 12 + month - 1) // months
+
+
+def period_dates(index, months):
+    """
+    Returns the (label, start, end) of a period, see period_index.
+    """
+    first = index * months
+    year, month = first // 12, first % 12 + 1
+    following = first + months
+    end = date(following // 12, following % 12 + 1, 1) - timedelta(days=1)
+    if months == 1:
+        label = '%04d-%02d' % (year, month)
+    elif months == 3:
+        label = '%d Q%d' % (year, (month - 1) // 3 + 1)
+    elif months == 6:
+        label = '%d H%d' % (year, (month - 1) // 6 + 1)
+    elif months == 12:
+        label = '%d' % year
+    else:
+        label = '%04d-%02d' % (year, month)
+    return label, date(year, month, 1), end
+
+
+def _local(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value
+
+
+def _new_period():
+    return {'actuals': ZERO, 'data_count': 0, 'target': ZERO,
+            'periodic_targets': []}
+
+
+def build_series(lookup, value):
+    """
+    Returns the progress series of the indicators matching an Indicator
+    lookup, ordered by name::
+
+        [{'id': 1, 'number': '1.1', 'name': 'Indicator', 'lop_target': 10,
+          'frequency': 'Quarterly', 'period_months': 3,
+          'undated_actuals': Decimal('0.00'),
+          'periods': [
+              {'period': '2017 Q1', 'start': date(2017, 1, 1),
+               'end': date(2017, 3, 31), 'periodic_targets': ['Q1'],
+               'target': Decimal('5.00'), 'actuals': Decimal('4.00'),
+               'data_count': 2, 'cumulative_target': Decimal('5.00'),
+               'cumulative_actuals': Decimal('4.00'),
+               'progress': Decimal('80.00')}]}]
+
+    The periods run without gaps from the first to the last one with data
+    or a target. progress is the percentage of the cumulative target
+    reached, None without target.
+    """
+    indicators = list(
+        Indicator.objects.filter(**{lookup: value})
+        .values('id', 'number', 'name', 'lop_target',
+                'reporting_frequency__frequency')
+        .order_by('name', 'id'))
+    months_of = dict((indicator['id'], period_months(
+        indicator['reporting_frequency__frequency']))
+        for indicator in indicators)
+
+    periods = dict((indicator_id, {}) for indicator_id in months_of)
+    undated = {}
+    monthly = CollectedData.objects.prefetch_related(None)\
+        .filter(**{'indicator__' + lookup: value})\
+        .annotate(year=ExtractYear('date_collected'),
+                  month=ExtractMonth('date_collected'))\
+        .values('indicator_id', 'year', 'month')\
+        .annotate(actuals=Sum('achieved'), data_count=Count('id'))\
+        .order_by()
+    for row in monthly:
+        indicator_id = row['indicator_id']
+        actuals = row['actuals'] or ZERO
+        if row['year'] is None:
+            undated[indicator_id] = undated.get(indicator_id, ZERO) + actuals
+            continue
+        index = period_index(row['year'], row['month'],
+                             months_of[indicator_id])
+        period = periods[indicator_id].setdefault(index, _new_period())
+        period['actuals'] += actuals
+        period['data_count'] += row['data_count']
+
+    unscheduled = {}
+    targets = PeriodicTarget.objects\
+        .filter(**{'indicator__' + lookup: value})\
+        .annotate(first_collected=Min('collecteddata__date_collected'))\
+        .values('indicator_id', 'period', 'target', 'first_collected')\
+        .order_by('indicator_id', 'customsort', 'create_date', 'id')
+    for target in targets:
+        indicator_id = target['indicator_id']
+        if target['first_collected'] is None:
+            unscheduled.setdefault(indicator_id, []).append(target)
+            continue
+        first_collected = _local(target['first_collected'])
+        index = period_index(first_collected.year, first_collected.month,
+                             months_of[indicator_id])
+        period = periods[indicator_id].setdefault(index, _new_period())
+        period['target'] += target['target'] or ZERO
+        period['periodic_targets'].append(target['period'])
+
+    today = _local(timezone.now())
+    series = []
+    for indicator in indicators:
+        indicator_id = indicator['id']
+        months = months_of[indicator_id]
+        indicator_periods = periods[indicator_id]
+        scheduled = [index for index, period in indicator_periods.items()
+                     if period['periodic_targets']]
+        if scheduled:
+            next_index = max(scheduled) + 1
+        elif indicator_periods:
+            next_index = min(indicator_periods)
+        else:
+            next_index = period_index(today.year, today.month, months)
+        for target in unscheduled.get(indicator_id, []):
+            period = indicator_periods.setdefault(next_index, _new_period())
+            period['target'] += target['target'] or ZERO
+            period['periodic_targets'].append(target['period'])
+            next_index += 1
+
+        rows = []
+        cumulative_target = cumulative_actuals = ZERO
+        if indicator_periods:
+            for index in range(min(indicator_periods),
+                               max(indicator_periods) + 1):
+                period = indicator_periods.get(index) or _new_period()
+                cumulative_target += period['target']
+                cumulative_actuals += period['actuals']
+                label, start, end = period_dates(index, months)
+                period.update({
+                    'period': label, 'start': start, 'end': end,
+                    'cumulative_target': cumulative_target,
+                    'cumulative_actuals': cumulative_actuals,
+                    'progress': (cumulative_actuals * 100 /
+                                 cumulative_target).quantize(ZERO)
+                    if cumulative_target else None,
+                })
+                rows.append(period)
+
+        series.append({
+            'id': indicator_id,
+            'number': indicator['number'],
+            'name': indicator['name'],
+            'lop_target': indicator['lop_target'],
+            'frequency': indicator['reporting_frequency__frequency'],
+            'period_months': months,
+            'undated_actuals': undated.get(indicator_id, ZERO),
+            'periods': rows,
+        })
+    return series
+
+
+def program_series(program_id):
+    """
+    Returns the progress series of the indicators of a program (see
+    build_series) from the cache, building them when the data of the
+    program changed.
+    """
+    key = PROGRAM_SERIES_KEY.format(program_id, data_version(program_id))
+    return cached_report(
+        key, lambda: build_series('workflowlevel1', program_id))
+
+
+def indicator_series(indicator_id):
+    """
+    Returns the progress series of an indicator (see build_series) from the
+    cache, None for unknown indicators.
+    """
+    key = INDICATOR_SERIES_KEY.format(indicator_id,
+                                      indicator_version(indicator_id))
+    series = cached_report(key, lambda: build_series('pk', indicator_id))
+    return series[0] if series else None
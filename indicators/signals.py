@@ -0,0 +1,47 @@
+from django.db.models import signals
+from django.dispatch import receiver
+
+from indicators.models import (CollectedData, Indicator, IndicatorActuals,
+                               IndicatorProgramActuals, PeriodicTarget)
+from search.models import SearchOutbox
+
+
+@receiver(signals.pre_delete, sender=CollectedData)
+def store_collecteddata_actuals_values(sender, instance, **kwargs):
+    """
+    Keep the stored values while the periodic target can still be read, it
+    may be deleted in the same cascade.
+    """
+    instance._actuals_values = instance.actuals_values()
+
+
+@receiver(signals.pre_delete, sender=Indicator)
+@receiver(signals.pre_delete, sender=CollectedData)
+def delete_indicator_documents(sender, instance, **kwargs):
+    """
+    Covers delete as well as queryset and cascading deletes, while the
+    relations of the documents can still be read.
+    """
+    SearchOutbox.objects.add_delete(instance)
+
+
+@receiver(signals.post_delete, sender=CollectedData)
+def remove_collecteddata_from_actuals(sender, instance, **kwargs):
+    """
+    Covers CollectedData.delete as well as queryset and cascading deletes.
+    """
+    IndicatorActuals.update_values(
+        getattr(instance, '_actuals_values', None), None)
+
+
+@receiver(signals.post_save, sender=PeriodicTarget)
+def update_periodic_target_actuals(sender, instance, **kwargs):
+    """
+    The targets total depends on the target of every collected data row.
+    """
+    if kwargs.get('created'):
+        return
+
+    if instance.collecteddata_set.exists():
+        IndicatorActuals.objects.rebuild([instance.indicator_id])
+        IndicatorProgramActuals.objects.rebuild([instance.indicator_id])
@@ -0,0 +1,92 @@
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase, tag
+
+import factories
+from indicators import disaggregation
+from indicators.models import (DisaggregationLabel, DisaggregationType,
+                               DisaggregationValue)
+from indicators.views import DisaggregationReportData
+
+
+@tag('pkg')
+class DisaggregationReportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.country = factories.Country()
+        self.tola_user = factories.TolaUser()
+        self.tola_user.countries.add(self.country)
+        self.wflvl1 = factories.WorkflowLevel1(country=[self.country])
+        self.indicator = factories.Indicator(name='B', lop_target=10,
+                                             workflowlevel1=[self.wflvl1])
+        self.other_indicator = factories.Indicator(
+            name='A', workflowlevel1=[self.wflvl1])
+
+        gender = DisaggregationType.objects.create(
+            disaggregation_type='Gender',
+            organization=self.tola_user.organization)
+        self.female = DisaggregationLabel.objects.create(
+            disaggregation_type=gender, label='Female', customsort=1)
+        self.male = DisaggregationLabel.objects.create(
+            disaggregation_type=gender, label='Male', customsort=2)
+        for achieved, values in ((5, {self.female: '3', self.male: '2'}),
+                                 (4, {self.female: '1.5', self.male: ''})):
+            data = factories.CollectedData(
+                indicator=self.indicator, workflowlevel1=self.wflvl1,
+                achieved=achieved)
+            for label, value in values.items():
+                data.disaggregation_value.add(
+                    DisaggregationValue.objects.create(
+                        disaggregation_label=label, value=value))
+
+        # not in the program
+        factories.CollectedData(indicator=factories.Indicator(),
+                                achieved=100)
+
+    def test_report(self):
+        with self.assertNumQueries(2):
+            report = disaggregation.build_disaggregation_report(
+                self.wflvl1.id)
+        self.assertEqual(report, [
+            {'id': self.other_indicator.id, 'number': None, 'name': 'A',
+             'lop_target': 0, 'actuals': None, 'disaggregations': []},
+            {'id': self.indicator.id, 'number': None, 'name': 'B',
+             'lop_target': 10, 'actuals': Decimal('9.00'),
+             'disaggregations': [
+                 {'type': 'Gender', 'labels': [
+                     {'label': 'Female', 'actuals': Decimal('4.50')},
+                     {'label': 'Male', 'actuals': Decimal('2.00')}]}]},
+        ])
+
+    def test_cached(self):
+        report = disaggregation.disaggregation_report(self.wflvl1.id)
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                disaggregation.disaggregation_report(self.wflvl1.id), report)
+
+        # a new version of the data, a new report
+        self.male.label = 'Men'
+        self.male.save()
+        report = disaggregation.disaggregation_report(self.wflvl1.id)
+        self.assertEqual(
+            report[1]['disaggregations'][0]['labels'][1]['label'], 'Men')
+
+    def test_view(self):
+        request = RequestFactory().get(
+            '/indicators/disrepdata/%s/' % self.wflvl1.id)
+        request.user = self.tola_user.user
+        response = DisaggregationReportData.as_view()(
+            request, workflowlevel1=self.wflvl1.id)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['program'], self.wflvl1.id)
+        self.assertEqual(
+            data['indicators'][1]['disaggregations'][0]['labels'][0],
+            {'label': 'Female', 'actuals': '4.50'})
+
+        with self.assertRaises(Http404):
+            DisaggregationReportData.as_view()(
+                request, workflowlevel1=factories.WorkflowLevel1().id)
@@ -1,6 +1,14 @@
+from cStringIO import StringIO
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management import call_command
 from django.test import TestCase, tag
+from django.utils.timezone import utc
 
-from indicators.models import Level
+import factories
+from indicators.models import (CollectedData, Indicator, IndicatorActuals,
+                               IndicatorProgramActuals, Level)
 from workflow.models import WorkflowLevel1, Organization
 
 
@@ -15,3 +23,99 @@ class LevelModelTest(TestCase):
         level = Level.objects.create(name='TestIndicator', workflowlevel1=self.wflvl1)
         level.save()
         self.assertEqual(level.organization, self.organization)
+
+
+class IndicatorActualsTest(TestCase):
+    def setUp(self):
+        self.wflvl1 = factories.WorkflowLevel1()
+        self.indicator = factories.Indicator(workflowlevel1=[self.wflvl1])
+        self.periodic_target = factories.PeriodicTarget(
+            indicator=self.indicator, target=Decimal('20.00'))
+
+    def _create_data(self, achieved, day, **kwargs):
+        kwargs.setdefault('workflowlevel1', self.wflvl1)
+        return factories.CollectedData(
+            indicator=self.indicator, achieved=Decimal(achieved),
+            date_collected=datetime(2017, 1, day, tzinfo=utc), **kwargs)
+
+    def test_save_collecteddata(self):
+        self._create_data('10.00', 5, periodic_target=self.periodic_target)
+        self._create_data('2.50', 3)
+
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.actuals, Decimal('12.50'))
+        self.assertEqual(actuals.targets, Decimal('20.00'))
+        self.assertEqual(actuals.data_count, 2)
+        self.assertTrue(actuals.has_data)
+        self.assertEqual(actuals.first_date_collected.day, 3)
+        self.assertEqual(actuals.last_date_collected.day, 5)
+
+        program_actuals = IndicatorProgramActuals.objects.get(
+            indicator=self.indicator, workflowlevel1=self.wflvl1)
+        self.assertEqual(program_actuals.actuals, Decimal('12.50'))
+        self.assertEqual(program_actuals.data_count, 2)
+
+    def test_update_collecteddata(self):
+        collected_data = self._create_data('10.00', 5)
+        other_wflvl1 = factories.WorkflowLevel1(name='Other')
+        collected_data.achieved = Decimal('4.00')
+        collected_data.workflowlevel1 = other_wflvl1
+        collected_data.save()
+
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.actuals, Decimal('4.00'))
+        self.assertEqual(actuals.data_count, 1)
+        self.assertFalse(IndicatorProgramActuals.objects.get(
+            indicator=self.indicator, workflowlevel1=self.wflvl1).has_data)
+        self.assertEqual(IndicatorProgramActuals.objects.get(
+            indicator=self.indicator,
+            workflowlevel1=other_wflvl1).actuals, Decimal('4.00'))
+
+    def test_delete_collecteddata(self):
+        self._create_data('10.00', 5)
+        collected_data = self._create_data('3.00', 9)
+        collected_data.delete()
+
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.actuals, Decimal('10.00'))
+        self.assertEqual(actuals.data_count, 1)
+        self.assertEqual(actuals.last_date_collected.day, 5)
+
+        CollectedData.objects.all().delete()
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.actuals, Decimal('0.00'))
+        self.assertFalse(actuals.has_data)
+        self.assertIsNone(actuals.first_date_collected)
+
+    def test_update_periodic_target(self):
+        self._create_data('10.00', 5, periodic_target=self.periodic_target)
+        self.periodic_target.target = Decimal('30.00')
+        self.periodic_target.save()
+
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.targets, Decimal('30.00'))
+
+    def test_rebuild(self):
+        self._create_data('10.00', 5)
+        self._create_data('1.00', 7)
+        IndicatorActuals.objects.all().delete()
+        IndicatorProgramActuals.objects.all().update(actuals=0)
+
+        call_command('rebuild-indicator-actuals', stdout=StringIO())
+
+        actuals = IndicatorActuals.objects.get(indicator=self.indicator)
+        self.assertEqual(actuals.actuals, Decimal('11.00'))
+        self.assertEqual(actuals.data_count, 2)
+        self.assertEqual(actuals.first_date_collected.day, 5)
+        self.assertEqual(IndicatorProgramActuals.objects.get(
+            indicator=self.indicator).actuals, Decimal('11.00'))
+
+    def test_with_actuals(self):
+        indicator_no_data = factories.Indicator(workflowlevel1=[self.wflvl1])
+        self._create_data('10.00', 5)
+
+        indicator = Indicator.objects.with_actuals().get(pk=self.indicator.pk)
+        self.assertEqual(indicator.actuals, Decimal('10.00'))
+        indicator = Indicator.objects.with_actuals().get(
+            pk=indicator_no_data.pk)
+        self.assertIsNone(indicator.actuals)
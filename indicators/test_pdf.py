@@ -0,0 +1,138 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings, tag
+from django.utils import timezone
+from mock import patch
+
+import factories
+from indicators import pdf
+from indicators.models import PDFReport
+from indicators.views import TVAPrint
+
+
+@tag('pkg')
+@override_settings(PDF_REPORT_WORKER=False)
+class PDFReportTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        patcher = patch.object(pdf, 'render_pdf', return_value='%PDF-1.4')
+        self.render_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.country = factories.Country()
+        self.tola_user = factories.TolaUser()
+        self.tola_user.countries.add(self.country)
+        self.wflvl1 = factories.WorkflowLevel1(country=[self.country])
+        self.indicator = factories.Indicator(workflowlevel1=[self.wflvl1])
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def _get(self, program_id, ajax=False):
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        request = RequestFactory().get('/indicators/tvaprint/%s/' % program_id,
+                                       **headers)
+        request.user = self.tola_user.user
+        return TVAPrint.as_view()(request, workflowlevel1=program_id)
+
+    def test_data_version(self):
+        version = pdf.data_version(self.wflvl1.pk)
+        data = factories.CollectedData(indicator=self.indicator,
+                                       workflowlevel1=self.wflvl1)
+        self.assertNotEqual(pdf.data_version(self.wflvl1.pk), version)
+        version = pdf.data_version(self.wflvl1.pk)
+        data.delete()
+        self.assertNotEqual(pdf.data_version(self.wflvl1.pk), version)
+        self.assertEqual(pdf.data_version(factories.WorkflowLevel1().pk),
+                         pdf.data_version(0))
+
+    def test_cached(self):
+        job = pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1)
+        self.assertEqual(job.status, PDFReport.STATUS_DONE)
+        self.assertEqual(job.file.read(), '%PDF-1.4')
+        self.assertEqual(pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1), job)
+        self.assertEqual(self.render_pdf.call_count, 1)
+
+        # new data, the old version is deleted
+        self.indicator.save()
+        new_job = pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1)
+        self.assertNotEqual(new_job, job)
+        self.assertEqual(self.render_pdf.call_count, 2)
+        self.assertFalse(PDFReport.objects.filter(pk=job.pk).exists())
+        self.assertFalse(job.file.storage.exists(job.file.name))
+
+    def test_failed(self):
+        self.render_pdf.side_effect = ValueError('Broken')
+        with patch.object(pdf, 'logger') as logger:
+            job = pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1)
+        self.assertTrue(logger.error.called)
+        self.assertEqual((job.status, job.error),
+                         (PDFReport.STATUS_FAILED, 'Broken'))
+        self.assertEqual(pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1).status,
+                         PDFReport.STATUS_FAILED)
+
+        self.render_pdf.side_effect = None
+        job = pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1, retry=True)
+        self.assertEqual(job.status, PDFReport.STATUS_DONE)
+
+    def test_superseded_while_rendering(self):
+        job = PDFReport.objects.create(
+            report=PDFReport.REPORT_TVA, workflowlevel1=self.wflvl1,
+            data_version='old')
+
+        def render_pdf(job):
+            with override_settings(PDF_REPORT_WORKER=True):
+                pdf.enqueue(PDFReport.REPORT_TVA, self.wflvl1)
+            return '%PDF-1.4'
+        self.render_pdf.side_effect = render_pdf
+
+        self.assertFalse(pdf.render(job))
+        self.assertFalse(PDFReport.objects.filter(pk=job.pk).exists())
+        self.assertFalse(job.file.storage.exists(job.file.name))
+        self.assertEqual(PDFReport.objects.get().status,
+                         PDFReport.STATUS_PENDING)
+
+    def test_render_pending(self):
+        stale = PDFReport.objects.create(
+            report=PDFReport.REPORT_TVA, workflowlevel1=self.wflvl1,
+            data_version='stale', status=PDFReport.STATUS_RUNNING)
+        running = PDFReport.objects.create(
+            report=PDFReport.REPORT_DISAGGREGATION,
+            workflowlevel1=self.wflvl1, data_version='running',
+            status=PDFReport.STATUS_RUNNING)
+        PDFReport.objects.filter(pk=stale.pk).update(
+            edit_date=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(pdf.render_pending(), 1)
+        self.assertEqual(PDFReport.objects.get(pk=stale.pk).status,
+                         PDFReport.STATUS_DONE)
+        self.assertEqual(PDFReport.objects.get(pk=running.pk).status,
+                         PDFReport.STATUS_RUNNING)
+
+    @override_settings(PDF_REPORT_WORKER=True)
+    def test_view(self):
+        response = self._get(self.wflvl1.pk, ajax=True)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content)['status'],
+                         PDFReport.STATUS_PENDING)
+        self.assertEqual(PDFReport.objects.count(), 1)
+
+        pdf.render_pending()
+        response = self._get(self.wflvl1.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename=tva.pdf')
+        self.assertEqual(''.join(response.streaming_content), '%PDF-1.4')
+
+    def test_view_other_country(self):
+        other = factories.WorkflowLevel1(country=[factories.Country(
+            country='Germany', code='DE')])
+        with self.assertRaises(Http404):
+            self._get(other.pk)
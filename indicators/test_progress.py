@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.utils import timezone
+
+import factories
+from indicators import progress
+
+
+def _date(year, month, day):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+@tag('pkg')
+class PeriodTest(TestCase):
+    def test_period_months(self):
+        self.assertEqual(progress.period_months('Monthly '), 1)
+        self.assertEqual(progress.period_months('Quarterly '), 3)
+        self.assertEqual(progress.period_months('Semi Annual '), 6)
+        self.assertEqual(progress.period_months('Annual'), 12)
+        self.assertEqual(
+            progress.period_months('Monthly, Quarterly, Annually'), 1)
+        self.assertEqual(progress.period_months('End of cycle'), 12)
+        self.assertEqual(progress.period_months(None), 12)
+
+    def test_period_dates(self):
+        index = progress.period_index(2017, 5, 3)
+        self.assertEqual(progress.period_dates(index, 3),
+                         ('2017 Q2', date(2017, 4, 1), date(2017, 6, 30)))
+        index = progress.period_index(2017, 12, 1)
+        self.assertEqual(progress.period_dates(index, 1),
+                         ('2017-12', date(2017, 12, 1), date(2017, 12, 31)))
+        self.assertEqual(progress.period_dates(index + 1, 1)[0], '2018-01')
+        index = progress.period_index(2017, 7, 6)
+        self.assertEqual(progress.period_dates(index, 6),
+                         ('2017 H2', date(2017, 7, 1), date(2017, 12, 31)))
+
+
+@tag('pkg')
+class ProgressSeriesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wflvl1 = factories.WorkflowLevel1()
+        self.indicator = factories.Indicator(
+            name='B', lop_target=20, workflowlevel1=[self.wflvl1],
+            reporting_frequency=factories.Frequency(frequency='Quarterly '))
+        self.other_indicator = factories.Indicator(
+            name='A', workflowlevel1=[self.wflvl1])
+
+        q1 = factories.PeriodicTarget(indicator=self.indicator, period='Q1',
+                                      target=5, customsort=1)
+        q3 = factories.PeriodicTarget(indicator=self.indicator, period='Q3',
+                                      target=5, customsort=2)
+        factories.PeriodicTarget(indicator=self.indicator, period='Q4',
+                                 target=10, customsort=3)
+        for target, achieved, date_collected in (
+                (q1, 2, _date(2017, 1, 15)),
+                (q1, 2, _date(2017, 3, 1)),
+                (q3, 6, _date(2017, 8, 1)),
+                (None, 1, None)):
+            factories.CollectedData(
+                indicator=self.indicator, workflowlevel1=self.wflvl1,
+                periodic_target=target, achieved=achieved,
+                date_collected=date_collected)
+
+    def test_series(self):
+        with self.assertNumQueries(3):
+            series = progress.build_series('workflowlevel1', self.wflvl1.id)
+        self.assertEqual([indicator['name'] for indicator in series],
+                         ['A', 'B'])
+        self.assertEqual(series[0]['periods'], [])
+
+        indicator = series[1]
+        self.assertEqual(indicator['period_months'], 3)
+        self.assertEqual(indicator['undated_actuals'], Decimal('1.00'))
+        self.assertEqual(
+            [(period['period'], period['periodic_targets'],
+              period['target'], period['actuals'], period['data_count'])
+             for period in indicator['periods']],
+            [('2017 Q1', ['Q1'], 5, 4, 2),
+             ('2017 Q2', [], 0, 0, 0),
+             ('2017 Q3', ['Q3'], 5, 6, 1),
+             ('2017 Q4', ['Q4'], 10, 0, 0)])
+        self.assertEqual(
+            [(period['cumulative_target'], period['cumulative_actuals'],
+              period['progress']) for period in indicator['periods']],
+            [(5, 4, Decimal('80.00')),
+             (5, 4, Decimal('80.00')),
+             (10, 10, Decimal('100.00')),
+             (20, 10, Decimal('50.00'))])
+
+    def test_cached(self):
+        series = progress.indicator_series(self.indicator.id)
+        self.assertEqual(len(series['periods']), 4)
+        with self.assertNumQueries(4):
+            self.assertEqual(progress.indicator_series(self.indicator.id),
+                             series)
+
+        factories.CollectedData(
+            indicator=self.indicator, workflowlevel1=self.wflvl1,
+            achieved=3, date_collected=_date(2018, 2, 1))
+        series = progress.indicator_series(self.indicator.id)
+        self.assertEqual(
+            [(period['period'], period['target'], period['actuals'])
+             for period in series['periods'][-2:]],
+            [('2017 Q4', 10, 0), ('2018 Q1', 0, 3)])
+        self.assertEqual(progress.indicator_series(0), None)
+
+    def test_program_cached(self):
+        series = progress.program_series(self.wflvl1.id)
+        with self.assertNumQueries(4):
+            self.assertEqual(progress.program_series(self.wflvl1.id), series)
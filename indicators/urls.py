@@ -1,7 +1,7 @@
 from django.conf.urls import include, url
 
 from .views import CollectedDataList, CollectedDataCreate, CollectedDataUpdate, CollectedDataDelete, IndicatorCreate, IndicatorDelete, IndicatorUpdate,\
-    IndicatorList, IndicatorExport, IndicatorReportData,CollectedDataReportData, IndicatorReport, IndicatorDataExport, TVAReport, DisaggregationReport, PeriodicTargetDeleteView, TVAPrint, DisaggregationPrint
+    IndicatorList, IndicatorExport, IndicatorReportData,CollectedDataReportData, IndicatorReport, IndicatorDataExport, TVAReport, DisaggregationReport, PeriodicTargetDeleteView, TVAPrint, DisaggregationPrint, DisaggregationReportData
 
 from indicators import views as indicatorviews
 
@@ -32,9 +32,10 @@ urlpatterns = [
     # Indicator Report
     url(r'^report/(?P<workflowlevel1>\w+)/(?P<indicator>\w+)/(?P<type>\w+)/$', indicatorviews.indicator_report, name='indicator_report'),
     url(r'^tvareport/$', TVAReport.as_view(), name='tvareport'),
-    url(r'^tvaprint/(?P<workflowlevel1>\w+)/$', TVAPrint.as_view(), name='tvaprint'),
+    url(r'^tvaprint/(?P<workflowlevel1>\d+)/$', TVAPrint.as_view(), name='tvaprint'),
     url(r'^disrep/(?P<workflowlevel1>\w+)/$', DisaggregationReport.as_view(), name='disrep'),
-    url(r'^disrepprint/(?P<workflowlevel1>\w+)/$', DisaggregationPrint.as_view(), name='disrepprint'),
+    url(r'^disrepprint/(?P<workflowlevel1>\d+)/$', DisaggregationPrint.as_view(), name='disrepprint'),
+    url(r'^disrepdata/(?P<workflowlevel1>\d+)/$', DisaggregationReportData.as_view(), name='disrepdata'),
     url(r'^report_table/(?P<workflowlevel1>\w+)/(?P<indicator>\w+)/(?P<type>\w+)/$', IndicatorReport.as_view(), name='indicator_table'),
     url(r'^program_report/(?P<workflowlevel1>\w+)/$', indicatorviews.WorkflowLevel1IndicatorReport,name='programIndicatorReport'),
 
@@ -0,0 +1,67 @@
+"""
+Versions of the indicator data of a program or an indicator, used as part
+of the keys of the reports built from it (PDFs, cached report data): a new
+version is a new key, so nothing has to be invalidated when the data
+changes.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from indicators.models import (CollectedData, DisaggregationValue, Indicator,
+                               PeriodicTarget)
+
+
+def _version(lookup, value):
+    """
+    Returns a key of the state of the Indicator rows matching lookup and of
+    their PeriodicTarget, CollectedData and DisaggregationValue rows: it
+    changes when one is edited (edit_date), added or deleted, or a label or
+    type of their values is edited.
+    """
+    indicators = Indicator.objects.filter(**{lookup: value})\
+        .aggregate(count=Count('id', distinct=True), edited=Max('edit_date'))
+    targets = PeriodicTarget.objects.filter(**{'indicator__' + lookup: value})\
+        .aggregate(count=Count('id', distinct=True), edited=Max('edit_date'))
+    data = CollectedData.objects.filter(**{'indicator__' + lookup: value})\
+        .aggregate(count=Count('id', distinct=True), edited=Max('edit_date'))
+    values = DisaggregationValue.objects.filter(
+        **{'collecteddata__indicator__' + lookup: value}).aggregate(
+        count=Count('id', distinct=True), edited=Max('edit_date'),
+        label_edited=Max('disaggregation_label__edit_date'),
+        type_edited=Max(
+            'disaggregation_label__disaggregation_type__edit_date'))
+    key = ' '.join('%s' % version for version in (
+        indicators['count'], indicators['edited'], targets['count'],
+        targets['edited'], data['count'], data['edited'], values['count'],
+        values['edited'], values['label_edited'], values['type_edited']))
+    return hashlib.md5(key).hexdigest()
+
+
+def data_version(program_id):
+    """
+    Returns a key of the state of the indicator data of a program.
+    """
+    return _version('workflowlevel1', program_id)
+
+
+def indicator_version(indicator_id):
+    """
+    Returns a key of the state of the data of an indicator.
+    """
+    return _version('pk', indicator_id)
+
+
+def cached_report(key, build):
+    """
+    Returns the report cached under key, built by build() when it is not
+    cached. Reports are kept REPORT_CACHE_TIMEOUT seconds.
+    """
+    report = cache.get(key)
+    if report is None:
+        report = build()
+        cache.set(key, report,
+                  getattr(settings, 'REPORT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return report
@@ -2,8 +2,8 @@ import json
 import re
 
 from django.db import connection
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import render
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.http import HttpResponseRedirect
 from urlparse import urlparse
 from django.shortcuts import render_to_response
@@ -26,9 +26,14 @@ from django.views.generic.detail import View
 import requests
 
 from export import IndicatorResource, CollectedDataResource
-from .models import Indicator, PeriodicTarget, DisaggregationLabel, DisaggregationValue, CollectedData, IndicatorType, Level, ExternalServiceRecord, ExternalService, TolaTable
+from .models import Indicator, PeriodicTarget, DisaggregationLabel, DisaggregationValue, CollectedData, IndicatorType, Level, ExternalServiceRecord, ExternalService, TolaTable, PDFReport
+from indicators import pdf
+from indicators.disaggregation import disaggregation_report
 from workflow.models import WorkflowLevel1, SiteProfile, Country, Sector, TolaSites, TolaUser, FormGuidance
-from tola.util import getCountry, get_table
+from search.backends import get_search_backend
+from tola.access import get_access_context
+from tola.export import csv_response
+from tola.util import get_table
 from workflow.forms import FilterForm
 from .forms import IndicatorForm, CollectedDataForm
 from workflow.mixins import AjaxableResponseMixin
@@ -59,7 +64,7 @@ class IndicatorList(ListView):
 
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getPrograms = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
         getIndicators = Indicator.objects.all().filter(workflowlevel1__country__in=countries).exclude(collecteddata__isnull=True).order_by("-number")
         getIndicatorTypes = IndicatorType.objects.all()
@@ -135,7 +140,7 @@ def indicator_create(request, id=0):
     """
     getIndicatorTypes = IndicatorType.objects.all()
     getCountries = Country.objects.all()
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
     country_id = Country.objects.get(country=countries[0]).id
     getPrograms = WorkflowLevel1.objects.all().filter( country__in=countries).distinct()
     getServices = ExternalService.objects.all()
@@ -694,7 +699,7 @@ def collecteddata_import(request):
         count = getTableCount(url,id)
 
         # get the users country
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         check_for_existence = TolaTable.objects.all().filter(name=name,owner=owner)
         if check_for_existence:
             result = check_for_existence[0].id
@@ -801,7 +806,7 @@ def indicator_report(request, workflowlevel1=0, indicator=0, type=0):
     :param workflowlevel1:
     :return:
     """
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
 
     getPrograms = WorkflowLevel1.objects.all().filter( country__in=countries).distinct()
     getIndicatorTypes = IndicatorType.objects.all()
@@ -843,7 +848,7 @@ def indicator_report(request, workflowlevel1=0, indicator=0, type=0):
 class IndicatorReport(View, AjaxableResponseMixin):
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getPrograms = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
         getIndicatorTypes = IndicatorType.objects.all()
@@ -877,14 +882,8 @@ class IndicatorReport(View, AjaxableResponseMixin):
 
         q = request.GET.get('search', None)
         if q:
-            getIndicators = getIndicators.filter(
-                Q(indicator_type__indicator_type__contains=q) |
-                Q(name__contains=q) |
-                Q(number__contains=q) |
-                Q(number__contains=q) |
-                Q(sector__sector__contains=q) |
-                Q(definition__contains=q)
-            )
+            getIndicators = get_search_backend().filter(
+                getIndicators, 'indicators', q)
 
         get_indicators = json.dumps(list(getIndicators), cls=DjangoJSONEncoder)
 
@@ -901,7 +900,7 @@ def WorkflowLevel1IndicatorReport(request, workflowlevel1=0):
     :return:
     """
     workflowlevel1 = int(workflowlevel1)
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
     getPrograms = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
     getIndicators = Indicator.objects.all().filter(workflowlevel1__id=workflowlevel1).select_related().order_by('level', 'number')
     getProgram = WorkflowLevel1.objects.get(id=workflowlevel1)
@@ -912,11 +911,8 @@ def WorkflowLevel1IndicatorReport(request, workflowlevel1=0):
         # list1 = list()
         # for obj in filtered:
         #    list1.append(obj)
-        getIndicators = Indicator.objects.all().filter(
-            Q(indicator_type__icontains=request.GET["search"]) |
-            Q(name__icontains=request.GET["search"]) |
-            Q(number__icontains=request.GET["search"]) |
-            Q(definition__startswith=request.GET["search"])
+        getIndicators = get_search_backend().filter(
+            Indicator.objects.all(), 'indicators', request.GET["search"]
         ).filter(workflowlevel1__id=workflowlevel1).select_related().order_by('level', 'number')
 
     # send the keys and vars from the json data to the template along with submitted feed info and silos for new form
@@ -937,7 +933,7 @@ def indicator_data_report(request, id=0, workflowlevel1=0, type=0):
     :param type: Type ID
     :return:
     """
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
     getPrograms = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
     getIndicators = Indicator.objects.select_related().filter(workflowlevel1__country__in=countries)
     getTypes = IndicatorType.objects.all()
@@ -979,11 +975,9 @@ def indicator_data_report(request, id=0, workflowlevel1=0, type=0):
         q.update(z)
 
     if request.method == "GET" and "search" in request.GET:
-        queryset = CollectedData.objects.filter(**q).filter(
-            Q(workflowlevel2__project_name__contains=request.GET["search"]) |
-            Q(description__icontains=request.GET["search"]) |
-            Q(indicator__name__contains=request.GET["search"])
-        ).select_related()
+        queryset = get_search_backend().filter(
+            CollectedData.objects.filter(**q), 'collected_data',
+            request.GET["search"]).select_related()
     else:
 
         queryset = CollectedData.objects.all().filter(**q).select_related()
@@ -1029,7 +1023,7 @@ class IndicatorReportData(View, AjaxableResponseMixin):
             }
             q.update(s)
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         indicator = Indicator.objects.filter(workflowlevel1__country__in=countries).filter(**q).values(\
             'id', 'workflowlevel1__name', 'baseline','level__name','lop_target','workflowlevel1__id',\
@@ -1053,10 +1047,7 @@ class IndicatorReportData(View, AjaxableResponseMixin):
 
         if request.GET.get('export'):
             indicator_export = Indicator.objects.all().filter(**q)
-            dataset = IndicatorResource().export(indicator_export)
-            response = HttpResponse(dataset.csv, content_type='application/ms-excel')
-            response['Content-Disposition'] = 'attachment; filename=indicator_data.csv'
-            return response
+            return csv_response(IndicatorResource(), indicator_export, 'indicator_data.csv')
 
         return JsonResponse(final_dict, safe=False)
 
@@ -1072,7 +1063,7 @@ class CollectedDataReportData(View, AjaxableResponseMixin):
 
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         workflowlevel1 = kwargs['workflowlevel1']
         indicator = kwargs['indicator']
         type = kwargs['type']
@@ -1131,20 +1122,11 @@ class CollectedDataReportData(View, AjaxableResponseMixin):
 
         return JsonResponse(final_dict, safe=False)
 
-def dictfetchall(cursor):
-    "Return all rows from a cursor as a dict"
-    columns = [col[0] for col in cursor.description]
-    return [
-        dict(zip(columns, row))
-        for row in cursor.fetchall()
-    ]
-
-
 class DisaggregationReportMixin(object):
     def get_context_data(self, **kwargs):
         context = super(DisaggregationReportMixin, self).get_context_data(**kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         programs = WorkflowLevel1.objects.filter(country__in=countries).distinct()
         indicators = Indicator.objects.filter(workflowlevel1__country__in=countries)
 
@@ -1156,53 +1138,29 @@ class DisaggregationReportMixin(object):
             if program_selected.indicator_set.count() > 0:
                 indicators = indicators.filter(workflowlevel1=program_selected.id)
 
-        disagg_query = "SELECT i.id AS IndicatorID, dt.disaggregation_type AS DType, "\
-            "l.customsort AS customsort, l.label AS Disaggregation, SUM(dv.value) AS Actuals "\
-                "FROM indicators_collecteddata_disaggregation_value AS cdv "\
-                "INNER JOIN indicators_collecteddata AS c ON c.id = cdv.collecteddata_id "\
-                "INNER JOIN indicators_indicator AS i ON i.id = c.indicator_id "\
-                "INNER JOIN indicators_indicator_workflowlevel1 AS ip ON ip.indicator_id = i.id "\
-                "INNER JOIN workflow_workflowlevel1 AS p ON p.id = ip.workflowlevel1_id "\
-                "INNER JOIN indicators_disaggregationvalue AS dv ON dv.id = cdv.disaggregationvalue_id "\
-                "INNER JOIN indicators_disaggregationlabel AS l ON l.id = dv.disaggregation_label_id "\
-                "INNER JOIN indicators_disaggregationtype AS dt ON dt.id = l.disaggregation_type_id "\
-                "WHERE p.id = %s "\
-                "GROUP BY IndicatorID, DType, customsort, Disaggregation "\
-                "ORDER BY IndicatorID, DType, customsort, Disaggregation;"  % program_selected.id
-        # we need to limit this catch exception but we should fix the manual sql query first
-        try:
-            cursor = connection.cursor()
-            cursor.execute(disagg_query)
-            disdata = dictfetchall(cursor)
-        except:
-            disdata = {}
-
-
-        indicator_query = "SELECT DISTINCT p.id as PID, i.id AS IndicatorID, i.number AS INumber, i.name AS Indicator, "\
-            "i.lop_target AS LOP_Target, SUM(cd.achieved) AS Overall "\
-            "FROM indicators_indicator AS i "\
-            "INNER JOIN indicators_indicator_workflowlevel1 AS ip ON ip.indicator_id = i.id "\
-            "INNER JOIN workflow_workflowlevel1 AS p ON p.id = ip.workflowlevel1_id "\
-            "LEFT OUTER JOIN indicators_collecteddata AS cd ON i.id = cd.indicator_id "\
-            "WHERE p.id = %s "\
-            "GROUP BY PID, IndicatorID "\
-            "ORDER BY Indicator; " % program_selected.id
-        cursor.execute(indicator_query)
-        idata = dictfetchall(cursor)
-
-        for indicator in idata:
-            indicator["disdata"] = []
-            for i, dis in enumerate(disdata):
-                if dis['IndicatorID'] == indicator['IndicatorID']:
-                    indicator["disdata"].append(disdata[i])
-
-
-        context['data'] = idata
+        context['data'] = disaggregation_report(program_selected.id) \
+            if program_selected else []
         context['getPrograms'] = programs
         context['getIndicators'] = indicators
         context['program_selected'] = program_selected
         return context
 
+
+class DisaggregationReportData(View):
+    """
+    The disaggregation report of a program as JSON, see
+    indicators.disaggregation.
+    """
+    def get(self, request, *args, **kwargs):
+        countries = get_access_context(request).countries
+        program = get_object_or_404(
+            WorkflowLevel1.objects.filter(country__in=countries).distinct(),
+            pk=kwargs['workflowlevel1'])
+        return JsonResponse({'program': program.id,
+                             'indicators': disaggregation_report(program.id)},
+                            encoder=DjangoJSONEncoder)
+
+
 class DisaggregationReport(DisaggregationReportMixin, TemplateView):
     template_name = 'indicators/disaggregation_report.html'
 
@@ -1212,81 +1170,49 @@ class DisaggregationReport(DisaggregationReportMixin, TemplateView):
         return context
 
 
-class DisaggregationPrint(DisaggregationReportMixin, TemplateView):
-    template_name = 'indicators/disaggregation_print.html'
-
+class PDFReportMixin(object):
+    """
+    Serves the PDF of a program report, rendered in the background by
+    indicators.pdf. Until it is done, Ajax requests get the status of
+    the report and browsers a page reloading itself.
+    """
+    report = None
 
     def get(self, request, *args, **kwargs):
-        context = super(DisaggregationPrint, self).get_context_data(**kwargs)
-        hmtl_string = render(request, self.template_name, {'data': context['data'], 'program_selected': context['program_selected']})
-        pdffile = HTML(string=hmtl_string.content)
-
-        result = pdffile.write_pdf(stylesheets=[CSS(
-            string='@page {\
-                size: letter; margin: 1cm;\
-                @bottom-right{\
-                    content: "Page " counter(page) " of " counter(pages);\
-                };\
-            }'\
-        )])
-        res = HttpResponse(result, content_type='application/pdf')
-        res['Content-Disposition'] = 'attachment; filename=indicators_disaggregation_report.pdf'
-        res['Content-Transfer-Encoding'] = 'binary'
-        #return super(DisaggregationReport, self).get(request, *args, **kwargs)
-        return res
-
-from django.template.loader import render_to_string
-#import tempfile
-
-class TVAPrint(TemplateView):
-    template_name = 'indicators/tva_print.html'
+        countries = get_access_context(request).countries
+        program = get_object_or_404(
+            WorkflowLevel1.objects.filter(country__in=countries).distinct(),
+            pk=kwargs['workflowlevel1'])
+        job = pdf.enqueue(self.report, program,
+                          base_url=request.build_absolute_uri('/'),
+                          retry='retry' in request.GET)
+
+        if job.status == PDFReport.STATUS_DONE:
+            res = FileResponse(job.file.storage.open(job.file.name, 'rb'), content_type='application/pdf')
+            res['Content-Disposition'] = 'attachment; filename=%s' % pdf.REPORTS[self.report][1]
+            return res
+
+        status = 500 if job.status == PDFReport.STATUS_FAILED else 202
+        if request.is_ajax():
+            return JsonResponse({'status': job.status, 'error': job.error}, status=status)
+        return render(request, 'indicators/pdf_report_status.html',
+                      {'job': job, 'program': program}, status=status)
+
+
+class DisaggregationPrint(PDFReportMixin, View):
+    report = PDFReport.REPORT_DISAGGREGATION
+
+
+class TVAPrint(PDFReportMixin, View):
+    report = PDFReport.REPORT_TVA
 
-    def get(self, request, *args, **kwargs):
-        program = Program.objects.filter(id=kwargs.get('program', None)).first()
-        indicators = Indicator.objects\
-            .select_related('sector')\
-            .prefetch_related('indicator_type', 'level', 'program')\
-            .filter(program=program)\
-            .annotate(actuals=Sum('collecteddata__achieved'))
-
-        #hmtl_string = render_to_string('indicators/tva_print.html', {'data': context['data'], 'program': context['program']})
-        hmtl_string = render(request, 'indicators/tva_print.html', {'data': indicators, 'program': program})
-        pdffile = HTML(string=hmtl_string.content)
-        # stylesheets=[CSS(string='@page { size: letter; margin: 1cm}')]
-        result = pdffile.write_pdf(stylesheets=[CSS(
-            string='@page {\
-                size: letter; margin: 1cm;\
-                @bottom-right{\
-                    content: "Page " counter(page) " of " counter(pages);\
-                };\
-            }'\
-        )])
-        res = HttpResponse(result, content_type='application/pdf')
-        #res['Content-Disposition'] = 'inline; filename="ztvareport.pdf"'
-        res['Content-Disposition'] = 'attachment; filename=tva.pdf'
-        res['Content-Transfer-Encoding'] = 'binary'
-        """
-        with tempfile.NamedTemporaryFile(delete=True) as output:
-            output.write(result)
-            output.flush()
-            output = open(output.name, 'r')
-            res.write(output.read())
-        """
-        """
-        # Create the PDF object, using the response object as its "file."
-        p = canvas.Canvas(res)
-        p.drawString(100, 100, 'hello world!')
-        p.showPage()
-        p.save()
-        """
-        return res
 
 class TVAReport(TemplateView):
     template_name = 'indicators/tva_report.html'
 
     def get_context_data(self, **kwargs):
         context = super(TVAReport, self).get_context_data(**kwargs)
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         filters = {'workflowlevel1__country__in': countries}
         workflowlevel1 = WorkflowLevel1.objects.filter(id=kwargs.get('workflowlevel1', None)).first()
         indicator_type = IndicatorType.objects.filter(id=kwargs.get('type', None)).first()
@@ -1303,7 +1229,8 @@ class TVAReport(TemplateView):
             .select_related('sector')\
             .prefetch_related('indicator_type', 'level', 'workflowlevel1')\
             .filter(**filters)\
-            .annotate(actuals=Sum('collecteddata__achieved'))
+            .distinct()\
+            .with_actuals()
             #.annotate(actuals=Sum('collecteddata__disaggregation_value__value'))
         context['data'] = indicators
         context['getIndicators'] = Indicator.objects.filter(workflowlevel1__country__in=countries).exclude(collecteddata__isnull=True)
@@ -1337,7 +1264,7 @@ class CollectedDataList(ListView):
 
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getPrograms = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
         getIndicators = Indicator.objects.all()\
@@ -1381,15 +1308,12 @@ class IndicatorExport(View):
         if int(kwargs['workflowlevel1']) == 0:
             del kwargs['workflowlevel1']
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         queryset = Indicator.objects.filter(**kwargs).filter(workflowlevel1__country__in=countries)
 
 
-        indicator = IndicatorResource().export(queryset)
-        response = HttpResponse(indicator.csv, content_type='application/ms-excel')
-        response['Content-Disposition'] = 'attachment; filename=indicator.csv'
-        return response
+        return csv_response(IndicatorResource(), queryset, 'indicator.csv')
 
 
 class IndicatorDataExport(View):
@@ -1408,13 +1332,10 @@ class IndicatorDataExport(View):
            kwargs['indicator__indicator_type__id'] = kwargs['type']
            del kwargs['type']
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         queryset = CollectedData.objects.filter(**kwargs).filter(indicator__workflowlevel1__country__in=countries)
-        dataset = CollectedDataResource().export(queryset)
-        response = HttpResponse(dataset.csv, content_type='application/ms-excel')
-        response['Content-Disposition'] = 'attachment; filename=indicator_data.csv'
-        return response
+        return csv_response(CollectedDataResource(), queryset, 'indicator_data.csv')
 
 
 class CountryExport(View):
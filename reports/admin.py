@@ -1,9 +1,10 @@
 from django.contrib import admin
 
-from .models import Report, ReportAdmin
+from .models import ExportJob, ExportJobAdmin, Report, ReportAdmin
 
 
 admin.site.register(Report, ReportAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
 
 
 
@@ -0,0 +1,274 @@
+"""
+Exports of large resources to CSV or XLSX files, run in the background.
+
+start_export adds an ExportJob for the rows of a resource the organization
+can see, narrowed by the filters of the request and, for users who are not
+organization admins, by the programs of their teams. A thread of the web
+process writes them to a file in chunks (see tola.export.export_rows),
+recording the rows done so clients can show the progress, and the file is
+kept in the storage for download.
+
+The version of the data (the count and latest edit_date of the rows) is
+part of a job, so an export asked for again by any user of the
+organization with the same programs is served from the file of the first
+one until the rows change. Jobs left pending by a stopped process are run with the
+run-export-jobs command. With EXPORT_JOB_WORKER off, exports run in the
+request.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from formlibrary.export import (BeneficiaryResource, DistributionResource,
+                                TrainingAttendanceResource)
+from reports.models import ExportJob
+from tola.export import csv_writer, export_rows
+from tola.worker import wake
+from workflow.export import ProjectAgreementResource, StakeholderResource
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+# name: (resource class, lookup of the organization, filter fields)
+EXPORTS = {
+    'projectagreement': (ProjectAgreementResource, 'organization',
+                         ('workflowlevel1', 'status', 'approval')),
+    'stakeholder': (StakeholderResource, 'organization',
+                    ('workflowlevel1', 'country')),
+    'trainingattendance': (TrainingAttendanceResource,
+                           'workflowlevel1__organization',
+                           ('workflowlevel1', 'workflowlevel2')),
+    'distribution': (DistributionResource, 'workflowlevel1__organization',
+                     ('workflowlevel1', 'workflowlevel2')),
+    'beneficiary': (BeneficiaryResource, 'organization',
+                    ('workflowlevel1',)),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def clean_filters(resource, filters):
+    """
+    Returns the filters of an export of resource as a dict of strings,
+    raises ExportError for unknown resources, filter fields or invalid
+    values.
+    """
+    if resource not in EXPORTS:
+        raise ExportError('Unknown resource: %s' % resource)
+    if not isinstance(filters, dict):
+        raise ExportError('The filters must be an object')
+    fields = EXPORTS[resource][2]
+    unknown = sorted(set(filters) - set(fields))
+    if unknown:
+        raise ExportError('Unknown filters: %s, use %s' % (
+            ', '.join(unknown), ', '.join(fields)))
+    model = EXPORTS[resource][0]._meta.model
+    cleaned = {}
+    for key, value in filters.items():
+        if value in (None, ''):
+            continue
+        field = model._meta.get_field(key)
+        if field.is_relation:
+            field = field.target_field
+        try:
+            if isinstance(value, (dict, list)):
+                raise ValidationError('Not a single value')
+            field.to_python(value)
+        except ValidationError:
+            raise ExportError('Invalid value of %s: %s' % (key, value))
+        cleaned[key] = unicode(value)
+    return cleaned
+
+
+def get_queryset(resource, organization_id, filters, program_ids=None):
+    """
+    Returns the rows of resource of the organization matching filters,
+    only those of the programs program_ids unless it is None.
+    """
+    resource_class, organization_lookup, _ = EXPORTS[resource]
+    queryset = resource_class._meta.model.objects.all()
+    if organization_id is not None:
+        queryset = queryset.filter(**{organization_lookup: organization_id})
+    if program_ids is not None:
+        queryset = queryset.filter(workflowlevel1__in=program_ids).distinct()
+    return queryset.filter(**filters).order_by('pk')
+
+
+def _load_program_ids(workflowlevel1_ids):
+    return json.loads(workflowlevel1_ids) if workflowlevel1_ids else None
+
+
+def data_version(queryset):
+    """
+    Returns a key of the state of the rows of queryset: it changes when a
+    row is edited (edit_date), added or deleted.
+    """
+    version = queryset.order_by().aggregate(count=Count('pk', distinct=True),
+                                            edited=Max('edit_date'))
+    return hashlib.md5('%s %s' % (version['count'],
+                                  version['edited'])).hexdigest()
+
+
+def start_export(organization_id, resource, format=ExportJob.FORMAT_CSV,
+                 filters=None, user=None, program_ids=None):
+    """
+    Returns the ExportJob of resource in format for filters and the
+    current data, adding one unless a job of the organization already
+    covers it. The rows are restricted to the programs program_ids unless
+    it is None. Raises ExportError for invalid requests.
+    """
+    if format not in dict(ExportJob.FORMAT_CHOICES):
+        raise ExportError('Unknown format: %s' % format)
+    if format == ExportJob.FORMAT_XLSX and Workbook is None:
+        raise ExportError('XLSX exports need openpyxl')
+    filters = clean_filters(resource, filters or {})
+    filters_json = json.dumps(filters, sort_keys=True)
+    workflowlevel1_ids = json.dumps(sorted(set(program_ids))) \
+        if program_ids is not None else ''
+    filter_hash = hashlib.sha1(
+        '%s %s' % (filters_json, workflowlevel1_ids)).hexdigest()
+    version = data_version(get_queryset(resource, organization_id, filters,
+                                        program_ids))
+
+    jobs = ExportJob.objects.filter(
+        organization_id=organization_id, resource=resource, format=format,
+        filter_hash=filter_hash)
+    job = jobs.filter(data_version=version)\
+        .exclude(status=ExportJob.STATUS_FAILED).order_by('-id').first()
+    if job is not None and (job.status != ExportJob.STATUS_DONE or
+                            job.file.storage.exists(job.file.name)):
+        return job
+
+    # the files of the older versions won't be asked for anymore
+    for old_job in jobs.exclude(status=ExportJob.STATUS_RUNNING):
+        if old_job.file:
+            old_job.file.delete(save=False)
+        old_job.delete()
+    job = ExportJob.objects.create(
+        organization_id=organization_id, resource=resource, format=format,
+        filters=filters_json, workflowlevel1_ids=workflowlevel1_ids,
+        filter_hash=filter_hash, data_version=version, created_by=user)
+
+    if getattr(settings, 'EXPORT_JOB_WORKER', True):
+        transaction.on_commit(schedule_exports)
+    else:
+        run(job)
+        job.refresh_from_db()
+    return job
+
+
+def _write_csv(resource, rows, headers, fileobj):
+    writer = csv_writer(fileobj)
+    writer.writerow(headers)
+    for chunk in rows:
+        for row in chunk:
+            writer.writerow(row)
+        yield len(chunk)
+
+
+def _write_xlsx(resource, rows, headers, fileobj):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=resource)
+    sheet.append(headers)
+    for chunk in rows:
+        for row in chunk:
+            sheet.append(row)
+        yield len(chunk)
+    workbook.save(fileobj)
+
+
+def _claim(job):
+    return ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+        status=ExportJob.STATUS_RUNNING, rows_done=0,
+        edit_date=timezone.now()) == 1
+
+
+def run(job):
+    """
+    Run a pending ExportJob. Returns False when another process has already
+    claimed it or the export failed.
+    """
+    if not _claim(job):
+        return False
+    jobs = ExportJob.objects.filter(pk=job.pk)
+    try:
+        queryset = get_queryset(job.resource, job.organization_id,
+                                json.loads(job.filters or '{}'),
+                                _load_program_ids(job.workflowlevel1_ids))
+        jobs.update(rows_total=queryset.count())
+        resource = EXPORTS[job.resource][0]()
+        write = _write_xlsx if job.format == ExportJob.FORMAT_XLSX \
+            else _write_csv
+        with tempfile.TemporaryFile() as fileobj:
+            rows_done = 0
+            for count in write(job.resource,
+                               export_rows(resource, queryset, CHUNK_SIZE),
+                               resource.get_export_headers(), fileobj):
+                rows_done += count
+                jobs.update(rows_done=rows_done, edit_date=timezone.now())
+            fileobj.seek(0)
+            job.file.save('%s-%s.%s' % (job.resource, job.pk, job.format),
+                          File(fileobj), save=False)
+    except Exception as e:
+        logger.error('Error exporting %s', job.resource, exc_info=True)
+        jobs.update(status=ExportJob.STATUS_FAILED, error=unicode(e),
+                    edit_date=timezone.now())
+        return False
+
+    if not jobs.update(status=ExportJob.STATUS_DONE, file=job.file.name,
+                       edit_date=timezone.now()):
+        # replaced by a newer version while exporting
+        job.file.delete(save=False)
+        return False
+    return True
+
+
+def run_pending():
+    """
+    Run the pending jobs, as well as the running ones which made no
+    progress for EXPORT_JOB_TIMEOUT seconds (their process died). Returns
+    the number of jobs done.
+    """
+    timeout = getattr(settings, 'EXPORT_JOB_TIMEOUT', 600)
+    ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        edit_date__lt=timezone.now() - timedelta(seconds=timeout))\
+        .update(status=ExportJob.STATUS_PENDING)
+
+    count = 0
+    while True:
+        jobs = list(ExportJob.objects.filter(status=ExportJob.STATUS_PENDING)
+                    .order_by('id')[:10])
+        if not jobs:
+            break
+        for job in jobs:
+            # claimed or failed jobs are not pending anymore, the next
+            # query leaves them out
+            if run(job):
+                count += 1
+    return count
+
+
+def schedule_exports():
+    """
+    Wake up the export worker of the process, used as on_commit callback.
+    """
+    wake('export-jobs', run_pending)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reports.exports import run_pending
+
+
+class Command(BaseCommand):
+    help = """
+    Run the pending export jobs started through /api/exportjob/.
+
+    The web processes run them in a background thread unless
+    EXPORT_JOB_WORKER is off. Run this to finish the jobs left pending by a
+    process that was stopped, e.g. by a deployment.
+    """
+
+    def handle(self, *args, **options):
+        count = run_pending()
+        self.stdout.write('Ran {} export jobs'.format(count))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 10:20
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('workflow', '0015_siteprofile_map_index'),
+        ('reports', '0003_report_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50)),
+                ('format', models.CharField(choices=[(b'csv', b'CSV'), (b'xlsx', b'XLSX')], default=b'csv', max_length=10)),
+                ('filters', models.TextField(blank=True)),
+                ('filter_hash', models.CharField(max_length=40)),
+                ('data_version', models.CharField(max_length=32)),
+                ('status', models.CharField(choices=[(b'pending', b'Pending'), (b'running', b'Running'), (b'done', b'Done'), (b'failed', b'Failed')], default=b'pending', max_length=10)),
+                ('rows_done', models.IntegerField(default=0)),
+                ('rows_total', models.IntegerField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, upload_to=b'reports/exports')),
+                ('error', models.TextField(blank=True)),
+                ('create_date', models.DateTimeField(blank=True, null=True)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='workflow.Organization')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='exportjob',
+            index_together=set([('organization', 'resource', 'format', 'filter_hash')]),
+        ),
+    ]
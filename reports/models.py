@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib import admin
-from workflow.models import WorkflowLevel1, WorkflowLevel2, Country
+from django.utils import timezone
+from workflow.models import WorkflowLevel1, WorkflowLevel2, Country, Organization
 from indicators.models import Indicator, CollectedData
 
 
@@ -26,6 +27,67 @@ class ReportAdmin(admin.ModelAdmin):
     display = 'Project Status'
 
 
+class ExportJob(models.Model):
+    """
+    An export of a resource to a file, run in the background by
+    reports.exports. Jobs of the same organization, resource, format,
+    filters, programs and version of the data share the file.
+    """
+    FORMAT_CSV = 'csv'
+    FORMAT_XLSX = 'xlsx'
+    FORMAT_CHOICES = (
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_XLSX, 'XLSX'),
+    )
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
 
+    organization = models.ForeignKey(Organization, null=True, blank=True, on_delete=models.CASCADE)
+    resource = models.CharField(max_length=50)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_CSV)
+    # JSON with sorted keys
+    filters = models.TextField(blank=True)
+    # JSON of the sorted ids of the programs the rows are restricted to,
+    # empty for every program of the organization
+    workflowlevel1_ids = models.TextField(blank=True)
+    # sha1 of the filters and workflowlevel1_ids
+    filter_hash = models.CharField(max_length=40)
+    data_version = models.CharField(max_length=32)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_done = models.IntegerField(default=0)
+    rows_total = models.IntegerField(null=True, blank=True)
+    file = models.FileField(upload_to='reports/exports', blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey('auth.User', related_name='export_jobs', null=True, blank=True, on_delete=models.SET_NULL)
+    create_date = models.DateTimeField(null=True, blank=True)
+    edit_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        index_together = ('organization', 'resource', 'format', 'filter_hash')
+
+    def save(self, *args, **kwargs):
+        if self.create_date is None:
+            self.create_date = timezone.now()
+        self.edit_date = timezone.now()
+        super(ExportJob, self).save(*args, **kwargs)
+
+    @property
+    def file_name(self):
+        return '%s.%s' % (self.resource, self.format)
+
+    def __unicode__(self):
+        return u'%s %s %s' % (self.resource, self.format, self.status)
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('resource', 'format', 'organization', 'status', 'rows_done', 'rows_total', 'create_date')
+    list_filter = ('resource', 'status')
+    display = 'Export Jobs'
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.test import TestCase, override_settings, tag
+from mock import patch
+from openpyxl import load_workbook
+
+import factories
+from reports import exports
+from reports.models import ExportJob
+from workflow.export import StakeholderResource
+from workflow.models import Stakeholder
+
+
+@tag('pkg')
+@override_settings(EXPORT_JOB_WORKER=False)
+class ExportJobTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+        self.organization = factories.Organization()
+        self.wflvl1 = factories.WorkflowLevel1(organization=self.organization)
+        self.stakeholders = [
+            factories.Stakeholder(name=u'Stakeholder \xe9 %s' % i,
+                                  organization=self.organization,
+                                  workflowlevel1=[self.wflvl1])
+            for i in range(3)]
+        factories.Stakeholder(organization=self.organization)
+        factories.Stakeholder(organization=factories.Organization(
+            name='Other Org'))
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def _start(self, format=ExportJob.FORMAT_CSV, filters=None):
+        return exports.start_export(
+            self.organization.id, 'stakeholder', format,
+            filters or {'workflowlevel1': self.wflvl1.id})
+
+    def test_csv(self):
+        with patch.object(exports, 'CHUNK_SIZE', 2):
+            job = self._start()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual((job.rows_done, job.rows_total), (3, 3))
+        expected = StakeholderResource().export(Stakeholder.objects.filter(
+            pk__in=[s.pk for s in self.stakeholders]).order_by('pk')).csv
+        self.assertEqual(job.file.read(), expected)
+
+    def test_organization(self):
+        job = exports.start_export(self.organization.id, 'stakeholder')
+        self.assertEqual(job.rows_total, 4)
+
+    def test_programs(self):
+        job = exports.start_export(self.organization.id, 'stakeholder',
+                                   program_ids=[self.wflvl1.id])
+        self.assertEqual(job.rows_total, 3)
+        self.assertNotEqual(
+            exports.start_export(self.organization.id, 'stakeholder').pk,
+            job.pk)
+        self.assertEqual(exports.start_export(
+            self.organization.id, 'stakeholder', program_ids=[]).rows_total,
+            0)
+
+    def test_xlsx(self):
+        job = self._start(ExportJob.FORMAT_XLSX)
+        sheet = load_workbook(BytesIO(job.file.read())).active
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]),
+                         StakeholderResource().get_export_headers())
+        self.assertEqual(len(rows), 4)
+
+    def test_deduplicated(self):
+        job = self._start()
+        self.assertEqual(self._start(), job)
+        self.assertNotEqual(self._start(ExportJob.FORMAT_XLSX).pk, job.pk)
+        self.assertNotEqual(exports.start_export(
+            self.organization.id, 'stakeholder').pk, job.pk)
+
+        # the data changes, the old file is removed
+        self.stakeholders[0].save()
+        new_job = self._start()
+        self.assertNotEqual(new_job.pk, job.pk)
+        self.assertFalse(ExportJob.objects.filter(pk=job.pk).exists())
+        self.assertFalse(job.file.storage.exists(job.file.name))
+
+    def test_invalid(self):
+        with self.assertRaises(exports.ExportError):
+            exports.start_export(self.organization.id, 'user')
+        with self.assertRaises(exports.ExportError):
+            self._start(filters={'name': 'Stakeholder'})
+        with self.assertRaises(exports.ExportError):
+            self._start(format='pdf')
+        with self.assertRaises(exports.ExportError):
+            self._start(filters={'workflowlevel1': 'abc'})
+        with self.assertRaises(exports.ExportError):
+            self._start(filters={'workflowlevel1': [self.wflvl1.id]})
+
+    def test_run_pending(self):
+        with override_settings(EXPORT_JOB_WORKER=True):
+            job = self._start()
+        self.assertEqual(job.status, ExportJob.STATUS_PENDING)
+        self.assertEqual(exports.run_pending(), 1)
+        self.assertEqual(ExportJob.objects.get(pk=job.pk).status,
+                         ExportJob.STATUS_DONE)
+
@@ -14,6 +14,7 @@ from workflow.export import ProjectAgreementResource
 from workflow.export import ProgramResource
 from indicators.export import CollectedDataResource
 from indicators.export import IndicatorResource
+from tola.export import csv_response
 
 
 def make_filter(my_request):
@@ -117,10 +118,7 @@ class ReportData(View, AjaxableResponseMixin):
 
         if request.GET.get('export'):
             program_export = WorkflowLevel1.objects.all().filter(**program_filter)
-            program_dataset = ProgramResource().export(program_export)
-            response = HttpResponse(program_dataset.csv, content_type='application/ms-excel')
-            response['Content-Disposition'] = 'attachment; filename=workflowlevel1_data.csv'
-            return response
+            return csv_response(ProgramResource(), program_export, 'workflowlevel1_data.csv')
 
         return JsonResponse(final_dict, safe=False)
 
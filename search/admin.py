@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
-from .models import SearchIndexLog, SearchIndexLogAdmin
+from .models import (SearchIndexLog, SearchIndexLogAdmin, SearchOutbox,
+                     SearchOutboxAdmin)
 
 from django.contrib import admin
 
@@ -8,3 +9,4 @@ from django.contrib import admin
 SearchIndexLog
 
 admin.site.register(SearchIndexLog, SearchIndexLogAdmin)
+admin.site.register(SearchOutbox, SearchOutboxAdmin)
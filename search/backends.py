@@ -0,0 +1,136 @@
+"""
+Search in the database, for the `search` parameter of the HTML views and
+for the search API when Elasticsearch is not enabled.
+
+DatabaseSearchBackend matches the fields of SEARCH_MODELS with icontains,
+which works on every database. On PostgreSQL, PostgresSearchBackend uses
+the search_vector column of the tables, kept up to date by a trigger and
+GIN indexed, and a trigram index for partial matches of names (see the
+migration search 0005_postgres_full_text). SEARCH_BACKEND in settings can
+name another backend class.
+"""
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from indicators.models import CollectedData, Indicator
+from workflow.models import SiteProfile, WorkflowLevel1, WorkflowLevel2
+
+# fields: looked up with icontains by the database backend
+# trigram_field: column of partial matches with the PostgreSQL backend
+# source: values returned by the search API
+SearchModel = namedtuple('SearchModel',
+                         'model fields trigram_field source')
+
+SEARCH_MODELS = OrderedDict((
+    ('workflow_level1', SearchModel(
+        WorkflowLevel1, ('name', 'description'), 'name',
+        ('id', 'level1_uuid', 'name'))),
+    ('workflow_level2', SearchModel(
+        WorkflowLevel2, ('name', 'short_name', 'description'), 'name',
+        ('id', 'level2_uuid', 'name', 'workflowlevel1_id'))),
+    ('indicators', SearchModel(
+        Indicator, ('name', 'number', 'definition',
+                    'indicator_type__indicator_type', 'sector__sector'),
+        'name', ('id', 'indicator_uuid', 'name', 'number'))),
+    ('collected_data', SearchModel(
+        CollectedData, ('description', 'comment', 'workflowlevel2__name',
+                        'indicator__name'),
+        'description', ('id', 'data_uuid', 'description', 'indicator_id'))),
+    ('site_profiles', SearchModel(
+        SiteProfile, ('name', 'office__name', 'type__profile',
+                      'province__name', 'district__name', 'village__name',
+                      'workflowlevel2__name'),
+        'name', ('id', 'site_uuid', 'name'))),
+))
+
+# documents of the search API: lookup of the organization and of the
+# programs giving access
+API_MODELS = OrderedDict((
+    ('workflow_level1', ('organization', ('id',))),
+    ('workflow_level2', ('organization', ('workflowlevel1',))),
+    ('indicators', ('workflowlevel1__organization', ('workflowlevel1',))),
+    ('collected_data', ('organization',
+                        ('workflowlevel1', 'indicator__workflowlevel1'))),
+))
+
+
+class DatabaseSearchBackend(object):
+    def filter(self, queryset, name, term):
+        """
+        Filter queryset (of the model of SEARCH_MODELS[name]) by term.
+        """
+        condition = Q()
+        for field in SEARCH_MODELS[name].fields:
+            condition |= Q(**{field + '__icontains': term})
+        return queryset.filter(condition).distinct()
+
+    def search(self, name, term, organization_id, program_ids=None,
+               offset=0, size=20):
+        """
+        Return (count, rows) of the API_MODELS[name] objects of an
+        organization matching term. Without program_ids (admins) every
+        object of the organization matches.
+        """
+        search_model = SEARCH_MODELS[name]
+        organization_path, program_paths = API_MODELS[name]
+        queryset = search_model.model.objects.filter(
+            **{organization_path: organization_id})
+        if program_ids is not None:
+            access = Q()
+            for path in program_paths:
+                access |= Q(**{path + '__in': program_ids})
+            queryset = queryset.filter(access)
+
+        queryset = self.filter(queryset, name, term).distinct() \
+            .order_by('-pk')
+        rows = queryset.values(*search_model.source)[offset:offset + size]
+        return queryset.count(), list(rows)
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    def filter(self, queryset, name, term):
+        """
+        Filter queryset by term in the search_vector or the trigram_field
+        of its table, or in the fields of SEARCH_MODELS[name] of related
+        tables (they are not part of the vector). Each table is matched by
+        its own query, using its indexes, and the rows are their UNION.
+        """
+        model = SEARCH_MODELS[name].model
+        table = model._meta.db_table
+        column = SEARCH_MODELS[name].trigram_field
+        queries = [
+            "SELECT {table}.{pk} FROM {table} WHERE {table}.search_vector @@ "
+            "plainto_tsquery('pg_catalog.simple', %s) OR "
+            "{table}.{column} ILIKE %s".format(
+                table=table, pk=model._meta.pk.column, column=column)]
+        params = [term, u'%{}%'.format(term)]
+        for field in SEARCH_MODELS[name].fields:
+            if '__' not in field:
+                continue
+            path, related_field = field.rsplit('__', 1)
+            related = model
+            for part in path.split('__'):
+                related = related._meta.get_field(part).related_model
+            matches = related._default_manager.filter(
+                **{related_field + '__icontains': term}).values('pk')
+            sql, related_params = model._default_manager.filter(
+                **{path + '__in': matches}).order_by().values('pk') \
+                .query.sql_with_params()
+            queries.append(sql)
+            params.extend(related_params)
+        return queryset.filter(pk__in=RawSQL(' UNION '.join(queries),
+                                             params))
+
+
+def get_search_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path is not None:
+        return import_string(path)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return DatabaseSearchBackend()
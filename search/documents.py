@@ -0,0 +1,115 @@
+"""
+Field extraction and index mappings of the search documents.
+
+The fields a model contributes to a document are looked up once per model
+class, with the conversion of their values to JSON types, see
+get_extractor. The mapping of each document type is declared here instead
+of left to the dynamic mapping of Elasticsearch, see get_mapping.
+"""
+from django.apps import apps
+from django.db import models
+
+TEXT_MAPPING = {'type': 'text',
+                'fields': {'keyword': {'type': 'keyword',
+                                       'ignore_above': 256}}}
+ID_MAPPING = {'type': 'long'}
+
+# the index names are the organization uuid followed by these
+INDEX_SUFFIXES = ('_indicators', '_collected_data', '_workflow_level1',
+                  '_workflow_level2')
+
+# field class: (mapping, conversion of the values)
+FIELD_TYPES = (
+    (models.AutoField, {'type': 'long'}, None),
+    (models.BooleanField, {'type': 'boolean'}, None),
+    (models.NullBooleanField, {'type': 'boolean'}, None),
+    (models.IntegerField, {'type': 'long'}, None),
+    (models.FloatField, {'type': 'double'}, None),
+    (models.DecimalField, {'type': 'double'}, float),
+    (models.DateTimeField, {'type': 'date'}, lambda value: value.isoformat()),
+    (models.DateField, {'type': 'date'}, lambda value: value.isoformat()),
+    (models.TimeField, {'type': 'keyword'}, lambda value: value.isoformat()),
+    (models.UUIDField, {'type': 'keyword'}, unicode),
+    (models.FileField, {'type': 'keyword'}, lambda value: value.name),
+    (models.TextField, {'type': 'text'}, unicode),
+    # the uuid columns are CharFields with uuid4 as default
+    (models.CharField, TEXT_MAPPING, unicode),
+)
+
+
+def _field_type(field):
+    for field_class, mapping, convert in FIELD_TYPES:
+        if isinstance(field, field_class):
+            return mapping, convert
+    return None, None
+
+
+class ModelExtractor(object):
+    """
+    Returns the values of the concrete fields (relations excluded) of an
+    object as a JSON-ready dict.
+    """
+    def __init__(self, model):
+        self.fields = []
+        self.mapping = {}
+        for field in model._meta.concrete_fields:
+            if field.is_relation:
+                continue
+            mapping, convert = _field_type(field)
+            self.fields.append((field.name, field.attname, convert))
+            if mapping is not None:
+                self.mapping[field.name] = mapping
+
+    def __call__(self, obj):
+        data = {}
+        for name, attname, convert in self.fields:
+            value = getattr(obj, attname)
+            if value is not None and convert is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+
+_extractors = {}
+
+
+def get_extractor(model):
+    if model not in _extractors:
+        _extractors[model] = ModelExtractor(model)
+    return _extractors[model]
+
+
+def _object_mapping(label):
+    return {'properties': get_extractor(apps.get_model(label)).mapping}
+
+
+def _properties(label, **related):
+    properties = dict(get_extractor(apps.get_model(label)).mapping)
+    properties.update(related)
+    properties['workflowlevel1_ids'] = ID_MAPPING
+    return properties
+
+
+def get_mapping(suffix):
+    """
+    Returns the mappings of the index of a document type by the suffix of
+    its name (see ElasticsearchIndexer), for the creation of the index.
+    """
+    if suffix == '_indicators':
+        return {'indicator': {'properties': _properties(
+            'indicators.Indicator', workflowlevel1=TEXT_MAPPING)}}
+    if suffix == '_collected_data':
+        return {'data_collection': {'properties': _properties(
+            'indicators.CollectedData', indicator=TEXT_MAPPING)}}
+    if suffix == '_workflow_level1':
+        return {'workflow': {'properties': _properties(
+            'workflow.WorkflowLevel1', sectors=TEXT_MAPPING,
+            country=_object_mapping('workflow.Country'))}}
+    if suffix == '_workflow_level2':
+        return {'workflow': {'properties': _properties(
+            'workflow.WorkflowLevel2', sector=TEXT_MAPPING,
+            workflowlevel1=_object_mapping('workflow.WorkflowLevel1'),
+            indicators=_object_mapping('indicators.Indicator'),
+            stakeholder=_object_mapping('workflow.Stakeholder'),
+            site=_object_mapping('workflow.SiteProfile'))}}
+    raise ValueError('Unknown index suffix {}'.format(suffix))
@@ -0,0 +1,221 @@
+"""
+Bulk indexing of whole tables, used by the search-index command.
+
+Objects are read in chunks with a server-side cursor, with the relations
+their documents use loaded per chunk. The documents of a chunk are sent
+with bulk requests, in parallel threads when there is more than one
+worker. After each chunk the last primary key is saved as checkpoint, so an
+interrupted run can be resumed.
+
+Runs are incremental: a watermark per model keeps when it was last
+indexed, and only objects edited since then are sent, along with the
+deletes of the tombstones left since then.
+"""
+import logging
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
+
+from indicators.models import CollectedData, Indicator
+from search.models import (SearchIndexCheckpoint, SearchIndexWatermark,
+                           SearchTombstone)
+from tola.util import queryset_chunks
+from workflow.models import WorkflowLevel1, WorkflowLevel2
+
+logger = logging.getLogger(__name__)
+
+# edits committed late (long transactions) are sent by the next run too
+WATERMARK_OVERLAP = timedelta(minutes=10)
+TOMBSTONE_RETENTION = timedelta(days=30)
+TOMBSTONES = 'tombstones'
+
+IndexedModel = namedtuple('IndexedModel',
+                          'queryset organization_path suffix')
+
+# name: objects with documents, loading the relations the documents use,
+# the lookup of their organization uuid and the suffix of their index
+INDEXED_MODELS = OrderedDict((
+    ('indicators', IndexedModel(
+        lambda: Indicator.objects.prefetch_related(
+            'workflowlevel1__organization'),
+        'workflowlevel1__organization__organization_uuid', '_indicators')),
+    ('collected_data', IndexedModel(
+        lambda: CollectedData.objects.select_related(
+            'workflowlevel1__organization', 'indicator').prefetch_related(
+            'indicator__workflowlevel1'),
+        'workflowlevel1__organization__organization_uuid',
+        '_collected_data')),
+    ('workflowlevel1', IndexedModel(
+        lambda: WorkflowLevel1.objects.select_related(
+            'organization').prefetch_related('sector', 'country'),
+        'organization__organization_uuid', '_workflow_level1')),
+    ('workflowlevel2', IndexedModel(
+        lambda: WorkflowLevel2.objects.select_related(
+            'workflowlevel1__organization', 'sector').prefetch_related(
+            'indicators', 'stakeholder', 'site'),
+        'workflowlevel1__organization__organization_uuid',
+        '_workflow_level2')),
+))
+
+# index argument of the search-index command: names of INDEXED_MODELS
+INDEX_GROUPS = OrderedDict((
+    ('_all', list(INDEXED_MODELS)),
+    ('workflows', ['workflowlevel1', 'workflowlevel2']),
+    ('indicators', ['indicators']),
+    ('collected_data', ['collected_data']),
+))
+
+
+class BulkIndexer(object):
+    """
+    Sends the documents of querysets to Elasticsearch.
+
+    :param indexer: the ElasticsearchIndexer building the documents
+    :param chunk_size: objects read from the database at a time
+    :param bulk_size: documents per bulk request
+    :param workers: bulk requests sent at the same time
+    :param progress: called with (name, objects done, total) after each chunk
+    """
+    def __init__(self, indexer, chunk_size=2000, bulk_size=500, workers=4,
+                 progress=None):
+        self.indexer = indexer
+        self.chunk_size = chunk_size
+        self.bulk_size = bulk_size
+        self.workers = workers
+        self.progress = progress
+
+    def _actions(self, objects):
+        for obj in objects:
+            for index, doc_type, doc_id, body in \
+                    self.indexer.get_documents(obj):
+                yield {'_index': index, '_type': doc_type, '_id': doc_id,
+                       '_source': body}
+
+    def _delete_actions(self, tombstones):
+        for tombstone in tombstones:
+            yield {'_op_type': 'delete', '_index': tombstone.index,
+                   '_type': tombstone.doc_type, '_id': tombstone.document_id}
+
+    def _bulk(self, actions):
+        if self.workers > 1:
+            return parallel_bulk(self.indexer.es, actions,
+                                 thread_count=self.workers,
+                                 chunk_size=self.bulk_size,
+                                 raise_on_error=False)
+        return streaming_bulk(self.indexer.es, actions,
+                              chunk_size=self.bulk_size, raise_on_error=False)
+
+    def index(self, name, queryset, resume=False):
+        """
+        Send the documents of the objects of queryset. With resume, start
+        after the checkpoint of an interrupted run. Returns the number of
+        objects and the number of documents that failed.
+        """
+        checkpoint, _ = SearchIndexCheckpoint.objects.get_or_create(name=name)
+        if not resume:
+            checkpoint.last_pk = 0
+        queryset = queryset.filter(pk__gt=checkpoint.last_pk).order_by('pk')
+
+        total = queryset.count()
+        count = 0
+        errors = 0
+        for chunk in queryset_chunks(queryset, self.chunk_size):
+            for ok, item in self._bulk(self._actions(chunk)):
+                if not ok:
+                    errors += 1
+                    logger.error('Error indexing %s: %s', name, item)
+
+            count += len(chunk)
+            checkpoint.last_pk = chunk[-1].pk
+            checkpoint.save()
+            if self.progress is not None:
+                self.progress(name, count, total)
+
+        checkpoint.delete()
+        return count, errors
+
+    def index_changes(self, name, resume=False, full=False):
+        """
+        Send the objects of INDEXED_MODELS[name] edited since the watermark,
+        all of them the first time or with full. The watermark only moves
+        when every document was sent.
+        """
+        started = timezone.now()
+        queryset = INDEXED_MODELS[name].queryset()
+        watermark = SearchIndexWatermark.objects.filter(name=name).first()
+        if watermark is not None and not full:
+            queryset = queryset.filter(
+                edit_date__gte=watermark.edit_date - WATERMARK_OVERLAP)
+
+        count, errors = self.index(name, queryset, resume)
+        if not errors:
+            SearchIndexWatermark.objects.update_or_create(
+                name=name, defaults={'edit_date': started})
+        return count, errors
+
+    def delete_tombstones(self):
+        """
+        Send the deletes of the tombstones left since the watermark and
+        remove the tombstones older than TOMBSTONE_RETENTION.
+        """
+        started = timezone.now()
+        tombstones = SearchTombstone.objects.order_by('pk')
+        watermark = SearchIndexWatermark.objects.filter(
+            name=TOMBSTONES).first()
+        if watermark is not None:
+            tombstones = tombstones.filter(
+                create_date__gte=watermark.edit_date - WATERMARK_OVERLAP)
+
+        total = tombstones.count()
+        count = 0
+        errors = 0
+        for chunk in queryset_chunks(tombstones, self.chunk_size):
+            for ok, item in self._bulk(self._delete_actions(chunk)):
+                if not ok and not _is_missing_delete(item):
+                    errors += 1
+                    logger.error('Error deleting %s', item)
+            count += len(chunk)
+            if self.progress is not None:
+                self.progress(TOMBSTONES, count, total)
+
+        if not errors:
+            SearchIndexWatermark.objects.update_or_create(
+                name=TOMBSTONES, defaults={'edit_date': started})
+        SearchTombstone.objects.filter(
+            create_date__lt=started - TOMBSTONE_RETENTION).delete()
+        return count, errors
+
+    def verify(self, name):
+        """
+        Compare the number of documents per index of INDEXED_MODELS[name]
+        in the database and in Elasticsearch. Returns a list of
+        (index, database count, index count).
+        """
+        indexed_model = INDEXED_MODELS[name]
+        path = indexed_model.organization_path
+        rows = indexed_model.queryset().prefetch_related(None) \
+            .filter(**{path + '__isnull': False}).order_by() \
+            .values_list(path).annotate(count=Count('pk', distinct=True))
+
+        counts = []
+        for organization_uuid, db_count in rows:
+            index = self.indexer.index_name(organization_uuid,
+                                            indexed_model.suffix)
+            try:
+                es_count = self.indexer.es.count(index=index)['count']
+            except NotFoundError:
+                es_count = 0
+            counts.append((index, db_count, es_count))
+        return counts
+
+
+def _is_missing_delete(item):
+    """
+    Deleting a document that is not in the index is not an error.
+    """
+    result = item.get('delete')
+    return result is not None and result.get('status') == 404
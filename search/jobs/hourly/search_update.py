@@ -3,7 +3,7 @@ from django.core.management import call_command
 
 
 class SearchJob(BaseJob):
-    help = "Search index update job."
+    help = "Search index update job, sends the changes since the last run."
 
     def execute(self):
         # executing Search index update job
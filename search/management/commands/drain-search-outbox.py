@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from search.outbox import BATCH_SIZE, drain
+
+
+class Command(BaseCommand):
+    help = """
+    Send the changes queued in the search outbox to Elasticsearch.
+
+    The web processes drain the outbox after each commit unless
+    ELASTICSEARCH_OUTBOX_WORKER is off. Run this periodically in that case,
+    and to retry entries left over after Elasticsearch was unavailable.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = drain(batch_size=options['batch_size'])
+        self.stdout.write('Sent {} outbox entries'.format(count))
@@ -1,206 +1,86 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from indicators.models import Indicator, IndicatorType, CollectedData
-from workflow.models import *
-from search.models import *
-from django.db.models.fields.related import ManyToManyField, RelatedField, ManyToManyRel, ManyToOneRel, ForeignKey
+from search.indexing import BulkIndexer, INDEX_GROUPS
+from search.models import SearchIndexLog
+from search.utils import ElasticsearchIndexer
 
-from datetime import datetime
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import RequestError
-import os
 
+class Command(BaseCommand):
+    help = """
+    Start the search index process.
 
-if settings.ELASTICSEARCH_URL is not None:
-    es = Elasticsearch([settings.ELASTICSEARCH_URL])
-else:
-    es = None
-
-if settings.ELASTICSEARCH_INDEX_PREFIX is not None:
-    prefix = settings.ELASTICSEARCH_INDEX_PREFIX+'_'
-else:
-    prefix = ''
-
-"""
-Search index process command
-
-"""
-
+    Objects edited since the last run are indexed, all of them on the first
+    run or with --full, and the documents of objects deleted since the last
+    run are removed. Documents are sent with bulk requests by --workers
+    threads. An interrupted run can be continued with --resume.
 
-class Command(BaseCommand):
-    help = "Start the search index process."
+    With --verify nothing is sent, the number of documents per index in
+    the database and in Elasticsearch are compared.
+    """
 
     def add_arguments(self, parser):
-        parser.add_argument('index')
+        parser.add_argument('index', choices=list(INDEX_GROUPS))
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Bulk requests sent at the same time')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Objects read from the database at a time')
+        parser.add_argument('--bulk-size', type=int, default=500,
+                            help='Documents per bulk request')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue after the last checkpoint')
+        parser.add_argument('--full', action='store_true',
+                            help='Index all objects, not only the edited')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare the document counts only')
 
     def handle(self, *args, **options):
-        print("Starting index process...")
-        # TODO add actual index process
-        index = options['index']
+        indexer = ElasticsearchIndexer()
+        if indexer.es is None:
+            raise CommandError('Elasticsearch is not enabled')
+
+        bulk_indexer = BulkIndexer(
+            indexer, chunk_size=options['chunk_size'],
+            bulk_size=options['bulk_size'], workers=options['workers'],
+            progress=self.progress)
+        names = INDEX_GROUPS[options['index']]
+
+        if options['verify']:
+            return self.verify(bulk_indexer, names)
 
+        self.stdout.write('Starting index process...')
         update_count = 0
-        if index == '_all':
-            update_count += self.index_indicators()
-            update_count += self.index_collected_data()
-            update_count += self.index_workflows()
-        elif index == 'workflows':
-            update_count += self.index_workflows()
-        elif index == 'indicators':
-            update_count += self.index_indicators()
-        elif index == 'collected_data':
-            update_count += self.index_collected_data()
+        for name in names:
+            self.stdout.write('Updating {} index'.format(name))
+            count, errors = bulk_indexer.index_changes(
+                name, resume=options['resume'], full=options['full'])
+            if errors:
+                self.stderr.write('{} documents of {} failed'.format(
+                    errors, name))
+            update_count += count
+
+        self.stdout.write('Removing deleted documents')
+        count, errors = bulk_indexer.delete_tombstones()
+        if errors:
+            self.stderr.write('{} deletes failed'.format(errors))
 
         s = SearchIndexLog()
         s.document_count = update_count
         s.save()
 
-        print("Index process done.")
-
-    def index_workflows(self):
-        print("Updating workflowlevel1 model index")
-
-        if len(SearchIndexLog.objects.all()) != 0:
-            latest_update = SearchIndexLog.objects.latest("create_date").create_date
-
-            wf1objects = WorkflowLevel1.objects.all().filter(
-                    create_date__gte=latest_update,
-                    create_date__lte=datetime.now())
-            wf2objects = WorkflowLevel2.objects.all().filter(
-                create_date__gte=latest_update,
-                create_date__lte=datetime.now())
-
-        else:
-            wf1objects = WorkflowLevel1.objects.all()
-            wf2objects = WorkflowLevel2.objects.all()
-
-        # index workflowlevel1 objects
-        for wf1 in wf1objects:
-            # get model field data
-            data = self.get_field_data(wf1)
-
-            if wf1.organization is not None:
-                org_uuid = str(wf1.organization.organization_uuid)
-            else:
-                continue
-
-            # aggregate related models
-            data['sectors'] = list(map(lambda s: s.sector, wf1.sector.all()))
-            data['country'] = list(map(lambda c: self.get_field_data(c), wf1.country.all()))
-
-            # index data with elasticsearch
-            try:
-                es.index(index=prefix+org_uuid+"_workflow_level1", id=data['level1_uuid'], doc_type='workflow', body=data)
-            except RequestError:
-                print(wf1, "Error")
-
-        print("Updating workflowlevel2 model index")
-
-        # index workflowlevel2 objects
-        for wf2 in wf2objects:
-            # get model field data
-            data = self.get_field_data(wf2)
-
-            if wf2.workflowlevel1.organization is not None and wf2.workflowlevel1.organization is not None:
-                org_uuid = str(wf2.workflowlevel1.organization.organization_uuid)
-            else:
-                continue
-
-            # aggregate related models
-            data['sector'] = wf2.sector.sector if wf2.sector is not None else None
-
-            data['workflowlevel1'] = self.get_field_data(wf2.workflowlevel1)
-            data['indicators'] = list(map(lambda i: self.get_field_data(i), wf2.indicators.all()))
-            data['stakeholder'] = list(map(lambda s: self.get_field_data(s), wf2.stakeholder.all()))
-            data['site'] = list(map(lambda s: self.get_field_data(s), wf2.site.all()))
-
-            # index data with elasticsearch
-            try:
-                es.index(index=prefix+org_uuid+"_workflow_level2", id=data['level2_uuid'], doc_type='workflow', body=data)
-            except RequestError:
-                print(wf2, "Error")
-
-        return len(wf1objects) + len(wf2objects)
-
-    def index_collected_data(self):
-        print("Updating collected data index")
-        print(os.getenv('ELASTICSEARCH_URL'))
-
-        if len(SearchIndexLog.objects.all()) != 0:
-            latest_update = SearchIndexLog.objects.latest("create_date").create_date
-            collected_data = CollectedData.objects.all().filter(
-                    create_date__gte=latest_update,
-                    create_date__lte=datetime.now())
-        else:
-            collected_data = CollectedData.objects.all()
-
-        for d in collected_data:
-            # get model field data
-            data = self.get_field_data(d)
-
-            if d.workflowlevel1.organization is not None and d.workflowlevel1.organization is not None:
-                org_uuid = str(d.workflowlevel1.organization.organization_uuid)
-            else:
-                continue
-
-            # aggregate related models
-            di = d.indicator
-            data['indicator'] = di.name
-
-            # index data with elasticsearch
-            try:
-                es.index(index=prefix+org_uuid+"_collected_data", id=data['data_uuid'], doc_type='data_collection', body=data)
-            except RequestError:
-                print(d, "Error")
-        return len(collected_data)
-
-    def index_indicators(self):
-        print("Updating indicator index")
-
-        if len(SearchIndexLog.objects.all()) != 0:
-            latest_update = SearchIndexLog.objects.latest("create_date").create_date
-
-            indicators = Indicator.objects.all().filter(
-                    create_date__gte=latest_update,
-                    create_date__lte=datetime.now())\
-                .prefetch_related('workflowlevel1')
-        else:
-            indicators = Indicator.objects.all()
-
-        for i in indicators:
-            # get model field data
-            data = self.get_field_data(i)
-
-            for wf1 in i.workflowlevel1.all():
-                if wf1.organization is not None and wf1.organization is not None:
-                    org_uuid = str(wf1.organization.organization_uuid)
-
-                    # aggregate related models
-                    data['workflowlevel1'] = list(map(lambda w: w.name, [wf1]))
-                    # data['workflowlevel1'] = list(map(lambda w: w.name, i.workflowlevel1.all()))
-
-                    # index data with elasticsearch
-                    try:
-                        es.index(index=prefix + org_uuid + "_indicators", id=data['id'], doc_type='indicator',
-                                 body=data)
-                    except RequestError:
-                        print(i, "Error")
-                else:
-                    continue
-
-        return len(indicators)
-
-    def get_field_data(self, obj):
-        """
-        Returns all field data that is stored in a related model
-        :param obj: the object to retrieve data from
-        :return: dict of object data with field names as keys
-        """
-        data = {}
-        for f in obj._meta.get_fields():
-            if type(f) is not ManyToManyField \
-                    and type(f) is not ManyToManyRel \
-                    and type(f) is not ManyToOneRel \
-                    and type(f) is not ForeignKey \
-                    and type(f) is not RelatedField:
-                data[f.name] = getattr(obj, f.name)
-        return data
+        self.stdout.write('Index process done.')
+
+    def verify(self, bulk_indexer, names):
+        mismatches = 0
+        for name in names:
+            for index, db_count, es_count in bulk_indexer.verify(name):
+                status = 'OK'
+                if db_count != es_count:
+                    status = 'DIFF'
+                    mismatches += 1
+                self.stdout.write('{} {}: {} in the database, {} indexed'
+                                  .format(status, index, db_count, es_count))
+        if mismatches:
+            raise CommandError('{} indices differ'.format(mismatches))
+
+    def progress(self, name, count, total):
+        self.stdout.write('{}: {}/{}'.format(name, count, total))
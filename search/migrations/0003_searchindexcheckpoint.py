@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 09:11
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_searchoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_pk', models.IntegerField(default=0)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
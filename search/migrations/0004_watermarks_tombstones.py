@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 09:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_searchindexcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('edit_date', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('index', models.CharField(max_length=255)),
+                ('doc_type', models.CharField(max_length=100)),
+                ('document_id', models.CharField(max_length=255)),
+                ('create_date', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
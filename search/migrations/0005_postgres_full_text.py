@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# table: (columns of the search_vector, column of the trigram index)
+FULL_TEXT_TABLES = (
+    ('workflow_workflowlevel1', ('name', 'description'), 'name'),
+    ('workflow_workflowlevel2', ('name', 'short_name', 'description'),
+     'name'),
+    ('indicators_indicator', ('name', 'number', 'definition'), 'name'),
+    ('indicators_collecteddata', ('description', 'comment'), 'description'),
+    ('workflow_siteprofile', ('name',), 'name'),
+)
+
+
+def add_search_vectors(apps, schema_editor):
+    """
+    Only PostgreSQL has full-text search, other databases use the
+    DatabaseSearchBackend.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns, trigram_column in FULL_TEXT_TABLES:
+        document = " || ' ' || ".join(
+            "coalesce({}, '')".format(column) for column in columns)
+        schema_editor.execute(
+            'ALTER TABLE {0} ADD COLUMN search_vector tsvector'.format(table))
+        schema_editor.execute(
+            "UPDATE {0} SET search_vector = "
+            "to_tsvector('pg_catalog.simple', {1})".format(table, document))
+        schema_editor.execute(
+            'CREATE INDEX {0}_search_vector ON {0} '
+            'USING GIN (search_vector)'.format(table))
+        schema_editor.execute(
+            'CREATE INDEX {0}_{1}_trgm ON {0} '
+            'USING GIN ({1} gin_trgm_ops)'.format(table, trigram_column))
+        schema_editor.execute(
+            'CREATE TRIGGER {0}_search_vector_update '
+            'BEFORE INSERT OR UPDATE ON {0} FOR EACH ROW EXECUTE PROCEDURE '
+            "tsvector_update_trigger(search_vector, 'pg_catalog.simple', "
+            '{1})'.format(table, ', '.join(columns)))
+
+
+def remove_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table, columns, trigram_column in FULL_TEXT_TABLES:
+        schema_editor.execute(
+            'DROP TRIGGER IF EXISTS {0}_search_vector_update ON {0}'.format(
+                table))
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS {0}_{1}_trgm'.format(table, trigram_column))
+        schema_editor.execute(
+            'ALTER TABLE {0} DROP COLUMN IF EXISTS search_vector'.format(
+                table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_watermarks_tombstones'),
+        ('workflow', '0014_workflowlevel1rollup'),
+        ('indicators', '0005_organization_scope'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, remove_search_vectors),
+    ]
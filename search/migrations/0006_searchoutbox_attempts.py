@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 11:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0005_postgres_full_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchoutbox',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from django.conf import settings
 from django.contrib import admin
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from search.utils import ElasticsearchIndexer
+
 
 class SearchIndexLog(models.Model):
     create_date = models.DateTimeField(null=True, blank=True)
@@ -24,3 +27,148 @@ class SearchIndexLog(models.Model):
 class SearchIndexLogAdmin(admin.ModelAdmin):
     list_display = ('document_count',)
     display = 'Search'
+
+
+class SearchIndexCheckpoint(models.Model):
+    """
+    The last object sent per model by a run of the search-index command, so
+    an interrupted run can be resumed. Removed when the run completes.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.IntegerField(default=0)
+    edit_date = models.DateTimeField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.edit_date = timezone.now()
+        super(SearchIndexCheckpoint, self).save(*args, **kwargs)
+
+    def __unicode__(self):
+        return u'{} {}'.format(self.name, self.last_pk)
+
+
+class SearchIndexWatermark(models.Model):
+    """
+    When the search-index command last indexed a model (or sent the
+    tombstones). The next run only sends the objects edited since then.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    edit_date = models.DateTimeField()
+
+    def __unicode__(self):
+        return u'{} {}'.format(self.name, self.edit_date)
+
+
+class SearchTombstone(models.Model):
+    """
+    A document of a deleted object, written in the transaction of the
+    delete. The search-index command sends the deletes again, so documents
+    are removed even if the outbox could not send them.
+    """
+    model = models.CharField(max_length=100)
+    index = models.CharField(max_length=255)
+    doc_type = models.CharField(max_length=100)
+    document_id = models.CharField(max_length=255)
+    create_date = models.DateTimeField(db_index=True)
+
+    def save(self, *args, **kwargs):
+        if self.create_date is None:
+            self.create_date = timezone.now()
+        super(SearchTombstone, self).save(*args, **kwargs)
+
+    def __unicode__(self):
+        return u'{} {}'.format(self.index, self.document_id)
+
+
+class SearchOutboxManager(models.Manager):
+    def add_index(self, obj):
+        """
+        Queue the (re)indexing of an object. Its documents are built from
+        the row when the outbox is drained, so several saves of the object
+        are sent once.
+        """
+        if not settings.ELASTICSEARCH_ENABLED:
+            return
+        self.create(action=SearchOutbox.ACTION_INDEX,
+                    model=obj._meta.label, object_pk=obj.pk)
+        _drain_on_commit()
+
+    def add_delete(self, obj):
+        """
+        Queue the deletion of the documents of an object and leave a
+        tombstone of each. Call it before the object is deleted, the
+        documents are looked up from its relations.
+        """
+        if not settings.ELASTICSEARCH_ENABLED:
+            return
+        documents = ElasticsearchIndexer().get_documents(obj, with_body=False)
+        self.bulk_create([
+            SearchOutbox(action=SearchOutbox.ACTION_DELETE,
+                         model=obj._meta.label, object_pk=obj.pk,
+                         index=index, doc_type=doc_type,
+                         document_id=unicode(doc_id))
+            for index, doc_type, doc_id, _ in documents])
+        now = timezone.now()
+        SearchTombstone.objects.bulk_create([
+            SearchTombstone(model=obj._meta.label, index=index,
+                            doc_type=doc_type, document_id=unicode(doc_id),
+                            create_date=now)
+            for index, doc_type, doc_id, _ in documents])
+        _drain_on_commit()
+
+
+def _drain_on_commit():
+    from search.outbox import schedule_drain
+    transaction.on_commit(schedule_drain)
+
+
+class SearchOutbox(models.Model):
+    """
+    Changes to send to Elasticsearch. Rows are written in the transaction
+    of the model change and sent by search.outbox.drain once it commits.
+    """
+    ACTION_INDEX = 'index'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = (
+        (ACTION_INDEX, 'Index'),
+        (ACTION_DELETE, 'Delete'),
+    )
+
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    model = models.CharField(max_length=100)
+    object_pk = models.IntegerField()
+    # the document of a delete, the object does not exist anymore
+    index = models.CharField(max_length=255, blank=True)
+    doc_type = models.CharField(max_length=100, blank=True)
+    document_id = models.CharField(max_length=255, blank=True)
+    # drains in which Elasticsearch rejected the documents of the entry
+    attempts = models.IntegerField(default=0)
+    create_date = models.DateTimeField(null=True, blank=True)
+
+    objects = SearchOutboxManager()
+
+    class Meta:
+        ordering = ('id',)
+
+    def save(self, *args, **kwargs):
+        if self.create_date is None:
+            self.create_date = timezone.now()
+        super(SearchOutbox, self).save(*args, **kwargs)
+
+    @property
+    def key(self):
+        """
+        Entries with the same key are sent once.
+        """
+        if self.action == self.ACTION_INDEX:
+            return self.action, self.model, self.object_pk
+        return self.action, self.index, self.doc_type, self.document_id
+
+    def __unicode__(self):
+        return u'{} {} {}'.format(self.action, self.model, self.object_pk)
+
+
+class SearchOutboxAdmin(admin.ModelAdmin):
+    list_display = ('action', 'model', 'object_pk', 'index', 'attempts',
+                    'create_date')
+    list_filter = ('action', 'model')
+    display = 'Search Outbox'
@@ -0,0 +1,162 @@
+"""
+Sends the changes queued in SearchOutbox to Elasticsearch.
+
+Models queue their changes in the transaction that writes them, see
+SearchOutboxManager. When the transaction commits, the search-outbox worker
+of the process (see tola.worker) drains the outbox: repeated changes of the same document are
+coalesced and the rest is sent with bulk requests. Entries that could not be
+sent stay in the outbox for the next drain, which can also be run with the
+drain-search-outbox command (e.g. when ELASTICSEARCH_OUTBOX_WORKER is off).
+So do the entries of documents Elasticsearch rejected, until they failed
+ELASTICSEARCH_OUTBOX_MAX_ATTEMPTS drains.
+
+Two processes draining at the same time may send a change twice. Index and
+delete requests are idempotent, so that is harmless.
+"""
+import logging
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from elasticsearch.exceptions import TransportError
+
+from search.models import SearchOutbox
+from search.utils import ElasticsearchIndexer
+from tola.worker import wake
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _coalesce(entries):
+    """
+    Keep the last entry of every key, in the order of the last entries.
+    """
+    coalesced = OrderedDict()
+    for entry in entries:
+        coalesced.pop(entry.key, None)
+        coalesced[entry.key] = entry
+    return coalesced.values()
+
+
+def _load_objects(entries):
+    """
+    Return {(model, pk): object} of the entries to index. Deleted objects
+    are left out.
+    """
+    pks_by_model = {}
+    for entry in entries:
+        if entry.action == SearchOutbox.ACTION_INDEX:
+            pks_by_model.setdefault(entry.model, []).append(entry.object_pk)
+
+    objects = {}
+    for label, pks in pks_by_model.items():
+        model = apps.get_model(label)
+        for pk, obj in model.objects.in_bulk(pks).items():
+            objects[(label, pk)] = obj
+    return objects
+
+
+def _bulk_body(indexer, entries):
+    """
+    Returns the body of the bulk request of entries and the entry of each
+    of its actions.
+    """
+    body = []
+    actions = []
+    objects = _load_objects(entries)
+    for entry in entries:
+        if entry.action == SearchOutbox.ACTION_DELETE:
+            body.append({'delete': {'_index': entry.index,
+                                    '_type': entry.doc_type,
+                                    '_id': entry.document_id}})
+            actions.append(entry)
+            continue
+
+        obj = objects.get((entry.model, entry.object_pk))
+        if obj is None:
+            continue
+        for index, doc_type, doc_id, data in indexer.get_documents(obj):
+            body.append({'index': {'_index': index, '_type': doc_type,
+                                   '_id': doc_id}})
+            body.append(data)
+            actions.append(entry)
+    return body, actions
+
+
+def _failed_entries(response, actions):
+    """
+    Returns the entries of the actions Elasticsearch rejected, logging the
+    errors. Deleting a missing document is no error.
+    """
+    failed = OrderedDict()
+    for item, entry in zip(response.get('items', []), actions):
+        for action, result in item.items():
+            if action == 'delete' and result.get('status') == 404:
+                continue
+            if result.get('error'):
+                logger.error('Error on %s of %s/%s in Elasticsearch: %s',
+                             action, result.get('_index'), result.get('_id'),
+                             result['error'])
+                failed[entry.id] = entry
+    return failed.values()
+
+
+def drain(indexer=None, batch_size=BATCH_SIZE):
+    """
+    Send the outbox to Elasticsearch in batches of batch_size entries.
+    Returns the number of entries sent. The entries Elasticsearch rejected
+    are kept for the next drain, with one more attempt.
+    """
+    if indexer is None:
+        indexer = ElasticsearchIndexer()
+    if indexer.es is None:
+        return 0
+    max_attempts = getattr(settings, 'ELASTICSEARCH_OUTBOX_MAX_ATTEMPTS', 5)
+
+    sent = 0
+    last_id = 0
+    while True:
+        # the kept entries are left for the next drain
+        entries = list(SearchOutbox.objects.filter(id__gt=last_id)
+                       .order_by('id')[:batch_size])
+        if not entries:
+            break
+        last_id = entries[-1].id
+
+        failed = []
+        body, actions = _bulk_body(indexer, _coalesce(entries))
+        if body:
+            try:
+                response = indexer.es.bulk(body=body)
+            except TransportError:
+                logger.error('Error sending the search outbox', exc_info=True)
+                break
+            failed = _failed_entries(response, actions)
+
+        kept = []
+        for entry in failed:
+            if entry.attempts + 1 < max_attempts:
+                kept.append(entry.id)
+            else:
+                logger.error('Dropped %s from the search outbox after %s '
+                             'attempts', entry, entry.attempts + 1)
+        SearchOutbox.objects.filter(id__in=kept)\
+            .update(attempts=F('attempts') + 1)
+        SearchOutbox.objects.filter(
+            id__in=[entry.id for entry in entries])\
+            .exclude(id__in=kept).delete()
+        sent += len(entries) - len(failed)
+        if len(entries) < batch_size:
+            break
+    return sent
+
+
+def schedule_drain():
+    """
+    Wake up the outbox worker of the process, used as on_commit callback.
+    """
+    if getattr(settings, 'ELASTICSEARCH_OUTBOX_WORKER', True):
+        wake('search-outbox', drain)
@@ -0,0 +1,64 @@
+from elasticsearch.exceptions import ConnectionError
+from elasticsearch.serializer import JSONSerializer
+
+
+class FakeTransport(object):
+    serializer = JSONSerializer()
+
+
+class FakeIndices(object):
+    def __init__(self):
+        self.mappings = {}
+
+    def create(self, index, body=None, **kwargs):
+        self.mappings[index] = body['mappings']
+
+
+class FakeElasticsearch(object):
+    """
+    Records the bulk requests instead of sending them. The bulk helpers of
+    elasticsearch send the body serialized, the outbox as list.
+    """
+    transport = FakeTransport()
+
+    def __init__(self, fail=False, reject=()):
+        self.fail = fail
+        # ids of the documents of which the actions fail
+        self.reject = reject
+        self.requests = []
+        self.indices = FakeIndices()
+
+    def bulk(self, body, **kwargs):
+        if self.fail:
+            raise ConnectionError('N/A', 'Connection refused', None)
+        if isinstance(body, basestring):
+            body = [self.transport.serializer.loads(line)
+                    for line in body.splitlines() if line]
+        self.requests.append(body)
+        items = [{action: dict(meta, status=400, error='Rejected')
+                  if str(meta['_id']) in self.reject
+                  else dict(meta, status=200)}
+                 for line in body for action, meta in line.items()
+                 if action in ('index', 'delete')]
+        return {'errors': any('error' in item.values()[0] for item in items),
+                'items': items}
+
+    def count(self, index, **kwargs):
+        """
+        Documents of index after the recorded requests.
+        """
+        documents = set()
+        for action, action_index, doc_id in self.actions():
+            if action_index != index:
+                continue
+            if action == 'index':
+                documents.add(doc_id)
+            else:
+                documents.discard(doc_id)
+        return {'count': len(documents)}
+
+    def actions(self):
+        return [(action, meta['_index'], meta['_id'])
+                for body in self.requests for line in body
+                for action, meta in line.items()
+                if action in ('index', 'delete')]
@@ -0,0 +1,84 @@
+import json
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, tag
+from mock import patch
+from rest_framework.test import APIRequestFactory
+
+import factories
+from indicators.models import Indicator
+from search import views
+from search.backends import (DatabaseSearchBackend, PostgresSearchBackend,
+                             get_search_backend)
+from workflow.models import ROLE_PROGRAM_ADMIN, WorkflowTeam
+
+
+@tag('pkg')
+class DatabaseSearchBackendTest(TestCase):
+    def setUp(self):
+        self.tola_user = factories.TolaUser()
+        self.organization = self.tola_user.organization
+        self.wflvl1 = factories.WorkflowLevel1(
+            name='Water supply', organization=self.organization)
+        self.other_wflvl1 = factories.WorkflowLevel1(
+            name='Water and sanitation', organization=self.organization)
+        self.indicator = factories.Indicator(
+            name='Wells built', workflowlevel1=[self.wflvl1])
+        factories.Indicator(name='Latrines built',
+                            workflowlevel1=[self.other_wflvl1])
+        self.backend = DatabaseSearchBackend()
+
+    def test_get_search_backend(self):
+        self.assertIsInstance(get_search_backend(), DatabaseSearchBackend)
+
+    def test_filter(self):
+        indicators = self.backend.filter(Indicator.objects.all(),
+                                         'indicators', 'WELLS')
+        self.assertEqual(list(indicators), [self.indicator])
+
+    def test_search(self):
+        count, rows = self.backend.search(
+            'workflow_level1', 'water', self.organization.pk)
+        self.assertEqual(count, 2)
+
+        count, rows = self.backend.search(
+            'workflow_level1', 'water', self.organization.pk,
+            program_ids=[self.wflvl1.id])
+        self.assertEqual(count, 1)
+        self.assertEqual(rows[0]['name'], 'Water supply')
+
+        count, rows = self.backend.search(
+            'workflow_level1', 'water', factories.Organization(
+                name='Other').pk)
+        self.assertEqual(count, 0)
+
+    def test_search_view(self):
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user, workflowlevel1=self.wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_ADMIN))
+        request = APIRequestFactory().get('/search/get/all/built')
+        request.user = self.tola_user.user
+        with patch.object(views, 'es', None):
+            response = views.search(request, 'all', 'built')
+
+        results = json.loads(response.content)
+        self.assertEqual(results['total'], 1)
+        self.assertEqual(results['counts']['indicators'], 1)
+        self.assertEqual(results['indicators'][0]['_id'], self.indicator.id)
+
+
+@tag('pkg')
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class PostgresSearchBackendTest(TestCase):
+    def setUp(self):
+        self.indicator = factories.Indicator(
+            name='Wells built', sector=factories.Sector(sector='Water'))
+        factories.Indicator(name='Latrines built')
+        self.backend = PostgresSearchBackend()
+
+    def test_filter(self):
+        for term in ('wells', 'WATER'):
+            indicators = self.backend.filter(Indicator.objects.all(),
+                                             'indicators', term)
+            self.assertEqual(list(indicators), [self.indicator])
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings, tag
+
+import factories
+from search import utils
+from search.documents import get_extractor, get_mapping
+from search.tests.fakes import FakeElasticsearch
+from search.utils import ElasticsearchIndexer
+from workflow.models import WorkflowLevel2
+
+
+@tag('pkg')
+class DocumentsTest(TestCase):
+    def test_extractor(self):
+        wflvl2 = factories.WorkflowLevel2(
+            total_estimated_budget=Decimal('15.50'), actual_cost=0)
+        extractor = get_extractor(WorkflowLevel2)
+        self.assertIs(get_extractor(WorkflowLevel2), extractor)
+
+        data = extractor(wflvl2)
+        self.assertEqual(data['total_estimated_budget'], 15.5)
+        self.assertEqual(data['create_date'], wflvl2.create_date.isoformat())
+        self.assertEqual(data['level2_uuid'], unicode(wflvl2.level2_uuid))
+        self.assertNotIn('workflowlevel1', data)
+        self.assertNotIn('workflowlevel1_id', data)
+
+    def test_mapping(self):
+        properties = get_mapping('_workflow_level2')['workflow']['properties']
+        self.assertEqual(properties['total_estimated_budget'],
+                         {'type': 'double'})
+        self.assertEqual(properties['create_date'], {'type': 'date'})
+        self.assertEqual(properties['workflowlevel1_ids'], {'type': 'long'})
+        self.assertIn('name',
+                      properties['workflowlevel1']['properties'])
+        self.assertRaises(ValueError, get_mapping, '_unknown')
+
+    @override_settings(ELASTICSEARCH_ENABLED=True,
+                       ELASTICSEARCH_INDEX_PREFIX=None)
+    def test_index_created_with_mapping(self):
+        self.addCleanup(utils._created_indices.clear)
+        es = FakeElasticsearch()
+        indexer = ElasticsearchIndexer(es=es)
+        wflvl1 = factories.WorkflowLevel1(
+            organization=factories.Organization())
+
+        indexer.get_documents(wflvl1, with_body=False)
+        self.assertEqual(es.indices.mappings, {})
+
+        index = indexer.get_documents(wflvl1)[0][0]
+        self.assertEqual(es.indices.mappings,
+                         {index: get_mapping('_workflow_level1')})
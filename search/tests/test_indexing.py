@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import factories
+from search.indexing import BulkIndexer, INDEXED_MODELS
+from search.models import (SearchIndexCheckpoint, SearchIndexWatermark,
+                           SearchTombstone)
+from search.tests.fakes import FakeElasticsearch
+from search.utils import ElasticsearchIndexer
+from workflow.models import WorkflowLevel2
+
+
+@tag('pkg')
+@override_settings(ELASTICSEARCH_ENABLED=True, ELASTICSEARCH_INDEX_PREFIX=None)
+class BulkIndexerTest(TestCase):
+    def setUp(self):
+        self.es = FakeElasticsearch()
+        self.indexer = ElasticsearchIndexer(es=self.es)
+        self.wflvl1 = factories.WorkflowLevel1(
+            organization=factories.Organization())
+        self.wflvl2s = factories.WorkflowLevel2.create_batch(
+            5, workflowlevel1=self.wflvl1)
+
+    def _index(self, name, workers=1, **kwargs):
+        progress = []
+        bulk_indexer = BulkIndexer(
+            self.indexer, chunk_size=2, bulk_size=2, workers=workers,
+            progress=lambda *args: progress.append(args))
+        result = bulk_indexer.index(name, INDEXED_MODELS[name].queryset(),
+                                    **kwargs)
+        return result, progress
+
+    def test_index(self):
+        result, progress = self._index('workflowlevel2')
+        self.assertEqual(result, (5, 0))
+        self.assertEqual(progress, [('workflowlevel2', 2, 5),
+                                    ('workflowlevel2', 4, 5),
+                                    ('workflowlevel2', 5, 5)])
+        self.assertEqual(len(self.es.requests), 3)
+        self.assertEqual(
+            sorted(doc_id for _, _, doc_id in self.es.actions()),
+            sorted(str(wflvl2.level2_uuid) for wflvl2 in self.wflvl2s))
+        self.assertFalse(SearchIndexCheckpoint.objects.exists())
+
+    def test_index_parallel(self):
+        result, _ = self._index('workflowlevel2', workers=3)
+        self.assertEqual(result, (5, 0))
+        self.assertEqual(len(self.es.actions()), 5)
+
+    def test_resume(self):
+        SearchIndexCheckpoint.objects.create(
+            name='workflowlevel2', last_pk=self.wflvl2s[2].pk)
+        result, _ = self._index('workflowlevel2', resume=True)
+        self.assertEqual(result, (2, 0))
+        self.assertEqual(
+            [doc_id for _, _, doc_id in self.es.actions()],
+            [str(wflvl2.level2_uuid) for wflvl2 in self.wflvl2s[3:]])
+
+    def test_queries_per_chunk(self):
+        bulk_indexer = BulkIndexer(self.indexer, chunk_size=100, workers=1)
+        with CaptureQueriesContext(connection) as queries:
+            bulk_indexer.index('workflowlevel2',
+                               INDEXED_MODELS['workflowlevel2'].queryset())
+        count = len(queries)
+
+        factories.WorkflowLevel2.create_batch(5, workflowlevel1=self.wflvl1)
+        with CaptureQueriesContext(connection) as queries:
+            bulk_indexer.index('workflowlevel2',
+                               INDEXED_MODELS['workflowlevel2'].queryset())
+        self.assertEqual(len(queries), count)
+
+    def test_index_changes(self):
+        bulk_indexer = BulkIndexer(self.indexer, workers=1)
+        self.assertEqual(bulk_indexer.index_changes('workflowlevel2'), (5, 0))
+        self.assertTrue(SearchIndexWatermark.objects.filter(
+            name='workflowlevel2').exists())
+
+        WorkflowLevel2.objects.update(
+            edit_date=timezone.now() - timedelta(days=1))
+        self.wflvl2s[0].save()
+        self.assertEqual(bulk_indexer.index_changes('workflowlevel2'), (1, 0))
+        self.assertEqual(bulk_indexer.index_changes(
+            'workflowlevel2', full=True), (5, 0))
+
+    def test_delete_tombstones(self):
+        bulk_indexer = BulkIndexer(self.indexer, workers=1)
+        old = SearchTombstone.objects.create(
+            model='workflow.WorkflowLevel2', index='old', doc_type='workflow',
+            document_id='old', create_date=timezone.now() - timedelta(days=90))
+        self.wflvl2s[0].delete()
+
+        self.assertEqual(bulk_indexer.delete_tombstones(), (2, 0))
+        self.assertIn(('delete', self.indexer.index_name(
+            self.wflvl1.organization.organization_uuid, '_workflow_level2'),
+            str(self.wflvl2s[0].level2_uuid)), self.es.actions())
+        self.assertFalse(SearchTombstone.objects.filter(pk=old.pk).exists())
+        self.assertEqual(SearchTombstone.objects.count(), 1)
+
+    def test_verify(self):
+        bulk_indexer = BulkIndexer(self.indexer, workers=1)
+        index = self.indexer.index_name(
+            self.wflvl1.organization.organization_uuid, '_workflow_level2')
+        self.assertEqual(bulk_indexer.verify('workflowlevel2'),
+                         [(index, 5, 0)])
+        bulk_indexer.index_changes('workflowlevel2')
+        self.assertEqual(bulk_indexer.verify('workflowlevel2'),
+                         [(index, 5, 5)])
+
+    @override_settings(ELASTICSEARCH_ENABLED=False)
+    def test_command_disabled(self):
+        self.assertRaises(CommandError, call_command, 'search-index', '_all')
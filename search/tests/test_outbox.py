@@ -0,0 +1,118 @@
+import logging
+
+from django.test import TestCase, override_settings, tag
+
+import factories
+from search import outbox
+from search.models import SearchOutbox, SearchTombstone
+from search.tests.fakes import FakeElasticsearch
+from search.utils import ElasticsearchIndexer
+from workflow.models import WorkflowLevel1
+
+
+@tag('pkg')
+@override_settings(ELASTICSEARCH_ENABLED=True, ELASTICSEARCH_INDEX_PREFIX=None)
+class SearchOutboxTest(TestCase):
+    def setUp(self):
+        self.es = FakeElasticsearch()
+        self.indexer = ElasticsearchIndexer(es=self.es)
+        self.organization = factories.Organization()
+        self.index_prefix = str(self.organization.organization_uuid)
+        self.wflvl1 = factories.WorkflowLevel1(organization=self.organization)
+
+    def test_save_adds_to_outbox(self):
+        self.wflvl1.name = 'Changed'
+        self.wflvl1.save()
+        self.assertEqual(
+            list(SearchOutbox.objects.values_list('action', 'model',
+                                                  'object_pk'))[-1],
+            (SearchOutbox.ACTION_INDEX, 'workflow.WorkflowLevel1',
+             self.wflvl1.pk))
+
+    @override_settings(ELASTICSEARCH_ENABLED=False)
+    def test_disabled(self):
+        SearchOutbox.objects.all().delete()
+        self.wflvl1.save()
+        self.assertFalse(SearchOutbox.objects.exists())
+
+    def test_drain_coalesces_updates(self):
+        for _ in range(3):
+            self.wflvl1.save()
+        wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1)
+        count = SearchOutbox.objects.count()
+
+        self.assertEqual(outbox.drain(self.indexer), count)
+        self.assertEqual(len(self.es.requests), 1)
+        self.assertEqual(self.es.actions(), [
+            ('index', self.index_prefix + '_workflow_level1',
+             str(self.wflvl1.level1_uuid)),
+            ('index', self.index_prefix + '_workflow_level2',
+             str(wflvl2.level2_uuid)),
+        ])
+        self.assertEqual(self.es.requests[0][1]['name'], self.wflvl1.name)
+        self.assertEqual(self.es.requests[0][3]['workflowlevel1_ids'],
+                         [self.wflvl1.id])
+        self.assertFalse(SearchOutbox.objects.exists())
+
+    def test_drain_delete(self):
+        indicator = factories.Indicator(workflowlevel1=[self.wflvl1])
+        indicator_id = indicator.id
+        outbox.drain(self.indexer)
+
+        indicator.save()
+        indicator.delete()
+        outbox.drain(self.indexer)
+
+        # the index entry of the deleted indicator is skipped
+        self.assertEqual(self.es.actions()[-1:], [
+            ('delete', self.index_prefix + '_indicators', str(indicator_id)),
+        ])
+        self.assertFalse(SearchOutbox.objects.exists())
+
+    def test_cascading_delete(self):
+        wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1)
+        wflvl1_uuid, wflvl2_uuid = self.wflvl1.level1_uuid, wflvl2.level2_uuid
+        outbox.drain(self.indexer)
+
+        WorkflowLevel1.objects.filter(pk=self.wflvl1.pk).delete()
+        self.assertEqual(SearchTombstone.objects.count(), 2)
+        outbox.drain(self.indexer)
+        self.assertEqual(sorted(self.es.actions()[-2:]), [
+            ('delete', self.index_prefix + '_workflow_level1',
+             str(wflvl1_uuid)),
+            ('delete', self.index_prefix + '_workflow_level2',
+             str(wflvl2_uuid)),
+        ])
+
+    def test_drain_batches(self):
+        factories.WorkflowLevel1.create_batch(
+            4, organization=self.organization)
+        count = SearchOutbox.objects.count()
+        self.assertEqual(outbox.drain(self.indexer, batch_size=2), count)
+        self.assertEqual(len(self.es.requests), (count + 1) // 2)
+        self.assertEqual(len(set(self.es.actions())), 5)
+
+    @override_settings(ELASTICSEARCH_OUTBOX_MAX_ATTEMPTS=2)
+    def test_drain_keeps_rejected_entries(self):
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1)
+        indexer = ElasticsearchIndexer(es=FakeElasticsearch(
+            reject=[str(wflvl2.level2_uuid)]))
+        count = SearchOutbox.objects.count()
+
+        self.assertEqual(outbox.drain(indexer), count - 1)
+        entry = SearchOutbox.objects.get()
+        self.assertEqual((entry.model, entry.object_pk, entry.attempts),
+                         ('workflow.WorkflowLevel2', wflvl2.pk, 1))
+
+        self.assertEqual(outbox.drain(indexer), 0)
+        self.assertFalse(SearchOutbox.objects.exists())
+
+    def test_drain_keeps_entries_on_error(self):
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        indexer = ElasticsearchIndexer(es=FakeElasticsearch(fail=True))
+        count = SearchOutbox.objects.count()
+        self.assertEqual(outbox.drain(indexer), 0)
+        self.assertEqual(SearchOutbox.objects.count(), count)
@@ -6,6 +6,7 @@ from django.test import TestCase, tag
 
 import factories
 from indicators.models import Indicator
+from search import outbox
 from search.exceptions import ValueNotFoundError
 from search.utils import ElasticsearchIndexer
 from workflow.models import Organization, WorkflowLevel1, WorkflowLevel2
@@ -37,6 +38,7 @@ class ElasticsearchIndexerTest(TestCase):
         org = Organization.objects.create(organization_uuid="not-existing-uuid")
         wflvl1 = factories.WorkflowLevel1(organization=org)
         indicator = factories.Indicator(workflowlevel1=[wflvl1])
+        outbox.drain(self.indexer)
         self.indexer.delete_indicator(indicator)
 
         self.assertRaises(ValueNotFoundError, self.indexer.delete_indicator, indicator)
@@ -44,16 +46,19 @@ class ElasticsearchIndexerTest(TestCase):
     def test_create_and_delete_workflowlevel1(self):
         org = Organization.objects.create(organization_uuid="index-workflowlevel1-test")
         wflvl1 = factories.WorkflowLevel1(organization=org)
+        outbox.drain(self.indexer)
         self.indexer.delete_workflowlevel1(wflvl1)
 
     def test_create_and_delete_workflowlevel2(self):
         org = Organization.objects.create(organization_uuid="index-workflowlevel2-test")
         wflvl1 = factories.WorkflowLevel1(organization=org)
         wflvl2 = factories.WorkflowLevel2(workflowlevel1=wflvl1)
+        outbox.drain(self.indexer)
         self.indexer.delete_workflowlevel2(wflvl2)
 
     def test_create_and_delete_collecteddata(self):
         org = Organization.objects.create(organization_uuid="index-collecteddata-test")
         wflvl1 = factories.WorkflowLevel1(organization=org)
         collecteddata = factories.CollectedData(workflowlevel1=wflvl1)
+        outbox.drain(self.indexer)
         self.indexer.delete_collecteddata(collecteddata)
@@ -0,0 +1,76 @@
+import json
+
+from django.test import TestCase, tag
+from mock import Mock, patch
+from rest_framework.test import APIRequestFactory
+
+import factories
+from search import views
+from workflow.models import (ROLE_ORGANIZATION_ADMIN, ROLE_PROGRAM_ADMIN,
+                             WorkflowTeam)
+
+
+@tag('pkg')
+class SearchViewTest(TestCase):
+    def setUp(self):
+        self.tola_user = factories.TolaUser()
+        self.wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        WorkflowTeam.objects.create(
+            workflow_user=self.tola_user, workflowlevel1=self.wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_ADMIN))
+
+        prefix = str(self.tola_user.organization.organization_uuid) + '_'
+        self.es = Mock()
+        self.es.search.return_value = {
+            "hits": {"total": 12, "hits": [
+                {"_index": prefix + "workflow_level1", "_source": {},
+                 "highlight": {"name": ["<em>Health</em>"]}},
+                {"_index": prefix + "indicators", "_source": {}},
+            ]},
+            "aggregations": {"types": {"buckets": [
+                {"key": prefix + "workflow_level1", "doc_count": 10},
+                {"key": prefix + "indicators", "doc_count": 2},
+            ]}},
+        }
+        patcher = patch.object(views, 'es', self.es)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, url='/search/get/all/health'):
+        request = APIRequestFactory().get(url)
+        request.user = self.tola_user.user
+        response = views.search(request, 'all', 'health')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_search(self):
+        results = self._search('/search/get/all/health?from=20&size=500')
+        self.assertEqual(results['total'], 12)
+        self.assertEqual(results['counts'], {
+            'workflowlevel1': 10, 'workflowlevel2': 0, 'indicators': 2,
+            'collected_data': 0})
+        self.assertEqual(len(results['workflowlevel1']), 1)
+        self.assertEqual(results['workflowlevel1'][0]['highlight'],
+                         {'name': ['<em>Health</em>']})
+        self.assertEqual(len(results['indicators']), 1)
+
+        body = self.es.search.call_args[1]['body']
+        self.assertEqual(body['from'], 20)
+        self.assertEqual(body['size'], views.MAX_PAGE_SIZE)
+        self.assertEqual(body['query']['bool']['filter'],
+                         {'terms': {'workflowlevel1_ids': [self.wflvl1.id]}})
+
+    def test_search_result_window(self):
+        results = self._search('/search/get/all/health?from=20000&size=50')
+        self.assertEqual((results['from'], results['size']), (9950, 50))
+        body = self.es.search.call_args[1]['body']
+        self.assertEqual(body['from'] + body['size'],
+                         views.MAX_RESULT_WINDOW)
+
+    def test_search_org_admin(self):
+        self.tola_user.user.groups.add(
+            factories.Group(name=ROLE_ORGANIZATION_ADMIN))
+        self._search()
+        body = self.es.search.call_args[1]['body']
+        self.assertNotIn('filter', body['query']['bool'])
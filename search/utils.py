@@ -2,15 +2,17 @@ import logging
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db.models.fields.related import ManyToManyField, RelatedField, ManyToManyRel, ManyToOneRel, ForeignKey
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import RequestError, NotFoundError
 
+from search.documents import INDEX_SUFFIXES, get_extractor, get_mapping
 from search.exceptions import ValueNotFoundError
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+_created_indices = set()
+
 
 class ElasticsearchIndexer:
     """
@@ -19,14 +21,24 @@ class ElasticsearchIndexer:
 
     To separate indices of different servers a prefix can be defined in
     settings.
+
+    Every document has the ids of the programs giving access to it in
+    workflowlevel1_ids, the search view filters on them.
+
+    Models don't call the index methods directly anymore, their changes go
+    through the outbox, see search.outbox. An Elasticsearch client can be
+    passed in instead of the one configured in settings (e.g. in tests).
     """
     es = None
+    prefix = ''
 
-    def __init__(self):
+    def __init__(self, es=None):
         if not settings.ELASTICSEARCH_ENABLED:
             return
 
-        if settings.ELASTICSEARCH_URL is not None:
+        if es is not None:
+            self.es = es
+        elif settings.ELASTICSEARCH_URL is not None:
             self.es = Elasticsearch([settings.ELASTICSEARCH_URL], timeout=30,
                                     max_retries=10, retry_on_timeout=True)
 
@@ -35,155 +47,163 @@ class ElasticsearchIndexer:
         else:
             self.prefix = ''
 
-    def index_indicator(self, indicator):
-        if self.es is None:
-            return
-
-        data = self.get_field_data(indicator)
-
+    def get_documents(self, obj, with_body=True):
+        """
+        Returns the documents of an indicator, workflowlevel 1 or 2 or
+        collecteddata object as (index, doc_type, id, body) tuples. Objects
+        without organization have no documents.
+        :param with_body: build the document bodies, not needed to delete.
+            The indices of the bodies are created if needed.
+        """
+        get_documents = getattr(self, '_{}_documents'.format(
+            obj._meta.model_name))
+        documents = get_documents(obj, with_body)
+        if with_body:
+            for index, _, _, _ in documents:
+                self.ensure_index(index)
+        return documents
+
+    def index_name(self, organization_uuid, suffix):
+        return self.prefix + str(organization_uuid) + suffix
+
+    def _indicator_documents(self, indicator, with_body):
+        documents = []
         for wf1 in indicator.workflowlevel1.all():
-            if wf1.organization is not None and wf1.organization is not None:
-                org_uuid = str(wf1.organization.organization_uuid)
-
-                # aggregate related models
-                data['workflowlevel1'] = list(map(lambda w: w.name, [wf1]))
-
-                # index data with elasticsearch
-                try:
-                    self.es.index(index=self.prefix + org_uuid + "_indicators",
-                                  id=data['id'], doc_type='indicator',
-                                  body=data)
-                except RequestError:
-                    logger.error('Error indexing indicator', exc_info=True)
-            else:
+            if wf1.organization is None:
                 continue
 
-    def delete_indicator(self, indicator):
-        if self.es is None:
-            return
-        try:
-            for org_uuid in indicator.workflowlevel1.values_list('organization__organization_uuid'):
-                org_uuid = str(org_uuid[0])
-                self.es.delete(index=self.prefix + org_uuid + "_indicators", id=indicator.id, doc_type='indicator')
-        except NotFoundError:
-            logger.warning('Indicator not found in Elasticsearch', exc_info=True)
-            raise ValueNotFoundError
+            body = None
+            if with_body:
+                body = self.get_field_data(indicator)
+                # aggregate related models
+                body['workflowlevel1'] = [wf1.name]
+                body['workflowlevel1_ids'] = [w.id for w in indicator.workflowlevel1.all()]
 
-    def index_workflowlevel1(self, wf):
-        if self.es is None:
-            return
+            documents.append((self.index_name(wf1.organization.organization_uuid, "_indicators"),
+                              'indicator', indicator.id, body))
+        return documents
 
-        if wf.organization is not None:
-            org_uuid = str(wf.organization.organization_uuid)
+    def _workflowlevel1_documents(self, wf, with_body):
+        if wf.organization is None:
+            return []
 
+        body = None
+        if with_body:
+            body = self.get_field_data(wf)
             # aggregate related models
-            data = self.get_field_data(wf)
+            body['sectors'] = [s.sector for s in wf.sector.all()]
+            body['country'] = [self.get_field_data(c) for c in wf.country.all()]
+            body['workflowlevel1_ids'] = [wf.id]
+
+        return [(self.index_name(wf.organization.organization_uuid, "_workflow_level1"),
+                 'workflow', wf.level1_uuid, body)]
 
+    def _workflowlevel2_documents(self, wf, with_body):
+        if wf.workflowlevel1.organization is None:
+            return []
+
+        body = None
+        if with_body:
+            body = self.get_field_data(wf)
+            # aggregate related models
+            body['sector'] = wf.sector.sector if wf.sector is not None else None
+            body['workflowlevel1'] = self.get_field_data(wf.workflowlevel1)
+            body['indicators'] = [self.get_field_data(i) for i in wf.indicators.all()]
+            body['stakeholder'] = [self.get_field_data(s) for s in wf.stakeholder.all()]
+            body['site'] = [self.get_field_data(s) for s in wf.site.all()]
+            body['workflowlevel1_ids'] = [wf.workflowlevel1_id]
+
+        return [(self.index_name(wf.workflowlevel1.organization.organization_uuid, "_workflow_level2"),
+                 'workflow', wf.level2_uuid, body)]
+
+    def _collecteddata_documents(self, d, with_body):
+        if d.workflowlevel1 is None or d.workflowlevel1.organization is None:
+            return []
+
+        body = None
+        if with_body:
+            body = self.get_field_data(d)
             # aggregate related models
-            data['sectors'] = list(map(lambda s: s.sector, wf.sector.all()))
-            data['country'] = list(map(lambda c: self.get_field_data(c), wf.country.all()))
+            body['indicator'] = d.indicator.name
+            # the programs of the indicator give access to its data too
+            body['workflowlevel1_ids'] = sorted(
+                set([d.workflowlevel1_id]) |
+                set(w.id for w in d.indicator.workflowlevel1.all()))
 
-            # index data with elasticsearch
-            try:
-                self.es.index(index=self.prefix + org_uuid + "_workflow_level1", id=data['level1_uuid'], doc_type='workflow', body=data)
-            except RequestError:
-                logger.error('Error indexing workflowlevel1', exc_info=True)
+        return [(self.index_name(d.workflowlevel1.organization.organization_uuid, "_collected_data"),
+                 'data_collection', d.data_uuid, body)]
 
-    def index_workflowlevel2(self, wf):
+    def _index_documents(self, obj, name):
         if self.es is None:
             return
 
-        if wf.workflowlevel1.organization is not None and wf.workflowlevel1.organization is not None:
-            org_uuid = str(wf.workflowlevel1.organization.organization_uuid)
-
-            # get model field data
-            data = self.get_field_data(wf)
-
-            # aggregate related models
-            data['sector'] = wf.sector.sector if wf.sector is not None else None
-
-            data['workflowlevel1'] = self.get_field_data(wf.workflowlevel1)
-            data['indicators'] = list(map(lambda i: self.get_field_data(i), wf.indicators.all()))
-            data['stakeholder'] = list(map(lambda s: self.get_field_data(s), wf.stakeholder.all()))
-            data['site'] = list(map(lambda s: self.get_field_data(s), wf.site.all()))
-
+        for index, doc_type, doc_id, body in self.get_documents(obj):
             # index data with elasticsearch
             try:
-                self.es.index(index=self.prefix + org_uuid + "_workflow_level2", id=data['level2_uuid'], doc_type='workflow', body=data)
+                self.es.index(index=index, id=doc_id, doc_type=doc_type, body=body)
             except RequestError:
-                logger.error('Error indexing workflowlevel2', exc_info=True)
+                logger.error('Error indexing %s', name, exc_info=True)
 
-    def delete_workflowlevel1(self, wf):
+    def _delete_documents(self, obj, name):
         if self.es is None:
             return
 
         try:
-            if wf.organization is not None and wf.organization is not None:
-                org_uuid = str(wf.organization.organization_uuid)
-
-                self.es.delete(index=self.prefix + org_uuid + "_workflow_level1", id=wf.level1_uuid, doc_type='workflow')
+            for index, doc_type, doc_id, _ in self.get_documents(obj, with_body=False):
+                self.es.delete(index=index, id=doc_id, doc_type=doc_type)
         except RequestError:
-            logger.error('Error deleting workflowlevel1 from index', exc_info=True)
+            logger.error('Error deleting %s from index', name, exc_info=True)
 
-    def delete_workflowlevel2(self, wf):
-        if self.es is None:
-            return
+    def index_indicator(self, indicator):
+        self._index_documents(indicator, 'indicator')
 
+    def delete_indicator(self, indicator):
         try:
-            if wf.workflowlevel1.organization is not None and wf.workflowlevel1.organization is not None:
-                org_uuid = str(wf.workflowlevel1.organization.organization_uuid)
-
-                self.es.delete(index=self.prefix + org_uuid + "_workflow_level2", id=wf.level2_uuid, doc_type='workflow')
-        except RequestError:
-            logger.error('Error deleting workflowlevel2 from index', exc_info=True)
+            self._delete_documents(indicator, 'indicator')
+        except NotFoundError:
+            logger.warning('Indicator not found in Elasticsearch', exc_info=True)
+            raise ValueNotFoundError
 
-    def index_collecteddata(self, d):
-        if self.es is None:
-            return
+    def index_workflowlevel1(self, wf):
+        self._index_documents(wf, 'workflowlevel1')
 
-        if d.workflowlevel1 is not None and d.workflowlevel1.organization is not None:
-            org_uuid = str(d.workflowlevel1.organization.organization_uuid)
+    def index_workflowlevel2(self, wf):
+        self._index_documents(wf, 'workflowlevel2')
 
-            # get model field data
-            data = self.get_field_data(d)
+    def delete_workflowlevel1(self, wf):
+        self._delete_documents(wf, 'workflowlevel1')
 
-            # aggregate related models
-            di = d.indicator
-            data['indicator'] = di.name
+    def delete_workflowlevel2(self, wf):
+        self._delete_documents(wf, 'workflowlevel2')
 
-            # index data with elasticsearch
-            try:
-                self.es.index(index=self.prefix + org_uuid + "_collected_data", id=data['data_uuid'], doc_type='data_collection', body=data)
-            except RequestError:
-                logger.error('Error indexing collected data', exc_info=True)
+    def index_collecteddata(self, d):
+        self._index_documents(d, 'collected data')
 
     def delete_collecteddata(self, d):
-        if self.es is None:
-            return
-
-        try:
-            if d.workflowlevel1.organization is not None:
-                org_uuid = str(d.workflowlevel1.organization.organization_uuid)
-
-                self.es.delete(index=self.prefix + org_uuid + "_collected_data", id=d.data_uuid, doc_type='data_collection')
-        except RequestError:
-            logger.error('Error deleting collected data from index', exc_info=True)
+        self._delete_documents(d, 'collected data')
 
     def get_field_data(self, obj):
-        if self.es is None:
-            return
-
         """
-        Returns all field data that is stored in a related model
+        Returns the values of the fields of obj, relations excluded, see
+        search.documents.get_extractor
         :param obj: the object to retrieve data from
         :return: dict of object data with field names as keys
         """
-        data = {}
-        for f in obj._meta.get_fields():
-            if type(f) is not ManyToManyField \
-                    and type(f) is not ManyToManyRel \
-                    and type(f) is not ManyToOneRel \
-                    and type(f) is not ForeignKey \
-                    and type(f) is not RelatedField:
-                data[f.name] = getattr(obj, f.name)
-        return data
+        return get_extractor(type(obj))(obj)
+
+    def ensure_index(self, index):
+        """
+        Create an index with the mapping of its document type, once per
+        process. Indices that exist already are left as they are.
+        """
+        if self.es is None or index in _created_indices:
+            return
+
+        suffix = [suffix for suffix in INDEX_SUFFIXES if index.endswith(suffix)][0]
+        try:
+            self.es.indices.create(index=index, body={'mappings': get_mapping(suffix)})
+        except RequestError as e:
+            if e.error != 'index_already_exists_exception':
+                logger.error('Error creating index %s', index, exc_info=True)
+                return
+        _created_indices.add(index)
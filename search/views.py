@@ -9,12 +9,12 @@ from django.http import HttpResponse
 from elasticsearch import Elasticsearch
 import json
 from django.conf import settings
-from workflow.models import TolaUser, ROLE_ORGANIZATION_ADMIN
-from indicators.models import Indicator, CollectedData
-from tola.util import get_programs_user
+from django.core.serializers.json import DjangoJSONEncoder
+from search.backends import get_search_backend
+from tola.access import get_access_context
 
 
-if settings.ELASTICSEARCH_URL is not None:
+if settings.ELASTICSEARCH_ENABLED and settings.ELASTICSEARCH_URL is not None:
     es = Elasticsearch([settings.ELASTICSEARCH_URL])
 else:
     es = None
@@ -27,98 +27,164 @@ def search_index(request):
     return HttpResponse("Index process done.")
 """
 
+# index suffix: key of the hits in the response
+RESULT_TYPES = (
+    ('workflow_level1', 'workflowlevel1'),
+    ('workflow_level2', 'workflowlevel2'),
+    ('indicators', 'indicators'),
+    ('collected_data', 'collected_data'),
+)
+SEARCH_FIELDS = ('name', 'sector', 'workflowlevel1.name', 'stakeholder.name',
+                 'site.name')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# from + size, the default index.max_result_window of Elasticsearch
+MAX_RESULT_WINDOW = 10000
+
+
+def _get_int(request, name, default, maximum=None):
+    try:
+        value = max(int(request.GET.get(name, default)), 0)
+    except ValueError:
+        value = default
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def get_search_body(term, program_ids=None, offset=0,
+                    size=DEFAULT_PAGE_SIZE):
+    """
+    The query of the search view. Without program_ids (admins) every
+    document of the organization matches, else only the documents of the
+    programs, see workflowlevel1_ids in ElasticsearchIndexer.
+    """
+    query = {
+        "bool": {
+            "should": [
+                {"match": {
+                    "name": {
+                        "query": term,
+                        "boost": 4
+                    }}},
+                {"match": {
+                    "sector": {
+                        "query": term,
+                        "boost": 2
+                    }}},
+                {"match": {"workflowlevel1.name": term}},
+                {"match": {"stakeholder.name": term}},
+                {"match": {"site.name": term}}
+            ],
+            "minimum_should_match": 1
+        }
+    }
+    if program_ids is not None:
+        query["bool"]["filter"] = {
+            "terms": {"workflowlevel1_ids": list(program_ids)}}
+
+    return {
+        "query": query,
+        "from": offset,
+        "size": size,
+        "aggs": {
+            "types": {"terms": {"field": "_index",
+                                "size": len(RESULT_TYPES)}}
+        },
+        "highlight": {
+            "fields": dict((field, {}) for field in SEARCH_FIELDS)
+        }
+    }
+
+
+def _result_type(index):
+    for suffix, result_type in RESULT_TYPES:
+        if index.endswith(suffix):
+            return result_type
+
+
+def _search_elasticsearch(results, suffixes, term, organization,
+                          program_ids, offset, size):
+    if settings.ELASTICSEARCH_INDEX_PREFIX is not None:
+        prefix = settings.ELASTICSEARCH_INDEX_PREFIX + '_'
+    else:
+        prefix = ''
+    prefix = prefix + str(organization.organization_uuid) + '_'
+    index = ','.join(prefix + suffix for suffix in suffixes)
+
+    response = es.search(index=index, ignore_unavailable=True,
+                         body=get_search_body(term, program_ids, offset,
+                                              size))
+    results["total"] = response["hits"]["total"]
+
+    # group result by type
+    for hit in response["hits"]["hits"]:
+        result_type = _result_type(hit["_index"])
+        if result_type is not None:
+            results[result_type].append(hit)
+
+    for bucket in response["aggregations"]["types"]["buckets"]:
+        result_type = _result_type(bucket["key"])
+        if result_type is not None:
+            results["counts"][result_type] = bucket["doc_count"]
+
+
+def _search_database(results, suffixes, term, organization, program_ids,
+                     offset, size):
+    """
+    Search without Elasticsearch. Every type is paginated on its own.
+    """
+    backend = get_search_backend()
+    for suffix in suffixes:
+        count, rows = backend.search(suffix, term, organization.pk,
+                                     program_ids, offset, size)
+        result_type = _result_type(suffix)
+        results[result_type] = [{"_index": suffix, "_id": row["id"],
+                                 "_source": row} for row in rows]
+        results["counts"][result_type] = count
+        results["total"] += count
+
+
 @api_view(['GET'])
 def search(request, index, term):
-    if request.method == 'GET' and es is not None:
-        if settings.ELASTICSEARCH_INDEX_PREFIX is not None:
-            prefix = settings.ELASTICSEARCH_INDEX_PREFIX + '_'
-        else:
-            prefix = ''
-
-        user_org_uuid = TolaUser.objects.get(user=request.user).organization.organization_uuid
-        prefix = prefix + str(user_org_uuid) + '_'
+    """
+    Search the documents of the organization of the user, in the database
+    when Elasticsearch is not enabled. Non admin users only find the
+    documents of their programs. Pages are selected with the `from` and
+    `size` parameters, up to the first MAX_RESULT_WINDOW hits, `counts` has
+    the number of hits per type.
+    """
+    if request.method == 'GET':
+        access = get_access_context(request)
 
         index = index.lower().strip('_')  # replace leading _ that _all cannot be accessed directly
 
-        allowed_indices = ['workflow_level1', 'workflow_level2', 'indicators', 'collected_data']
+        allowed_indices = [suffix for suffix, _ in RESULT_TYPES]
         if index.lower() == 'all':
-            index = prefix + 'workflow_level1,' + prefix + 'workflow_level2,' + prefix + 'indicators,' + prefix + 'collected_data'
+            suffixes = allowed_indices
         elif not index in allowed_indices:
             raise Exception("Index not allowed to access")
         else:
-            index = prefix + index
-
-        b = {
-            "query": {
-                "bool": {
-                    "should": [
-                        {"match": {
-                            "name": {
-                                "query": term,
-                                "boost": 4
-                            }}},
-                        {"match": {
-                            "sector": {
-                                "query": term,
-                                "boost": 2
-                            }}},
-                        {"match": {"workflowlevel1.name": term}},
-                        {"match": {"stakeholder.name": term}},
-                        {"match": {"site.name": term}}
-                    ]
-                }
-            }
-        }
-        response = es.search(index=index, body=b)
-        results = {"workflowlevel1": [], "workflowlevel2": [], "indicators": [], "collected_data": []}
-
-        # group result by type
-        for hit in response["hits"]["hits"]:
-            if "workflow_level1" in hit["_index"]:
-                results["workflowlevel1"].append(hit)
-            elif "workflow_level2" in hit["_index"]:
-                results["workflowlevel2"].append(hit)
-            elif "indicators" in hit["_index"]:
-                results["indicators"].append(hit)
-            elif "collected_data" in hit["_index"]:
-                results["collected_data"].append(hit)
-
-        # check access
-        if not request.user.is_superuser \
-            and ROLE_ORGANIZATION_ADMIN not in request.user.groups.values_list(
-                    'name', flat=True):
-            allowed_wf1s = get_programs_user(request.user)
-
-            wf1_results = []
-            for wf1 in results["workflowlevel1"]:
-                if wf1["_source"]["id"] in allowed_wf1s:
-                    wf1_results.append(wf1)
-            results["workflowlevel1"] = wf1_results
-
-            wf2_results = []
-            for wf2 in results["workflowlevel2"]:
-                if wf2["_source"]["workflowlevel1"]["id"] in allowed_wf1s:
-                    wf2_results.append(wf2)
-            results["workflowlevel2"] = wf2_results
-
-            i_results = []
-            if len(results["indicators"]) > 0:
-                allowed_is = list(map(lambda i: i[0], Indicator.objects.values_list("id")
-                                      .filter(workflowlevel1__in=allowed_wf1s)))
-
-                for i in results["indicators"]:
-                    if i["_source"]["id"] in allowed_is:
-                        i_results.append(i)
-            results["indicators"] = i_results
-
-            cd_res = []
-            if len(results["collected_data"]) > 0:
-                allowed_cds = list(map(lambda i: i[0], CollectedData.objects.values_list("id")
-                                       .filter(indicator__workflowlevel1__in=allowed_wf1s)))
-
-                for cd in results["collected_data"]:
-                    if cd["_source"]["id"] in allowed_cds:
-                        cd_res.append(cd)
-            results["collected_data"] = cd_res
-
-        return HttpResponse(json.dumps(results), content_type="application/json")
+            suffixes = [index]
+
+        program_ids = None
+        if not request.user.is_superuser and not access.is_org_admin:
+            program_ids = access.program_ids
+
+        size = _get_int(request, 'size', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        offset = _get_int(request, 'from', 0, MAX_RESULT_WINDOW - size)
+
+        results = dict((result_type, []) for _, result_type in RESULT_TYPES)
+        results["counts"] = dict.fromkeys(results, 0)
+        results["total"] = 0
+        results["from"] = offset
+        results["size"] = size
+
+        search_documents = _search_elasticsearch if es is not None \
+            else _search_database
+        search_documents(results, suffixes, term,
+                         access.tola_user.organization, program_ids, offset,
+                         size)
+
+        return HttpResponse(json.dumps(results, cls=DjangoJSONEncoder),
+                            content_type="application/json")
@@ -0,0 +1,142 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from workflow.models import (Country, TolaUser, WorkflowTeam,
+                             ROLE_ORGANIZATION_ADMIN)
+
+PROGRAM_ROLES_KEY = 'program-roles:{}:{}:{}'
+PROGRAM_ROLES_VERSION_KEY = 'program-roles-version:{}'
+PROGRAM_ROLES_GLOBAL_VERSION_KEY = 'program-roles-version'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # a random first version, so an evicted version key never brings
+        # back a map cached under an older version
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _program_roles_key(tola_user_id):
+    return PROGRAM_ROLES_KEY.format(
+        tola_user_id, _get_version(PROGRAM_ROLES_GLOBAL_VERSION_KEY),
+        _get_version(PROGRAM_ROLES_VERSION_KEY.format(tola_user_id)))
+
+
+def get_program_roles(tola_user_id):
+    """
+    Return {WorkflowLevel1 id: set of role names} of the teams of a
+    TolaUser. The map is kept in the cache until invalidate_program_roles
+    is called for the user (see workflow.signals), at most
+    PROGRAM_ROLES_CACHE_TIMEOUT seconds: the invalidation only reaches the
+    other processes through a shared cache backend.
+    """
+    key = _program_roles_key(tola_user_id)
+    program_roles = cache.get(key)
+    if program_roles is None:
+        program_roles = {}
+        teams = WorkflowTeam.objects.filter(
+            workflow_user_id=tola_user_id,
+            workflowlevel1__isnull=False).values_list(
+            'workflowlevel1_id', 'role__name')
+        for wflvl1_id, role in teams:
+            roles = program_roles.setdefault(wflvl1_id, set())
+            if role is not None:
+                roles.add(role)
+        cache.set(key, program_roles,
+                  getattr(settings, 'PROGRAM_ROLES_CACHE_TIMEOUT', 60))
+    return program_roles
+
+
+def invalidate_program_roles(tola_user_id=None):
+    """
+    Drop the cached program roles of a TolaUser, or of every user when no
+    id is given (e.g. a role was renamed).
+    """
+    if tola_user_id is None:
+        key = PROGRAM_ROLES_GLOBAL_VERSION_KEY
+    else:
+        key = PROGRAM_ROLES_VERSION_KEY.format(tola_user_id)
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+class AccessContext(object):
+    """
+    What a user can access: organization, groups, team roles per program
+    and countries. Every value is looked up the first time it is used and
+    then kept for the rest of the request, see get_access_context.
+    """
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def tola_user(self):
+        return self.user.tola_user
+
+    @cached_property
+    def organization_id(self):
+        return self.tola_user.organization_id
+
+    @cached_property
+    def group_names(self):
+        return frozenset(self.user.groups.values_list('name', flat=True))
+
+    @cached_property
+    def is_org_admin(self):
+        return ROLE_ORGANIZATION_ADMIN in self.group_names
+
+    @cached_property
+    def program_roles(self):
+        """
+        {WorkflowLevel1 id: set of role names of the user in its team}
+        """
+        try:
+            tola_user_id = self.tola_user.pk
+        except TolaUser.DoesNotExist:
+            return {}
+        return get_program_roles(tola_user_id)
+
+    @cached_property
+    def program_ids(self):
+        return sorted(self.program_roles)
+
+    def roles_for(self, workflowlevel1s):
+        """
+        Role names of the user in the teams of the given programs (objects
+        or ids).
+        """
+        roles = set()
+        for wflvl1 in workflowlevel1s:
+            wflvl1_id = getattr(wflvl1, 'pk', wflvl1)
+            roles |= self.program_roles.get(wflvl1_id, set())
+        return roles
+
+    @cached_property
+    def country_ids(self):
+        return [country_id for country_id in TolaUser.objects.filter(
+            user=self.user).values_list('countries', flat=True)
+            if country_id is not None]
+
+    @cached_property
+    def countries(self):
+        return Country.objects.filter(id__in=self.country_ids)
+
+
+def get_access_context(request):
+    """
+    Return the AccessContext of request.user, shared by everything handling
+    the request (views, permissions, forms). A DRF Request stores it on the
+    wrapped HttpRequest.
+    """
+    http_request = getattr(request, '_request', request)
+    user = request.user
+    context = getattr(http_request, '_tola_access', None)
+    if context is None or context.user.pk != user.pk:
+        context = AccessContext(user)
+        http_request._tola_access = context
+    return context
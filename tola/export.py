@@ -0,0 +1,115 @@
+"""
+Streaming CSV exports of django-import-export resources.
+
+Resource.export builds the whole tablib Dataset in memory before it is
+written, and every row loads the related objects of its ForeignKey and
+ManyToMany columns one by one. stream_csv writes the same rows one chunk
+at a time instead: the rows are read with a server-side cursor, the
+related objects of the columns are loaded once per chunk (see
+export_lookups) and the CSV is written with the writer tablib uses, so
+the output is the same as Dataset.csv.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from tablib.compat import csv
+
+from tola.util import queryset_chunks
+
+CHUNK_SIZE = 500
+
+
+class _Echo(object):
+    """
+    File-like object returning what is written, so the csv writer hands
+    back each row instead of buffering it.
+    """
+    def write(self, value):
+        return value
+
+
+def _relation_path(model, attribute):
+    """
+    Returns (lookup, many) of the relations an attribute path like
+    ``indicator__sector`` follows from model, lookup is None when the first
+    attribute is not a relation.
+    """
+    path, many = [], False
+    for attr in attribute.split('__'):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        path.append(attr)
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    if not path:
+        return None, False
+    return '__'.join(path), many
+
+
+def export_lookups(resource):
+    """
+    Returns the (select_related, prefetch_related) lookups of the export
+    columns of a ModelResource. Columns read through model properties are
+    not covered, resources list the lookups they need in
+    export_select_related and export_prefetch_related.
+    """
+    select_related = set(getattr(resource, 'export_select_related', ()))
+    prefetch_related = set(getattr(resource, 'export_prefetch_related', ()))
+    model = resource._meta.model
+    for field in resource.get_export_fields():
+        if not field.attribute:
+            continue
+        lookup, many = _relation_path(model, field.attribute)
+        if lookup is None:
+            continue
+        if many:
+            prefetch_related.add(lookup)
+        else:
+            select_related.add(lookup)
+    return select_related, prefetch_related
+
+
+def export_rows(resource, queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yields the exported rows of queryset in lists of at most chunk_size
+    rows.
+    """
+    select_related, prefetch_related = export_lookups(resource)
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*sorted(prefetch_related))
+    for chunk in queryset_chunks(queryset, chunk_size):
+        yield [resource.export_resource(obj) for obj in chunk]
+
+
+def csv_writer(fileobj):
+    """
+    Returns the csv writer of Dataset.csv writing to fileobj.
+    """
+    return csv.writer(fileobj, delimiter=',', encoding='utf-8')
+
+
+def stream_csv(resource, queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yields the CSV of the export of queryset, one chunk of rows at a time.
+    """
+    writer = csv_writer(_Echo())
+    yield writer.writerow(resource.get_export_headers())
+    for rows in export_rows(resource, queryset, chunk_size):
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+def csv_response(resource, queryset, filename,
+                 content_type='application/ms-excel'):
+    """
+    Returns a StreamingHttpResponse downloading the CSV export of queryset
+    as filename.
+    """
+    response = StreamingHttpResponse(stream_csv(resource, queryset),
+                                     content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+    return response
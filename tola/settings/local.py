@@ -75,11 +75,17 @@ if os.getenv('SOCIAL_AUTH_MICROSOFT_WHITELISTED_DOMAINS'):
 
 ########## CACHE CONFIGURATION
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#caches
+# The program roles of the users (tola.access) are cached, a change of the
+# teams is only seen at once by every process of the server with a shared
+# backend (memcached, redis). With the local memory cache of each process,
+# the others keep the previous roles for up to PROGRAM_ROLES_CACHE_TIMEOUT
+# seconds.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+PROGRAM_ROLES_CACHE_TIMEOUT = int(os.getenv('PROGRAM_ROLES_CACHE_TIMEOUT', 60))
 ########## END CACHE CONFIGURATION
 
 ######## If report server then limit navigation and allow access to public dashboards
@@ -151,9 +157,19 @@ TOLA_TRACK_TOKEN = os.getenv('TOLA_TRACK_TOKEN')
 ELASTICSEARCH_ENABLED = True if os.getenv('ELASTICSEARCH_ENABLED') == 'True' else False
 ELASTICSEARCH_URL = os.getenv('ELASTICSEARCH_URL')
 ELASTICSEARCH_INDEX_PREFIX = os.getenv('ELASTICSEARCH_INDEX_PREFIX')
+# send the search outbox from a thread of the web process after each commit,
+# else run the drain-search-outbox command periodically
+ELASTICSEARCH_OUTBOX_WORKER = False if os.getenv('ELASTICSEARCH_OUTBOX_WORKER') == 'False' else True
 
 ########## END ELASTIC SEARCH CONFIGURATION
 
+########## BACKGROUND JOBS CONFIGURATION
+# render the PDF reports and run the export jobs in a thread of the web
+# process, else in the request
+PDF_REPORT_WORKER = False if os.getenv('PDF_REPORT_WORKER') == 'False' else True
+EXPORT_JOB_WORKER = False if os.getenv('EXPORT_JOB_WORKER') == 'False' else True
+########## END BACKGROUND JOBS CONFIGURATION
+
 TOLAUSER_OBFUSCATED_NAME = os.getenv('TOLAUSER_OBFUSCATED_NAME')
 
 DEFAULT_ORG = os.getenv('DEFAULT_ORG')
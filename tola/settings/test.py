@@ -10,3 +10,4 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = '/tmp/tola-messages'
 
 ELASTICSEARCH_ENABLED = False
+ELASTICSEARCH_OUTBOX_WORKER = False
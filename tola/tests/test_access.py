@@ -0,0 +1,68 @@
+from django.test import RequestFactory, TestCase
+from rest_framework.request import Request
+
+import factories
+from tola.access import get_access_context
+from workflow.models import (ROLE_ORGANIZATION_ADMIN, ROLE_PROGRAM_ADMIN,
+                             ROLE_VIEW_ONLY)
+
+
+class AccessContextTest(TestCase):
+    def setUp(self):
+        self.tola_user = factories.TolaUser()
+        self.country = factories.Country()
+        self.tola_user.countries.add(self.country)
+        self.wflvl1 = factories.WorkflowLevel1(
+            organization=self.tola_user.organization)
+        self.other_wflvl1 = factories.WorkflowLevel1(
+            name='Other', organization=self.tola_user.organization)
+        factories.WorkflowTeam(
+            workflow_user=self.tola_user, workflowlevel1=self.wflvl1,
+            role=factories.Group(name=ROLE_PROGRAM_ADMIN))
+        factories.WorkflowTeam(
+            workflow_user=self.tola_user, workflowlevel1=self.other_wflvl1,
+            role=factories.Group(name=ROLE_VIEW_ONLY))
+
+        self.request = RequestFactory().get('/')
+        self.request.user = self.tola_user.user
+
+    def test_values(self):
+        access = get_access_context(self.request)
+        self.assertEqual(access.organization_id,
+                         self.tola_user.organization_id)
+        self.assertFalse(access.is_org_admin)
+        self.assertEqual(access.program_ids,
+                         sorted([self.wflvl1.id, self.other_wflvl1.id]))
+        self.assertEqual(access.roles_for([self.wflvl1]),
+                         {ROLE_PROGRAM_ADMIN})
+        self.assertEqual(access.roles_for([self.wflvl1.id,
+                                           self.other_wflvl1.id]),
+                         {ROLE_PROGRAM_ADMIN, ROLE_VIEW_ONLY})
+        self.assertEqual(list(access.countries), [self.country])
+
+    def test_org_admin(self):
+        self.tola_user.user.groups.add(
+            factories.Group(name=ROLE_ORGANIZATION_ADMIN))
+        self.assertTrue(get_access_context(self.request).is_org_admin)
+
+    def test_lookups_once_per_request(self):
+        access = get_access_context(self.request)
+        with self.assertNumQueries(4):
+            access.organization_id
+            access.group_names
+            access.program_ids
+            list(access.countries)
+
+        drf_request = Request(self.request)
+        drf_request.user = self.request.user
+        with self.assertNumQueries(0):
+            access = get_access_context(drf_request)
+            access.organization_id
+            access.is_org_admin
+            access.roles_for([self.wflvl1])
+            access.country_ids
+
+    def test_new_context_for_other_user(self):
+        access = get_access_context(self.request)
+        self.request.user = factories.User(username='other')
+        self.assertIsNot(get_access_context(self.request), access)
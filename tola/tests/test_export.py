@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+
+import factories
+from indicators.export import CollectedDataResource, IndicatorResource
+from indicators.models import (CollectedData, DisaggregationLabel,
+                               DisaggregationType, DisaggregationValue,
+                               Indicator)
+from tola.export import csv_response, export_lookups, stream_csv
+from workflow.export import ProgramResource
+from workflow.models import WorkflowLevel1
+
+
+@tag('pkg')
+class StreamCSVTest(TestCase):
+    def setUp(self):
+        self.wflvl1 = factories.WorkflowLevel1(country=[factories.Country()])
+        self.disaggregation_type = DisaggregationType.objects.create(
+            disaggregation_type='Gender')
+        self.label = DisaggregationLabel.objects.create(
+            disaggregation_type=self.disaggregation_type, label='Female')
+        self._add_rows(3)
+
+    def _add_rows(self, count):
+        for i in range(count):
+            indicator = factories.Indicator(
+                name=u'Indicator \xe9 %s' % i, workflowlevel1=[self.wflvl1],
+                level=factories.Level(workflowlevel1=self.wflvl1),
+                sector=factories.Sector(), reporting_frequency=factories
+                .Frequency(), approved_by=factories.TolaUser())
+            indicator.indicator_type.add(factories.IndicatorType())
+            indicator.objectives.add(factories.Objective())
+            indicator.strategic_objectives.add(
+                factories.StrategicObjective())
+            indicator.disaggregation.add(self.disaggregation_type)
+            data = factories.CollectedData(indicator=indicator,
+                                           workflowlevel1=self.wflvl1)
+            data.disaggregation_value.add(DisaggregationValue.objects.create(
+                disaggregation_label=self.label, value='%s' % i))
+
+    def _stream(self, resource, queryset, chunk_size=500):
+        with CaptureQueriesContext(connection) as queries:
+            content = ''.join(stream_csv(resource, queryset, chunk_size))
+        return content, len(queries)
+
+    def test_same_as_dataset(self):
+        for resource, queryset in (
+                (IndicatorResource(), Indicator.objects.all()),
+                (CollectedDataResource(), CollectedData.objects.all()),
+                (ProgramResource(), WorkflowLevel1.objects.all())):
+            content, _ = self._stream(resource, queryset, chunk_size=2)
+            self.assertEqual(content, resource.export(queryset).csv)
+
+    def test_queries_per_chunk(self):
+        for resource, queryset in (
+                (IndicatorResource(), Indicator.objects.all()),
+                (CollectedDataResource(), CollectedData.objects.all())):
+            _, count = self._stream(resource, queryset)
+            self._add_rows(3)
+            _, more_rows_count = self._stream(resource, queryset)
+            self.assertEqual(more_rows_count, count)
+
+    def test_export_lookups(self):
+        select_related, prefetch_related = export_lookups(
+            CollectedDataResource())
+        self.assertIn('indicator__level', select_related)
+        self.assertIn('workflowlevel1', select_related)
+        self.assertIn('site', prefetch_related)
+
+    def test_csv_response(self):
+        response = csv_response(IndicatorResource(), Indicator.objects.all(),
+                                'indicator.csv')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename=indicator.csv')
+        self.assertEqual(
+            ''.join(response.streaming_content),
+            IndicatorResource().export(Indicator.objects.all()).csv)
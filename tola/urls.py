@@ -83,6 +83,7 @@ router.register(r'dashboard', DashboardViewSet)
 router.register(r'widget', WidgetViewSet)
 router.register(r'portfolio', PortfolioViewSet)
 router.register(r'sectorrelated', SectorRelatedViewSet)
+router.register(r'exportjob', ExportJobViewSet)
 router.register(r'pindicators', ProgramIndicatorReadOnlyViewSet, base_name='pindicators')
 
 # router.register(r'search', SearchView, base_name='search')
@@ -141,6 +142,9 @@ urlpatterns = [ # rest framework
                 # Search app URL's
                 url(r'^search/', include('search.urls')),
 
+                # app include of gladmap urls
+                url(r'^gladmap/', include('gladmap.urls')),
+
                 # Auth backend URL's
                 url('', include('django.contrib.auth.urls', namespace='auth')),
                 url('', include('social_django.urls', namespace='social')),
@@ -8,10 +8,13 @@ from workflow.models import (Country, TolaUser, TolaSites, WorkflowTeam,
                              WorkflowLevel1, Organization)
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db.models import prefetch_related_objects
 from django.core.mail import mail_admins, EmailMessage
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.decorators import user_passes_test
 
+from tola.access import AccessContext
+
 
 # CREATE NEW DATA DICTIONARY OBJECT
 def siloToDict(silo):
@@ -29,15 +32,12 @@ def siloToDict(silo):
 
 
 def getCountry(user):
-        """
-        Returns the object the view is displaying.
-        """
-        # get users country from django cosign module
-        user_countries = TolaUser.objects.all().filter(user__id=user.id).values('countries')
-
-        get_countries = Country.objects.all().filter(id__in=user_countries)
-
-        return get_countries
+    """
+    Returns the countries of the user. Views should use
+    get_access_context(request).countries, which is looked up once per
+    request.
+    """
+    return AccessContext(user).countries
 
 
 def get_programs_user(user):
@@ -45,9 +45,26 @@ def get_programs_user(user):
     Returns a list of Programs (WorkflowLevel1) ID's where the user has access
     to.
     """
-    # get user
-    return WorkflowTeam.objects.filter(
-        workflow_user__user=user).values_list('workflowlevel1__id', flat=True)
+    return AccessContext(user).program_ids
+
+
+def queryset_chunks(queryset, chunk_size=500):
+    """
+    Iterate a queryset with a server-side cursor and yield lists of at most
+    chunk_size objects. QuerySet.iterator() skips prefetch_related, so the
+    lookups are prefetched per chunk to keep the queries per chunk constant.
+    """
+    lookups = queryset._prefetch_related_lookups
+    chunk = []
+    for obj in queryset.iterator():
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *lookups)
+            yield chunk
+            chunk = []
+    if chunk:
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
 
 
 def emailGroup(country, group, link, subject, message, submiter=None):
@@ -0,0 +1,59 @@
+"""
+Background threads of the web process for work that takes too long for a
+request, like rendering reports or exports.
+
+A worker runs its function every time it is woken up with wake, usually
+from a transaction.on_commit callback so the rows it works on are visible.
+Wake-ups arriving while it runs are coalesced into one more run. The work
+is kept in the database, so what a process does not finish can be picked
+up by a management command.
+"""
+import logging
+import os
+import threading
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class Worker(threading.Thread):
+    """
+    Runs function every time it is woken up by wake.
+    """
+    def __init__(self, name, function):
+        super(Worker, self).__init__(name=name)
+        self.daemon = True
+        self.function = function
+        self.pid = os.getpid()
+        self.pending = threading.Event()
+
+    def run(self):
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            try:
+                self.function()
+            except Exception:
+                logger.error('Error in the %s worker', self.name,
+                             exc_info=True)
+            finally:
+                connection.close()
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def wake(name, function):
+    """
+    Wake up the worker name of the process, starting it if needed.
+    """
+    with _workers_lock:
+        worker = _workers.get(name)
+        # threads don't survive a fork of the process
+        if worker is None or worker.pid != os.getpid() or \
+                not worker.is_alive():
+            worker = _workers[name] = Worker(name, function)
+            worker.start()
+    worker.pending.set()
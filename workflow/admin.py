@@ -16,7 +16,8 @@ from .models import (Country, Documentation, WorkflowLevel2,
                      FormGuidance, TolaUserProxy, TolaBookmarks, Currency,
                      ApprovalWorkflow, ApprovalType, FundCode, RiskRegister,
                      IssueRegister, CodedField, WorkflowModules, Milestone,
-                     Portfolio, SectorRelated, WorkflowLevel1Sector)
+                     Portfolio, SectorRelated, WorkflowLevel1Sector,
+                     WorkflowLevel1Rollup)
 
 
 # Resource for CSV export
@@ -290,6 +291,12 @@ class WorkflowLevel1SectorAdmin(admin.ModelAdmin):
     search_fields = ('sector', 'workflowlevel1')
 
 
+class WorkflowLevel1RollupAdmin(admin.ModelAdmin):
+    list_display = ('workflowlevel1', 'budget', 'actuals', 'project_count',
+                    'status')
+    display = 'WorkflowLevel1 Rollups'
+
+
 admin.site.register(Organization, OrganizationAdmin)
 admin.site.register(Country, CountryAdmin)
 admin.site.register(AdminLevelOne, AdminLevelOneAdmin)
@@ -330,3 +337,4 @@ admin.site.register(Milestone, MilestoneAdmin)
 admin.site.register(Portfolio, PortfolioAdmin)
 admin.site.register(SectorRelated, SectorRelatedAdmin)
 admin.site.register(WorkflowLevel1Sector, WorkflowLevel1SectorAdmin)
+admin.site.register(WorkflowLevel1Rollup, WorkflowLevel1RollupAdmin)
@@ -10,7 +10,7 @@ from .models import WorkflowLevel1, WorkflowLevel2, WorkflowLevel3, SiteProfile,
     Office, ChecklistItem, AdminLevelOne, Stakeholder, TolaUser, Contact, Sector
 from indicators.models import CollectedData, Indicator
 from crispy_forms.layout import LayoutObject, TEMPLATE_PACK
-from tola.util import getCountry
+from tola.access import get_access_context
 import ast
 import collections
 
@@ -457,7 +457,7 @@ class WorkflowLevel2Form(forms.ModelForm):
         super(WorkflowLevel2Form, self).__init__(*args, **kwargs)
 
         # override the program queryset to use request.user for country
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['workflowlevel1'].widget = forms.HiddenInput()
         self.fields['short'].widget = forms.HiddenInput()
 
@@ -690,7 +690,7 @@ class WorkflowLevel2SimpleForm(forms.ModelForm):
         )
         super(WorkflowLevel2SimpleForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
 
         #self.fields['program'].queryset = Program.objects.filter(funding_status="Funded", country__in=countries)
         self.fields['workflowlevel1'].widget = forms.HiddenInput()
@@ -812,7 +812,7 @@ class SiteProfileForm(forms.ModelForm):
         super(SiteProfileForm, self).__init__(*args, **kwargs)
 
         #override the office queryset to use request.user for country
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['date_of_firstcontact'].label = "Date of First Contact"
         self.fields['office'].queryset = Office.objects.filter(country__in=countries)
         self.fields['province'].queryset = AdminLevelOne.objects.filter(country__in=countries)
@@ -853,7 +853,7 @@ class DocumentationForm(forms.ModelForm):
         super(DocumentationForm, self).__init__(*args, **kwargs)
 
         #override the program queryset to use request.user for country
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         self.fields['workflowlevel2'].queryset = WorkflowLevel2.objects.filter(workflowlevel1__country__in=countries)
         self.fields['workflowlevel1'].queryset = WorkflowLevel1.objects.filter(country__in=countries)
 
@@ -884,7 +884,7 @@ class QuantitativeOutputsForm(forms.ModelForm):
 
         super(QuantitativeOutputsForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
 
         self.fields['indicator'].queryset = Indicator.objects.filter(workflowlevel1__id=kwargs['initial']['program'])
         self.fields['workflowlevel2'].queryset = WorkflowLevel2.objects.filter(id=kwargs['initial']['agreement'])
@@ -926,7 +926,7 @@ class BenchmarkForm(forms.ModelForm):
             )
         super(BenchmarkForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         # override the site queryset to use request.user for country
         self.fields['site'].queryset = SiteProfile.objects.filter(country__in=countries)
 
@@ -1064,7 +1064,7 @@ class StakeholderForm(forms.ModelForm):
         )
         super(StakeholderForm, self).__init__(*args, **kwargs)
 
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         users = TolaUser.objects.filter(country__in=countries)
         self.fields['contact'].queryset = Contact.objects.filter(country__in=countries)
         self.fields['sectors'].queryset = Sector.objects.all()
@@ -0,0 +1,18 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from workflow.organization import ORGANIZATION_PATHS, fill_organization
+
+
+class Command(BaseCommand):
+    help = """
+    Copy the organization of the programs to the rows below them.
+
+    The copies are kept up to date when rows are saved through the models,
+    run this after bulk imports, queryset updates or raw SQL changes.
+    """
+
+    def handle(self, *args, **options):
+        for label, organization_path in ORGANIZATION_PATHS.items():
+            fill_organization(apps.get_model(label), organization_path)
+            self.stdout.write('Filled the organization of {}'.format(label))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from workflow.models import WorkflowLevel1Rollup
+
+
+class Command(BaseCommand):
+    help = """
+    Recompute the program rollups from the WorkflowLevel2 table.
+
+    The rollups are maintained on every WorkflowLevel2 write, run this after
+    bulk imports or raw SQL changes. Pass program ids to limit the rebuild.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('workflowlevel1_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        workflowlevel1_ids = options['workflowlevel1_ids'] or None
+        count = WorkflowLevel1Rollup.objects.rebuild(workflowlevel1_ids)
+        self.stdout.write('Rebuilt the rollups of {} programs'.format(count))
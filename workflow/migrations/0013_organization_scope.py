@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 08:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from workflow.organization import ORGANIZATION_PATHS, fill_organization
+
+
+def fill_workflow_organization(apps, schema_editor):
+    for label, organization_path in ORGANIZATION_PATHS.items():
+        app_label, model_name = label.split('.')
+        if app_label == 'workflow':
+            fill_organization(apps.get_model(app_label, model_name),
+                              organization_path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0012_widget_changed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='checklist',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='documentation',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='historicalbudget',
+            name='organization',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='historicalriskregister',
+            name='organization',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='historicalworkflowlevel2',
+            name='organization',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='riskregister',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.AddField(
+            model_name='workflowlevel2',
+            name='organization',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='workflow.Organization'),
+        ),
+        migrations.RunPython(fill_workflow_organization,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 08:55
+from __future__ import unicode_literals
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+STATUS_FIELDS = {'green': 'status_green', 'yellow': 'status_yellow',
+                 'orange': 'status_orange', 'red': 'status_red'}
+PROGRESS_FIELDS = {'open': 'progress_open',
+                   'awaitingapproval': 'progress_awaiting_approval',
+                   'tracking': 'progress_tracking',
+                   'closed': 'progress_closed'}
+
+
+def fill_workflowlevel1_rollups(apps, schema_editor):
+    WorkflowLevel2 = apps.get_model('workflow', 'WorkflowLevel2')
+    WorkflowLevel1Rollup = apps.get_model('workflow', 'WorkflowLevel1Rollup')
+    totals = WorkflowLevel2.objects.order_by().values(
+        'workflowlevel1', 'status', 'progress').annotate(
+        count=Count('id'), budget=Sum('total_estimated_budget'),
+        actuals=Sum('actual_cost'))
+
+    rows = {}
+    for total in totals:
+        row = rows.setdefault(total['workflowlevel1'], WorkflowLevel1Rollup(
+            workflowlevel1_id=total['workflowlevel1']))
+        row.project_count += total['count']
+        row.budget += total['budget'] or Decimal('0.00')
+        row.actuals += total['actuals'] or Decimal('0.00')
+        for field in (STATUS_FIELDS.get(total['status']),
+                      PROGRESS_FIELDS.get(total['progress'])):
+            if field is not None:
+                setattr(row, field, getattr(row, field) + total['count'])
+    WorkflowLevel1Rollup.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0013_organization_scope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowLevel1Rollup',
+            fields=[
+                ('workflowlevel1', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='workflow.WorkflowLevel1')),
+                ('budget', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('actuals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('project_count', models.PositiveIntegerField(default=0)),
+                ('status_green', models.PositiveIntegerField(default=0)),
+                ('status_yellow', models.PositiveIntegerField(default=0)),
+                ('status_orange', models.PositiveIntegerField(default=0)),
+                ('status_red', models.PositiveIntegerField(default=0)),
+                ('progress_open', models.PositiveIntegerField(default=0)),
+                ('progress_awaiting_approval', models.PositiveIntegerField(default=0)),
+                ('progress_tracking', models.PositiveIntegerField(default=0)),
+                ('progress_closed', models.PositiveIntegerField(default=0)),
+                ('edit_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Workflow Level 1 Rollup',
+                'verbose_name_plural': 'Workflow Level 1 Rollups',
+            },
+        ),
+        migrations.RunPython(fill_workflowlevel1_rollups,
+                             migrations.RunPython.noop),
+    ]
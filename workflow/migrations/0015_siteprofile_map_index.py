@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 09:54
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0014_workflowlevel1rollup'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='siteprofile',
+            index_together=set([('country', 'latitude', 'longitude')]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 11:11
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0015_siteprofile_map_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='documentation',
+            index_together=set([('edit_date', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='siteprofile',
+            index_together=set([('country', 'latitude', 'longitude'), ('edit_date', 'id')]),
+        ),
+    ]
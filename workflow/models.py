@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
-from django.db import models
+from collections import OrderedDict
+from django.db import models, transaction
 from django.contrib.auth.models import User, Group
 from django.contrib.sites.models import Site
 from decimal import Decimal
@@ -10,7 +11,8 @@ from django.conf import settings
 from simple_history.models import HistoricalRecords
 from django.contrib.postgres.fields import JSONField
 
-from search.utils import ElasticsearchIndexer
+from search.models import SearchOutbox
+from workflow.organization import ORGANIZATION_PATHS, fill_organization
 
 try:
     from django.utils import timezone
@@ -639,17 +641,36 @@ class WorkflowLevel1(models.Model):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
-
-        super(WorkflowLevel1, self).save()
-
-        ei = ElasticsearchIndexer()
-        ei.index_workflowlevel1(self)
-
-    def delete(self, *args, **kwargs):
-        super(WorkflowLevel1, self).delete(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.delete_workflowlevel1(self)
+        organization_changed = self.pk is not None and \
+            self.organization_id != WorkflowLevel1.objects.filter(
+                pk=self.pk).values_list('organization_id', flat=True).first()
+
+        with transaction.atomic():
+            super(WorkflowLevel1, self).save()
+
+            if organization_changed:
+                self.update_organization()
+            SearchOutbox.objects.add_index(self)
+
+    def update_organization(self):
+        """
+        Copy the organization to the rows below the program. Their
+        edit_date is set so the search index picks them up. A beneficiary
+        keeps the organization of its first program.
+        """
+        now = timezone.now()
+        for related in (self.workflowlevel2, self.documentation_set,
+                        self.objective_set, self.i_workflowlevel1):
+            related.update(organization_id=self.organization_id,
+                           edit_date=now)
+        for model in (Budget, RiskRegister, Checklist):
+            model.objects.filter(workflowlevel2__workflowlevel1=self).update(
+                organization_id=self.organization_id, edit_date=now)
+        fill_organization(self.beneficiary_set.model,
+                          ORGANIZATION_PATHS['formlibrary.Beneficiary'],
+                          pks=self.beneficiary_set.values_list('pk',
+                                                               flat=True),
+                          touch=True)
 
     @property
     def countries(self):
@@ -918,6 +939,10 @@ class SiteProfile(models.Model):
     class Meta:
         ordering = ('name',)
         verbose_name_plural = "Site Profiles"
+        # bounding box queries of the site map, keyset pagination of the
+        # API (see feed.pagination)
+        index_together = (('country', 'latitude', 'longitude'),
+                          ('edit_date', 'id'))
 
     def save(self, *args, **kwargs):
 
@@ -1146,6 +1171,8 @@ class WorkflowLevel2(models.Model):
     create_date = models.DateTimeField("Date Created", null=True, blank=True)
     edit_date = models.DateTimeField("Last Edit Date", null=True, blank=True)
     created_by = models.ForeignKey('auth.User', related_name='workflowlevel2', null=True, blank=True, on_delete=models.SET_NULL)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
     history = HistoricalRecords()
     # optimize base query for all classbasedviews
     objects = WorkflowLevel2Manager()
@@ -1201,16 +1228,30 @@ class WorkflowLevel2(models.Model):
         if self.agency_cost == None:
             self.agency_cost = Decimal("0.00")
 
-        super(WorkflowLevel2, self).save(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.index_workflowlevel2(self)
-
-    def delete(self, *args, **kwargs):
-        super(WorkflowLevel2, self).delete(*args, **kwargs)
-
-        ei = ElasticsearchIndexer()
-        ei.delete_workflowlevel2(self)
+        self.organization_id = self.workflowlevel1.organization_id
+        with transaction.atomic():
+            old_values = self.stored_values()
+            super(WorkflowLevel2, self).save(*args, **kwargs)
+            new_values = self.stored_values()
+            WorkflowLevel1Rollup.update_values(old_values, new_values)
+
+            if old_values is not None and \
+                    old_values['organization'] != self.organization_id:
+                for model in (Budget, RiskRegister, Checklist):
+                    model.objects.filter(workflowlevel2=self).update(
+                        organization_id=self.organization_id)
+            SearchOutbox.objects.add_index(self)
+
+    def stored_values(self):
+        """
+        The stored values the program rollup and the organization copies
+        depend on, or None if the project was not saved yet.
+        """
+        if not self.pk:
+            return None
+        return WorkflowLevel2.objects.filter(pk=self.pk).values(
+            'workflowlevel1', 'organization', 'total_estimated_budget',
+            'actual_cost', 'status', 'progress').first()
 
     @property
     def project_name_clean(self):
@@ -1252,6 +1293,162 @@ class WorkflowLevel2Sort(models.Model):
         return unicode(self.workflowlevel1)
 
 
+class WorkflowLevel1RollupManager(models.Manager):
+    """
+    Keeps the WorkflowLevel2 totals of the programs up to date.
+    """
+    def add_values(self, values, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) the values of a WorkflowLevel2, as
+        returned by WorkflowLevel2.stored_values, to its program rollup.
+        """
+        scope = {'workflowlevel1_id': values['workflowlevel1']}
+        if sign > 0:
+            row, created = self.select_for_update().get_or_create(**scope)
+        else:
+            # Removing never creates rows, the program may be in the middle
+            # of a cascading delete.
+            row = self.select_for_update().filter(**scope).first()
+            if row is None:
+                return
+
+        row.project_count = max(row.project_count + sign, 0)
+        if row.project_count == 0:
+            row.reset()
+        else:
+            row.budget += sign * (values['total_estimated_budget'] or
+                                  Decimal('0.00'))
+            row.actuals += sign * (values['actual_cost'] or Decimal('0.00'))
+            for field in (self.model.STATUS_FIELDS.get(values['status']),
+                          self.model.PROGRESS_FIELDS.get(values['progress'])):
+                if field is not None:
+                    setattr(row, field, max(getattr(row, field) + sign, 0))
+        row.save()
+
+    def rebuild(self, workflowlevel1_ids=None):
+        """
+        Recompute the rollups from scratch with one grouped query, for the
+        given programs or all of them. Use it after bulk_create/update of
+        WorkflowLevel2, which do not go through save().
+        """
+        projects = WorkflowLevel2.objects.order_by()
+        rows = self.all()
+        if workflowlevel1_ids is not None:
+            projects = projects.filter(workflowlevel1_id__in=workflowlevel1_ids)
+            rows = rows.filter(workflowlevel1_id__in=workflowlevel1_ids)
+
+        totals = projects.values('workflowlevel1', 'status', 'progress') \
+            .annotate(count=models.Count('id'),
+                      budget=models.Sum('total_estimated_budget'),
+                      actuals=models.Sum('actual_cost'))
+
+        new_rows = {}
+        now = timezone.now()
+        for total in totals:
+            row = new_rows.get(total['workflowlevel1'])
+            if row is None:
+                row = self.model(workflowlevel1_id=total['workflowlevel1'],
+                                 edit_date=now)
+                new_rows[total['workflowlevel1']] = row
+            row.project_count += total['count']
+            row.budget += total['budget'] or Decimal('0.00')
+            row.actuals += total['actuals'] or Decimal('0.00')
+            for field in (self.model.STATUS_FIELDS.get(total['status']),
+                          self.model.PROGRESS_FIELDS.get(total['progress'])):
+                if field is not None:
+                    setattr(row, field, getattr(row, field) + total['count'])
+
+        with transaction.atomic():
+            rows.delete()
+            self.bulk_create(new_rows.values(), batch_size=1000)
+        return len(new_rows)
+
+
+class WorkflowLevel1Rollup(models.Model):
+    """
+    WorkflowLevel2 totals per program: budget, actuals and the number of
+    projects per status and progress. Maintained on every WorkflowLevel2
+    write so program lists don't have to load all their projects.
+    """
+    workflowlevel1 = models.OneToOneField(WorkflowLevel1, primary_key=True, related_name='rollup')
+    budget = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    actuals = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    project_count = models.PositiveIntegerField(default=0)
+    status_green = models.PositiveIntegerField(default=0)
+    status_yellow = models.PositiveIntegerField(default=0)
+    status_orange = models.PositiveIntegerField(default=0)
+    status_red = models.PositiveIntegerField(default=0)
+    progress_open = models.PositiveIntegerField(default=0)
+    progress_awaiting_approval = models.PositiveIntegerField(default=0)
+    progress_tracking = models.PositiveIntegerField(default=0)
+    progress_closed = models.PositiveIntegerField(default=0)
+    edit_date = models.DateTimeField(null=True, blank=True)
+    objects = WorkflowLevel1RollupManager()
+
+    # from the worst to the best status
+    STATUS_FIELDS = OrderedDict((
+        (WorkflowLevel2.STATUS_RED, 'status_red'),
+        (WorkflowLevel2.STATUS_ORANGE, 'status_orange'),
+        (WorkflowLevel2.STATUS_YELLOW, 'status_yellow'),
+        (WorkflowLevel2.STATUS_GREEN, 'status_green'),
+    ))
+    PROGRESS_FIELDS = OrderedDict((
+        (WorkflowLevel2.PROGRESS_OPEN, 'progress_open'),
+        (WorkflowLevel2.PROGRESS_AWAITING_APPROVAL,
+         'progress_awaiting_approval'),
+        (WorkflowLevel2.PROGRESS_TRACKING, 'progress_tracking'),
+        (WorkflowLevel2.PROGRESS_CLOSED, 'progress_closed'),
+    ))
+
+    class Meta:
+        verbose_name = "Workflow Level 1 Rollup"
+        verbose_name_plural = "Workflow Level 1 Rollups"
+
+    def save(self, *args, **kwargs):
+        self.edit_date = timezone.now()
+        super(WorkflowLevel1Rollup, self).save(*args, **kwargs)
+
+    @classmethod
+    def update_values(cls, old_values, new_values):
+        """
+        Move a WorkflowLevel2 from its old to its new program rollup.
+        """
+        if old_values == new_values:
+            return
+        if old_values:
+            cls.objects.add_values(old_values, sign=-1)
+        if new_values:
+            cls.objects.add_values(new_values)
+
+    def reset(self):
+        self.budget = self.actuals = Decimal('0.00')
+        for field in self.STATUS_FIELDS.values() + \
+                self.PROGRESS_FIELDS.values():
+            setattr(self, field, 0)
+
+    @property
+    def difference(self):
+        return self.budget - self.actuals
+
+    @property
+    def status(self):
+        """
+        The worst status of the projects, green without projects.
+        """
+        for status, field in self.STATUS_FIELDS.items():
+            if getattr(self, field):
+                return status
+        return WorkflowLevel2.STATUS_GREEN
+
+    @property
+    def progress_counts(self):
+        return OrderedDict((progress, getattr(self, field))
+                           for progress, field in self.PROGRESS_FIELDS.items())
+
+    def __unicode__(self):
+        return u'%s' % self.workflowlevel1_id
+
+
 class CodedField(models.Model):
     name = models.CharField("Field Name", max_length=255, blank=True, null=True)
     label = models.CharField("Field Label", max_length=255, blank=True, null=True)
@@ -1314,11 +1511,14 @@ class Documentation(models.Model):
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey('auth.User', related_name='documentation', null=True, blank=True)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
 
     def save(self, *args, **kwargs):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
+        self.organization_id = self.workflowlevel1.organization_id
         super(Documentation, self).save()
 
     def __unicode__(self):
@@ -1331,6 +1531,8 @@ class Documentation(models.Model):
     class Meta:
         ordering = ('name',)
         verbose_name_plural = "Documentation"
+        # keyset pagination of the API, see feed.pagination
+        index_together = (('edit_date', 'id'),)
 
 
 class WorkflowLevel3(models.Model):
@@ -1378,6 +1580,8 @@ class Budget(models.Model):
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey('auth.User', related_name='budgets', null=True, blank=True)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
     history = HistoricalRecords()
 
     def save(self, *args, **kwargs):
@@ -1385,22 +1589,26 @@ class Budget(models.Model):
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
 
-        if self.workflowlevel2:
-            wflvl2 = self.workflowlevel2
-            try:
-                old_budget = self.__class__.objects.get(id=self.id)
-                # Subtract the old values
-                wflvl2.total_estimated_budget -= old_budget.proposed_value
-                wflvl2.actual_cost -= old_budget.actual_value
-            except Budget.DoesNotExist:
-                pass
-            finally:
-                # Sum the new values
-                wflvl2.total_estimated_budget += self.proposed_value
-                wflvl2.actual_cost += self.actual_value
-                wflvl2.save()
-
-        super(Budget, self).save()
+        # the project totals and the program rollup change together
+        with transaction.atomic():
+            if self.workflowlevel2:
+                wflvl2 = self.workflowlevel2
+                try:
+                    old_budget = self.__class__.objects.get(id=self.id)
+                    # Subtract the old values
+                    wflvl2.total_estimated_budget -= old_budget.proposed_value
+                    wflvl2.actual_cost -= old_budget.actual_value
+                except Budget.DoesNotExist:
+                    pass
+                finally:
+                    # Sum the new values
+                    wflvl2.total_estimated_budget += self.proposed_value
+                    wflvl2.actual_cost += self.actual_value
+                    wflvl2.save()
+
+            self.organization_id = self.workflowlevel2.organization_id \
+                if self.workflowlevel2 else None
+            super(Budget, self).save()
 
     def __unicode__(self):
         return self.contributor
@@ -1425,12 +1633,16 @@ class RiskRegister(models.Model):
     workflowlevel2 = models.ForeignKey(WorkflowLevel2,null=True, blank=True)
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
     history = HistoricalRecords()
 
     def save(self, *args, **kwargs):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
+        self.organization_id = self.workflowlevel2.organization_id \
+            if self.workflowlevel2 else None
         super(RiskRegister, self).save()
 
     def __unicode__(self):
@@ -1476,6 +1688,8 @@ class Checklist(models.Model):
     country = models.ForeignKey(Country,null=True,blank=True)
     create_date = models.DateTimeField(null=True, blank=True)
     edit_date = models.DateTimeField(null=True, blank=True)
+    # copied from the program, see workflow.organization
+    organization = models.ForeignKey(Organization, null=True, blank=True, editable=False, on_delete=models.SET_NULL)
 
     class Meta:
         ordering = ('workflowlevel2',)
@@ -1484,6 +1698,8 @@ class Checklist(models.Model):
         if self.create_date == None:
             self.create_date = timezone.now()
         self.edit_date = timezone.now()
+        self.organization_id = self.workflowlevel2.organization_id \
+            if self.workflowlevel2 else None
         super(Checklist, self).save()
 
     def __unicode__(self):
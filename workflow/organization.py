@@ -0,0 +1,54 @@
+"""
+Models below a program keep a copy of the organization of the program, so
+they can be scoped to an organization without joining up to WorkflowLevel1.
+The copy is set when a row is saved and when the program or project it
+belongs to changes organization.
+"""
+from collections import OrderedDict
+
+from django.utils import timezone
+
+# model: lookup of the organization through the program
+ORGANIZATION_PATHS = OrderedDict((
+    ('workflow.WorkflowLevel2', 'workflowlevel1__organization'),
+    ('workflow.Documentation', 'workflowlevel1__organization'),
+    ('workflow.Budget', 'workflowlevel2__workflowlevel1__organization'),
+    ('workflow.RiskRegister',
+     'workflowlevel2__workflowlevel1__organization'),
+    ('workflow.Checklist', 'workflowlevel2__workflowlevel1__organization'),
+    ('indicators.Objective', 'workflowlevel1__organization'),
+    ('indicators.CollectedData', 'workflowlevel1__organization'),
+    ('formlibrary.Beneficiary', 'workflowlevel1__organization'),
+))
+
+
+def fill_organization(model, organization_path, batch_size=500, pks=None,
+                      touch=False):
+    """
+    Set the organization column of every row of model from its program.
+    Works with the historical models of migrations. Rows of several programs
+    (many-to-many) get the organization of the first program.
+    :param pks: only fill these rows
+    :param touch: set the edit_date of the rows, so changes are picked up
+        by the search index
+    """
+    organization_ids = {}
+    program_path = organization_path.rsplit('__', 1)[0] + '__pk'
+    rows = model.objects.all()
+    if pks is not None:
+        rows = rows.filter(pk__in=list(pks))
+    rows = rows.order_by('pk', program_path).values_list(
+        'pk', organization_path)
+    for pk, organization_id in rows.iterator():
+        if pk not in organization_ids:
+            organization_ids[pk] = organization_id
+
+    pks_by_organization = {}
+    for pk, organization_id in organization_ids.items():
+        pks_by_organization.setdefault(organization_id, []).append(pk)
+
+    values = {'edit_date': timezone.now()} if touch else {}
+    for organization_id, pks in pks_by_organization.items():
+        for start in range(0, len(pks), batch_size):
+            model.objects.filter(pk__in=pks[start:start + batch_size]) \
+                .update(organization_id=organization_id, **values)
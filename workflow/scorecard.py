@@ -0,0 +1,114 @@
+"""
+Scorecards of programs for the program lists and dashboards: how many of
+the program indicators have collected data and how many of its projects
+are past initiation.
+
+The scorecards of any number of programs come from two grouped queries,
+one over the indicators of the programs (with their IndicatorActuals) and
+one over the WorkflowLevel1Rollup rows. The scorecards of the programs of
+a country are cached for SCORECARD_CACHE_TIMEOUT seconds, see
+country_scorecards.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, When
+
+from indicators.models import Indicator
+from workflow.models import WorkflowLevel1, WorkflowLevel1Rollup
+
+COUNTRY_SCORECARDS_KEY = 'program-scorecards:{}'
+
+
+def _percent(count, total):
+    return int(100 * float(count) / total) if total else 0
+
+
+def scorecard(indicator_count=0, indicator_data_count=0, project_count=0,
+              project_tracking_count=0):
+    """
+    Returns the scorecard of a program from its counts. The percentages are
+    rounded down like the progress bars of the program list show them.
+    """
+    indicator_data_percent = _percent(indicator_data_count, indicator_count)
+    project_percent = _percent(project_tracking_count, project_count)
+    return {
+        'indicator_count': indicator_count,
+        'indicator_data_count': indicator_data_count,
+        'indicator_data_percent': indicator_data_percent,
+        'indicator_percent': 100 - indicator_data_percent,
+        'project_count': project_count,
+        'project_tracking_count': project_tracking_count,
+        'project_percent': project_percent,
+        'project_agreement_percent': 100 - project_percent,
+    }
+
+
+def build_scorecards(program_ids):
+    """
+    Returns {WorkflowLevel1 id: scorecard} of programs. Indicators have
+    data when any CollectedData was collected for them, projects are past
+    initiation once they are tracking or closed.
+    """
+    program_ids = list(program_ids)
+    if not program_ids:
+        return {}
+    counts = dict((program_id, {}) for program_id in program_ids)
+
+    indicators = Indicator.objects.filter(workflowlevel1__in=program_ids)\
+        .values('workflowlevel1')\
+        .annotate(indicator_count=Count('id', distinct=True),
+                  indicator_data_count=Count(Case(When(
+                      actuals_summary__has_data=True, then=F('id'))),
+                      distinct=True))\
+        .order_by()
+    for row in indicators:
+        counts[row['workflowlevel1']].update(
+            indicator_count=row['indicator_count'],
+            indicator_data_count=row['indicator_data_count'])
+
+    rollups = WorkflowLevel1Rollup.objects\
+        .filter(workflowlevel1_id__in=program_ids)\
+        .values('workflowlevel1_id', 'project_count', 'progress_tracking',
+                'progress_closed')
+    for row in rollups:
+        counts[row['workflowlevel1_id']].update(
+            project_count=row['project_count'],
+            project_tracking_count=row['progress_tracking'] +
+            row['progress_closed'])
+
+    return dict((program_id, scorecard(**program_counts))
+                for program_id, program_counts in counts.items())
+
+
+def country_scorecards(country_id):
+    """
+    Returns {WorkflowLevel1 id: scorecard} of the programs of a country,
+    from the cache when they were built in the last SCORECARD_CACHE_TIMEOUT
+    seconds.
+    """
+    key = COUNTRY_SCORECARDS_KEY.format(country_id)
+    scorecards = cache.get(key)
+    if scorecards is None:
+        scorecards = build_scorecards(
+            WorkflowLevel1.objects.filter(country=country_id)
+            .values_list('id', flat=True).distinct())
+        cache.set(key, scorecards,
+                  getattr(settings, 'SCORECARD_CACHE_TIMEOUT', 300))
+    return scorecards
+
+
+def get_scorecards(program_ids, country_ids=()):
+    """
+    Returns {WorkflowLevel1 id: scorecard} of programs, taken from the
+    cached scorecards of countries when the programs are in one of them.
+    """
+    program_ids = set(program_ids)
+    scorecards = {}
+    for country_id in country_ids:
+        country = country_scorecards(country_id)
+        scorecards.update((program_id, country[program_id])
+                          for program_id in program_ids & set(country))
+    missing = program_ids - set(scorecards)
+    if missing:
+        scorecards.update(build_scorecards(missing))
+    return scorecards
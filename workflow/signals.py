@@ -1,14 +1,19 @@
 import logging
 import os
 
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, User
+from django.db import transaction
 from django.db.models import signals
 from django.dispatch import receiver
 
+from formlibrary.models import Beneficiary
+from search.models import SearchOutbox
 from tola import DEMO_BRANCH
+from tola.access import invalidate_program_roles
 from tola.management.commands.loadinitialdata import DEFAULT_WORKFLOW_LEVEL_1S
-from workflow.models import (TolaUser, WorkflowLevel1, WorkflowTeam,
-                             ROLE_VIEW_ONLY)
+from workflow.models import (TolaUser, WorkflowLevel1, WorkflowLevel1Rollup,
+                             WorkflowLevel2, WorkflowTeam, ROLE_VIEW_ONLY)
+from workflow.organization import ORGANIZATION_PATHS, fill_organization
 
 logger = logging.getLogger(__name__)
 
@@ -43,3 +48,115 @@ def add_users_to_default_wflvl1(sender, instance, **kwargs):
                                     workflowlevel1=wflvl1_0)
         WorkflowTeam.objects.create(workflow_user=instance, role=role,
                                     workflowlevel1=wflvl1_1)
+
+
+def _invalidate_program_roles(tola_user_id=None):
+    # once more after commit, in case the old roles were cached again by
+    # another request before the transaction was committed
+    invalidate_program_roles(tola_user_id)
+    transaction.on_commit(lambda: invalidate_program_roles(tola_user_id))
+
+
+@receiver(signals.post_save, sender=TolaUser)
+def invalidate_new_user_program_roles(sender, instance, created, **kwargs):
+    """
+    A new TolaUser may reuse the id of a deleted one.
+    """
+    if created:
+        _invalidate_program_roles(instance.id)
+
+
+@receiver(signals.pre_save, sender=WorkflowTeam)
+def invalidate_previous_team_member(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    previous_user_id = WorkflowTeam.objects.filter(pk=instance.pk).values_list(
+        'workflow_user_id', flat=True).first()
+    if previous_user_id not in (None, instance.workflow_user_id):
+        _invalidate_program_roles(previous_user_id)
+
+
+@receiver(signals.post_save, sender=WorkflowTeam)
+@receiver(signals.post_delete, sender=WorkflowTeam)
+def invalidate_team_program_roles(sender, instance, **kwargs):
+    if instance.workflow_user_id is not None:
+        _invalidate_program_roles(instance.workflow_user_id)
+
+
+@receiver(signals.m2m_changed, sender=User.groups.through)
+def invalidate_group_member_program_roles(sender, instance, action, reverse,
+                                          pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif pk_set:
+        user_ids = pk_set
+    else:
+        # clearing a group does not tell which users were in it
+        _invalidate_program_roles()
+        return
+    for tola_user_id in TolaUser.objects.filter(
+            user_id__in=user_ids).values_list('id', flat=True):
+        _invalidate_program_roles(tola_user_id)
+
+
+@receiver(signals.post_save, sender=Group)
+@receiver(signals.post_delete, sender=Group)
+def invalidate_all_program_roles(sender, instance, **kwargs):
+    """
+    The role names of every cached map may have changed.
+    """
+    _invalidate_program_roles()
+
+
+@receiver(signals.m2m_changed, sender=Beneficiary.workflowlevel1.through)
+def update_beneficiary_organization(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    """
+    The organization of a Beneficiary is the one of its first program.
+    """
+    if reverse and action == 'pre_clear':
+        # the beneficiaries of a cleared program are not given to post_clear
+        instance._cleared_beneficiary_ids = list(
+            sender.objects.filter(workflowlevel1_id=instance.pk)
+            .values_list('beneficiary_id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_beneficiary_ids', None)
+        pks = pk_set or []
+    else:
+        pks = [instance.pk]
+    fill_organization(Beneficiary,
+                      ORGANIZATION_PATHS['formlibrary.Beneficiary'], pks=pks,
+                      touch=True)
+    if not reverse:
+        instance.organization_id = Beneficiary.objects.filter(
+            pk=instance.pk).values_list('organization_id', flat=True).first()
+
+
+@receiver(signals.pre_delete, sender=WorkflowLevel1)
+@receiver(signals.pre_delete, sender=WorkflowLevel2)
+def delete_workflow_documents(sender, instance, **kwargs):
+    """
+    Covers delete as well as queryset and cascading deletes, while the
+    relations of the documents can still be read.
+    """
+    SearchOutbox.objects.add_delete(instance)
+
+
+@receiver(signals.pre_delete, sender=WorkflowLevel2)
+def store_workflowlevel2_values(sender, instance, **kwargs):
+    instance._stored_values = instance.stored_values()
+
+
+@receiver(signals.post_delete, sender=WorkflowLevel2)
+def remove_workflowlevel2_from_rollup(sender, instance, **kwargs):
+    """
+    Covers WorkflowLevel2.delete as well as queryset and cascading deletes.
+    """
+    WorkflowLevel1Rollup.update_values(
+        getattr(instance, '_stored_values', None), None)
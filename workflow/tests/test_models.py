@@ -1,7 +1,13 @@
+from StringIO import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase, override_settings, tag
 
 import factories
-from workflow.models import TolaUser
+from formlibrary.models import Beneficiary
+from indicators.models import CollectedData
+from workflow.models import (Budget, TolaUser, WorkflowLevel1Rollup,
+                             WorkflowLevel2)
 
 
 @tag('pkg')
@@ -43,3 +49,153 @@ class TolaUserTest(TestCase):
         user = factories.User(first_name='', last_name='')
         tolauser = factories.TolaUser(user=user)
         self.assertEqual(unicode(tolauser), u'-')
+
+
+@tag('pkg')
+class OrganizationCopyTest(TestCase):
+    def setUp(self):
+        self.organization = factories.Organization()
+        self.wflvl1 = factories.WorkflowLevel1(organization=self.organization)
+        self.wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1)
+
+    def test_save(self):
+        budget = factories.Budget(workflowlevel2=self.wflvl2)
+        documentation = factories.Documentation(workflowlevel1=self.wflvl1)
+        beneficiary = factories.Beneficiary(workflowlevel1=[self.wflvl1])
+        self.assertEqual(self.wflvl2.organization, self.organization)
+        self.assertEqual(budget.organization, self.organization)
+        self.assertEqual(documentation.organization, self.organization)
+        self.assertEqual(Beneficiary.objects.get(
+            pk=beneficiary.pk).organization, self.organization)
+
+    def test_beneficiary_programs_cleared(self):
+        beneficiary = factories.Beneficiary(workflowlevel1=[self.wflvl1])
+        self.wflvl1.beneficiary_set.clear()
+        self.assertIsNone(Beneficiary.objects.get(
+            pk=beneficiary.pk).organization)
+
+    def test_shared_beneficiary_organization_changed(self):
+        other_organization = factories.Organization(name='Other Org')
+        other_wflvl1 = factories.WorkflowLevel1(
+            name='Other Program', organization=other_organization)
+        beneficiary = factories.Beneficiary(
+            workflowlevel1=[self.wflvl1, other_wflvl1])
+        self.assertEqual(Beneficiary.objects.get(
+            pk=beneficiary.pk).organization, self.organization)
+
+        # the beneficiary keeps the organization of its first program
+        other_wflvl1.organization = factories.Organization(name='Third Org')
+        other_wflvl1.save()
+        self.assertEqual(Beneficiary.objects.get(
+            pk=beneficiary.pk).organization, self.organization)
+
+        self.wflvl1.organization = other_organization
+        self.wflvl1.save()
+        self.assertEqual(Beneficiary.objects.get(
+            pk=beneficiary.pk).organization, other_organization)
+
+    def test_organization_changed(self):
+        budget = factories.Budget(workflowlevel2=self.wflvl2)
+        collecteddata = factories.CollectedData(workflowlevel1=self.wflvl1)
+        other_organization = factories.Organization(name='Other Org')
+
+        edit_date = WorkflowLevel2.objects.get(pk=self.wflvl2.pk).edit_date
+
+        self.wflvl1.organization = other_organization
+        self.wflvl1.save()
+        wflvl2 = WorkflowLevel2.objects.get(pk=self.wflvl2.pk)
+        self.assertEqual(wflvl2.organization, other_organization)
+        self.assertGreater(wflvl2.edit_date, edit_date)
+        self.assertEqual(Budget.objects.get(pk=budget.pk).organization,
+                         other_organization)
+        self.assertEqual(CollectedData.objects.get(
+            pk=collecteddata.pk).organization, other_organization)
+
+        self.wflvl2.workflowlevel1 = factories.WorkflowLevel1(
+            organization=self.organization)
+        self.wflvl2.save()
+        self.assertEqual(Budget.objects.get(pk=budget.pk).organization,
+                         self.organization)
+
+    def test_fill_organization(self):
+        budget = factories.Budget(workflowlevel2=self.wflvl2)
+        Budget.objects.update(organization=None)
+        WorkflowLevel2.objects.update(organization=None)
+
+        call_command('fill-organization', stdout=StringIO())
+        self.assertEqual(Budget.objects.get(pk=budget.pk).organization,
+                         self.organization)
+        self.assertEqual(WorkflowLevel2.objects.get(
+            pk=self.wflvl2.pk).organization, self.organization)
+
+
+@tag('pkg')
+class WorkflowLevel1RollupTest(TestCase):
+    def setUp(self):
+        self.wflvl1 = factories.WorkflowLevel1()
+
+    def _rollup(self):
+        return WorkflowLevel1Rollup.objects.get(workflowlevel1=self.wflvl1)
+
+    def test_save(self):
+        factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                 total_estimated_budget=100, actual_cost=20)
+        wflvl2 = factories.WorkflowLevel2(
+            workflowlevel1=self.wflvl1, total_estimated_budget=50,
+            actual_cost=0, status=WorkflowLevel2.STATUS_YELLOW)
+        rollup = self._rollup()
+        self.assertEqual(rollup.budget, 150)
+        self.assertEqual(rollup.actuals, 20)
+        self.assertEqual(rollup.difference, 130)
+        self.assertEqual(rollup.project_count, 2)
+        self.assertEqual(rollup.status, WorkflowLevel2.STATUS_YELLOW)
+        self.assertEqual(rollup.progress_counts[WorkflowLevel2.PROGRESS_OPEN],
+                         2)
+
+        wflvl2.status = WorkflowLevel2.STATUS_RED
+        wflvl2.progress = WorkflowLevel2.PROGRESS_CLOSED
+        wflvl2.save()
+        rollup = self._rollup()
+        self.assertEqual(rollup.status, WorkflowLevel2.STATUS_RED)
+        self.assertEqual(rollup.status_yellow, 0)
+        self.assertEqual(rollup.progress_open, 1)
+        self.assertEqual(rollup.progress_closed, 1)
+
+    def test_budget(self):
+        wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                          total_estimated_budget=0,
+                                          actual_cost=0)
+        factories.Budget(workflowlevel2=wflvl2, proposed_value=300,
+                         actual_value=100)
+        rollup = self._rollup()
+        self.assertEqual(rollup.budget, 300)
+        self.assertEqual(rollup.actuals, 100)
+
+    def test_delete_and_move(self):
+        wflvl2 = factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                          total_estimated_budget=100)
+        other = factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                         status=WorkflowLevel2.STATUS_RED)
+        other.delete()
+        rollup = self._rollup()
+        self.assertEqual(rollup.project_count, 1)
+        self.assertEqual(rollup.status, WorkflowLevel2.STATUS_GREEN)
+
+        wflvl2.workflowlevel1 = factories.WorkflowLevel1(name='Other')
+        wflvl2.save()
+        rollup = self._rollup()
+        self.assertEqual(rollup.project_count, 0)
+        self.assertEqual(rollup.budget, 0)
+        self.assertEqual(wflvl2.workflowlevel1.rollup.budget, 100)
+
+    def test_rebuild(self):
+        factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                 total_estimated_budget=100,
+                                 status=WorkflowLevel2.STATUS_ORANGE)
+        WorkflowLevel1Rollup.objects.all().delete()
+
+        call_command('rebuild-workflowlevel1-rollups', stdout=StringIO())
+        rollup = self._rollup()
+        self.assertEqual(rollup.budget, 100)
+        self.assertEqual(rollup.project_count, 1)
+        self.assertEqual(rollup.status, WorkflowLevel2.STATUS_ORANGE)
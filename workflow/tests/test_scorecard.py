@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings, tag
+
+import factories
+from workflow import scorecard
+from workflow.models import WorkflowLevel2
+
+
+@tag('pkg')
+class ScorecardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.country = factories.Country()
+        self.wflvl1 = factories.WorkflowLevel1(country=[self.country])
+        self.other_wflvl1 = factories.WorkflowLevel1(name='Other Program',
+                                                     country=[self.country])
+        # an indicator of both programs, with data
+        indicator = factories.Indicator(
+            workflowlevel1=[self.wflvl1, self.other_wflvl1])
+        factories.CollectedData(indicator=indicator,
+                                workflowlevel1=self.wflvl1)
+        factories.Indicator.create_batch(2, workflowlevel1=[self.wflvl1])
+
+        for progress in (WorkflowLevel2.PROGRESS_OPEN,
+                         WorkflowLevel2.PROGRESS_TRACKING,
+                         WorkflowLevel2.PROGRESS_CLOSED,
+                         WorkflowLevel2.PROGRESS_OPEN):
+            factories.WorkflowLevel2(workflowlevel1=self.wflvl1,
+                                     progress=progress)
+
+    def test_build(self):
+        empty = factories.WorkflowLevel1(name='Empty Program')
+        with self.assertNumQueries(2):
+            scorecards = scorecard.build_scorecards(
+                [self.wflvl1.id, self.other_wflvl1.id, empty.id])
+        self.assertEqual(scorecards[self.wflvl1.id], {
+            'indicator_count': 3, 'indicator_data_count': 1,
+            'indicator_data_percent': 33, 'indicator_percent': 67,
+            'project_count': 4, 'project_tracking_count': 2,
+            'project_percent': 50, 'project_agreement_percent': 50})
+        self.assertEqual(
+            scorecards[self.other_wflvl1.id]['indicator_data_percent'], 100)
+        self.assertEqual(scorecards[empty.id], scorecard.scorecard())
+        self.assertEqual(scorecard.build_scorecards([]), {})
+
+    def test_cached_per_country(self):
+        cards = scorecard.get_scorecards([self.wflvl1.id], [self.country.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                scorecard.get_scorecards([self.wflvl1.id], [self.country.id]),
+                cards)
+
+        # programs out of the countries are built
+        other = factories.WorkflowLevel1(name='Another Program')
+        with self.assertNumQueries(2):
+            cards = scorecard.get_scorecards([self.wflvl1.id, other.id],
+                                             [self.country.id])
+        self.assertEqual(cards[other.id], scorecard.scorecard())
+
+    @override_settings(SCORECARD_CACHE_TIMEOUT=0)
+    def test_not_cached(self):
+        cards = scorecard.country_scorecards(self.country.id)
+        factories.WorkflowLevel2(workflowlevel1=self.wflvl1)
+        self.assertEqual(
+            scorecard.country_scorecards(self.country.id)[self.wflvl1.id]
+            ['project_count'],
+            cards[self.wflvl1.id]['project_count'] + 1)
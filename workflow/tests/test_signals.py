@@ -1,12 +1,14 @@
 import logging
 import os
 
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
 
 import factories
 from tola import DEMO_BRANCH
+from tola.access import get_program_roles
 from tola.management.commands.loadinitialdata import DEFAULT_WORKFLOW_LEVEL_1S
-from workflow.models import WorkflowTeam, ROLE_VIEW_ONLY
+from workflow.models import (WorkflowTeam, ROLE_PROGRAM_ADMIN,
+                             ROLE_PROGRAM_TEAM, ROLE_VIEW_ONLY)
 
 
 @tag('pkg')
@@ -90,3 +92,69 @@ class AddUsersToDefaultWorkflowLevel1Test(TestCase):
             workflow_user=tola_user, role=role, workflowlevel1=wflvl1_1).count()
         self.assertEqual(num_results, 1)
         os.environ['APP_BRANCH'] = ''
+
+
+@tag('pkg')
+class InvalidateProgramRolesTest(TestCase):
+    def setUp(self):
+        self.tola_user = factories.TolaUser()
+        self.wflvl1 = factories.WorkflowLevel1()
+        self.role = factories.Group(name=ROLE_VIEW_ONLY)
+
+    def test_cached(self):
+        factories.WorkflowTeam(workflow_user=self.tola_user,
+                               workflowlevel1=self.wflvl1, role=self.role)
+        get_program_roles(self.tola_user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_program_roles(self.tola_user.id),
+                             {self.wflvl1.id: {ROLE_VIEW_ONLY}})
+
+    @override_settings(PROGRAM_ROLES_CACHE_TIMEOUT=0)
+    def test_cache_timeout(self):
+        get_program_roles(self.tola_user.id)
+        # no signal, like a change invalidated in another process only
+        WorkflowTeam.objects.bulk_create([WorkflowTeam(
+            workflow_user=self.tola_user, workflowlevel1=self.wflvl1,
+            role=self.role)])
+        self.assertEqual(get_program_roles(self.tola_user.id),
+                         {self.wflvl1.id: {ROLE_VIEW_ONLY}})
+
+    def test_workflowteam_save_and_delete(self):
+        self.assertEqual(get_program_roles(self.tola_user.id), {})
+        team = factories.WorkflowTeam(workflow_user=self.tola_user,
+                                      workflowlevel1=self.wflvl1,
+                                      role=self.role)
+        self.assertEqual(get_program_roles(self.tola_user.id),
+                         {self.wflvl1.id: {ROLE_VIEW_ONLY}})
+
+        team.role = factories.Group(name=ROLE_PROGRAM_ADMIN)
+        team.save()
+        self.assertEqual(get_program_roles(self.tola_user.id),
+                         {self.wflvl1.id: {ROLE_PROGRAM_ADMIN}})
+
+        team.delete()
+        self.assertEqual(get_program_roles(self.tola_user.id), {})
+
+    def test_workflowteam_user_changed(self):
+        team = factories.WorkflowTeam(workflow_user=self.tola_user,
+                                      workflowlevel1=self.wflvl1,
+                                      role=self.role)
+        get_program_roles(self.tola_user.id)
+        team.workflow_user = factories.TolaUser(
+            user=factories.User(first_name='Ringo', last_name='Starr'))
+        team.save()
+        self.assertEqual(get_program_roles(self.tola_user.id), {})
+
+    def test_group_changes(self):
+        factories.WorkflowTeam(workflow_user=self.tola_user,
+                               workflowlevel1=self.wflvl1, role=self.role)
+        get_program_roles(self.tola_user.id)
+        self.role.name = ROLE_PROGRAM_TEAM
+        self.role.save()
+        self.assertEqual(get_program_roles(self.tola_user.id),
+                         {self.wflvl1.id: {ROLE_PROGRAM_TEAM}})
+
+        get_program_roles(self.tola_user.id)
+        self.tola_user.user.groups.add(self.role)
+        with self.assertNumQueries(1):
+            get_program_roles(self.tola_user.id)
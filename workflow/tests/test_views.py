@@ -0,0 +1,77 @@
+import json
+from decimal import Decimal
+
+from django.test import RequestFactory, TestCase, tag
+from mock import patch
+
+import factories
+from workflow import views
+
+
+@tag('pkg')
+class SiteProfileMapDataTest(TestCase):
+    def setUp(self):
+        self.tola_user = factories.TolaUser()
+        self.country = factories.Country()
+        self.tola_user.countries.add(self.country)
+        self.organization = self.tola_user.organization
+
+    def _site(self, latitude, longitude, **kwargs):
+        kwargs.setdefault('organization', self.organization)
+        kwargs.setdefault('country', self.country)
+        return factories.SiteProfile(latitude=Decimal(latitude),
+                                     longitude=Decimal(longitude), **kwargs)
+
+    def _get(self, **params):
+        request = RequestFactory().get('/workflow/siteprofile_map_data/',
+                                       params)
+        request.user = self.tola_user.user
+        response = views.SiteProfileMapData.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_sites(self):
+        site = self._site('34.5', '69.2', name='Kabul')
+        self._site('34.5', '69.2', status=False)
+        self._site('34.5', '69.2', organization=factories.Organization(
+            name='Other Org'))
+        self._site('34.5', '69.2', country=factories.Country(
+            country='Germany', code='DE'))
+        self._site('36.7', '68.8')
+
+        status, data = self._get(bbox='69,34,70,35', zoom=10)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['sites'], [{
+            'id': site.id, 'name': 'Kabul', 'latitude': 34.5,
+            'longitude': 69.2, 'country': 'Afghanistan', 'province': None,
+            'district': None}])
+
+    def test_clusters(self):
+        for latitude in ('34.50', '34.51', '34.52'):
+            self._site(latitude, '69.2')
+        site = self._site('36.7', '68.8')
+
+        with patch.object(views, 'SITE_MAP_MAX_SITES', 2):
+            status, data = self._get(bbox='60,30,75,40', zoom=5)
+        self.assertEqual(data['count'], 4)
+        clusters = sorted(data['clusters'], key=lambda c: c['count'])
+        self.assertEqual([c['count'] for c in clusters], [1, 3])
+        self.assertEqual(clusters[0]['id'], site.id)
+        self.assertIsNone(clusters[1]['id'])
+        self.assertAlmostEqual(clusters[1]['latitude'], 34.51)
+
+    def test_antimeridian(self):
+        self._site('-17.7', '178.0')
+        self._site('-17.7', '-179.0')
+        self._site('-17.7', '170.0')
+        status, data = self._get(bbox='175,-20,-175,-15', zoom=8)
+        self.assertEqual(data['count'], 2)
+
+    def test_invalid(self):
+        self.assertEqual(self._get(bbox='1,2,3', zoom=5)[0], 400)
+        self.assertEqual(self._get(bbox='a,b,c,d', zoom=5)[0], 400)
+        self.assertEqual(self._get(bbox='1,2,3,4', zoom='x')[0], 400)
+        self.assertEqual(self._get(bbox='1,2,3,4', zoom=5,
+                                   workflowlevel1='x')[0], 400)
+        self.assertEqual(self._get(bbox='1,2,3,4', zoom=5,
+                                   workflowlevel2='1.5')[0], 400)
@@ -27,6 +27,7 @@ urlpatterns = [
 
                        url(r'^siteprofile_list/(?P<workflowlevel1_id>\w+)/(?P<activity_id>\w+)/$', SiteProfileList.as_view(), name='siteprofile_list'),
                        url(r'^siteprofile_report/(?P<pk>\w+)/$', SiteProfileReport.as_view(), name='siteprofile_report'),
+                       url(r'^siteprofile_map_data/$', SiteProfileMapData.as_view(), name='siteprofile_map_data'),
                        url(r'^siteprofile_add', SiteProfileCreate.as_view(), name='siteprofile_add'),
                        url(r'^siteprofile_update/(?P<pk>\w+)/$', SiteProfileUpdate.as_view(), name='siteprofile_update'),
                        url(r'^siteprofile_delete/(?P<pk>\w+)/$', SiteProfileDelete.as_view(), name='siteprofile_delete'),
@@ -1,4 +1,5 @@
 import unicodedata
+from decimal import Decimal, InvalidOperation
 
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.list import ListView
@@ -20,8 +21,10 @@ import pytz
 from django.shortcuts import render
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Count
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, \
+    F, IntegerField, Min
 from django.db.models import Q
+from django.db.models.functions import Cast
 from filters import ProjectAgreementFilter
 import json
 import requests
@@ -38,7 +41,10 @@ from django.contrib.sites.shortcuts import get_current_site
 logger = logging.getLogger(__name__)
 
 from django.utils.decorators import method_decorator
-from tola.util import getCountry, emailGroup, group_excluded, group_required
+from search.backends import get_search_backend
+from tola.access import get_access_context
+from tola.util import emailGroup, group_excluded, group_required
+from workflow.scorecard import get_scorecards
 from mixins import AjaxableResponseMixin
 from export import ProjectAgreementResource, StakeholderResource
 
@@ -65,7 +71,7 @@ class ProjectDash(ListView):
     template_name = 'workflow/projectdashboard_list.html'
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
         project_id = int(self.kwargs['pk'])
 
@@ -114,12 +120,12 @@ class Level1Dash(ListView):
 
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
-        print(countries)
+        access = get_access_context(request)
+        countries = access.countries
         getworkflowlevel1s = WorkflowLevel1.objects.filter(country__in=countries).distinct()
         filtered_workflowlevel1 = None
         if int(self.kwargs['pk']) == 0:
-            getDashboard = WorkflowLevel1.objects.all().filter(country__in=countries).order_by('name').annotate(has_workflowlevel2=Count('workflowlevel2'))
+            getDashboard = WorkflowLevel1.objects.all().filter(country__in=countries).distinct().order_by('name')
         else:
             getDashboard = WorkflowLevel1.objects.all().filter(id=self.kwargs['pk'])
             filtered_workflowlevel1 = WorkflowLevel1.objects.only('name').get(pk=self.kwargs['pk']).name
@@ -131,8 +137,14 @@ class Level1Dash(ListView):
 
         else:
             status = None
-        print(getworkflowlevel1s)
-        print(getDashboard)
+
+        # the template leaves out the programs without projects
+        getDashboard = list(getDashboard)
+        scorecards = get_scorecards(
+            [workflowlevel1.id for workflowlevel1 in getDashboard],
+            access.country_ids)
+        for workflowlevel1 in getDashboard:
+            workflowlevel1.scorecard = scorecards[workflowlevel1.id]
 
         return render(request, self.template_name, {'getDashboard': getDashboard, 'getworkflowlevel1s': getworkflowlevel1s, 'APPROVALS': APPROVALS, 'workflowlevel1_id':  self.kwargs['pk'], 'status': status, 'filtered_workflowlevel1': filtered_workflowlevel1})
 
@@ -146,7 +158,7 @@ class ProjectAgreementList(ListView):
     template_name = 'workflow/workflowlevel2_list.html'
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
         if int(self.kwargs['pk']) != 0:
@@ -172,7 +184,7 @@ class ProjectAgreementImport(ListView):
     template_name = 'workflow/workflowlevel2_import.html'
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
         getServices = ExternalService.objects.all()
         getCountries = Country.objects.all().filter(country__in=countries)
@@ -189,7 +201,7 @@ class WorkflowLevel1List(ListView):
     template_name = 'workflow/workflowlevel1_list.html'
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries).distinct()
 
         return render(request, self.template_name, {'form': FilterForm(),'getworkflowlevel1s':getworkflowlevel1s, 'countires': countries})
@@ -224,7 +236,7 @@ class WorkflowLevel1Create(CreateView):
     def get_initial(self):
 
         initial = {
-            'country': getCountry(self.request.user),
+            'country': get_access_context(self.request).countries,
             }
 
         return initial
@@ -616,7 +628,7 @@ class DocumentationList(ListView):
     def get(self, request, *args, **kwargs):
 
         project_agreement_id = self.kwargs['project']
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
 
         if int(self.kwargs['workflowlevel1']) != 0 & int(self.kwargs['project']) == 0:
@@ -628,7 +640,7 @@ class DocumentationList(ListView):
                 .prefetch_related('workflowlevel1','workflowlevel2')\
                 .filter(workflowlevel2__id=self.kwargs['project'])
         else:
-            countries = getCountry(request.user)
+            countries = get_access_context(request).countries
             getDocumentation = Documentation.objects.all()\
                 .prefetch_related('workflowlevel1','workflowlevel2','workflowlevel2__office')\
                 .filter(workflowlevel1__country__in=countries)
@@ -648,7 +660,7 @@ class DocumentationAgreementList(AjaxableResponseMixin, CreateView):
 
     def get(self, request, *args, **kwargs):
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
 
         getDocumentation = Documentation.objects.all().prefetch_related('workflowlevel1', 'project')
@@ -943,7 +955,7 @@ class SiteProfileList(ListView):
         activity_id = int(self.kwargs['activity_id'])
         workflowlevel1_id = int(self.kwargs['workflowlevel1_id'])
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
 
         #this date, 3 months ago, a site is considered inactive
@@ -966,16 +978,9 @@ class SiteProfileList(ListView):
                 .filter(country__in=countries).distinct()
 
         if request.method == "GET" and "search" in request.GET:
-            getSiteProfile = SiteProfile.objects.all()\
-                .filter(\
-                    Q(country__in=countries), \
-                    Q(name__contains=request.GET["search"]) | \
-                    Q(office__name__contains=request.GET["search"]) | \
-                    Q(type__profile__contains=request.GET['search']) | \
-                    Q(province__name__contains=request.GET["search"]) | \
-                    Q(district__name__contains=request.GET["search"]) | \
-                    Q(village__contains=request.GET['search']) | \
-                    Q(workflowlevel2__project_name__contains=request.GET['search']))\
+            getSiteProfile = get_search_backend().filter(
+                SiteProfile.objects.filter(country__in=countries),
+                'site_profiles', request.GET["search"])\
                 .select_related().distinct()
         #paginate site profile list
 
@@ -1001,12 +1006,119 @@ class SiteProfileList(ListView):
             'default_list':default_list,\
             'getSiteProfile':getSiteProfile,\
             'project_agreement_id': activity_id,\
+            'workflowlevel1_id': workflowlevel1_id,\
             'country': countries,\
             'getworkflowlevel1s':getworkflowlevel1s, \
             'form': FilterForm(), \
             'helper': FilterForm.helper})
 
 
+# site map: width of a cluster in pixels, zoom from which the sites are
+# sent one by one, and number of sites under which they always are
+SITE_MAP_CLUSTER_PIXELS = 60
+SITE_MAP_SITES_ZOOM = 14
+SITE_MAP_MAX_SITES = 500
+
+
+def _site_map_bbox(value):
+    """
+    Return (min lon, min lat, max lon, max lat) of the bbox parameter,
+    None when it is not valid.
+    """
+    try:
+        bbox = [Decimal(part) for part in value.split(',')]
+    except (AttributeError, InvalidOperation):
+        return None
+    if len(bbox) != 4 or bbox[1] > bbox[3]:
+        return None
+    return bbox
+
+
+def cluster_sites(sites, zoom):
+    """
+    Group sites in the cells of a grid of SITE_MAP_CLUSTER_PIXELS at zoom,
+    returning the number of sites and their mean position per cell.
+    """
+    size = Decimal(360 * SITE_MAP_CLUSTER_PIXELS) / (256 * 2 ** zoom)
+    cells = sites.order_by().annotate(
+        cell_x=Cast(ExpressionWrapper(
+            (F('longitude') + 180) / size, output_field=DecimalField()),
+            IntegerField()),
+        cell_y=Cast(ExpressionWrapper(
+            (F('latitude') + 90) / size, output_field=DecimalField()),
+            IntegerField())).values('cell_x', 'cell_y').annotate(
+        count=Count('id'), latitude=Avg('latitude'),
+        longitude=Avg('longitude'), site_id=Min('id'))
+    return [{'count': cell['count'], 'latitude': float(cell['latitude']),
+             'longitude': float(cell['longitude']),
+             'id': cell['site_id'] if cell['count'] == 1 else None}
+            for cell in cells]
+
+
+class SiteProfileMapData(View):
+    """
+    Sites of the map in the bounding box bbox=min lon,min lat,max lon,max
+    lat at zoom, grouped in clusters unless there are few of them or the
+    zoom is high. Only the active sites of the organization in the
+    countries of the user are sent, of a program with workflowlevel1, of
+    an activity with workflowlevel2.
+    """
+    def get(self, request, *args, **kwargs):
+        bbox = _site_map_bbox(request.GET.get('bbox'))
+        try:
+            zoom = min(int(request.GET.get('zoom', 0)), 22)
+        except ValueError:
+            zoom = None
+        if bbox is None or zoom is None or zoom < 0:
+            return JsonResponse({'error': 'bbox and zoom are required'},
+                                status=400)
+        try:
+            workflowlevel1_id = int(request.GET.get('workflowlevel1') or 0)
+            workflowlevel2_id = int(request.GET.get('workflowlevel2') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'workflowlevel1 and '
+                                          'workflowlevel2 must be ids'},
+                                status=400)
+
+        access = get_access_context(request)
+        min_lon, min_lat, max_lon, max_lat = bbox
+        sites = SiteProfile.objects.filter(
+            organization_id=access.organization_id,
+            country_id__in=access.country_ids, status=True,
+            latitude__range=(min_lat, max_lat))
+        if min_lon <= max_lon:
+            sites = sites.filter(longitude__range=(min_lon, max_lon))
+        else:
+            # the bbox crosses the antimeridian
+            sites = sites.filter(Q(longitude__gte=min_lon) |
+                                 Q(longitude__lte=max_lon))
+
+        if workflowlevel2_id:
+            sites = sites.filter(pk__in=SiteProfile.objects.filter(
+                workflowlevel2__id=workflowlevel2_id).values('pk'))
+        elif workflowlevel1_id:
+            sites = sites.filter(pk__in=SiteProfile.objects.filter(
+                Q(workflowlevel1__id=workflowlevel1_id) |
+                Q(workflowlevel2__workflowlevel1__id=workflowlevel1_id))
+                .values('pk'))
+
+        count = sites.count()
+        if zoom < SITE_MAP_SITES_ZOOM and count > SITE_MAP_MAX_SITES:
+            return JsonResponse({'count': count,
+                                 'clusters': cluster_sites(sites, zoom)})
+
+        rows = sites.order_by().values(
+            'id', 'name', 'latitude', 'longitude', 'country__country',
+            'province__name', 'district__name')
+        return JsonResponse({'count': count, 'sites': [
+            {'id': row['id'], 'name': row['name'],
+             'latitude': float(row['latitude']),
+             'longitude': float(row['longitude']),
+             'country': row['country__country'],
+             'province': row['province__name'],
+             'district': row['district__name']} for row in rows]})
+
+
 class SiteProfileReport(ListView):
     """
     SiteProfile Report filtered by project
@@ -1015,7 +1127,7 @@ class SiteProfileReport(ListView):
     template_name = 'workflow/site_profile_report.html'
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         project_agreement_id = self.kwargs['pk']
 
         if int(self.kwargs['pk']) == 0:
@@ -1051,7 +1163,7 @@ class SiteProfileCreate(CreateView):
         return kwargs
 
     def get_initial(self):
-        countries = getCountry(self.request.user)
+        countries = get_access_context(self.request).countries
         default_country = None
         if countries:
             default_country = countries[0]
@@ -1286,7 +1398,7 @@ class ContactList(ListView):
             pass
 
         if int(self.kwargs['pk']) == 0:
-            countries=getCountry(request.user)
+            countries=get_access_context(request).countries
             getContacts = Contact.objects.all().filter(country__in=countries)
 
         else:
@@ -1318,7 +1430,7 @@ class ContactCreate(CreateView):
         return context
 
     def get_initial(self):
-        country = getCountry(self.request.user)[0]
+        country = get_access_context(self.request).countries[0]
         initial = {
             'workflowlevel2': self.kwargs['id'],
             'country': country,
@@ -1423,10 +1535,10 @@ class StakeholderList(ListView):
         else:
             workflowlevel1_id = 0
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
         getworkflowlevel1s = WorkflowLevel1.objects.all().filter(country__in=countries)
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         if workflowlevel1_id != 0:
             getStakeholders = Stakeholder.objects.all().filter(workflowlevel2__workflowlevel1__id=workflowlevel1_id).distinct()
@@ -1467,7 +1579,7 @@ class StakeholderCreate(CreateView):
 
     def get_initial(self):
 
-        country = getCountry(self.request.user)[0]
+        country = get_access_context(self.request).countries[0]
 
         initial = {
             'workflowlevel2': self.kwargs['id'],
@@ -2104,7 +2216,7 @@ class Report(View, AjaxableResponseMixin):
     """
     def get(self, request, *args, **kwargs):
 
-        countries=getCountry(request.user)
+        countries=get_access_context(request).countries
 
         if int(self.kwargs['pk']) != 0:
             getAgreements = WorkflowLevel2.objects.all().filter(workflowlevel1__id=self.kwargs['pk'])
@@ -2154,7 +2266,7 @@ class ReportData(View, AjaxableResponseMixin):
 
     def get(self, request, *args, **kwargs):
 
-        countries=getCountry(request.user)
+        countries=get_access_context(request).countries
         filters = {}
         if int(self.kwargs['pk']) != 0:
             getAgreements = WorkflowLevel2.objects.all()\
@@ -2247,7 +2359,7 @@ def service_json(request, service):
 def export_stakeholders_list(request, **kwargs):
 
     workflowlevel1_id = int(kwargs['workflowlevel1_id'])
-    countries = getCountry(request.user)
+    countries = get_access_context(request).countries
 
     if workflowlevel1_id != 0:
         getStakeholders = Stakeholder.objects.prefetch_related('sector').filter(workflowlevel2__workflowlevel1__id=workflowlevel1_id).distinct()
@@ -2291,9 +2403,9 @@ class StakeholderObjects(View, AjaxableResponseMixin):
         else:
             workflowlevel1_id = 0
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         if workflowlevel1_id != 0:
             getStakeholders = Stakeholder.objects.all().filter(workflowlevel2__workflowlevel1__id=workflowlevel1_id).distinct().values('id', 'create_date', 'type__name', 'name', 'sectors__sector')
@@ -2314,7 +2426,7 @@ class StakeholderObjects(View, AjaxableResponseMixin):
 class DocumentationListObjects(View, AjaxableResponseMixin):
 
     def get(self, request, *args, **kwargs):
-        countries = getCountry(request.user)
+        countries = get_access_context(request).countries
 
         if int(self.kwargs['workflowlevel1']) != 0 & int(self.kwargs['project']) == 0:
             getDocumentation = Documentation.objects.all()\